@@ -1,6 +1,15 @@
 # app.py - Programa Principal - Sistema Climatot Almacén
-import socket
 import sys
+
+# --profile-startup: medir imports e inicialización desde la primera línea
+PERFIL_ARRANQUE = "--profile-startup" in sys.argv
+if PERFIL_ARRANQUE:
+    sys.argv.remove("--profile-startup")
+    from src.core import perfil_arranque
+    perfil_arranque.activar()
+
+import contextlib
+import socket
 import threading
 import time
 from pathlib import Path
@@ -28,27 +37,21 @@ from src.core.logger import log_fin_sesion, log_inicio_sesion, logger
 from src.core.session_manager import session_manager
 from src.repos import sesiones_repo
 from src.ui.estilos import ESTILO_VENTANA
-from src.ventanas.consultas.ventana_consumos import VentanaConsumos
-from src.ventanas.consultas.ventana_historico import VentanaHistorico
-from src.ventanas.consultas.ventana_informe_furgonetas import VentanaInformeFurgonetas
-from src.ventanas.consultas.ventana_pedido_ideal import VentanaPedidoIdeal
-from src.ventanas.consultas.ventana_stock import VentanaStock
-from src.ventanas.dialogo_cambiar_password import DialogoCambiarPassword
-from src.ventanas.maestros.ventana_articulos import VentanaArticulos
-from src.ventanas.maestros.ventana_familias import VentanaFamilias
-from src.ventanas.maestros.ventana_furgonetas import VentanaFurgonetas
-from src.ventanas.maestros.ventana_operarios import VentanaOperarios
-from src.ventanas.maestros.ventana_proveedores import VentanaProveedores
-from src.ventanas.maestros.ventana_ubicaciones import VentanaUbicaciones
-from src.ventanas.maestros.ventana_usuarios import VentanaUsuarios
-from src.ventanas.operativas.ventana_devolucion import VentanaDevolucion
-from src.ventanas.operativas.ventana_imputacion import VentanaImputacion
-from src.ventanas.operativas.ventana_inventario import VentanaInventario
-from src.ventanas.operativas.ventana_material_perdido import VentanaMaterialPerdido
-from src.ventanas.operativas.ventana_movimientos import VentanaMovimientos
-from src.ventanas.operativas.ventana_recepcion import VentanaRecepcion
 from src.ventanas.ventana_login import VentanaLogin
 
+# Las ventanas del menú (y sus servicios, reportlab, openpyxl, pandas...)
+# se importan al abrirlas por primera vez, no antes de mostrar el login.
+
+if PERFIL_ARRANQUE:
+    perfil_arranque.marcar("Imports de app.py completados")
+
+
+def perfil_fase(nombre: str):
+    """Mide una fase de arranque si se lanzó con --profile-startup."""
+    if PERFIL_ARRANQUE:
+        return perfil_arranque.fase(nombre)
+    return contextlib.nullcontext()
+
 
 # ========================================
 # VENTANA MENÚ PRINCIPAL
@@ -241,23 +244,40 @@ class MainMenuWindow(QWidget):
                 logger.error(f"Error al eliminar sesión al cerrar: {str(e)}")
 
             # Crear backup automático al cerrar si está configurado
+            hilo_backup = None
             try:
                 from src.services.backup_config_service import obtener_configuracion
                 config = obtener_configuracion()
 
                 if config.backup_auto_cierre:
-                    # Importar y ejecutar backup
-                    import sys
-                    from pathlib import Path
-                    ROOT_DIR = Path(__file__).parent
-                    sys.path.insert(0, str(ROOT_DIR))
-
-                    from scripts.backup_db import crear_backup
-                    crear_backup(mostrar_log=True, forzar=False)
+                    # En segundo plano: la ventana se cierra sin esperar y el
+                    # proceso termina cuando el backup ha acabado
+                    from src.services import backup_service
+                    hilo_backup = backup_service.crear_backup_en_segundo_plano(forzar=False)
             except Exception as e:
                 # No bloquear el cierre si falla el backup
                 logger.warning(f"No se pudo crear backup automático al cerrar: {e}")
 
+            # Subir métricas de rendimiento si está activado en config/app.ini
+            try:
+                from src.services import metricas_service
+                if metricas_service.subida_automatica_activada():
+                    metricas_service.subir_metricas(self.usuario, self.hostname)
+            except Exception as e:
+                logger.warning(f"No se pudieron subir las métricas de rendimiento: {e}")
+
+            # Parar la escucha de cambios de maestros (LISTEN) y cerrar el
+            # pool para no dejar conexiones abiertas en el servidor. Si hay un
+            # backup en marcha el pool sigue abierto hasta que acabe el proceso
+            try:
+                from src.core import cache_maestros
+                from src.core.db_utils import close_all_connections
+                cache_maestros.detener()
+                if hilo_backup is None:
+                    close_all_connections()
+            except Exception as e:
+                logger.warning(f"No se pudieron cerrar las conexiones a la BD: {e}")
+
             # NO usar idle manager - deshabilitado
             # idle_manager = get_idle_manager()
             # idle_manager.stop()
@@ -384,11 +404,13 @@ class MainMenuWindow(QWidget):
 
     def abrir_recepcion(self):
         """Abrir ventana de recepción (maximizada)"""
+        from src.ventanas.operativas.ventana_recepcion import VentanaRecepcion
         self.ventana_recep = VentanaRecepcion()
         self.ventana_recep.showMaximized()
 
     def abrir_movimientos(self):
         """Abrir ventana de movimientos (maximizada)"""
+        from src.ventanas.operativas.ventana_movimientos import VentanaMovimientos
         self.ventana_mov = VentanaMovimientos()
         self.ventana_mov.showMaximized()
 
@@ -399,6 +421,7 @@ class MainMenuWindow(QWidget):
 
     def abrir_imputacion(self):
         """Abrir ventana de imputación (maximizada)"""
+        from src.ventanas.operativas.ventana_imputacion import VentanaImputacion
         self.ventana_imput = VentanaImputacion()
         self.ventana_imput.showMaximized()
 
@@ -409,16 +432,19 @@ class MainMenuWindow(QWidget):
 
     def abrir_material_perdido(self):
         """Abrir ventana de material perdido (maximizada)"""
+        from src.ventanas.operativas.ventana_material_perdido import VentanaMaterialPerdido
         self.ventana_perdido = VentanaMaterialPerdido()
         self.ventana_perdido.showMaximized()
 
     def abrir_devolucion(self):
         """Abrir ventana de devolución (maximizada)"""
+        from src.ventanas.operativas.ventana_devolucion import VentanaDevolucion
         self.ventana_devol = VentanaDevolucion()
         self.ventana_devol.showMaximized()
 
     def abrir_inventario(self):
         """Abrir ventana de inventario físico"""
+        from src.ventanas.operativas.ventana_inventario import VentanaInventario
         self.ventana_inv = VentanaInventario()
         self.ventana_inv.show()
 
@@ -506,11 +532,13 @@ class MenuInformes(QWidget):
 
     def abrir_consumos(self):
         """Abrir ventana consolidada de análisis de consumos"""
+        from src.ventanas.consultas.ventana_consumos import VentanaConsumos
         self.ventana_consumos = VentanaConsumos()
         self.ventana_consumos.show()
 
     def abrir_pedido_ideal(self):
         """Abrir ventana de cálculo de pedido ideal"""
+        from src.ventanas.consultas.ventana_pedido_ideal import VentanaPedidoIdeal
         self.ventana_pedido_ideal = VentanaPedidoIdeal()
         self.ventana_pedido_ideal.show()
 
@@ -522,6 +550,7 @@ class MenuInformes(QWidget):
 
     def abrir_informe_furgonetas(self):
         """Abrir ventana de informe semanal de furgonetas"""
+        from src.ventanas.consultas.ventana_informe_furgonetas import VentanaInformeFurgonetas
         self.ventana_informe_furg = VentanaInformeFurgonetas()
         self.ventana_informe_furg.show()
 
@@ -582,27 +611,33 @@ class MaestrosWindow(QWidget):
         layout.addWidget(btn_volver)
 
     def abrir_proveedores(self):
+        from src.ventanas.maestros.ventana_proveedores import VentanaProveedores
         self.ventana_prov = VentanaProveedores()
         self.ventana_prov.show()
 
     def abrir_familias(self):
+        from src.ventanas.maestros.ventana_familias import VentanaFamilias
         self.ventana_fam = VentanaFamilias()
         self.ventana_fam.show()
 
     def abrir_ubicaciones(self):
+        from src.ventanas.maestros.ventana_ubicaciones import VentanaUbicaciones
         self.ventana_ubic = VentanaUbicaciones()
         self.ventana_ubic.show()
 
     def abrir_operarios(self):
+        from src.ventanas.maestros.ventana_operarios import VentanaOperarios
         self.ventana_oper = VentanaOperarios()
         self.ventana_oper.show()
 
     def abrir_articulos(self):
+        from src.ventanas.maestros.ventana_articulos import VentanaArticulos
         self.ventana_art = VentanaArticulos()
         self.ventana_art.show()
 
     def abrir_furgonetas(self):
         """Abrir ventana de gestión de furgonetas/almacenes"""
+        from src.ventanas.maestros.ventana_furgonetas import VentanaFurgonetas
         self.ventana_furg = VentanaFurgonetas()
         self.ventana_furg.show()
 
@@ -663,6 +698,7 @@ class MenuAjustes(QWidget):
 
     def cambiar_password(self):
         """Abrir diálogo para cambiar contraseña propia"""
+        from src.ventanas.dialogo_cambiar_password import DialogoCambiarPassword
         dialogo = DialogoCambiarPassword(self)
         dialogo.exec()
 
@@ -794,6 +830,7 @@ class MenuConfiguracion(QWidget):
             ("💾 Backup y Restauración", self.abrir_backup),
             ("📊 Estadísticas del Sistema", self.abrir_estadisticas_sistema),
             ("🔒 Seguridad y Permisos", self.abrir_seguridad_permisos),
+            ("⏱️ Diagnóstico de Rendimiento", self.abrir_diagnostico_rendimiento),
         ]
 
         for i, (texto, func) in enumerate(botones):
@@ -815,6 +852,7 @@ class MenuConfiguracion(QWidget):
 
     def abrir_usuarios(self):
         """Abrir ventana de gestión de usuarios (solo admin)"""
+        from src.ventanas.maestros.ventana_usuarios import VentanaUsuarios
         self.ventana_usuarios = VentanaUsuarios()
         self.ventana_usuarios.show()
 
@@ -889,6 +927,12 @@ class MenuConfiguracion(QWidget):
                 f"Error al obtener estadísticas:\n{e}"
             )
 
+    def abrir_diagnostico_rendimiento(self):
+        """Abrir diálogo con los tiempos por pantalla de esta sesión (solo admin)"""
+        from src.ventanas.dialogo_diagnostico_rendimiento import DialogoDiagnosticoRendimiento
+        dialogo = DialogoDiagnosticoRendimiento(self)
+        dialogo.exec()
+
     def abrir_seguridad_permisos(self):
         """Muestra información sobre seguridad y permisos"""
         mensaje = """
@@ -938,7 +982,12 @@ class MenuConfiguracion(QWidget):
 # PUNTO DE ENTRADA DE LA APLICACIÓN
 # ========================================
 def main():
-    app = QApplication(sys.argv)
+    with perfil_fase("QApplication"):
+        app = QApplication(sys.argv)
+
+    # Abrir el pool de conexiones mientras el usuario escribe sus credenciales
+    from src.core.db_utils import asegurar_particiones_movimientos, precalentar_pool
+    hilo_pool = precalentar_pool()
 
     # Configurar icono de la aplicación
     base_dir = Path(__file__).parent
@@ -946,9 +995,32 @@ def main():
     if icon_path.exists():
         app.setWindowIcon(QIcon(str(icon_path)))
 
+    if PERFIL_ARRANQUE:
+        # El informe se vuelca cuando el login ya está en pantalla y el pool ha
+        # terminado de abrirse. Se consulta el hilo con un temporizador en vez
+        # de esperarlo con join(), que congelaría el login mientras tanto.
+        temporizador_pool = QTimer(app)
+        temporizador_pool.setInterval(50)
+
+        def _informe_arranque():
+            if hilo_pool.is_alive():
+                return
+            temporizador_pool.stop()
+            perfil_arranque.marcar("Conexión a BD (pool precalentado)")
+            perfil_arranque.desactivar()
+            perfil_arranque.volcar_informe()
+
+        def _login_en_pantalla():
+            perfil_arranque.marcar("Login en pantalla")
+            temporizador_pool.start()
+
+        temporizador_pool.timeout.connect(_informe_arranque)
+        QTimer.singleShot(0, _login_en_pantalla)
+
     # Bucle de login: seguir intentando hasta que el usuario se autentique o quiera salir
     while True:
-        login = VentanaLogin()
+        with perfil_fase("Construir VentanaLogin"):
+            login = VentanaLogin()
         resultado = login.exec()
 
         if resultado == QDialog.Accepted:
@@ -961,6 +1033,9 @@ def main():
                 sesiones_repo.registrar_sesion(user_data["usuario"], t, hostname)
                 log_inicio_sesion(user_data["usuario"], hostname)
 
+                # Particiones de movimientos del año en curso y el siguiente
+                asegurar_particiones_movimientos()
+
             except Exception as e:
                 logger.error(f"Error al registrar sesión: {str(e)}")
                 QMessageBox.critical(
@@ -0,0 +1,105 @@
+-- ========================================
+-- PARTICIONADO DE MOVIMIENTOS Y CIERRE DE EJERCICIOS
+-- ========================================
+-- Objetos que necesita movimientos particionada por fecha. Es idempotente:
+-- lo ejecuta scripts/particionar_movimientos.py y está también incluido en
+-- schema_postgres_full.sql para las instalaciones nuevas.
+--
+-- fecha es TEXT 'YYYY-MM-DD': las particiones anuales van de 'AAAA-01-01'
+-- (incluido) a 'AAAA+1-01-01' (excluido), que también ordena bien como texto.
+
+-- Tabla: cierres_movimientos
+-- Un registro por ejercicio cerrado. El stock de los ejercicios cerrados
+-- queda resumido en movimientos de tipo 'APERTURA' con fecha_apertura.
+CREATE TABLE IF NOT EXISTS cierres_movimientos (
+  anio INTEGER PRIMARY KEY,
+  fecha_apertura TEXT NOT NULL,
+  cerrado_en TIMESTAMP NOT NULL DEFAULT NOW(),
+  usuario TEXT,
+  posiciones INTEGER NOT NULL DEFAULT 0,
+  movimientos_cerrados BIGINT NOT NULL DEFAULT 0
+);
+
+-- Función: fecha_apertura_movimientos
+-- Primer día del ejercicio abierto ('' si no se ha cerrado ninguno). Las
+-- consultas de stock filtran fecha >= fecha_apertura_movimientos() y así
+-- PostgreSQL descarta las particiones de los ejercicios cerrados.
+CREATE OR REPLACE FUNCTION fecha_apertura_movimientos() RETURNS TEXT
+LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(MAX(fecha_apertura), '') FROM cierres_movimientos
+$$;
+
+-- Función: comprobar_fecha_movimiento
+-- Impide registrar movimientos en un ejercicio cerrado (descuadrarían el
+-- saldo de apertura).
+CREATE OR REPLACE FUNCTION comprobar_fecha_movimiento() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+  apertura TEXT := fecha_apertura_movimientos();
+BEGIN
+  IF NEW.fecha < apertura THEN
+    RAISE EXCEPTION 'Ejercicio cerrado: no se admiten movimientos anteriores a %', apertura;
+  END IF;
+  RETURN NEW;
+END
+$$;
+
+-- Función: crear_particiones_movimientos
+-- Crea las particiones anuales que falten entre los dos años (incluidos),
+-- moviendo a cada una las filas de su año que hubiera en movimientos_default.
+-- Cada partición copia los CHECK de movimientos: ATTACH PARTITION los exige.
+CREATE OR REPLACE FUNCTION crear_particiones_movimientos(desde_anio INTEGER, hasta_anio INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+  anio INTEGER;
+  particion TEXT;
+  desde TEXT;
+  hasta TEXT;
+  creadas INTEGER := 0;
+BEGIN
+  FOR anio IN desde_anio..hasta_anio LOOP
+    particion := 'movimientos_' || anio;
+    CONTINUE WHEN to_regclass('public.' || particion) IS NOT NULL;
+    desde := anio || '-01-01';
+    hasta := (anio + 1) || '-01-01';
+    EXECUTE format('CREATE TABLE public.%I (LIKE public.movimientos INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', particion);
+    EXECUTE format(
+      'WITH movidas AS (DELETE FROM public.movimientos_default WHERE fecha >= %L AND fecha < %L RETURNING *) '
+      'INSERT INTO public.%I SELECT * FROM movidas', desde, hasta, particion);
+    EXECUTE format('ALTER TABLE public.movimientos ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+                   particion, desde, hasta);
+    creadas := creadas + 1;
+  END LOOP;
+  RETURN creadas;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER trg_movimientos_fecha
+  BEFORE INSERT OR UPDATE OF fecha ON movimientos
+  FOR EACH ROW EXECUTE FUNCTION comprobar_fecha_movimiento();
+
+-- Vista: vw_stock
+-- Solo el ejercicio abierto: el de los cerrados está en los movimientos de
+-- APERTURA (fechados el primer día del ejercicio abierto).
+CREATE OR REPLACE VIEW vw_stock AS
+  SELECT destino_id AS almacen_id, articulo_id, SUM(cantidad) AS delta
+  FROM movimientos
+  WHERE tipo IN ('ENTRADA','TRASPASO','APERTURA')
+    AND fecha >= fecha_apertura_movimientos()
+  GROUP BY destino_id, articulo_id
+  UNION ALL
+  SELECT origen_id AS almacen_id, articulo_id, SUM(-cantidad) AS delta
+  FROM movimientos
+  WHERE tipo IN ('IMPUTACION','PERDIDA','DEVOLUCION','TRASPASO')
+    AND origen_id IS NOT NULL
+    AND fecha >= fecha_apertura_movimientos()
+  GROUP BY origen_id, articulo_id;
+
+-- Vista: vw_stock_total
+-- Se recrea por si la migración de una tabla antigua (fecha DATE) tuvo que
+-- borrar las vistas que dependían de movimientos.
+CREATE OR REPLACE VIEW vw_stock_total AS
+  SELECT articulo_id, SUM(delta) AS stock_total
+  FROM vw_stock
+  GROUP BY articulo_id;
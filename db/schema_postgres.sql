@@ -9,6 +9,12 @@
 --   - INTEGER (booleans) → SMALLINT (se mantiene para compatibilidad)
 --   - date('now') → CURRENT_DATE
 --   - datetime('now') → NOW()
+--
+-- Se conserva como referencia de la conversión inicial. Las instalaciones
+-- nuevas usan schema_postgres_full.sql (scripts/init_postgres.py), que es el
+-- esquema con el que trabaja la aplicación: fecha de movimientos como TEXT
+-- 'YYYY-MM-DD', movimientos particionada por año, tipo 'APERTURA',
+-- cierres de ejercicio y disparadores de la caché de maestros.
 -- ========================================
 
 -- ========================================
@@ -198,6 +204,22 @@ CREATE TABLE IF NOT EXISTS historial(
   detalles    TEXT
 );
 
+-- Telemetría de rendimiento por pantalla (resúmenes enviados por cada equipo)
+CREATE TABLE IF NOT EXISTS metricas_rendimiento(
+  id          SERIAL PRIMARY KEY,
+  fecha       TIMESTAMP NOT NULL DEFAULT NOW(),
+  usuario     VARCHAR(100),
+  hostname    VARCHAR(255),
+  pantalla    VARCHAR(100) NOT NULL,
+  fase        VARCHAR(30) NOT NULL,
+  muestras    INTEGER NOT NULL,
+  media_ms    NUMERIC(12,1),
+  p50_ms      NUMERIC(12,1),
+  p90_ms      NUMERIC(12,1),
+  p99_ms      NUMERIC(12,1),
+  max_ms      NUMERIC(12,1)
+);
+
 -- ========================================
 -- VISTAS PARA STOCK
 -- ========================================
@@ -249,6 +271,9 @@ CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial(fecha);
 CREATE INDEX IF NOT EXISTS idx_historial_usuario ON historial(usuario);
 CREATE INDEX IF NOT EXISTS idx_historial_tabla ON historial(tabla);
 
+-- Índice para métricas de rendimiento
+CREATE INDEX IF NOT EXISTS idx_metricas_pantalla_fecha ON metricas_rendimiento(pantalla, fecha);
+
 -- ========================================
 -- COMENTARIOS SOBRE LA MIGRACIÓN
 -- ========================================
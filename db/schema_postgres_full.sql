@@ -49,6 +49,17 @@ CREATE TABLE IF NOT EXISTS asignaciones_furgoneta (
   PRIMARY KEY (operario_id, fecha, turno)
 );
 
+-- Tabla: cierres_movimientos
+-- Un registro por ejercicio cerrado (ver db/particionado_movimientos.sql)
+CREATE TABLE IF NOT EXISTS cierres_movimientos (
+  anio INTEGER PRIMARY KEY,
+  fecha_apertura TEXT NOT NULL,
+  cerrado_en TIMESTAMP NOT NULL DEFAULT NOW(),
+  usuario TEXT,
+  posiciones INTEGER NOT NULL DEFAULT 0,
+  movimientos_cerrados BIGINT NOT NULL DEFAULT 0
+);
+
 -- Tabla: config_backups
 CREATE TABLE IF NOT EXISTS config_backups (
   id SERIAL PRIMARY KEY,
@@ -131,9 +142,29 @@ CREATE TABLE IF NOT EXISTS inventarios (
   fecha_cierre TEXT
 );
 
+-- Tabla: metricas_rendimiento
+-- Telemetría de rendimiento por pantalla (resúmenes enviados por cada equipo)
+CREATE TABLE IF NOT EXISTS metricas_rendimiento (
+  id SERIAL PRIMARY KEY,
+  fecha TIMESTAMP NOT NULL DEFAULT NOW(),
+  usuario VARCHAR(100),
+  hostname VARCHAR(255),
+  pantalla VARCHAR(100) NOT NULL,
+  fase VARCHAR(30) NOT NULL,
+  muestras INTEGER NOT NULL,
+  media_ms NUMERIC(12,1),
+  p50_ms NUMERIC(12,1),
+  p90_ms NUMERIC(12,1),
+  p99_ms NUMERIC(12,1),
+  max_ms NUMERIC(12,1)
+);
+
 -- Tabla: movimientos
+-- Particionada por año de fecha ('YYYY-MM-DD'); las particiones anuales se
+-- crean con crear_particiones_movimientos() y movimientos_default recoge el
+-- resto. La clave primaria incluye fecha, como exige el particionado.
 CREATE TABLE IF NOT EXISTS movimientos (
-  id SERIAL PRIMARY KEY,
+  id SERIAL,
   fecha TEXT NOT NULL,
   tipo TEXT NOT NULL,
   origen_id INTEGER,
@@ -145,8 +176,11 @@ CREATE TABLE IF NOT EXISTS movimientos (
   ot TEXT,
   operario_id INTEGER,
   responsable TEXT,
-  albaran TEXT
-);
+  albaran TEXT,
+  PRIMARY KEY (id, fecha)
+) PARTITION BY RANGE (fecha);
+
+CREATE TABLE IF NOT EXISTS movimientos_default PARTITION OF movimientos DEFAULT;
 
 -- Tabla: notificaciones
 CREATE TABLE IF NOT EXISTS notificaciones (
@@ -200,6 +234,122 @@ CREATE TABLE IF NOT EXISTS usuarios (
   PRIMARY KEY (usuario)
 );
 
+-- Tabla: versiones_maestros
+-- Contador de cambios por tabla maestra (ver registrar_cambio_maestro).
+CREATE TABLE IF NOT EXISTS versiones_maestros (
+  tabla TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  actualizado TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+
+-- ========================================
+-- FUNCIONES Y DISPARADORES
+-- ========================================
+
+-- Función: fecha_apertura_movimientos
+-- Primer día del ejercicio abierto ('' si no se ha cerrado ninguno). Las
+-- consultas de stock filtran fecha >= fecha_apertura_movimientos() y así
+-- PostgreSQL descarta las particiones de los ejercicios cerrados.
+CREATE OR REPLACE FUNCTION fecha_apertura_movimientos() RETURNS TEXT
+LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(MAX(fecha_apertura), '') FROM cierres_movimientos
+$$;
+
+-- Función: comprobar_fecha_movimiento
+-- Impide registrar movimientos en un ejercicio cerrado (descuadrarían el
+-- saldo de apertura).
+CREATE OR REPLACE FUNCTION comprobar_fecha_movimiento() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+  apertura TEXT := fecha_apertura_movimientos();
+BEGIN
+  IF NEW.fecha < apertura THEN
+    RAISE EXCEPTION 'Ejercicio cerrado: no se admiten movimientos anteriores a %', apertura;
+  END IF;
+  RETURN NEW;
+END
+$$;
+
+-- Función: crear_particiones_movimientos
+-- Crea las particiones anuales que falten entre los dos años (incluidos),
+-- moviendo a cada una las filas de su año que hubiera en movimientos_default.
+-- Cada partición copia los CHECK de movimientos: ATTACH PARTITION los exige.
+CREATE OR REPLACE FUNCTION crear_particiones_movimientos(desde_anio INTEGER, hasta_anio INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+  anio INTEGER;
+  particion TEXT;
+  desde TEXT;
+  hasta TEXT;
+  creadas INTEGER := 0;
+BEGIN
+  FOR anio IN desde_anio..hasta_anio LOOP
+    particion := 'movimientos_' || anio;
+    CONTINUE WHEN to_regclass('public.' || particion) IS NOT NULL;
+    desde := anio || '-01-01';
+    hasta := (anio + 1) || '-01-01';
+    EXECUTE format('CREATE TABLE public.%I (LIKE public.movimientos INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', particion);
+    EXECUTE format(
+      'WITH movidas AS (DELETE FROM public.movimientos_default WHERE fecha >= %L AND fecha < %L RETURNING *) '
+      'INSERT INTO public.%I SELECT * FROM movidas', desde, hasta, particion);
+    EXECUTE format('ALTER TABLE public.movimientos ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+                   particion, desde, hasta);
+    creadas := creadas + 1;
+  END LOOP;
+  RETURN creadas;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER trg_movimientos_fecha
+  BEFORE INSERT OR UPDATE OF fecha ON movimientos
+  FOR EACH ROW EXECUTE FUNCTION comprobar_fecha_movimiento();
+
+-- Función: registrar_cambio_maestro
+-- Incrementa la versión de la tabla maestra cambiada y lo notifica en el
+-- canal 'maestros' para que la caché de la aplicación la invalide.
+CREATE OR REPLACE FUNCTION registrar_cambio_maestro() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  INSERT INTO versiones_maestros(tabla, version) VALUES (TG_TABLE_NAME, 1)
+  ON CONFLICT (tabla) DO UPDATE
+    SET version = versiones_maestros.version + 1, actualizado = NOW();
+  PERFORM pg_notify('maestros', TG_TABLE_NAME);
+  RETURN NULL;
+END
+$$;
+
+-- Un disparador por sentencia (no por fila) en cada tabla maestra. articulos
+-- no se guarda en la caché, pero su versión avisa a la ventana de artículos.
+CREATE OR REPLACE TRIGGER trg_almacenes_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON almacenes
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_articulos_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON articulos
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_familias_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON familias
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_furgonetas_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON furgonetas
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_operarios_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON operarios
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_proveedores_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON proveedores
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_ubicaciones_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ubicaciones
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
 
 -- ========================================
 -- VISTAS
@@ -226,16 +376,20 @@ SELECT f.id AS furgoneta_id,
   FROM furgonetas f;
 
 -- Vista: vw_stock
+-- Solo el ejercicio abierto: el de los cerrados está en los movimientos de
+-- APERTURA (fechados el primer día del ejercicio abierto).
 CREATE OR REPLACE VIEW vw_stock AS
   SELECT destino_id AS almacen_id, articulo_id, SUM(cantidad) AS delta
   FROM movimientos
-  WHERE tipo IN ('ENTRADA','TRASPASO')
+  WHERE tipo IN ('ENTRADA','TRASPASO','APERTURA')
+    AND fecha >= fecha_apertura_movimientos()
   GROUP BY destino_id, articulo_id
   UNION ALL
   SELECT origen_id AS almacen_id, articulo_id, SUM(-cantidad) AS delta
   FROM movimientos
   WHERE tipo IN ('IMPUTACION','PERDIDA','DEVOLUCION','TRASPASO')
     AND origen_id IS NOT NULL
+    AND fecha >= fecha_apertura_movimientos()
   GROUP BY origen_id, articulo_id;
 
 -- Vista: vw_stock_total
@@ -302,6 +456,8 @@ CREATE INDEX IF NOT EXISTS idx_inventarios_almacen ON inventarios(almacen_id);
 
 CREATE INDEX IF NOT EXISTS idx_inventarios_fecha ON inventarios(fecha);
 
+CREATE INDEX IF NOT EXISTS idx_metricas_pantalla_fecha ON metricas_rendimiento(pantalla, fecha);
+
 CREATE INDEX IF NOT EXISTS idx_movimientos_albaran ON movimientos(albaran);
 
 CREATE INDEX IF NOT EXISTS idx_movimientos_articulo ON movimientos(articulo_id);
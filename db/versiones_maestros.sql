@@ -0,0 +1,67 @@
+-- ========================================
+-- VERSIONES DE DATOS MAESTROS
+-- ========================================
+-- Avisa de los cambios en las tablas maestras a la caché de la aplicación
+-- (src/core/cache_maestros.py). Es idempotente: lo ejecuta
+-- scripts/crear_versiones_maestros.py y está también incluido en
+-- schema_postgres_full.sql para las instalaciones nuevas.
+--
+-- Cada sentencia que cambia una tabla maestra incrementa su contador en
+-- versiones_maestros y notifica en el canal 'maestros' con el nombre de la
+-- tabla. La notificación solo se entrega si la transacción confirma.
+
+-- Tabla: versiones_maestros
+CREATE TABLE IF NOT EXISTS versiones_maestros (
+  tabla TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  actualizado TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Función: registrar_cambio_maestro
+CREATE OR REPLACE FUNCTION registrar_cambio_maestro() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  INSERT INTO versiones_maestros(tabla, version) VALUES (TG_TABLE_NAME, 1)
+  ON CONFLICT (tabla) DO UPDATE
+    SET version = versiones_maestros.version + 1, actualizado = NOW();
+  PERFORM pg_notify('maestros', TG_TABLE_NAME);
+  RETURN NULL;
+END
+$$;
+
+-- Un disparador por sentencia (no por fila) en cada tabla maestra. articulos
+-- no se guarda en la caché, pero su versión avisa a la ventana de artículos.
+CREATE OR REPLACE TRIGGER trg_almacenes_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON almacenes
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_articulos_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON articulos
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_familias_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON familias
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_furgonetas_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON furgonetas
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_operarios_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON operarios
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_proveedores_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON proveedores
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+CREATE OR REPLACE TRIGGER trg_ubicaciones_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ubicaciones
+  FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_maestro();
+
+-- Los movimientos no avisan: un NOTIFY por sentencia serializa todas las
+-- transacciones que escriben movimientos en la cola de notificaciones. El
+-- cubo de consumos usa su propia marca de agua (último id). Se quita el
+-- aviso de las BD que lo tenían de una versión anterior de este script.
+DROP TRIGGER IF EXISTS trg_movimientos_aviso ON movimientos;
+DROP FUNCTION IF EXISTS avisar_cambio_movimientos();
@@ -0,0 +1,19 @@
+"""
+Banco de pruebas de rendimiento de ClimatotAlmacen
+
+- generador: crea una BD sintética determinista (misma semilla y misma
+  fecha final -> mismos datos) escalable hasta decenas de millones de
+  movimientos, cargada con COPY.
+- escenarios: cronometra las llamadas de service más usadas contra esa BD
+  y guarda una línea base JSON para comparar versiones.
+
+Uso:
+    python -m scripts.benchmark generar --escala media
+    python -m scripts.benchmark ejecutar --salida bench/base.json
+    python -m scripts.benchmark ejecutar --comparar bench/base.json
+
+Trabaja siempre sobre una BD aparte (por defecto climatot_bench); nunca
+sobre la configurada en config.ini.
+"""
+
+BD_POR_DEFECTO = "climatot_bench"
@@ -0,0 +1,84 @@
+"""
+Punto de entrada: python -m scripts.benchmark {generar,ejecutar} ...
+"""
+import argparse
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+from scripts.benchmark import BD_POR_DEFECTO
+from scripts.benchmark.generador import ESCALAS, generar, obtener_escala
+
+
+def _cmd_generar(args) -> int:
+    escala = obtener_escala(args.escala, movimientos=args.movimientos, articulos=args.articulos)
+    hasta = date.fromisoformat(args.hasta) if args.hasta else None
+    print(f"Generando '{args.escala}' en {args.bd} (semilla {args.semilla}): "
+          f"{escala.articulos:,} artículos, {escala.movimientos:,} movimientos, "
+          f"{escala.anios} año(s)")
+    tiempos = generar(args.bd, escala, args.semilla, hasta)
+    print(f"✓ Terminado en {sum(tiempos.values()):.1f} s")
+    return 0
+
+
+def _cmd_ejecutar(args) -> int:
+    from scripts.benchmark import escenarios
+
+    solo = args.escenarios.split(",") if args.escenarios else None
+    print(f"Ejecutando escenarios en {args.bd} "
+          f"({args.calentamiento} de calentamiento + {args.repeticiones} medidas)")
+    informe = escenarios.ejecutar(args.bd, args.repeticiones, args.calentamiento, solo)
+
+    if args.salida:
+        escenarios.guardar(informe, Path(args.salida))
+        print(f"✓ Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding='utf-8'))
+        regresiones = escenarios.comparar(informe, base, args.umbral)
+        if regresiones:
+            print(f"\n✗ {len(regresiones)} escenario(s) más de un {args.umbral:.0%} "
+                  f"más lentos: {', '.join(regresiones)}")
+            return 1
+        print("\n✓ Sin regresiones")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts.benchmark",
+        description="Benchmark de rendimiento con datos sintéticos"
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_gen = sub.add_parser("generar", help="(Re)crea la BD de benchmark")
+    p_gen.add_argument("--escala", choices=sorted(ESCALAS), default="pequena")
+    p_gen.add_argument("--movimientos", type=int, help="Sustituye el nº de movimientos de la escala")
+    p_gen.add_argument("--articulos", type=int, help="Sustituye el nº de artículos de la escala")
+    p_gen.add_argument("--semilla", type=int, default=42)
+    p_gen.add_argument("--hasta", help="Fecha del último día con datos (YYYY-MM-DD, por defecto hoy)")
+    p_gen.add_argument("--bd", default=BD_POR_DEFECTO)
+    p_gen.set_defaults(func=_cmd_generar)
+
+    p_ejec = sub.add_parser("ejecutar", help="Cronometra los escenarios")
+    p_ejec.add_argument("--bd", default=BD_POR_DEFECTO)
+    p_ejec.add_argument("--repeticiones", type=int, default=10)
+    p_ejec.add_argument("--calentamiento", type=int, default=2)
+    p_ejec.add_argument("--escenarios", help="Lista separada por comas (por defecto todos)")
+    p_ejec.add_argument("--salida", help="Guarda los resultados como JSON")
+    p_ejec.add_argument("--comparar", help="JSON de una ejecución anterior")
+    p_ejec.add_argument("--umbral", type=float, default=0.20,
+                        help="Empeoramiento del p50 que cuenta como regresión (0.20 = 20%%)")
+    p_ejec.set_defaults(func=_cmd_ejecutar)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
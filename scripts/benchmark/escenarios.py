@@ -0,0 +1,370 @@
+"""
+Escenarios cronometrados del benchmark
+
+Cada escenario llama a la misma función de service/repo que usa la pantalla
+correspondiente, contra la BD generada por scripts.benchmark.generador.
+Se ejecuta varias veces tras unas vueltas de calentamiento y se resume en
+min/p50/p90/max. El resultado se puede guardar como línea base JSON y
+comparar con una ejecución posterior para detectar regresiones.
+
+La BD se selecciona con CLIMATOT_DB_NAME antes de importar src, de modo
+que db_utils y su pool apuntan a la BD de benchmark y no a la de config.ini.
+"""
+import json
+import os
+import platform
+import socket
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from scripts.benchmark.generador import PROJECT_ROOT, comprobar_bd_desechable, leer_meta
+
+# Regresión a partir de la cual --comparar falla (p50 un 20 % más lento)
+UMBRAL_REGRESION = 0.20
+
+# Lecturas de código de barras por vuelta del escenario del escáner
+LECTURAS_ESCANER = 50
+
+
+@dataclass
+class Escenario:
+    """
+    Operación a medir. `ejecutar` recibe el contexto y el valor devuelto por
+    `preparar` (que no se cronometra); `limpiar` recibe además lo que devolvió
+    `ejecutar`, para deshacer lo que haya escrito en la BD.
+    """
+    nombre: str
+    descripcion: str
+    ejecutar: Callable[[Dict[str, Any], Any], Any]
+    preparar: Optional[Callable[[Dict[str, Any]], Any]] = None
+    limpiar: Optional[Callable[[Dict[str, Any], Any, Any], None]] = None
+
+
+@dataclass
+class Resultado:
+    nombre: str
+    descripcion: str
+    tiempos_ms: List[float] = field(default_factory=list)
+
+    def resumen(self) -> Dict[str, Any]:
+        from src.core.telemetria import percentil
+
+        ordenados = sorted(self.tiempos_ms)
+        return {
+            'descripcion': self.descripcion,
+            'repeticiones': len(ordenados),
+            'min_ms': round(ordenados[0], 2),
+            'p50_ms': round(percentil(ordenados, 50), 2),
+            'p90_ms': round(percentil(ordenados, 90), 2),
+            'max_ms': round(ordenados[-1], 2),
+        }
+
+
+# ========================================
+# CONTEXTO
+# ========================================
+
+def seleccionar_bd(nombre_bd: str) -> None:
+    """Apunta db_utils a `nombre_bd`. Debe llamarse antes de importar src.core.db_utils."""
+    comprobar_bd_desechable(nombre_bd)
+    os.environ['CLIMATOT_DB_NAME'] = nombre_bd
+
+
+def crear_contexto(nombre_bd: str) -> Dict[str, Any]:
+    """Datos fijos que usan los escenarios (furgoneta, semana, usuario...)."""
+    from src.core.db_utils import fetch_all, fetch_one
+
+    meta = leer_meta(nombre_bd)
+    hasta = date.fromisoformat(meta['hasta'])
+    # Última semana completa: el lunes anterior a la semana de `hasta`
+    lunes = hasta - timedelta(days=hasta.weekday() + 7)
+
+    furgoneta = fetch_one(
+        "SELECT MIN(id) AS id FROM almacenes WHERE tipo = 'furgoneta'"
+    )
+    articulo = fetch_one(
+        "SELECT articulo_id, COUNT(*) AS n FROM movimientos "
+        "GROUP BY articulo_id ORDER BY n DESC LIMIT 1"
+    )
+    # Códigos que "lee" el escáner y una asignación de furgoneta existente
+    eans = fetch_all(
+        "SELECT ean FROM articulos WHERE activo = 1 AND ean IS NOT NULL ORDER BY id LIMIT %s",
+        (LECTURAS_ESCANER,)
+    )
+    asignacion = fetch_one(
+        "SELECT operario_id, fecha::text AS fecha FROM asignaciones_furgoneta "
+        "ORDER BY fecha DESC LIMIT 1"
+    )
+    return {
+        'meta': meta,
+        'hasta': hasta,
+        'lunes': lunes.isoformat(),
+        'almacen_central': 1,
+        'furgoneta_id': furgoneta['id'],
+        'articulo_popular': articulo['articulo_id'],
+        'eans': [fila['ean'] for fila in eans],
+        'asignacion': asignacion,
+        'usuario': 'admin',
+    }
+
+
+# ========================================
+# ESCENARIOS
+# ========================================
+
+def _stock_listado(ctx, _):
+    from src.services import stock_service
+    return stock_service.obtener_stock_completo()
+
+
+def _stock_listado_columnar(ctx, _):
+    from src.services import stock_service
+    return stock_service.obtener_stock_completo(columnar=True)
+
+
+def _historico_busqueda(ctx, _):
+    from src.services import movimientos_service
+    return movimientos_service.obtener_movimientos_filtrados(
+        fecha_desde=(ctx['hasta'] - timedelta(days=90)).isoformat(),
+        articulo_texto="cobre"
+    )
+
+
+def _historico_almacen(ctx, _):
+    from src.services import movimientos_service
+    return movimientos_service.obtener_movimientos_filtrados(
+        almacen_id=ctx['furgoneta_id']
+    )
+
+
+def _historico_articulo(ctx, _):
+    from src.services import movimientos_service
+    return movimientos_service.obtener_movimientos_filtrados(
+        articulo_id=ctx['articulo_popular']
+    )
+
+
+def _pedido_ideal(ctx, _):
+    from src.repos import pedido_ideal_repo
+    from src.services import pedido_ideal_service
+    articulos = pedido_ideal_repo.get_articulos_para_analizar(True, columnar=True)
+    return pedido_ideal_service.calcular_pedidos_multiples(articulos, 20, None, 90, {})
+
+
+def _informe_furgoneta(ctx, _):
+    from src.services import informes_furgonetas_service
+    return informes_furgonetas_service.generar_datos_informe(ctx['furgoneta_id'], ctx['lunes'])
+
+
+def _notificaciones(ctx, _):
+    from src.services import notificaciones_service
+    notificaciones_service.generar_notificaciones_usuario(ctx['usuario'])
+    return notificaciones_service.contar_notificaciones(ctx['usuario'])
+
+
+def _escaner(ctx, _):
+    """Cada lectura: artículo por EAN, su stock por almacén y la furgoneta del operario."""
+    from src.repos import articulos_repo, movimientos_repo, stock_repo
+    asignacion = ctx['asignacion']
+    for ean in ctx['eans']:
+        articulo = articulos_repo.buscar_articulo_exacto(ean)
+        if articulo:
+            stock_repo.get_stock_articulo_por_almacen(articulo['id'])
+        if asignacion:
+            movimientos_repo.get_furgoneta_asignada(asignacion['operario_id'], asignacion['fecha'])
+
+
+def _sin_sentencias_preparadas(ctx):
+    """Mismo escenario con SQL normal, para comparar (limpiar las reactiva)."""
+    from src.core import db_utils
+    db_utils.USAR_SENTENCIAS_PREPARADAS = False
+
+
+def _con_sentencias_preparadas(ctx, _, __):
+    from src.core import db_utils
+    db_utils.USAR_SENTENCIAS_PREPARADAS = True
+
+
+def _inventario_crear(ctx, _):
+    from src.services import inventarios_service
+    exito, mensaje, inventario_id = inventarios_service.crear_inventario(
+        ctx['hasta'].isoformat(), "bench", ctx['furgoneta_id'], None, True, ctx['usuario']
+    )
+    if not exito:
+        raise RuntimeError(mensaje)
+    return inventario_id
+
+
+def _borrar_inventario(inventario_id: Optional[int]) -> None:
+    """Deja la BD como estaba: inventario, líneas y movimientos de ajuste."""
+    from src.core.db_utils import execute_query
+    if not inventario_id:
+        return
+    execute_query(
+        "DELETE FROM movimientos WHERE motivo = %s",
+        (f"Ajuste por inventario {inventario_id}",)
+    )
+    execute_query("DELETE FROM inventario_detalle WHERE inventario_id = %s", (inventario_id,))
+    execute_query("DELETE FROM inventarios WHERE id = %s", (inventario_id,))
+
+
+def _preparar_inventario_contado(ctx):
+    """Inventario de la furgoneta con todo contado y una diferencia de cada 10 líneas."""
+    from src.core.db_utils import execute_query
+    inventario_id = _inventario_crear(ctx, None)
+    execute_query("""
+        UPDATE inventario_detalle
+        SET stock_contado = CASE WHEN id %% 10 = 0 THEN GREATEST(stock_teorico - 1, 1)
+                                 ELSE stock_teorico END,
+            diferencia = CASE WHEN id %% 10 = 0 THEN GREATEST(stock_teorico - 1, 1) - stock_teorico
+                              ELSE 0 END
+        WHERE inventario_id = %s
+    """, (inventario_id,))
+    return inventario_id
+
+
+def _inventario_finalizar(ctx, inventario_id):
+    from src.services import inventarios_service
+    exito, mensaje, _ = inventarios_service.finalizar_inventario(inventario_id, True, ctx['usuario'])
+    if not exito:
+        raise RuntimeError(mensaje)
+
+
+ESCENARIOS: List[Escenario] = [
+    Escenario('stock_listado', "Ventana de stock sin filtros", _stock_listado),
+    Escenario('stock_listado_columnar', "Ventana de stock, formato columnar", _stock_listado_columnar),
+    Escenario('historico_busqueda', "Histórico: 90 días filtrando por texto", _historico_busqueda),
+    Escenario('historico_almacen', "Histórico de una furgoneta", _historico_almacen),
+    Escenario('historico_articulo', "Histórico del artículo más movido", _historico_articulo),
+    Escenario('pedido_ideal', "Pedido ideal de todos los artículos activos", _pedido_ideal),
+    Escenario('informe_furgoneta', "Informe semanal de una furgoneta", _informe_furgoneta),
+    Escenario('notificaciones', "Generar y contar notificaciones al iniciar sesión", _notificaciones),
+    Escenario('escaner', f"{LECTURAS_ESCANER} lecturas del escáner (sentencias preparadas)", _escaner),
+    Escenario('escaner_sin_preparar', f"{LECTURAS_ESCANER} lecturas del escáner (SQL sin preparar)",
+              _escaner, preparar=_sin_sentencias_preparadas, limpiar=_con_sentencias_preparadas),
+    Escenario('inventario_crear', "Crear inventario de una furgoneta", _inventario_crear,
+              limpiar=lambda ctx, _, inventario_id: _borrar_inventario(inventario_id)),
+    Escenario('inventario_finalizar', "Finalizar inventario aplicando ajustes",
+              _inventario_finalizar, preparar=_preparar_inventario_contado,
+              limpiar=lambda ctx, inventario_id, _: _borrar_inventario(inventario_id)),
+]
+
+
+# ========================================
+# EJECUCIÓN
+# ========================================
+
+def ejecutar(
+    nombre_bd: str,
+    repeticiones: int = 10,
+    calentamiento: int = 2,
+    solo: Optional[List[str]] = None,
+    progreso: Callable[[str], None] = print
+) -> Dict[str, Any]:
+    """
+    Ejecuta los escenarios y devuelve el informe (apto para guardar como JSON).
+
+    Args:
+        nombre_bd: BD generada con `generar`
+        repeticiones: Ejecuciones cronometradas por escenario
+        calentamiento: Ejecuciones previas que no cuentan (caché, pool, imports)
+        solo: Nombres de escenarios a ejecutar (None = todos)
+    """
+    seleccionar_bd(nombre_bd)
+    ctx = crear_contexto(nombre_bd)
+
+    escenarios = [e for e in ESCENARIOS if not solo or e.nombre in solo]
+    desconocidos = set(solo or []) - {e.nombre for e in ESCENARIOS}
+    if desconocidos:
+        raise ValueError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    resultados = {}
+    for escenario in escenarios:
+        resultado = Resultado(escenario.nombre, escenario.descripcion)
+        for vuelta in range(calentamiento + repeticiones):
+            preparado = escenario.preparar(ctx) if escenario.preparar else None
+            devuelto = None
+            try:
+                inicio = time.perf_counter()
+                devuelto = escenario.ejecutar(ctx, preparado)
+                duracion_ms = (time.perf_counter() - inicio) * 1000
+            finally:
+                if escenario.limpiar:
+                    escenario.limpiar(ctx, preparado, devuelto)
+            if vuelta >= calentamiento:
+                resultado.tiempos_ms.append(duracion_ms)
+
+        resultados[escenario.nombre] = resultado.resumen()
+        r = resultados[escenario.nombre]
+        progreso(f"  {escenario.nombre:<26} p50 {r['p50_ms']:>10.1f} ms   "
+                 f"p90 {r['p90_ms']:>10.1f} ms   max {r['max_ms']:>10.1f} ms")
+
+    return {
+        'version': _version_git(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'equipo': socket.gethostname(),
+        'python': platform.python_version(),
+        'postgres': _version_postgres(),
+        'bd': nombre_bd,
+        'datos': ctx['meta'],
+        'repeticiones': repeticiones,
+        'escenarios': resultados,
+    }
+
+
+def _version_git() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or "desconocida"
+    except (OSError, subprocess.SubprocessError):
+        return "desconocida"
+
+
+def _version_postgres() -> str:
+    from src.core.db_utils import fetch_one
+    fila = fetch_one("SHOW server_version")
+    return fila['server_version'] if fila else "desconocida"
+
+
+def guardar(informe: Dict[str, Any], ruta: Path) -> None:
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+def comparar(
+    actual: Dict[str, Any],
+    base: Dict[str, Any],
+    umbral: float = UMBRAL_REGRESION,
+    progreso: Callable[[str], None] = print
+) -> List[str]:
+    """
+    Compara el p50 de cada escenario con la línea base.
+
+    Returns:
+        Nombres de los escenarios que empeoran más de `umbral`
+    """
+    if actual.get('datos') != base.get('datos'):
+        progreso("⚠ La línea base se generó con otros datos (escala/semilla/fechas): "
+                 "la comparación es orientativa")
+
+    regresiones = []
+    progreso(f"\n  {'escenario':<26}{'base p50':>12}{'actual p50':>14}{'cambio':>10}")
+    for nombre, res in actual['escenarios'].items():
+        previo = base.get('escenarios', {}).get(nombre)
+        if not previo:
+            progreso(f"  {nombre:<26}{'-':>12}{res['p50_ms']:>11.1f} ms{'nuevo':>10}")
+            continue
+        cambio = (res['p50_ms'] - previo['p50_ms']) / previo['p50_ms'] if previo['p50_ms'] else 0.0
+        marca = ""
+        if cambio > umbral:
+            regresiones.append(nombre)
+            marca = "  ✗ REGRESIÓN"
+        progreso(f"  {nombre:<26}{previo['p50_ms']:>9.1f} ms{res['p50_ms']:>11.1f} ms"
+                 f"{cambio:>+10.0%}{marca}")
+    return regresiones
@@ -0,0 +1,564 @@
+"""
+Generador de datos sintéticos para los benchmarks
+
+Crea una BD con el esquema de producción (db/schema_postgres_full.sql) y la
+llena con datos coherentes: un almacén central, furgonetas con su operario
+asignado cada día laborable, artículos con popularidad desigual (unos pocos
+concentran la mayoría de movimientos) y años de movimientos ENTRADA ->
+TRASPASO -> IMPUTACION/DEVOLUCION/PERDIDA.
+
+Es determinista: con la misma escala, semilla y fecha final se generan
+exactamente los mismos datos, así dos ejecuciones del benchmark en
+versiones distintas comparan lo mismo. Cada tabla usa su propio generador
+aleatorio derivado de la semilla, de modo que cambiar una no altera las demás.
+
+Todo se carga con COPY desde un flujo generado al vuelo (no se materializan
+los 10M de filas en memoria) y los índices secundarios de movimientos se
+crean después de la carga.
+"""
+import configparser
+import json
+import random
+import time
+from dataclasses import dataclass, asdict, replace
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+SCHEMA_PATH = PROJECT_ROOT / "db" / "schema_postgres_full.sql"
+
+# informes_furgonetas_service trata un TRASPASO con destino 1 como devolución
+# al almacén principal: el central debe ser el almacén 1
+ALMACEN_CENTRAL = 1
+
+# Reparto acumulado de tipos de movimiento
+_REPARTO_TIPOS = (
+    (0.15, 'ENTRADA'),
+    (0.45, 'TRASPASO'),
+    (0.88, 'IMPUTACION'),
+    (0.95, 'DEVOLUCION'),
+    (1.00, 'PERDIDA'),
+)
+
+SQL_META = """
+    CREATE TABLE IF NOT EXISTS benchmark_meta(
+      clave TEXT PRIMARY KEY,
+      valor TEXT NOT NULL
+    );
+"""
+
+
+@dataclass(frozen=True)
+class Escala:
+    """Tamaño del conjunto de datos generado."""
+    articulos: int
+    familias: int
+    proveedores: int
+    ubicaciones: int
+    furgonetas: int
+    operarios: int
+    movimientos: int
+    anios: int
+
+    def validar(self) -> None:
+        if self.operarios < self.furgonetas:
+            # Cada furgoneta lleva un operario distinto cada día
+            raise ValueError("Debe haber al menos tantos operarios como furgonetas")
+        if min(self.articulos, self.familias, self.proveedores, self.ubicaciones,
+               self.furgonetas, self.movimientos, self.anios) < 1:
+            raise ValueError("Todos los tamaños de la escala deben ser >= 1")
+
+
+ESCALAS: Dict[str, Escala] = {
+    'pequena': Escala(articulos=2_000, familias=30, proveedores=20, ubicaciones=60,
+                      furgonetas=8, operarios=20, movimientos=100_000, anios=1),
+    'media': Escala(articulos=10_000, familias=60, proveedores=50, ubicaciones=200,
+                    furgonetas=25, operarios=60, movimientos=1_000_000, anios=3),
+    'grande': Escala(articulos=30_000, familias=100, proveedores=120, ubicaciones=400,
+                     furgonetas=60, operarios=150, movimientos=10_000_000, anios=5),
+}
+
+
+def obtener_escala(nombre: str, **ajustes) -> Escala:
+    """Escala predefinida con los valores de `ajustes` que no sean None sustituidos."""
+    if nombre not in ESCALAS:
+        raise ValueError(f"Escala desconocida: {nombre} (disponibles: {', '.join(ESCALAS)})")
+    cambios = {k: v for k, v in ajustes.items() if v is not None}
+    escala = replace(ESCALAS[nombre], **cambios)
+    escala.validar()
+    return escala
+
+
+# ========================================
+# CONEXIÓN
+# ========================================
+
+def _leer_config() -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read(PROJECT_ROOT / "config.ini")
+    return config
+
+
+def nombre_bd_configurada() -> str:
+    """Nombre de la BD de la aplicación según config.ini."""
+    return _leer_config().get('database', 'NAME', fallback='climatot_almacen')
+
+
+def conectar(nombre_bd: str, autocommit: bool = False):
+    """Conexión directa (sin el pool de db_utils) a `nombre_bd`."""
+    import psycopg2
+
+    config = _leer_config()
+    con = psycopg2.connect(
+        host=config.get('database', 'HOST', fallback='localhost'),
+        port=config.getint('database', 'PORT', fallback=5432),
+        database=nombre_bd,
+        user=config.get('database', 'USER', fallback='climatot'),
+        password=config.get('database', 'PASSWORD', fallback='')
+    )
+    con.autocommit = autocommit
+    return con
+
+
+def comprobar_bd_desechable(nombre_bd: str) -> None:
+    """Impide generar o medir sobre la BD real de la aplicación."""
+    if nombre_bd == nombre_bd_configurada():
+        raise ValueError(
+            f"'{nombre_bd}' es la BD configurada en config.ini. "
+            "El benchmark borra y regenera su BD: usa otro nombre."
+        )
+
+
+def crear_bd_si_no_existe(nombre_bd: str) -> bool:
+    """Crea la BD de benchmark. Devuelve True si no existía."""
+    from psycopg2 import sql
+
+    con = conectar('postgres', autocommit=True)
+    try:
+        with con.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (nombre_bd,))
+            if cur.fetchone():
+                return False
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(nombre_bd)))
+            return True
+    finally:
+        con.close()
+
+
+# ========================================
+# COPY DESDE UN ITERADOR
+# ========================================
+
+class _FlujoCopy:
+    """Expone un iterador de líneas de texto como archivo con read() para COPY."""
+
+    def __init__(self, lineas: Iterator[str]):
+        self._lineas = lineas
+        self._resto = ""
+
+    def read(self, n: int = -1) -> str:
+        if n is None or n < 0:
+            datos = self._resto + "".join(self._lineas)
+            self._resto = ""
+            return datos
+
+        partes = [self._resto]
+        tam = len(self._resto)
+        for linea in self._lineas:
+            partes.append(linea)
+            tam += len(linea)
+            if tam >= n:
+                break
+        datos = "".join(partes)
+        self._resto = datos[n:]
+        return datos[:n]
+
+
+def _linea_copy(valores: Sequence) -> str:
+    # Los textos generados nunca llevan tabuladores, saltos ni barras invertidas
+    return "\t".join("\\N" if v is None else str(v) for v in valores) + "\n"
+
+
+def copiar_filas(cur, tabla: str, columnas: Sequence[str], filas: Iterable[Sequence]) -> int:
+    """Carga `filas` en `tabla` con COPY FROM STDIN. Devuelve las filas cargadas."""
+    contador = [0]
+
+    def _lineas():
+        for fila in filas:
+            contador[0] += 1
+            yield _linea_copy(fila)
+
+    sql = f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN"
+    cur.copy_expert(sql, _FlujoCopy(_lineas()), size=1 << 16)
+    return contador[0]
+
+
+# ========================================
+# GENERACIÓN DE DATOS
+# ========================================
+
+_PIEZAS = ["Tubo", "Codo", "Manguito", "Válvula", "Filtro", "Condensador", "Ventilador",
+           "Sonda", "Termostato", "Compresor", "Racor", "Cable", "Brida", "Aislante",
+           "Bomba", "Presostato", "Tornillo", "Taco", "Cinta", "Soporte"]
+_MATERIALES = ["cobre", "PVC", "inox", "latón", "aluminio", "acero", "polietileno", "goma"]
+_MEDIDAS = ["1/4", "3/8", "1/2", "5/8", "3/4", "6mm", "10mm", "16mm", "25mm", "40mm"]
+_MARCAS = ["Daikin", "Mitsubishi", "Fujitsu", "LG", "Samsung", "Carrier", "Danfoss", "Genérica"]
+_UNIDADES = ["unidad", "unidad", "unidad", "metro", "caja", "rollo"]
+_NOMBRES = ["Juan", "María", "Pedro", "Ana", "Luis", "Carmen", "José", "Lucía", "Javier",
+            "Elena", "Carlos", "Marta", "Pablo", "Sara", "Diego", "Laura"]
+_APELLIDOS = ["García", "López", "Martínez", "Sánchez", "Pérez", "Gómez", "Ruiz",
+              "Hernández", "Díaz", "Moreno", "Álvarez", "Romero"]
+
+
+@dataclass
+class _Articulo:
+    id: int
+    coste: float
+    proveedor_id: int
+
+
+class GeneradorDatos:
+    """Produce las filas de cada tabla para una escala, semilla y fecha final."""
+
+    def __init__(self, escala: Escala, semilla: int = 42, hasta: Optional[date] = None):
+        escala.validar()
+        self.escala = escala
+        self.semilla = semilla
+        self.hasta = hasta or date.today()
+        self.desde = self.hasta - timedelta(days=365 * escala.anios - 1)
+
+        self.ids_furgonetas = list(range(ALMACEN_CENTRAL + 1, ALMACEN_CENTRAL + 1 + escala.furgonetas))
+        self.dias = self._dias_laborables()
+        self.articulos = self._preparar_articulos()
+        # Albaranes vistos al generar movimientos: albaran -> (proveedor_id, fecha)
+        self._albaranes: Dict[str, Tuple[int, str]] = {}
+
+    def _rng(self, nombre: str) -> random.Random:
+        return random.Random(f"{self.semilla}-{nombre}")
+
+    def _dias_laborables(self) -> List[date]:
+        rng = self._rng("dias")
+        dias = []
+        dia = self.desde
+        while dia <= self.hasta:
+            # L-V siempre; algún sábado para cubrir el caso L-S del informe semanal
+            if dia.weekday() < 5 or (dia.weekday() == 5 and rng.random() < 0.15):
+                dias.append(dia)
+            dia += timedelta(days=1)
+        return dias
+
+    def _preparar_articulos(self) -> List[_Articulo]:
+        rng = self._rng("articulos-base")
+        return [
+            _Articulo(id=i, coste=round(rng.uniform(0.5, 250), 2),
+                      proveedor_id=rng.randint(1, self.escala.proveedores))
+            for i in range(1, self.escala.articulos + 1)
+        ]
+
+    def operario_de(self, indice_furgoneta: int, indice_dia: int) -> int:
+        """Operario asignado a una furgoneta un día: rota cada semana, sin repetir en el día."""
+        semana = indice_dia // 5
+        return 1 + (indice_furgoneta + semana) % self.escala.operarios
+
+    # ---------- Maestros ----------
+
+    def usuarios(self) -> Iterator[tuple]:
+        # Sin contraseña válida: la BD de benchmark no está pensada para iniciar sesión
+        yield ('admin', '!', 'admin', 1)
+        yield ('almacen', '!', 'almacen', 1)
+
+    def proveedores(self) -> Iterator[tuple]:
+        for i in range(1, self.escala.proveedores + 1):
+            yield (i, f"Proveedor {i:04d} SL", f"9{i:08d}", f"Contacto {i}",
+                   f"pedidos{i}@proveedor.test", None)
+
+    def familias(self) -> Iterator[tuple]:
+        for i in range(1, self.escala.familias + 1):
+            yield (i, f"{_PIEZAS[(i - 1) % len(_PIEZAS)]} - grupo {i:03d}")
+
+    def ubicaciones(self) -> Iterator[tuple]:
+        for i in range(1, self.escala.ubicaciones + 1):
+            yield (i, f"P{(i - 1) // 40 + 1:02d}-E{(i - 1) % 40 + 1:02d}")
+
+    def almacenes(self) -> Iterator[tuple]:
+        yield (ALMACEN_CENTRAL, "Almacén Central", "almacen")
+        for n, almacen_id in enumerate(self.ids_furgonetas, start=1):
+            yield (almacen_id, self._matricula(n), "furgoneta")
+
+    def furgonetas(self) -> Iterator[tuple]:
+        rng = self._rng("furgonetas")
+        for n in range(1, self.escala.furgonetas + 1):
+            yield (n, self._matricula(n), rng.choice(["Renault", "Citroën", "Ford", "Peugeot"]),
+                   "Furgón", rng.randint(2012, 2024), 1, None, n)
+
+    @staticmethod
+    def _matricula(n: int) -> str:
+        letras = "BCDFGHJKLMNPRSTVWXYZ"
+        return f"{n:04d}{letras[n % 20]}{letras[(n // 20) % 20]}{letras[(n // 400) % 20]}"
+
+    def operarios(self) -> Iterator[tuple]:
+        rng = self._rng("operarios")
+        for i in range(1, self.escala.operarios + 1):
+            nombre = f"{rng.choice(_NOMBRES)} {rng.choice(_APELLIDOS)} {i:03d}"
+            rol = 'oficial' if i <= self.escala.operarios // 2 else 'ayudante'
+            yield (i, nombre, rol, 1)
+
+    def articulos_filas(self) -> Iterator[tuple]:
+        rng = self._rng("articulos")
+        for art in self.articulos:
+            pieza = rng.choice(_PIEZAS)
+            material = rng.choice(_MATERIALES)
+            medida = rng.choice(_MEDIDAS)
+            marca = rng.choice(_MARCAS)
+            nombre = f"{pieza} {material} {medida} {marca} {art.id:05d}"
+            yield (
+                art.id,
+                f"84{art.id:011d}",                       # ean
+                f"REF-{art.proveedor_id:03d}-{art.id:06d}",  # ref_proveedor
+                nombre,
+                f"{pieza.lower()} {material.lower()} {medida}",  # palabras_clave
+                rng.choice(_UNIDADES),
+                rng.choice([0, 0, 2, 5, 10, 20]),         # min_alerta
+                rng.randint(1, self.escala.ubicaciones),
+                art.proveedor_id,
+                rng.randint(1, self.escala.familias),
+                marca,
+                f"{art.coste:.2f}",
+                f"{art.coste * 1.35:.2f}",                # pvp_sin
+                21,
+                0 if rng.random() < 0.03 else 1,          # activo
+                rng.choice([None, 1, 5, 10, 25]),         # unidad_compra
+                rng.choice([3, 5, 5, 7]),                 # dias_seguridad
+                1 if rng.random() < 0.05 else 0,          # critico
+            )
+
+    def asignaciones(self) -> Iterator[tuple]:
+        for indice_dia, dia in enumerate(self.dias):
+            fecha = dia.isoformat()
+            for indice, almacen_id in enumerate(self.ids_furgonetas):
+                yield (self.operario_de(indice, indice_dia), fecha, 'completo', almacen_id)
+
+    # ---------- Movimientos ----------
+
+    def movimientos(self) -> Iterator[tuple]:
+        """Movimientos en orden de fecha (los id crecen con la fecha, como en producción)."""
+        rng = self._rng("movimientos")
+        escala = self.escala
+        num_dias = len(self.dias)
+        base, sobrante = divmod(escala.movimientos, num_dias)
+
+        # Popularidad tipo Zipf sobre un orden aleatorio de artículos
+        ids = [a.id for a in self.articulos]
+        self._rng("popularidad").shuffle(ids)
+        acumulado = []
+        total = 0.0
+        for rango in range(len(ids)):
+            total += 1.0 / (rango + 1) ** 0.9
+            acumulado.append(total)
+        por_id = {a.id: a for a in self.articulos}
+
+        for indice_dia, dia in enumerate(self.dias):
+            fecha = dia.isoformat()
+            n = base + (1 if indice_dia < sobrante else 0)
+            if n == 0:
+                continue
+            elegidos = rng.choices(ids, cum_weights=acumulado, k=n)
+            for articulo_id in elegidos:
+                r = rng.random()
+                tipo = next(t for limite, t in _REPARTO_TIPOS if r < limite)
+                indice_furgo = rng.randrange(escala.furgonetas)
+                furgoneta = self.ids_furgonetas[indice_furgo]
+                operario = self.operario_de(indice_furgo, indice_dia)
+
+                if tipo == 'ENTRADA':
+                    art = por_id[articulo_id]
+                    albaran = f"ALB{dia:%Y%m%d}-{art.proveedor_id:04d}"
+                    self._albaranes.setdefault(albaran, (art.proveedor_id, fecha))
+                    yield (fecha, tipo, None, ALMACEN_CENTRAL, articulo_id,
+                           rng.randint(20, 200), f"{art.coste:.2f}", None, None, None,
+                           'admin', albaran)
+                elif tipo == 'TRASPASO':
+                    yield (fecha, tipo, ALMACEN_CENTRAL, furgoneta, articulo_id,
+                           rng.randint(5, 30), None, None, None, operario, 'admin', None)
+                elif tipo == 'IMPUTACION':
+                    ot = f"OT{dia.year}{indice_dia * 25 + rng.randrange(25):06d}"
+                    yield (fecha, tipo, furgoneta, None, articulo_id,
+                           rng.randint(1, 5), None, None, ot, operario, None, None)
+                elif tipo == 'DEVOLUCION':
+                    yield (fecha, tipo, furgoneta, ALMACEN_CENTRAL, articulo_id,
+                           rng.randint(1, 5), None, 'Devolución a almacén', None, operario,
+                           None, None)
+                else:
+                    yield (fecha, tipo, furgoneta, None, articulo_id,
+                           rng.randint(1, 2), None, 'Rotura', None, operario, None, None)
+
+    def albaranes(self) -> Iterator[tuple]:
+        """Albaranes de las ENTRADA generadas (llamar después de movimientos())."""
+        for albaran, (proveedor_id, fecha) in self._albaranes.items():
+            yield (albaran, proveedor_id, fecha)
+
+    def tablas(self) -> Iterator[Tuple[str, Sequence[str], Callable[[], Iterable[tuple]]]]:
+        """(tabla, columnas, productor de filas) en el orden de carga."""
+        yield 'usuarios', ('usuario', 'pass_hash', 'rol', 'activo'), self.usuarios
+        yield 'proveedores', ('id', 'nombre', 'telefono', 'contacto', 'email', 'notas'), self.proveedores
+        yield 'familias', ('id', 'nombre'), self.familias
+        yield 'ubicaciones', ('id', 'nombre'), self.ubicaciones
+        yield 'almacenes', ('id', 'nombre', 'tipo'), self.almacenes
+        yield ('furgonetas', ('id', 'matricula', 'marca', 'modelo', 'anio', 'activa', 'notas', 'numero'),
+               self.furgonetas)
+        yield 'operarios', ('id', 'nombre', 'rol_operario', 'activo'), self.operarios
+        yield ('articulos', ('id', 'ean', 'ref_proveedor', 'nombre', 'palabras_clave', 'u_medida',
+                             'min_alerta', 'ubicacion_id', 'proveedor_id', 'familia_id', 'marca',
+                             'coste', 'pvp_sin', 'iva', 'activo', 'unidad_compra',
+                             'dias_seguridad', 'critico'),
+               self.articulos_filas)
+        yield ('asignaciones_furgoneta', ('operario_id', 'fecha', 'turno', 'furgoneta_id'),
+               self.asignaciones)
+        yield ('movimientos', ('fecha', 'tipo', 'origen_id', 'destino_id', 'articulo_id', 'cantidad',
+                               'coste_unit', 'motivo', 'ot', 'operario_id', 'responsable', 'albaran'),
+               self.movimientos)
+        yield 'albaranes', ('albaran', 'proveedor_id', 'fecha'), self.albaranes
+
+
+# ========================================
+# CARGA
+# ========================================
+
+def _quitar_indices(cur, tablas: Sequence[str]) -> List[str]:
+    """Elimina los índices secundarios de `tablas` y devuelve sus definiciones."""
+    cur.execute("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = 'public'
+          AND i.tablename = ANY(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+    """, (list(tablas),))
+    definiciones = []
+    for nombre, definicion in cur.fetchall():
+        cur.execute(f'DROP INDEX IF EXISTS "{nombre}"')
+        # En tablas particionadas la definición lleva "ON ONLY" (sin particiones)
+        definiciones.append(definicion.replace(' ON ONLY ', ' ON ', 1))
+    return definiciones
+
+
+def _quitar_disparadores(cur, tablas: Sequence[str]) -> List[str]:
+    """
+    Elimina los disparadores por fila de `tablas` y devuelve sus definiciones.
+
+    trg_movimientos_fecha consulta cierres_movimientos en cada fila: con él
+    activo, COPY de millones de movimientos lo ejecuta millones de veces.
+    """
+    cur.execute("""
+        SELECT t.tgname, c.relname, pg_get_triggerdef(t.oid)
+        FROM pg_trigger t
+        JOIN pg_class c ON c.oid = t.tgrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public'
+          AND c.relname = ANY(%s)
+          AND NOT t.tgisinternal
+          AND t.tgtype & 1 = 1
+    """, (list(tablas),))
+    definiciones = []
+    for nombre, tabla, definicion in cur.fetchall():
+        cur.execute(f'DROP TRIGGER "{nombre}" ON public."{tabla}"')
+        definiciones.append(definicion)
+    return definiciones
+
+
+def _ajustar_secuencias(cur) -> None:
+    """Pone cada secuencia SERIAL por encima del id máximo cargado con COPY."""
+    cur.execute("""
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND column_default LIKE 'nextval%'
+    """)
+    for tabla, columna in cur.fetchall():
+        cur.execute(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', '{columna}'), "
+            f"COALESCE(MAX({columna}), 1), MAX({columna}) IS NOT NULL) FROM {tabla}"
+        )
+
+
+def generar(
+    nombre_bd: str,
+    escala: Escala,
+    semilla: int = 42,
+    hasta: Optional[date] = None,
+    progreso: Callable[[str], None] = print
+) -> Dict[str, float]:
+    """
+    (Re)crea `nombre_bd` con el esquema de producción y la llena con datos sintéticos.
+
+    Returns:
+        Dict tabla -> segundos de carga (más 'indices' y 'analyze')
+    """
+    comprobar_bd_desechable(nombre_bd)
+    if crear_bd_si_no_existe(nombre_bd):
+        progreso(f"BD {nombre_bd} creada")
+
+    generador = GeneradorDatos(escala, semilla, hasta)
+    tiempos: Dict[str, float] = {}
+
+    con = conectar(nombre_bd)
+    try:
+        with con.cursor() as cur:
+            cur.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+            cur.execute(SCHEMA_PATH.read_text(encoding='utf-8'))
+            cur.execute(SQL_META)
+            # Una partición de movimientos por año generado (y el siguiente)
+            cur.execute("SELECT crear_particiones_movimientos(%s, %s)",
+                        (generador.desde.year, generador.hasta.year + 1))
+            indices = _quitar_indices(cur, ['movimientos', 'asignaciones_furgoneta', 'albaranes'])
+            disparadores = _quitar_disparadores(cur, ['movimientos'])
+        con.commit()
+
+        for tabla, columnas, productor in generador.tablas():
+            t0 = time.perf_counter()
+            with con.cursor() as cur:
+                filas = copiar_filas(cur, tabla, columnas, productor())
+            con.commit()
+            tiempos[tabla] = time.perf_counter() - t0
+            progreso(f"  {tabla:<24}{filas:>12,} filas  {tiempos[tabla]:>8.1f} s")
+
+        t0 = time.perf_counter()
+        with con.cursor() as cur:
+            for definicion in indices + disparadores:
+                cur.execute(definicion)
+            _ajustar_secuencias(cur)
+        con.commit()
+        tiempos['indices'] = time.perf_counter() - t0
+        progreso(f"  {'índices, disparadores y secuencias':<36}{tiempos['indices']:>8.1f} s")
+
+        t0 = time.perf_counter()
+        con.autocommit = True
+        with con.cursor() as cur:
+            cur.execute("ANALYZE")
+            meta = {
+                'escala': asdict(escala),
+                'semilla': semilla,
+                'desde': generador.desde.isoformat(),
+                'hasta': generador.hasta.isoformat(),
+            }
+            for clave, valor in meta.items():
+                cur.execute(
+                    "INSERT INTO benchmark_meta(clave, valor) VALUES (%s, %s) "
+                    "ON CONFLICT (clave) DO UPDATE SET valor = EXCLUDED.valor",
+                    (clave, json.dumps(valor, sort_keys=True) if isinstance(valor, dict) else str(valor))
+                )
+        tiempos['analyze'] = time.perf_counter() - t0
+    finally:
+        con.close()
+
+    return tiempos
+
+
+def leer_meta(nombre_bd: str) -> Dict[str, str]:
+    """Metadatos guardados por generar() (escala, semilla, rango de fechas)."""
+    con = conectar(nombre_bd)
+    try:
+        with con.cursor() as cur:
+            cur.execute("SELECT clave, valor FROM benchmark_meta")
+            return dict(cur.fetchall())
+    finally:
+        con.close()
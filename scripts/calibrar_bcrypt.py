@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Calibración del coste bcrypt para el hardware de despliegue
+
+PROPÓSITO:
+    Mide cuánto tarda bcrypt en esta máquina con cada factor de coste y
+    elige el mayor que no supera la latencia objetivo del login.
+
+USO:
+    python scripts/calibrar_bcrypt.py                  # objetivo 250 ms
+    python scripts/calibrar_bcrypt.py --objetivo 400
+    python scripts/calibrar_bcrypt.py --guardar        # escribe config.ini
+
+IMPORTANTE:
+    - Ejecutar en el PC más lento donde se use la aplicación
+    - El valor se guarda en config.ini, sección [security], clave BCRYPT_ROUNDS
+    - Nunca baja de 10 rondas aunque el equipo sea muy lento
+    - Las contraseñas con menos rondas que las configuradas se regeneran
+      automáticamente (en segundo plano) en el siguiente login
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+# Añadir src al path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.db_utils import (
+    BCRYPT_ROUNDS_MIN,
+    BCRYPT_ROUNDS_MAX,
+    medir_bcrypt,
+    config_path,
+)
+
+
+def calibrar(objetivo_ms: float, repeticiones: int = 3) -> int:
+    """
+    Devuelve el mayor coste cuyo tiempo medio de verificación no supera
+    objetivo_ms (como mínimo BCRYPT_ROUNDS_MIN).
+    """
+    elegido = BCRYPT_ROUNDS_MIN
+    print(f"{'rondas':>8}{'tiempo':>12}")
+    for rounds in range(BCRYPT_ROUNDS_MIN, BCRYPT_ROUNDS_MAX + 1):
+        ms = medir_bcrypt(rounds, repeticiones)
+        marca = "  <= objetivo" if ms <= objetivo_ms else ""
+        print(f"{rounds:>8}{ms:>10.0f}ms{marca}")
+        if ms > objetivo_ms:
+            # Cada ronda más duplica el tiempo: no tiene sentido seguir
+            break
+        elegido = rounds
+    return elegido
+
+
+def guardar_en_config(rounds: int) -> None:
+    """
+    Escribe [security] BCRYPT_ROUNDS en config.ini.
+
+    Edita solo esa línea del texto: ConfigParser.write() reescribiría el
+    archivo entero y perdería los comentarios de configuración.
+    """
+    lineas = config_path.read_text(encoding='utf-8').splitlines() if config_path.exists() else []
+    nueva = f"BCRYPT_ROUNDS = {rounds}"
+
+    seccion = re.compile(r'^\s*\[(?P<nombre>[^\]]+)\]')
+    clave = re.compile(r'^\s*BCRYPT_ROUNDS\s*[=:]', re.IGNORECASE)
+
+    en_security = False
+    fin_security = None  # Índice tras la última línea con contenido de [security]
+    for i, linea in enumerate(lineas):
+        cabecera = seccion.match(linea)
+        if cabecera:
+            en_security = cabecera.group('nombre').strip() == 'security'
+            if en_security:
+                fin_security = i + 1
+            continue
+        if not en_security:
+            continue
+        if clave.match(linea):
+            lineas[i] = nueva
+            break
+        if linea.strip():
+            fin_security = i + 1
+    else:
+        if fin_security is not None:
+            lineas.insert(fin_security, nueva)
+        else:
+            if lineas and lineas[-1].strip():
+                lineas.append("")
+            lineas += ["[security]", nueva]
+
+    config_path.write_text("\n".join(lineas) + "\n", encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra el coste bcrypt para el login")
+    parser.add_argument('--objetivo', type=float, default=250,
+                        help="Latencia objetivo de verificación en ms (por defecto 250)")
+    parser.add_argument('--repeticiones', type=int, default=3,
+                        help="Verificaciones por medida (por defecto 3)")
+    parser.add_argument('--guardar', action='store_true',
+                        help="Guardar el resultado en config.ini")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("  CALIBRACION DE BCRYPT")
+    print("=" * 70)
+    print(f"\n>> Objetivo: {args.objetivo:.0f} ms por verificación\n")
+
+    rounds = calibrar(args.objetivo, args.repeticiones)
+
+    print(f"\n[OK] Coste recomendado: {rounds} rondas")
+    if args.guardar:
+        guardar_en_config(rounds)
+        print(f"[OK] Guardado en {config_path} ([security] BCRYPT_ROUNDS = {rounds})")
+    else:
+        print("     Usa --guardar para escribirlo en config.ini")
+    print()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n[!!] Calibracion cancelada por el usuario.")
+        sys.exit(0)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Crea la tabla metricas_rendimiento en una BD existente
+
+Uso:
+    python scripts/crear_tabla_metricas.py
+
+Las BD nuevas ya la tienen (db/schema_postgres_full.sql). Hace falta para
+subir la telemetría por pantalla desde el diálogo de Diagnóstico de
+Rendimiento o al cerrar la aplicación. Se puede ejecutar varias veces.
+"""
+import sys
+from pathlib import Path
+
+# Configurar UTF-8 para la salida en Windows
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.db_utils import nueva_conexion
+from src.core.logger import logger
+
+SQL_CREAR_TABLA = """
+    CREATE TABLE IF NOT EXISTS metricas_rendimiento (
+      id SERIAL PRIMARY KEY,
+      fecha TIMESTAMP NOT NULL DEFAULT NOW(),
+      usuario VARCHAR(100),
+      hostname VARCHAR(255),
+      pantalla VARCHAR(100) NOT NULL,
+      fase VARCHAR(30) NOT NULL,
+      muestras INTEGER NOT NULL,
+      media_ms NUMERIC(12,1),
+      p50_ms NUMERIC(12,1),
+      p90_ms NUMERIC(12,1),
+      p99_ms NUMERIC(12,1),
+      max_ms NUMERIC(12,1)
+    );
+    CREATE INDEX IF NOT EXISTS idx_metricas_pantalla_fecha
+        ON metricas_rendimiento(pantalla, fecha);
+"""
+
+
+def crear() -> bool:
+    """Crea la tabla y su índice en una transacción."""
+    con = nueva_conexion()
+    try:
+        with con.cursor() as cur:
+            cur.execute(SQL_CREAR_TABLA)
+        con.commit()
+    except Exception as e:
+        con.rollback()
+        logger.exception(f"Error creando metricas_rendimiento: {e}")
+        print(f"❌ No se pudo crear la tabla: {e}")
+        return False
+    finally:
+        con.close()
+
+    print("✅ Tabla 'metricas_rendimiento' lista")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if crear() else 1)
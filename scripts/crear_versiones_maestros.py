@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Crea los objetos de db/versiones_maestros.sql en una BD existente
+
+Uso:
+    python scripts/crear_versiones_maestros.py
+
+Instala la tabla versiones_maestros y los disparadores que avisan a la
+caché de maestros de la aplicación (src/core/cache_maestros.py) cuando
+cambian familias, almacenes, ubicaciones, proveedores, operarios o
+furgonetas. Sin ellos la caché funciona igualmente, pero relee los
+maestros por tiempo en vez de cuando cambian. Se puede ejecutar varias veces.
+"""
+import sys
+from pathlib import Path
+
+# Configurar UTF-8 para la salida en Windows
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.db_utils import nueva_conexion
+from src.core.logger import logger
+
+SQL_OBJETOS = PROJECT_ROOT / "db" / "versiones_maestros.sql"
+
+
+def crear() -> bool:
+    """Aplica db/versiones_maestros.sql en una transacción."""
+    con = nueva_conexion()
+    try:
+        with con.cursor() as cur:
+            cur.execute(SQL_OBJETOS.read_text(encoding='utf-8'))
+            cur.execute("SELECT tabla, version FROM versiones_maestros ORDER BY tabla")
+            versiones = cur.fetchall()
+        con.commit()
+    except Exception as e:
+        con.rollback()
+        logger.exception(f"Error creando versiones_maestros: {e}")
+        print(f"❌ No se pudieron crear los objetos: {e}")
+        return False
+    finally:
+        con.close()
+
+    print("✅ Disparadores de versiones de maestros instalados")
+    for tabla, version in versiones:
+        print(f"  • {tabla}: versión {version}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if crear() else 1)
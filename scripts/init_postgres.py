@@ -19,6 +19,7 @@ PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 import configparser
+from datetime import date
 
 def init_postgres_database():
     """Inicializa la base de datos PostgreSQL con el esquema"""
@@ -69,8 +70,9 @@ PASSWORD = tu_password
         print("   Ejecuta: pip install psycopg2-binary")
         return False
 
-    # Verificar que existe schema_postgres.sql
-    schema_path = PROJECT_ROOT / "db" / "schema_postgres.sql"
+    # Verificar que existe el esquema completo (movimientos particionada,
+    # cierres de ejercicio, disparadores de la caché de maestros...)
+    schema_path = PROJECT_ROOT / "db" / "schema_postgres_full.sql"
     if not schema_path.exists():
         print(f"\n❌ ERROR: No se encontró {schema_path}")
         return False
@@ -126,9 +128,15 @@ PASSWORD = tu_password
     try:
         with conn.cursor() as cur:
             cur.execute(schema_sql)
+            # Particiones de movimientos del año en curso y el siguiente; el
+            # resto de años las crea la aplicación al arrancar
+            anio = date.today().year
+            cur.execute("SELECT crear_particiones_movimientos(%s, %s)", (anio, anio + 1))
+            particiones = cur.fetchone()[0]
             conn.commit()
 
         print("✅ Schema ejecutado correctamente")
+        print(f"✅ {particiones} partición(es) anuales de movimientos ({anio}-{anio + 1})")
     except Exception as e:
         print(f"\n❌ ERROR al ejecutar schema: {e}")
         conn.rollback()
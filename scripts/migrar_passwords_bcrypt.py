@@ -8,12 +8,22 @@ PROPÓSITO:
 
 USO:
     python scripts/migrar_passwords_bcrypt.py
+    python scripts/migrar_passwords_bcrypt.py --masivo [--procesos N]
 
 IMPORTANTE:
-    - Este script requiere conocer las contraseñas en texto plano
+    - El modo normal requiere conocer las contraseñas en texto plano
     - Solo puede migrar usuarios con contraseñas conocidas (ej: admin)
     - El resto de usuarios se migran automáticamente en su primer login
 
+MODO MASIVO (--masivo):
+    - No necesita contraseñas: envuelve el SHA256 guardado en bcrypt
+      ('bcrypt-sha256$' + bcrypt(sha256)), que verificar_password() acepta
+    - Calcula los bcrypt en paralelo con un pool de procesos (uno por núcleo)
+    - Escribe todos los hashes en una sola transacción: o se migran todos
+      o ninguno
+    - En el siguiente login de cada usuario el hash envuelto se sustituye
+      por un bcrypt normal
+
 MODO DE OPERACIÓN:
     1. Manual: Lista usuarios con contraseñas conocidas
     2. Interactivo: Pide confirmación antes de migrar
@@ -25,7 +35,11 @@ CONTRASEÑAS COMUNES A PROBAR:
     - test / test
 """
 
+import argparse
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Añadir src al path
@@ -37,6 +51,10 @@ from src.core.db_utils import (
     hash_password_seguro,
     verificar_password,
     es_hash_legacy,
+    envolver_hash_legacy,
+    get_bcrypt_rounds,
+    get_connection,
+    release_connection,
     fetch_all,
     execute_query
 )
@@ -123,6 +141,78 @@ def verificar_y_migrar_usuario(usuario, password_plano):
         return False, f"Error migrando '{usuario}': {str(e)}"
 
 
+def _envolver(args):
+    """Trabajo de cada proceso del pool: (usuario, sha256, rondas) -> (usuario, sha256, nuevo_hash)."""
+    usuario, hash_sha256, rounds = args
+    return usuario, hash_sha256, envolver_hash_legacy(hash_sha256, rounds)
+
+
+def migrar_masivo(procesos=None):
+    """
+    Envuelve en bcrypt todos los hashes SHA256 y los guarda en una transacción.
+
+    Returns:
+        (migrados, omitidos): omitidos son usuarios cuyo hash cambió mientras
+        se calculaba (p. ej. un login que ya lo migró) y se dejan como están.
+    """
+    usuarios_legacy, _ = obtener_usuarios_legacy()
+    if not usuarios_legacy:
+        return 0, 0
+
+    rounds = get_bcrypt_rounds()
+    procesos = procesos or os.cpu_count() or 1
+    trabajos = [(u['usuario'], u['pass_hash'], rounds) for u in usuarios_legacy]
+
+    print(f">> Calculando {len(trabajos)} hashes bcrypt ({rounds} rondas) con {procesos} procesos...")
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        resultados = list(pool.map(_envolver, trabajos, chunksize=max(1, len(trabajos) // (procesos * 4))))
+    print(f"   Hashes calculados en {time.perf_counter() - inicio:.1f} s")
+
+    # Una sola transacción; solo se actualiza si el hash sigue siendo el leído
+    conn = get_connection()
+    try:
+        migrados = 0
+        with conn.cursor() as cur:
+            for usuario, hash_sha256, nuevo_hash in resultados:
+                cur.execute(
+                    "UPDATE usuarios SET pass_hash = %s WHERE usuario = %s AND pass_hash = %s",
+                    (nuevo_hash, usuario, hash_sha256)
+                )
+                migrados += cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_connection(conn)
+
+    logger.info(f"Migración masiva de contraseñas: {migrados} usuarios envueltos en bcrypt")
+    return migrados, len(resultados) - migrados
+
+
+def main_masivo(procesos=None):
+    """Modo --masivo: migra todos los hashes SHA256 sin contraseñas."""
+    print("="*70)
+    print("  MIGRACION MASIVA DE CONTRASENAS (bcrypt-sha256)")
+    print("="*70)
+    print()
+
+    migrados, omitidos = migrar_masivo(procesos)
+
+    if migrados == 0 and omitidos == 0:
+        print("[OK] Todos los usuarios ya usan bcrypt!")
+        print("     No hay nada que migrar.")
+    else:
+        print()
+        print(f"[OK] Migrados: {migrados} usuario(s)")
+        if omitidos:
+            print(f"[!!] Omitidos: {omitidos} (su hash cambió durante la migración)")
+    print()
+    print("="*70)
+    print()
+
+
 def main():
     """Función principal del script de migración."""
     print("="*70)
@@ -176,6 +266,7 @@ def main():
         print()
         print("   Estos se migraran AUTOMATICAMENTE en su proximo login.")
         print("   No necesitas resetear sus contrasenas.")
+        print("   Para migrarlos todos ahora, sin contrasenas: --masivo")
         print()
 
     print("="*70)
@@ -183,8 +274,18 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migración de contraseñas SHA256 a bcrypt")
+    parser.add_argument('--masivo', action='store_true',
+                        help="Envolver en bcrypt todos los hashes SHA256 (sin contraseñas)")
+    parser.add_argument('--procesos', type=int, default=None,
+                        help="Procesos para calcular bcrypt (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
     try:
-        main()
+        if args.masivo:
+            main_masivo(args.procesos)
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n\n[!!] Migracion cancelada por el usuario.")
         sys.exit(0)
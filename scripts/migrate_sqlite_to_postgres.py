@@ -3,14 +3,37 @@
 """
 Script de migración de datos SQLite a PostgreSQL
 Copia todos los datos de la BD SQLite a PostgreSQL
+
+- Cada tabla se divide en lotes por rango de rowid y cada lote se carga con
+  COPY FROM STDIN en un proceso trabajador; varias tablas (y varios lotes de
+  la misma tabla) se cargan a la vez.
+- Una tabla no empieza hasta que han terminado las tablas a las que apunta
+  (claves foráneas reales del esquema más las relaciones lógicas de
+  DEPENDENCIAS, porque schema_postgres_full.sql no declara FOREIGN KEY).
+- Cada lote se confirma junto con su fila en _migracion_progreso, así que si
+  la migración se interrumpe basta con volver a lanzarla: continúa por el
+  primer lote no confirmado.
+- Los índices secundarios se eliminan antes de cargar y se recrean al final;
+  después se ajustan las secuencias SERIAL al id máximo de cada tabla.
+- Los disparadores por fila (trg_movimientos_fecha) también se quitan durante
+  la carga y se vuelven a crear al final: no se ejecutan una vez por fila
+  copiada ni rechazan los movimientos históricos de ejercicios ya cerrados.
+
+Uso:
+    python scripts/migrate_sqlite_to_postgres.py [--sqlite ruta.db] [--workers 4]
+           [--lote 50000] [--reiniciar]
 """
 import sys
 import os
+import argparse
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 # Configurar UTF-8 para la salida en Windows
 if sys.platform == 'win32':
-    import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
@@ -21,9 +44,370 @@ sys.path.insert(0, str(PROJECT_ROOT))
 import sqlite3
 import configparser
 
+SQLITE_POR_DEFECTO = PROJECT_ROOT / "db" / "almacen.db"
+
+# Filas por lote: unidad de trabajo de cada proceso y de reanudación
+LOTE_FILAS = 50_000
+
+TABLA_PROGRESO = "_migracion_progreso"
+TABLA_INDICES = "_migracion_indices"
+TABLA_DISPARADORES = "_migracion_disparadores"
+
+# Relaciones entre tablas (tabla -> tablas a las que apunta). Se combinan con
+# las FOREIGN KEY que tenga el esquema de destino.
+DEPENDENCIAS: Dict[str, Set[str]] = {
+    'sesiones': {'usuarios'},
+    'notificaciones': {'usuarios'},
+    'config_notificaciones': {'usuarios'},
+    'articulos': {'proveedores', 'familias', 'ubicaciones'},
+    'furgonetas': {'almacenes'},
+    'furgonetas_asignaciones': {'furgonetas'},
+    'movimientos': {'articulos', 'almacenes', 'operarios'},
+    'asignaciones_furgoneta': {'operarios', 'almacenes'},
+    'albaranes': {'proveedores'},
+    'inventarios': {'almacenes'},
+    'inventario_detalle': {'inventarios', 'articulos'},
+    'historial_operaciones': {'articulos', 'usuarios'},
+}
+
+SQL_TABLAS_CONTROL = f"""
+    CREATE TABLE IF NOT EXISTS {TABLA_PROGRESO}(
+      tabla       TEXT NOT NULL,
+      desde_rowid BIGINT NOT NULL,
+      hasta_rowid BIGINT NOT NULL,
+      filas       INTEGER NOT NULL,
+      fecha       TIMESTAMP NOT NULL DEFAULT NOW(),
+      PRIMARY KEY (tabla, desde_rowid)
+    );
+    CREATE TABLE IF NOT EXISTS {TABLA_INDICES}(
+      nombre     TEXT PRIMARY KEY,
+      tabla      TEXT NOT NULL,
+      definicion TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS {TABLA_DISPARADORES}(
+      nombre     TEXT NOT NULL,
+      tabla      TEXT NOT NULL,
+      definicion TEXT NOT NULL,
+      PRIMARY KEY (nombre, tabla)
+    );
+"""
+
 
-def migrate_data():
-    """Migra datos de SQLite a PostgreSQL"""
+def _parametros_pg(config: configparser.ConfigParser) -> Dict[str, Any]:
+    return {
+        'host': config.get('database', 'HOST'),
+        'port': config.getint('database', 'PORT'),
+        'database': config.get('database', 'NAME'),
+        'user': config.get('database', 'USER'),
+        'password': config.get('database', 'PASSWORD'),
+    }
+
+
+# ========================================
+# CONVERSIÓN DE VALORES A FORMATO COPY
+# ========================================
+
+# NUL no es válido en un TEXT de PostgreSQL; el resto son los escapes de COPY
+_ESCAPES_COPY = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\x00': ''})
+_NULO = '\\N'
+
+
+def _texto(valor) -> str:
+    if isinstance(valor, bytes):
+        valor = valor.decode('utf-8', errors='replace')
+    return str(valor).translate(_ESCAPES_COPY)
+
+
+def _convertidor(tipo_pg: str) -> Callable[[Any], str]:
+    """Función valor SQLite -> campo COPY según el tipo de la columna en PostgreSQL."""
+    if tipo_pg in ('smallint', 'integer', 'bigint'):
+        def convertir(v):
+            if v is None or v == '':
+                return _NULO
+            if isinstance(v, float) and v.is_integer():
+                return str(int(v))
+            return _texto(v).strip()
+    elif tipo_pg in ('numeric', 'real', 'double precision'):
+        def convertir(v):
+            return _NULO if v is None or v == '' else _texto(v).strip()
+    elif tipo_pg == 'boolean':
+        def convertir(v):
+            if v is None or v == '':
+                return _NULO
+            if v in (0, 1):
+                return 't' if v else 'f'
+            return _texto(v)
+    elif tipo_pg == 'bytea':
+        def convertir(v):
+            if v is None:
+                return _NULO
+            datos = v if isinstance(v, bytes) else str(v).encode('utf-8')
+            return '\\\\x' + datos.hex()
+    elif tipo_pg.startswith(('date', 'time')):
+        # SQLite guarda '' donde PostgreSQL necesita NULL
+        def convertir(v):
+            return _NULO if v is None or v == '' else _texto(v)
+    else:
+        def convertir(v):
+            return _NULO if v is None else _texto(v)
+    return convertir
+
+
+# ========================================
+# TRABAJADOR (se ejecuta en cada proceso)
+# ========================================
+
+_sqlite_worker: Optional[sqlite3.Connection] = None
+_pg_worker = None
+
+
+def _iniciar_worker(sqlite_path: str, parametros_pg: Dict[str, Any]) -> None:
+    global _sqlite_worker, _pg_worker
+    import psycopg2
+
+    _sqlite_worker = sqlite3.connect(Path(sqlite_path).resolve().as_uri() + "?mode=ro", uri=True)
+    _pg_worker = psycopg2.connect(**parametros_pg)
+    # Los lotes se pueden repetir tras un fallo: no merece la pena esperar al WAL
+    with _pg_worker.cursor() as cur:
+        cur.execute("SET synchronous_commit TO off")
+    _pg_worker.commit()
+
+
+def _migrar_lote(tabla: str, desde: int, hasta: int,
+                 columnas: List[str], tipos: List[str]) -> Dict[str, Any]:
+    """
+    Copia las filas de `tabla` con rowid en [desde, hasta) y registra el lote
+    en la misma transacción. Devuelve un dict con el resultado (los errores
+    se devuelven como texto: las excepciones de psycopg2 no siempre se pueden
+    enviar entre procesos).
+    """
+    inicio = time.perf_counter()
+    convertidores = [_convertidor(t) for t in tipos]
+    lista_columnas = ', '.join(f'"{c}"' for c in columnas)
+
+    buffer = io.StringIO()
+    filas = 0
+    cursor = _sqlite_worker.execute(
+        f'SELECT {lista_columnas} FROM "{tabla}" WHERE rowid >= ? AND rowid < ?',
+        (desde, hasta)
+    )
+    for fila in cursor:
+        buffer.write('\t'.join([conv(v) for conv, v in zip(convertidores, fila)]))
+        buffer.write('\n')
+        filas += 1
+    buffer.seek(0)
+
+    try:
+        with _pg_worker.cursor() as cur:
+            if filas:
+                cur.copy_expert(f'COPY {tabla} ({lista_columnas}) FROM STDIN', buffer, size=1 << 18)
+            cur.execute(
+                f"INSERT INTO {TABLA_PROGRESO}(tabla, desde_rowid, hasta_rowid, filas) "
+                "VALUES (%s, %s, %s, %s)",
+                (tabla, desde, hasta, filas)
+            )
+        _pg_worker.commit()
+        error = None
+    except Exception as e:
+        _pg_worker.rollback()
+        error = f"{type(e).__name__}: {str(e).strip()}"
+        filas = 0
+
+    return {
+        'tabla': tabla,
+        'desde': desde,
+        'filas': filas,
+        'segundos': time.perf_counter() - inicio,
+        'error': error,
+    }
+
+
+# ========================================
+# PLANIFICACIÓN
+# ========================================
+
+def _columnas_sqlite(sqlite_conn: sqlite3.Connection) -> Dict[str, List[str]]:
+    tablas = [r[0] for r in sqlite_conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    )]
+    return {
+        tabla: [r[1] for r in sqlite_conn.execute(f'PRAGMA table_info("{tabla}")')]
+        for tabla in tablas
+    }
+
+
+def _columnas_pg(cur) -> Dict[str, Dict[str, str]]:
+    cur.execute("""
+        SELECT c.table_name, c.column_name, c.data_type
+        FROM information_schema.columns c
+        JOIN information_schema.tables t
+          ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+        WHERE c.table_schema = 'public' AND t.table_type = 'BASE TABLE'
+        ORDER BY c.table_name, c.ordinal_position
+    """)
+    columnas: Dict[str, Dict[str, str]] = {}
+    for tabla, columna, tipo in cur.fetchall():
+        columnas.setdefault(tabla, {})[columna] = tipo
+    return columnas
+
+
+def _dependencias_pg(cur) -> Dict[str, Set[str]]:
+    cur.execute("""
+        SELECT conrelid::regclass::text, confrelid::regclass::text
+        FROM pg_constraint
+        WHERE contype = 'f' AND connamespace = 'public'::regnamespace
+    """)
+    dependencias: Dict[str, Set[str]] = {}
+    for tabla, referenciada in cur.fetchall():
+        if tabla != referenciada:
+            dependencias.setdefault(tabla, set()).add(referenciada)
+    return dependencias
+
+
+def ordenar_por_dependencias(tablas: List[str], dependencias: Dict[str, Set[str]]) -> List[str]:
+    """
+    Orden topológico de `tablas` (las referenciadas primero). Las dependencias
+    hacia tablas que no se migran se ignoran.
+    """
+    pendientes = {t: dependencias.get(t, set()) & set(tablas) for t in tablas}
+    orden = []
+    while pendientes:
+        listas = sorted(t for t, deps in pendientes.items() if not deps - set(orden))
+        if not listas:
+            raise ValueError(f"Dependencias circulares entre: {', '.join(sorted(pendientes))}")
+        orden.extend(listas)
+        for t in listas:
+            del pendientes[t]
+    return orden
+
+
+def _planificar_lotes(sqlite_conn: sqlite3.Connection, tabla: str, lote: int) -> List[Tuple[int, int]]:
+    minimo, maximo = sqlite_conn.execute(f'SELECT MIN(rowid), MAX(rowid) FROM "{tabla}"').fetchone()
+    if minimo is None:
+        return []
+    return [(desde, min(desde + lote, maximo + 1)) for desde in range(minimo, maximo + 1, lote)]
+
+
+def _diferir_indices(cur, tablas: List[str]) -> int:
+    """Guarda y elimina los índices secundarios (no ligados a restricciones) de `tablas`."""
+    cur.execute("""
+        SELECT i.indexname, i.tablename, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = 'public'
+          AND i.tablename = ANY(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+    """, (tablas,))
+    indices = cur.fetchall()
+    for nombre, tabla, definicion in indices:
+        # En tablas particionadas la definición lleva "ON ONLY" (sin particiones)
+        definicion = definicion.replace(' ON ONLY ', ' ON ', 1)
+        cur.execute(
+            f"INSERT INTO {TABLA_INDICES}(nombre, tabla, definicion) VALUES (%s, %s, %s) "
+            "ON CONFLICT (nombre) DO NOTHING",
+            (nombre, tabla, definicion)
+        )
+        cur.execute(f'DROP INDEX IF EXISTS "{nombre}"')
+    return len(indices)
+
+
+def _diferir_disparadores(cur, tablas: List[str]) -> int:
+    """Guarda y elimina los disparadores por fila (FOR EACH ROW) de `tablas`."""
+    cur.execute("""
+        SELECT t.tgname, c.relname, pg_get_triggerdef(t.oid)
+        FROM pg_trigger t
+        JOIN pg_class c ON c.oid = t.tgrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public'
+          AND c.relname = ANY(%s)
+          AND NOT t.tgisinternal
+          AND t.tgtype & 1 = 1
+    """, (tablas,))
+    disparadores = cur.fetchall()
+    for nombre, tabla, definicion in disparadores:
+        cur.execute(
+            f"INSERT INTO {TABLA_DISPARADORES}(nombre, tabla, definicion) VALUES (%s, %s, %s) "
+            "ON CONFLICT (nombre, tabla) DO NOTHING",
+            (nombre, tabla, definicion)
+        )
+        cur.execute(f'DROP TRIGGER IF EXISTS "{nombre}" ON public."{tabla}"')
+    return len(disparadores)
+
+
+def _crear_particiones(sqlite_conn, cur) -> int:
+    """
+    Particiones anuales de movimientos para los años que hay en SQLite (y el
+    siguiente al actual), si la tabla de destino está particionada. Así COPY
+    reparte las filas directamente en vez de dejarlas en movimientos_default.
+    """
+    cur.execute("SELECT to_regprocedure('crear_particiones_movimientos(integer, integer)')")
+    if cur.fetchone()[0] is None:
+        return 0
+    desde, hasta = sqlite_conn.execute(
+        "SELECT MIN(substr(fecha, 1, 4)), MAX(substr(fecha, 1, 4)) FROM movimientos"
+    ).fetchone()
+    if desde is None:
+        return 0
+    cur.execute("SELECT crear_particiones_movimientos(%s, %s)",
+                (int(desde), max(int(hasta), time.localtime().tm_year) + 1))
+    return cur.fetchone()[0]
+
+
+def _recrear_indices(cur) -> int:
+    cur.execute(f"SELECT nombre, definicion FROM {TABLA_INDICES} ORDER BY tabla, nombre")
+    indices = cur.fetchall()
+    for nombre, definicion in indices:
+        cur.execute(definicion.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1)
+                              .replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX IF NOT EXISTS", 1))
+        cur.execute(f"DELETE FROM {TABLA_INDICES} WHERE nombre = %s", (nombre,))
+    return len(indices)
+
+
+def _recrear_disparadores(cur) -> int:
+    cur.execute(f"SELECT nombre, tabla, definicion FROM {TABLA_DISPARADORES} ORDER BY tabla, nombre")
+    disparadores = cur.fetchall()
+    for nombre, tabla, definicion in disparadores:
+        cur.execute(definicion.replace("CREATE TRIGGER", "CREATE OR REPLACE TRIGGER", 1))
+        cur.execute(f"DELETE FROM {TABLA_DISPARADORES} WHERE nombre = %s AND tabla = %s", (nombre, tabla))
+    return len(disparadores)
+
+
+def _ajustar_secuencias(cur) -> List[Tuple[str, int]]:
+    """Pone cada secuencia SERIAL en el id máximo de su tabla."""
+    cur.execute("""
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND column_default LIKE 'nextval%'
+    """)
+    ajustadas = []
+    for tabla, columna in cur.fetchall():
+        cur.execute(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', '{columna}'), "
+            f"COALESCE(MAX({columna}), 1), MAX({columna}) IS NOT NULL), "
+            f"COALESCE(MAX({columna}), 0) FROM {tabla}"
+        )
+        ajustadas.append((tabla, cur.fetchone()[1]))
+    return ajustadas
+
+
+# ========================================
+# MIGRACIÓN
+# ========================================
+
+def migrate_data(
+    sqlite_path: Optional[Path] = None,
+    workers: Optional[int] = None,
+    lote: int = LOTE_FILAS,
+    reiniciar: bool = False
+) -> bool:
+    """
+    Migra datos de SQLite a PostgreSQL (reanudable).
+
+    Args:
+        sqlite_path: BD SQLite de origen (por defecto db/almacen.db)
+        workers: Procesos de carga en paralelo (por defecto, hasta 4)
+        lote: Filas por lote; debe ser el mismo al reanudar
+        reiniciar: Vacía las tablas de destino y descarta el progreso anterior
+    """
 
     print("=" * 70)
     print("  MIGRACIÓN DE DATOS: SQLite → PostgreSQL")
@@ -38,207 +422,236 @@ def migrate_data():
         return False
 
     config.read(config_path)
+    parametros_pg = _parametros_pg(config)
 
     # Ruta SQLite
-    sqlite_db_path = PROJECT_ROOT / "db" / "almacen.db"
+    sqlite_db_path = Path(sqlite_path) if sqlite_path else SQLITE_POR_DEFECTO
     if not sqlite_db_path.exists():
         print(f"\n❌ ERROR: No se encontró la base de datos SQLite: {sqlite_db_path}")
         return False
 
     print(f"\n📁 Base de datos SQLite: {sqlite_db_path}")
-    print(f"   Tamaño: {sqlite_db_path.stat().st_size / 1024:.2f} KB")
+    print(f"   Tamaño: {sqlite_db_path.stat().st_size / 1024 / 1024:.2f} MB")
 
     # Verificar psycopg2
     try:
         import psycopg2
-        from psycopg2.extras import execute_values
     except ImportError:
         print("\n❌ ERROR: psycopg2 no está instalado")
         print("   Ejecuta: pip install psycopg2-binary")
         return False
 
-    # Conectar SQLite
-    print("\n🔌 Conectando a SQLite...")
     try:
         sqlite_conn = sqlite3.connect(sqlite_db_path)
-        sqlite_conn.row_factory = sqlite3.Row
-        print("✅ SQLite conectado")
+        pg_conn = psycopg2.connect(**parametros_pg)
     except Exception as e:
-        print(f"❌ Error conectando a SQLite: {e}")
-        return False
-
-    # Conectar PostgreSQL
-    print("\n🔌 Conectando a PostgreSQL...")
-    try:
-        pg_conn = psycopg2.connect(
-            host=config.get('database', 'HOST'),
-            port=config.getint('database', 'PORT'),
-            database=config.get('database', 'NAME'),
-            user=config.get('database', 'USER'),
-            password=config.get('database', 'PASSWORD')
-        )
-        print("✅ PostgreSQL conectado")
-    except Exception as e:
-        print(f"❌ Error conectando a PostgreSQL: {e}")
+        print(f"❌ Error conectando: {e}")
         print("\n💡 Asegúrate de haber ejecutado: python scripts/init_postgres.py")
-        sqlite_conn.close()
         return False
 
-    # Orden de tablas (respetar foreign keys)
-    tablas_orden = [
-        'usuarios',
-        'sesiones',
-        'proveedores',
-        'operarios',
-        'familias',
-        'ubicaciones',
-        'almacenes',
-        'furgonetas',
-        'articulos',
-        'movimientos',
-        'asignaciones_furgoneta',
-        'albaranes',
-        'inventarios',
-        'inventario_detalle',
-        'notificaciones',
-        'historial'
-    ]
-
-    print("\n📋 Migrando tablas...\n")
-
-    total_registros = 0
-    tablas_migradas = 0
-
-    for tabla in tablas_orden:
-        # Verificar si la tabla existe en SQLite
-        try:
-            cursor_check = sqlite_conn.execute(
-                f"SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-                (tabla,)
-            )
-            if not cursor_check.fetchone():
-                print(f"⏭️  {tabla:30} - No existe en SQLite")
+    inicio_total = time.perf_counter()
+    try:
+        # ---------- Plan ----------
+        with pg_conn.cursor() as cur:
+            cur.execute(SQL_TABLAS_CONTROL)
+            columnas_pg = _columnas_pg(cur)
+            dependencias = _dependencias_pg(cur)
+        pg_conn.commit()
+
+        for tabla, deps in DEPENDENCIAS.items():
+            dependencias.setdefault(tabla, set()).update(deps)
+
+        columnas_sqlite = _columnas_sqlite(sqlite_conn)
+        columnas_por_tabla: Dict[str, List[str]] = {}
+        for tabla, columnas in columnas_sqlite.items():
+            if tabla not in columnas_pg:
+                print(f"⏭️  {tabla:30} - No existe en PostgreSQL")
                 continue
-        except Exception:
-            continue
+            comunes = [c for c in columnas if c in columnas_pg[tabla]]
+            ignoradas = [c for c in columnas if c not in columnas_pg[tabla]]
+            if ignoradas:
+                print(f"⚠️  {tabla:30} - Columnas sin destino: {', '.join(ignoradas)}")
+            columnas_por_tabla[tabla] = comunes
 
-        # Leer datos de SQLite
-        try:
-            cursor_sqlite = sqlite_conn.execute(f"SELECT * FROM {tabla}")
-            rows = cursor_sqlite.fetchall()
-
-            if not rows:
-                print(f"⚠️  {tabla:30} - Tabla vacía")
-                continue
+        orden = ordenar_por_dependencias(sorted(columnas_por_tabla), dependencias)
 
-            # Obtener nombres de columnas
-            columnas = [desc[0] for desc in cursor_sqlite.description]
-
-        except Exception as e:
-            print(f"❌ {tabla:30} - Error leyendo SQLite: {e}")
-            continue
-
-        # Insertar en PostgreSQL
-        try:
-            with pg_conn.cursor() as cur_pg:
-                # Preparar INSERT
-                placeholders = ', '.join(['%s'] * len(columnas))
-                cols = ', '.join(columnas)
-                insert_sql = f"INSERT INTO {tabla} ({cols}) VALUES ({placeholders})"
-
-                # Insertar por lotes para mejor rendimiento
-                batch_size = 100
-                for i in range(0, len(rows), batch_size):
-                    batch = rows[i:i + batch_size]
-                    data = [tuple(row) for row in batch]
-                    execute_values(cur_pg, f"INSERT INTO {tabla} ({cols}) VALUES %s", data, template=None)
-
-            pg_conn.commit()
-            print(f"✅ {tabla:30} - {len(rows):6} registros migrados")
-            total_registros += len(rows)
-            tablas_migradas += 1
-
-        except Exception as e:
-            pg_conn.rollback()
-            print(f"❌ {tabla:30} - Error insertando en PostgreSQL:")
-            print(f"   {e}")
-            # Intentar insertar fila por fila para identificar problemas
-            print(f"   Intentando inserción fila por fila...")
-            errores = 0
-            exitos = 0
-            with pg_conn.cursor() as cur_pg:
-                for row in rows:
-                    try:
-                        cur_pg.execute(insert_sql, tuple(row))
-                        pg_conn.commit()
-                        exitos += 1
-                    except Exception as row_error:
-                        pg_conn.rollback()
-                        errores += 1
-                        if errores <= 3:  # Mostrar solo los primeros 3 errores
-                            print(f"      Error en fila: {dict(row)}")
-                            print(f"      {row_error}")
-
-            if exitos > 0:
-                print(f"   ✅ {exitos} registros insertados correctamente")
-                print(f"   ❌ {errores} registros con errores")
-                total_registros += exitos
-                tablas_migradas += 1
-
-    # Actualizar secuencias de PostgreSQL
-    print("\n🔄 Actualizando secuencias (SERIAL)...")
-    with pg_conn.cursor() as cur:
-        for tabla in tablas_orden:
+        with pg_conn.cursor() as cur:
+            if reiniciar:
+                print("\n🗑️  Vaciando tablas de destino y progreso anterior...")
+                cur.execute(f"TRUNCATE {', '.join(orden)} RESTART IDENTITY CASCADE")
+                cur.execute(f"DELETE FROM {TABLA_PROGRESO}")
+
+            cur.execute(f"SELECT tabla, desde_rowid, hasta_rowid FROM {TABLA_PROGRESO}")
+            hechos: Dict[str, Set[Tuple[int, int]]] = {}
+            for tabla, desde, hasta in cur.fetchall():
+                hechos.setdefault(tabla, set()).add((desde, hasta))
+
+            # Una tabla con datos pero sin progreso registrado no es nuestra: no mezclar
+            ocupadas = []
+            for tabla in orden:
+                if tabla not in hechos:
+                    cur.execute(f"SELECT EXISTS (SELECT 1 FROM {tabla})")
+                    if cur.fetchone()[0]:
+                        ocupadas.append(tabla)
+        pg_conn.commit()
+
+        if ocupadas:
+            print(f"\n❌ Estas tablas ya tienen datos en PostgreSQL: {', '.join(ocupadas)}")
+            print("   Usa --reiniciar para vaciarlas y migrar desde cero")
+            return False
+
+        lotes_pendientes: Dict[str, List[Tuple[int, int]]] = {}
+        for tabla in orden:
+            planificados = _planificar_lotes(sqlite_conn, tabla, lote)
+            previos = hechos.get(tabla, set())
+            if previos - set(planificados):
+                print(f"\n❌ El progreso guardado de {tabla} no encaja con --lote {lote}.")
+                print("   Reanuda con el mismo tamaño de lote o usa --reiniciar")
+                return False
+            lotes_pendientes[tabla] = [l for l in planificados if l not in previos]
+
+        total_lotes = sum(len(l) for l in lotes_pendientes.values())
+        ya_hechos = sum(len(h) for h in hechos.values())
+        if ya_hechos and not reiniciar:
+            print(f"\n🔁 Reanudando: {ya_hechos} lote(s) ya migrados, {total_lotes} pendientes")
+
+        tablas_con_trabajo = [t for t in orden if lotes_pendientes[t]]
+        with pg_conn.cursor() as cur:
+            particiones = _crear_particiones(sqlite_conn, cur) if 'movimientos' in tablas_con_trabajo else 0
+            diferidos = _diferir_indices(cur, tablas_con_trabajo) if tablas_con_trabajo else 0
+            sin_disparadores = _diferir_disparadores(cur, tablas_con_trabajo) if tablas_con_trabajo else 0
+        pg_conn.commit()
+        if particiones:
+            print(f"\n🗂️  {particiones} partición(es) anuales de movimientos creadas")
+        if diferidos:
+            print(f"\n📑 {diferidos} índice(s) secundarios se recrearán al final")
+        if sin_disparadores:
+            print(f"\n⚡ {sin_disparadores} disparador(es) por fila se recrearán al final")
+
+        # ---------- Carga en paralelo ----------
+        workers = workers or min(4, os.cpu_count() or 1)
+        print(f"\n📋 Migrando {len(tablas_con_trabajo)} tabla(s) con {workers} proceso(s), "
+              f"lotes de {lote:,} filas...\n")
+
+        terminadas = {t for t in orden if not lotes_pendientes[t]}
+        fallidas: Dict[str, str] = {}
+        en_curso: Dict[str, int] = {}
+        filas_tabla: Dict[str, int] = {}
+        inicio_tabla: Dict[str, float] = {}
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_iniciar_worker,
+            initargs=(str(sqlite_db_path), parametros_pg)
+        ) as pool:
+            futuros = set()
             try:
-                # Obtener nombre de la secuencia
-                cur.execute("""
-                    SELECT pg_get_serial_sequence(%s, 'id')
-                """, (tabla,))
-                result = cur.fetchone()
-
-                if result and result[0]:
-                    seq_name = result[0]
-                    # Actualizar secuencia al máximo id + 1
-                    cur.execute(f"""
-                        SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {tabla}), 1), true)
-                    """, (seq_name,))
-                    pg_conn.commit()
-                    print(f"   ✅ {tabla}")
-
-            except Exception as e:
-                # Algunas tablas no tienen secuencias (ej: sesiones)
-                pass
+                while True:
+                    # Lanzar las tablas cuyas dependencias ya han terminado
+                    for tabla in orden:
+                        if tabla in terminadas or tabla in en_curso or tabla in fallidas:
+                            continue
+                        deps = dependencias.get(tabla, set()) & set(orden)
+                        if deps & set(fallidas):
+                            fallidas[tabla] = "depende de una tabla con errores"
+                            continue
+                        if not deps <= terminadas:
+                            continue
+                        columnas = columnas_por_tabla[tabla]
+                        tipos = [columnas_pg[tabla][c] for c in columnas]
+                        en_curso[tabla] = len(lotes_pendientes[tabla])
+                        filas_tabla[tabla] = 0
+                        inicio_tabla[tabla] = time.perf_counter()
+                        for desde, hasta in lotes_pendientes[tabla]:
+                            futuros.add(pool.submit(_migrar_lote, tabla, desde, hasta, columnas, tipos))
+
+                    if not futuros:
+                        break
+
+                    listos, futuros = wait(futuros, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        r = futuro.result()
+                        tabla = r['tabla']
+                        if r['error']:
+                            fallidas.setdefault(tabla, f"lote desde rowid {r['desde']}: {r['error']}")
+                        filas_tabla[tabla] += r['filas']
+                        en_curso[tabla] -= 1
+
+                        if en_curso[tabla] == 0:
+                            del en_curso[tabla]
+                            segundos = time.perf_counter() - inicio_tabla[tabla]
+                            if tabla in fallidas:
+                                print(f"❌ {tabla:30} - {fallidas[tabla]}")
+                            else:
+                                terminadas.add(tabla)
+                                print(f"✅ {tabla:30} - {filas_tabla[tabla]:>10,} registros  {segundos:7.1f} s")
+                        elif len(lotes_pendientes[tabla]) >= 20 and en_curso[tabla] % 10 == 0:
+                            hechos_tabla = len(lotes_pendientes[tabla]) - en_curso[tabla]
+                            print(f"   … {tabla}: {hechos_tabla}/{len(lotes_pendientes[tabla])} lotes")
+            except KeyboardInterrupt:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        if fallidas:
+            for tabla, motivo in fallidas.items():
+                if motivo.startswith("depende"):
+                    print(f"⏭️  {tabla:30} - No migrada: {motivo}")
+            print("\n❌ La migración no ha terminado. Corrige los errores y vuelve a lanzar")
+            print("   el script: los lotes ya confirmados no se repiten.")
+            return False
+
+        # ---------- Índices, secuencias y verificación ----------
+        print("\n📑 Recreando índices y disparadores...")
+        with pg_conn.cursor() as cur:
+            cur.execute("SET maintenance_work_mem TO '512MB'")
+            recreados = _recrear_indices(cur)
+            disparadores = _recrear_disparadores(cur)
+        pg_conn.commit()
+        print(f"   ✅ {recreados} índice(s), {disparadores} disparador(es)")
+
+        print("\n🔄 Actualizando secuencias (SERIAL)...")
+        with pg_conn.cursor() as cur:
+            for tabla, maximo in _ajustar_secuencias(cur):
+                print(f"   ✅ {tabla:30} -> {maximo}")
+        pg_conn.commit()
+
+        print("\n🔍 Verificando recuentos...")
+        diferencias = []
+        with pg_conn.cursor() as cur:
+            for tabla in orden:
+                origen = sqlite_conn.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0]
+                cur.execute(f"SELECT COUNT(*) FROM {tabla}")
+                destino = cur.fetchone()[0]
+                if origen != destino:
+                    diferencias.append(f"{tabla}: SQLite {origen:,} / PostgreSQL {destino:,}")
+            if not diferencias:
+                cur.execute(f"DROP TABLE {TABLA_PROGRESO}, {TABLA_INDICES}, {TABLA_DISPARADORES}")
+        pg_conn.commit()
+
+        pg_conn.autocommit = True
+        with pg_conn.cursor() as cur:
+            cur.execute("ANALYZE")
+
+        if diferencias:
+            print("   ⚠️  Recuentos distintos:")
+            for d in diferencias:
+                print(f"      {d}")
+            return False
+
+        total_registros = sum(filas_tabla.values())
+
+    finally:
+        sqlite_conn.close()
+        pg_conn.close()
 
     # Resumen
     print("\n" + "=" * 70)
     print("  ✅ MIGRACIÓN COMPLETADA")
     print("=" * 70)
     print(f"\n📊 Estadísticas:")
-    print(f"   Tablas migradas: {tablas_migradas}")
-    print(f"   Registros totales: {total_registros:,}")
-
-    # Verificar integridad
-    print("\n🔍 Verificando integridad...")
-    try:
-        with pg_conn.cursor() as cur:
-            # Contar registros en tablas principales
-            cur.execute("SELECT COUNT(*) FROM usuarios")
-            usuarios_count = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM articulos")
-            articulos_count = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM movimientos")
-            movimientos_count = cur.fetchone()[0]
-
-        print(f"   Usuarios: {usuarios_count}")
-        print(f"   Artículos: {articulos_count}")
-        print(f"   Movimientos: {movimientos_count}")
-
-    except Exception as e:
-        print(f"   ⚠️  Error verificando integridad: {e}")
-
-    # Cerrar conexiones
-    sqlite_conn.close()
-    pg_conn.close()
+    print(f"   Tablas migradas: {len(orden)}")
+    print(f"   Registros copiados en esta ejecución: {total_registros:,}")
+    print(f"   Tiempo total: {time.perf_counter() - inicio_total:.1f} s")
 
     print("\n💡 Próximos pasos:")
     print("   1. Ejecutar: python scripts/test_postgres_migration.py")
@@ -250,12 +663,26 @@ def migrate_data():
     return True
 
 
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migra los datos de SQLite a PostgreSQL")
+    parser.add_argument("--sqlite", type=Path, default=SQLITE_POR_DEFECTO,
+                        help="BD SQLite de origen (por defecto db/almacen.db)")
+    parser.add_argument("--workers", type=int, help="Procesos en paralelo (por defecto hasta 4)")
+    parser.add_argument("--lote", type=int, default=LOTE_FILAS,
+                        help="Filas por lote (usa el mismo valor al reanudar)")
+    parser.add_argument("--reiniciar", action="store_true",
+                        help="Vacía las tablas de destino y empieza desde cero")
+    args = parser.parse_args(argv)
+
+    return 0 if migrate_data(args.sqlite, args.workers, args.lote, args.reiniciar) else 1
+
+
 if __name__ == '__main__':
     try:
-        success = migrate_data()
-        sys.exit(0 if success else 1)
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\n\n⚠️  Operación cancelada por el usuario")
+        print("   Vuelve a ejecutar el script para continuar donde se quedó")
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ ERROR FATAL: {e}")
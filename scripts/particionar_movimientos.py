@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Particionado de movimientos por año y cierre de ejercicios
+
+Uso:
+    python scripts/particionar_movimientos.py migrar [--conservar]
+    python scripts/particionar_movimientos.py cerrar --anio 2024 [--usuario admin]
+    python scripts/particionar_movimientos.py estado
+
+migrar: convierte la tabla movimientos actual en una tabla particionada por
+    rango de fecha (una partición por año más movimientos_default) y crea
+    los objetos de db/particionado_movimientos.sql. Conserva claves foráneas
+    y CHECK. Las tablas creadas con el antiguo schema_postgres.sql (fecha
+    DATE, tipo sin 'APERTURA') se ajustan antes. Todo en una transacción.
+
+cerrar: cierra un ejercicio. Escribe un movimiento de tipo APERTURA por
+    almacén y artículo con el stock a 31 de diciembre, fechado el 1 de enero
+    siguiente, y registra el cierre en cierres_movimientos. Desde entonces
+    vw_stock solo lee el ejercicio abierto y PostgreSQL descarta las
+    particiones cerradas; los movimientos antiguos siguen disponibles para
+    informes y consumos. Se comprueba que el stock no cambia con el cierre.
+
+IMPORTANTE: migrar bloquea movimientos mientras copia los datos. Haz un
+backup antes (python scripts/backup_db.py).
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+# Configurar UTF-8 para la salida en Windows
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.backup_pg import resumen_stock
+from src.core.db_utils import nueva_conexion
+from src.core.logger import logger
+
+SQL_OBJETOS = PROJECT_ROOT / "db" / "particionado_movimientos.sql"
+
+TIPOS_MOVIMIENTO = ('ENTRADA', 'TRASPASO', 'IMPUTACION', 'PERDIDA', 'DEVOLUCION', 'APERTURA')
+
+# Stock por almacén y artículo de [desde, apertura), con la misma lógica que vw_stock
+SQL_SALDOS_APERTURA = """
+    INSERT INTO movimientos(fecha, tipo, destino_id, articulo_id, cantidad, motivo, responsable)
+    SELECT %(apertura)s, 'APERTURA', almacen_id, articulo_id, SUM(delta), %(motivo)s, %(usuario)s
+    FROM (
+        SELECT destino_id AS almacen_id, articulo_id, cantidad AS delta
+        FROM movimientos
+        WHERE tipo IN ('ENTRADA', 'TRASPASO', 'APERTURA')
+          AND fecha >= %(desde)s AND fecha < %(apertura)s
+        UNION ALL
+        SELECT origen_id, articulo_id, -cantidad
+        FROM movimientos
+        WHERE tipo IN ('IMPUTACION', 'PERDIDA', 'DEVOLUCION', 'TRASPASO')
+          AND origen_id IS NOT NULL
+          AND fecha >= %(desde)s AND fecha < %(apertura)s
+    ) m
+    GROUP BY almacen_id, articulo_id
+    HAVING SUM(delta) <> 0
+"""
+
+
+def _tipo_tabla(cur) -> str:
+    """relkind de movimientos ('r' normal, 'p' particionada, '' si no existe)."""
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('public.movimientos')")
+    fila = cur.fetchone()
+    return fila[0] if fila else ''
+
+
+def _adaptar_tabla_antigua(cur) -> None:
+    """
+    Ajusta una tabla movimientos del antiguo schema_postgres.sql al esquema
+    actual: fecha TEXT 'YYYY-MM-DD' (las particiones y
+    fecha_apertura_movimientos() la comparan como texto) y 'APERTURA'
+    admitido en el CHECK de tipo.
+    """
+    cur.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'movimientos' AND column_name = 'fecha'
+    """)
+    if cur.fetchone()[0] == 'date':
+        # vw_stock y vw_stock_total dependen de la columna; SQL_OBJETOS las recrea
+        cur.execute("DROP VIEW IF EXISTS vw_stock CASCADE")
+        cur.execute("ALTER TABLE movimientos ALTER COLUMN fecha TYPE TEXT USING to_char(fecha, 'YYYY-MM-DD')")
+        print("✅ fecha convertida de DATE a TEXT 'YYYY-MM-DD'")
+
+    cur.execute("""
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = 'public.movimientos'::regclass AND contype = 'c'
+          AND pg_get_constraintdef(oid) LIKE '%tipo%'
+          AND pg_get_constraintdef(oid) NOT LIKE '%APERTURA%'
+    """)
+    tipos = ", ".join(f"'{t}'" for t in TIPOS_MOVIMIENTO)
+    for (nombre,) in cur.fetchall():
+        cur.execute(f'ALTER TABLE movimientos DROP CONSTRAINT "{nombre}"')
+        cur.execute(f'ALTER TABLE movimientos ADD CONSTRAINT "{nombre}" CHECK (tipo IN ({tipos}))')
+        print(f"✅ {nombre} admite movimientos de APERTURA")
+
+
+def migrar(conservar: bool = False) -> bool:
+    """
+    Convierte movimientos en tabla particionada por año de fecha.
+
+    Args:
+        conservar: Si True, deja la tabla original como movimientos_sin_particionar
+    """
+    print("=" * 60)
+    print("🗂️  PARTICIONADO DE MOVIMIENTOS")
+    print("=" * 60)
+
+    anio_actual = date.today().year
+    con = nueva_conexion()
+    try:
+        with con.cursor() as cur:
+            tipo = _tipo_tabla(cur)
+            if not tipo:
+                print("❌ No existe la tabla movimientos")
+                return False
+
+            if tipo == 'p':
+                # Ya migrada: asegura los objetos y saca lo que haya en default
+                cur.execute(SQL_OBJETOS.read_text(encoding='utf-8'))
+                cur.execute("SELECT MIN(EXTRACT(YEAR FROM fecha::date))::int FROM movimientos_default")
+                desde = cur.fetchone()[0]
+                cur.execute("SELECT crear_particiones_movimientos(%s, %s)",
+                            (int(desde) if desde else anio_actual, anio_actual + 1))
+                creadas = cur.fetchone()[0]
+                con.commit()
+                print(f"⏭️  movimientos ya está particionada ({creadas} partición(es) nuevas)")
+                return True
+
+            cur.execute("LOCK TABLE movimientos IN ACCESS EXCLUSIVE MODE")
+            _adaptar_tabla_antigua(cur)
+            cur.execute("""
+                SELECT i.indexname, i.indexdef
+                FROM pg_indexes i
+                WHERE i.schemaname = 'public' AND i.tablename = 'movimientos'
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c
+                                  WHERE c.conname = i.indexname
+                                    AND c.conrelid = 'public.movimientos'::regclass)
+            """)
+            indices = cur.fetchall()
+            cur.execute("""
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = 'public.movimientos'::regclass AND contype = 'p'
+            """)
+            claves = [r[0] for r in cur.fetchall()]
+            # LIKE no copia las claves foráneas: se vuelven a crear tras la copia
+            cur.execute("""
+                SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = 'public.movimientos'::regclass AND contype = 'f'
+            """)
+            foraneas = cur.fetchall()
+            cur.execute("SELECT pg_get_serial_sequence('public.movimientos', 'id')")
+            secuencia = cur.fetchone()[0]
+            cur.execute("""
+                SELECT COUNT(*), MIN(EXTRACT(YEAR FROM fecha::date))::int, MAX(EXTRACT(YEAR FROM fecha::date))::int
+                FROM movimientos
+            """)
+            total, desde, hasta = cur.fetchone()
+            print(f"📊 {total:,} movimientos ({desde or '-'} a {hasta or '-'}), {len(indices)} índices")
+
+            # La tabla original se aparta con sus índices renombrados para
+            # poder crear los nuevos con los mismos nombres
+            cur.execute("ALTER TABLE movimientos RENAME TO movimientos_sin_particionar")
+            for nombre, _ in indices:
+                cur.execute(f'ALTER INDEX "{nombre}" RENAME TO "{nombre}_sp"')
+            for nombre in claves:
+                cur.execute(f'ALTER TABLE movimientos_sin_particionar RENAME CONSTRAINT "{nombre}" TO "{nombre}_sp"')
+
+            # Todo menos los índices (la clave primaria de una tabla particionada
+            # debe incluir fecha): valores por defecto, NOT NULL, CHECK...
+            cur.execute("""
+                CREATE TABLE movimientos (LIKE movimientos_sin_particionar INCLUDING ALL EXCLUDING INDEXES)
+                PARTITION BY RANGE (fecha)
+            """)
+            cur.execute("CREATE TABLE movimientos_default PARTITION OF movimientos DEFAULT")
+            cur.execute(SQL_OBJETOS.read_text(encoding='utf-8'))
+            cur.execute("SELECT crear_particiones_movimientos(%s, %s)",
+                        (int(desde) if desde else anio_actual, max(int(hasta or anio_actual), anio_actual) + 1))
+            print(f"✅ {cur.fetchone()[0]} particiones anuales creadas")
+
+            # Los índices se crean después de copiar: es mucho más rápido
+            cur.execute("INSERT INTO movimientos SELECT * FROM movimientos_sin_particionar")
+            print(f"✅ {cur.rowcount:,} movimientos copiados")
+
+            cur.execute("ALTER TABLE movimientos ADD PRIMARY KEY (id, fecha)")
+            for _, definicion in indices:
+                cur.execute(definicion)
+            for nombre, definicion in foraneas:
+                cur.execute(f'ALTER TABLE movimientos ADD CONSTRAINT "{nombre}" {definicion}')
+            if secuencia:
+                cur.execute(f"ALTER SEQUENCE {secuencia} OWNED BY movimientos.id")
+            print(f"✅ Clave primaria (id, fecha), {len(indices)} índices y "
+                  f"{len(foraneas)} claves foráneas recreados")
+
+            cur.execute("SELECT COUNT(*) FROM movimientos")
+            copiados = cur.fetchone()[0]
+            if copiados != total:
+                raise RuntimeError(f"Se copiaron {copiados:,} movimientos de {total:,}")
+
+            if not conservar:
+                cur.execute("DROP TABLE movimientos_sin_particionar")
+            cur.execute("ANALYZE movimientos")
+        con.commit()
+    except Exception as e:
+        con.rollback()
+        logger.exception(f"Error al particionar movimientos: {e}")
+        print(f"❌ Error: {e} (no se ha modificado nada)")
+        return False
+    finally:
+        con.close()
+
+    logger.info(f"PARTICIONADO | movimientos particionada por año ({total:,} filas)")
+    print("\n✅ movimientos particionada por año")
+    if conservar:
+        print("   La tabla original queda como movimientos_sin_particionar")
+    return True
+
+
+def cerrar(anio: int, usuario: str = "sistema") -> bool:
+    """
+    Cierra el ejercicio `anio` con movimientos de APERTURA a 1 de enero siguiente.
+
+    Cierra a la vez los ejercicios anteriores que siguieran abiertos.
+    """
+    if anio >= date.today().year:
+        print(f"❌ Solo se pueden cerrar ejercicios anteriores a {date.today().year}")
+        return False
+    apertura = f"{anio + 1}-01-01"
+
+    con = nueva_conexion()
+    try:
+        with con.cursor() as cur:
+            if _tipo_tabla(cur) != 'p':
+                print("❌ movimientos no está particionada: ejecuta antes 'migrar'")
+                return False
+
+            # Nadie puede registrar movimientos mientras se calculan los saldos
+            cur.execute("LOCK TABLE movimientos IN SHARE ROW EXCLUSIVE MODE")
+            cur.execute("SELECT fecha_apertura_movimientos()")
+            desde = cur.fetchone()[0]
+            if desde >= apertura:
+                print(f"⏭️  El ejercicio {anio} ya está cerrado (ejercicio abierto desde {desde})")
+                return False
+
+            cur.execute("SELECT crear_particiones_movimientos(%s, %s)", (anio + 1, anio + 1))
+            antes = resumen_stock(cur)
+
+            cur.execute(SQL_SALDOS_APERTURA, {
+                'apertura': apertura,
+                'desde': desde,
+                'motivo': f"Saldo de apertura {anio + 1}",
+                'usuario': usuario,
+            })
+            posiciones = cur.rowcount
+            cur.execute("SELECT COUNT(*) FROM movimientos WHERE fecha >= %s AND fecha < %s",
+                        (desde, apertura))
+            cerrados = cur.fetchone()[0]
+            cur.execute("""
+                INSERT INTO cierres_movimientos(anio, fecha_apertura, usuario, posiciones, movimientos_cerrados)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (anio, apertura, usuario, posiciones, cerrados))
+
+            despues = resumen_stock(cur)
+            if despues != antes:
+                raise RuntimeError(f"El stock cambia con el cierre: {antes} -> {despues}")
+        con.commit()
+    except Exception as e:
+        con.rollback()
+        logger.exception(f"Error al cerrar el ejercicio {anio}: {e}")
+        print(f"❌ Error: {e} (no se ha modificado nada)")
+        return False
+    finally:
+        con.close()
+
+    logger.info(f"PARTICIONADO | Ejercicio {anio} cerrado por {usuario} | "
+                f"{posiciones:,} saldos de apertura | {cerrados:,} movimientos cerrados")
+    print(f"✅ Ejercicio {anio} cerrado: {posiciones:,} saldos de apertura a {apertura}, "
+          f"{cerrados:,} movimientos quedan fuera del cálculo de stock")
+    return True
+
+
+def estado() -> None:
+    """Muestra las particiones de movimientos y los ejercicios cerrados."""
+    con = nueva_conexion()
+    try:
+        with con.cursor() as cur:
+            if _tipo_tabla(cur) != 'p':
+                print("ℹ️  movimientos no está particionada")
+                return
+            cur.execute("""
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+                       pg_total_relation_size(c.oid)
+                FROM pg_inherits h
+                JOIN pg_class c ON c.oid = h.inhrelid
+                WHERE h.inhparent = 'public.movimientos'::regclass
+                ORDER BY c.relname
+            """)
+            print("📋 Particiones de movimientos:")
+            for nombre, limites, filas, tamanio in cur.fetchall():
+                print(f"  • {nombre:<22} {max(filas, 0):>12,} filas  "
+                      f"{tamanio / 1024 / 1024:>8.1f} MB  {limites}")
+
+            cur.execute("""
+                SELECT anio, fecha_apertura, cerrado_en, usuario, posiciones, movimientos_cerrados
+                FROM cierres_movimientos ORDER BY anio
+            """)
+            cierres = cur.fetchall()
+            print("\n🔒 Ejercicios cerrados:" if cierres else "\n🔓 No hay ejercicios cerrados")
+            for anio, apertura, cerrado_en, usuario, posiciones, cerrados in cierres:
+                print(f"  • {anio}: apertura {apertura}, {posiciones:,} saldos, "
+                      f"{cerrados:,} movimientos ({cerrado_en:%Y-%m-%d %H:%M} por {usuario})")
+        con.rollback()
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Particionado de movimientos y cierre de ejercicios")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_migrar = sub.add_parser("migrar", help="Convertir movimientos en tabla particionada por año")
+    p_migrar.add_argument("--conservar", action="store_true",
+                          help="Conservar la tabla original como movimientos_sin_particionar")
+
+    p_cerrar = sub.add_parser("cerrar", help="Cerrar un ejercicio con saldos de apertura")
+    p_cerrar.add_argument("--anio", type=int, required=True, help="Ejercicio a cerrar")
+    p_cerrar.add_argument("--usuario", default="sistema", help="Responsable del cierre")
+
+    sub.add_parser("estado", help="Mostrar particiones y ejercicios cerrados")
+
+    args = parser.parse_args()
+    if args.comando == "migrar":
+        sys.exit(0 if migrar(args.conservar) else 1)
+    elif args.comando == "cerrar":
+        sys.exit(0 if cerrar(args.anio, args.usuario) else 1)
+    else:
+        estado()
@@ -17,7 +17,6 @@ PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 import configparser
-import sqlite3
 
 def reset_and_migrate():
     """Resetea PostgreSQL y migra desde SQLite"""
@@ -37,7 +36,6 @@ def reset_and_migrate():
     config.read(PROJECT_ROOT / "config.ini")
 
     import psycopg2
-    from psycopg2.extras import execute_values
 
     # Conectar PostgreSQL
     print("\n🔌 Conectando a PostgreSQL...")
@@ -103,89 +101,20 @@ def reset_and_migrate():
         pg_conn.rollback()
         return False
 
-    # PASO 4: Migrar datos desde SQLite
-    print("\n📦 Migrando datos desde SQLite...")
-
-    sqlite_conn = sqlite3.connect(PROJECT_ROOT / "db" / "almacen.db")
-    sqlite_conn.row_factory = sqlite3.Row
-
-    # Obtener lista de tablas de SQLite
-    cursor = sqlite_conn.execute("""
-        SELECT name FROM sqlite_master
-        WHERE type='table' AND name NOT LIKE 'sqlite_%'
-        ORDER BY name
-    """)
-    tablas = [row[0] for row in cursor.fetchall()]
-
-    total_registros = 0
-
-    for tabla in tablas:
-        try:
-            # Leer datos de SQLite
-            cursor_sqlite = sqlite_conn.execute(f"SELECT * FROM {tabla}")
-            rows = cursor_sqlite.fetchall()
-
-            if not rows:
-                print(f"  ⏭️  {tabla:30} - vacía")
-                continue
-
-            columnas = [desc[0] for desc in cursor_sqlite.description]
-
-            # Insertar en PostgreSQL
-            with pg_conn.cursor() as cur_pg:
-                placeholders = ', '.join(['%s'] * len(columnas))
-                cols = ', '.join(columnas)
-                insert_sql = f"INSERT INTO {tabla} ({cols}) VALUES ({placeholders})"
-
-                # Insertar por lotes
-                batch_size = 100
-                for i in range(0, len(rows), batch_size):
-                    batch = rows[i:i + batch_size]
-                    data = [tuple(row) for row in batch]
-                    execute_values(cur_pg, f"INSERT INTO {tabla} ({cols}) VALUES %s", data)
-
-            pg_conn.commit()
-            print(f"  ✅ {tabla:30} - {len(rows):6} registros")
-            total_registros += len(rows)
+    pg_conn.close()
 
-        except Exception as e:
-            pg_conn.rollback()
-            print(f"  ❌ {tabla:30} - ERROR: {str(e)[:60]}")
+    # PASO 4: Migrar datos desde SQLite (COPY en paralelo, secuencias incluidas)
+    print("\n📦 Migrando datos desde SQLite...")
+    from scripts.migrate_sqlite_to_postgres import migrate_data
 
-    # PASO 5: Actualizar secuencias
-    print("\n🔄 Actualizando secuencias...")
-    with pg_conn.cursor() as cur:
-        cur.execute("""
-            SELECT table_name FROM information_schema.columns
-            WHERE table_schema = 'public' AND column_name = 'id'
-        """)
-        tablas_con_id = [row[0] for row in cur.fetchall()]
-
-        for tabla in tablas_con_id:
-            try:
-                cur.execute(f"SELECT pg_get_serial_sequence('{tabla}', 'id')")
-                result = cur.fetchone()
-
-                if result and result[0]:
-                    seq_name = result[0]
-                    cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabla}")
-                    max_id = cur.fetchone()[0]
-
-                    if max_id > 0:
-                        cur.execute(f"SELECT setval('{seq_name}', {max_id}, true)")
-                        pg_conn.commit()
-                        print(f"  ✅ {tabla:30} -> {max_id}")
-            except:
-                pass
-
-    # Cerrar conexiones
-    sqlite_conn.close()
-    pg_conn.close()
+    if not migrate_data():
+        print("\n❌ La migración no terminó: vuelve a lanzar")
+        print("   python scripts/migrate_sqlite_to_postgres.py para continuar")
+        return False
 
     print("\n" + "=" * 70)
     print("  ✅ RESET Y MIGRACIÓN COMPLETADOS")
     print("=" * 70)
-    print(f"\n📊 Total de registros migrados: {total_registros:,}")
     print("\n🚀 Ahora puedes ejecutar: python app.py")
 
     return True
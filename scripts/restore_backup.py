@@ -1,7 +1,13 @@
 """
 Script para restaurar un backup
-Uso: python scripts/restore_backup.py
+Uso: python scripts/restore_backup.py [--paralelo N]
+
+Por defecto restaura en una sola transacción: si algo falla, la BD queda
+como estaba. --paralelo N (p. ej. 4) carga las tablas en N conexiones a la
+vez; es mucho más rápido con BD grandes, pero un fallo deja la BD a medias
+y hay que repetir la restauración.
 """
+import argparse
 import sys
 from pathlib import Path
 
@@ -9,13 +15,22 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-from backup_db import listar_backups, restaurar_backup, BACKUP_DIR
+from src.core import backup_pg
+from src.services import backup_service
+
+parser = argparse.ArgumentParser(description="Restaurar un backup de la BD")
+parser.add_argument("--paralelo", type=int, default=1,
+                    help="Conexiones cargando tablas a la vez (por defecto 1, en una transacción; "
+                         f"p. ej. {backup_service.PARALELO_RESTAURACION} para BD grandes)")
+args = parser.parse_args()
 
 print("📋 Backups disponibles:")
-backups = listar_backups()
+backups = backup_service.listar_backups()
 
-for i, (nombre, fecha, tamanio) in enumerate(backups, 1):
-    print(f"{i}. {nombre} - {fecha.strftime('%Y-%m-%d %H:%M:%S')} - {tamanio:.2f} MB")
+for i, b in enumerate(backups, 1):
+    tipo = f"incremental sobre {b['base']}" if b['tipo'] == 'incremental' else b['tipo']
+    print(f"{i}. {b['nombre']} - {b['fecha'].strftime('%Y-%m-%d %H:%M:%S')} - {tipo} - "
+          f"{b['filas']:,} filas - {b['tamanio_mb']:.2f} MB")
 
 if not backups:
     print("❌ No hay backups disponibles")
@@ -24,17 +39,34 @@ if not backups:
 try:
     opcion = int(input("\n¿Qué backup deseas restaurar? (número): "))
     if 1 <= opcion <= len(backups):
-        backup_seleccionado = BACKUP_DIR / backups[opcion - 1][0]
-        
-        confirmacion = input(f"\n⚠️  ¿Estás seguro de restaurar {backups[opcion - 1][0]}? (SI/NO): ")
+        backup_seleccionado = backups[opcion - 1]
+
+        if backup_seleccionado['tipo'] == 'incremental':
+            try:
+                cadena = backup_pg.resolver_cadena(backup_seleccionado['ruta'])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ No se puede restaurar: {e}")
+                exit()
+            print(f"\n🔗 Se reproducirá la cadena de {len(cadena)} backups:")
+            for eslabon in cadena:
+                print(f"  • {eslabon.name}")
+
+        if args.paralelo > 1:
+            print(f"\n⚠️  Restauración en paralelo ({args.paralelo} conexiones): "
+                  f"si falla, la BD quedará incompleta hasta repetirla")
+
+        confirmacion = input(
+            f"\n⚠️  Se sustituirán TODOS los datos actuales por los de "
+            f"{backup_seleccionado['nombre']}. ¿Continuar? (SI/NO): "
+        )
         if confirmacion.upper() == "SI":
-            if restaurar_backup(backup_seleccionado):
-                print("✅ Backup restaurado exitosamente")
-            else:
-                print("❌ Error al restaurar backup")
+            exito, mensaje = backup_service.restaurar_backup(
+                backup_seleccionado['ruta'], paralelo=args.paralelo
+            )
+            print(("✅ " if exito else "❌ ") + mensaje)
         else:
             print("❌ Operación cancelada")
     else:
         print("❌ Opción inválida")
 except ValueError:
-    print("❌ Debes introducir un número")
\ No newline at end of file
+    print("❌ Debes introducir un número")
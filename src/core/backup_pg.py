@@ -0,0 +1,892 @@
+# ========================================
+# BACKUP LÓGICO DE POSTGRESQL
+# ========================================
+"""
+Copia lógica de la BD sin depender de pg_dump.
+
+Cada backup es una carpeta con:
+- un archivo por tabla (<tabla>.copy.gz o .copy.zst) con la salida de
+  COPY ... TO STDOUT, comprimida mientras llega del servidor;
+- manifest.json: esquema (tablas, restricciones, índices, vistas,
+  secuencias, funciones y disparadores) y, por tabla, filas, tamaños y
+  SHA-256 de los datos sin comprimir y del archivo comprimido.
+
+Un backup incremental guarda enteras las tablas maestras pero, de las
+tablas de solo inserción (movimientos, historial), solo las filas nuevas
+desde el backup anterior. Su manifiesto apunta al anterior ('anterior') y al
+completo del que parte la cadena ('base'); restaurarlo reproduce la cadena.
+
+Los hashes se calculan sobre el flujo, sin volver a leer los archivos. Las
+tablas se exportan en paralelo con varias conexiones que comparten la misma
+instantánea (pg_export_snapshot), así el backup es coherente aunque la
+aplicación siga escribiendo. Al restaurar, las tablas se cargan e indexan
+también en paralelo y el resultado se comprueba contra el manifiesto
+(filas por tabla y resumen de stock).
+
+Se usa zstd si está instalado el paquete `zstandard`; si no, gzip.
+"""
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.core.db_utils import nueva_conexion
+from src.core.logger import logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATO = 1
+MANIFIESTO = "manifest.json"
+EXTENSIONES = {'gzip': '.copy.gz', 'zstd': '.copy.zst'}
+
+# Tablas de solo inserción: en un backup incremental solo se guardan sus
+# filas nuevas (id por encima de la marca del backup anterior)
+TABLAS_INCREMENTALES = ('movimientos', 'historial_operaciones', 'historial')
+
+# Los datos de COPY se agrupan en bloques de este tamaño antes de
+# resumirlos y comprimirlos (psycopg2 escribe fila a fila)
+_TAM_BLOQUE = 1 << 20
+
+
+def compresion_disponible() -> str:
+    """'zstd' si está instalado zstandard, si no 'gzip'."""
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+# ========================================
+# FLUJOS COMPRIMIDOS CON HASH
+# ========================================
+
+class _ArchivoConHash:
+    """Escribe en un archivo y va calculando el SHA-256 de lo escrito."""
+
+    def __init__(self, archivo):
+        self._archivo = archivo
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, datos) -> int:
+        self.sha256.update(datos)
+        self.bytes += len(datos)
+        return self._archivo.write(datos)
+
+    def flush(self):
+        self._archivo.flush()
+
+    def close(self):
+        # El archivo real lo cierra quien lo abrió
+        self.flush()
+
+
+class SumideroCopy:
+    """
+    Destino de COPY TO STDOUT: cuenta filas, resume los datos, los comprime
+    y resume el archivo resultante, todo en una pasada.
+    """
+
+    def __init__(self, ruta: Path, compresion: str):
+        self._archivo = open(ruta, 'wb')
+        self._salida = _ArchivoConHash(self._archivo)
+        if compresion == 'zstd':
+            self._comp = zstandard.ZstdCompressor(level=3).stream_writer(self._salida)
+        else:
+            self._comp = gzip.GzipFile(filename='', mode='wb', fileobj=self._salida,
+                                       compresslevel=6, mtime=0)
+        self._pendiente = bytearray()
+        self.sha256_datos = hashlib.sha256()
+        self.bytes_datos = 0
+        self.filas = 0
+
+    def write(self, datos) -> int:
+        self._pendiente += datos
+        if len(self._pendiente) >= _TAM_BLOQUE:
+            self._volcar()
+        return len(datos)
+
+    def _volcar(self):
+        if not self._pendiente:
+            return
+        bloque = bytes(self._pendiente)
+        self._pendiente.clear()
+        self.sha256_datos.update(bloque)
+        self.bytes_datos += len(bloque)
+        # En formato texto de COPY los saltos dentro de un valor van escapados
+        self.filas += bloque.count(b'\n')
+        self._comp.write(bloque)
+
+    def cerrar(self) -> Dict[str, Any]:
+        """Termina el archivo (con fsync) y devuelve sus datos para el manifiesto."""
+        self._volcar()
+        self._comp.close()
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._archivo.close()
+        return {
+            'filas': self.filas,
+            'bytes_datos': self.bytes_datos,
+            'bytes_archivo': self._salida.bytes,
+            'sha256_datos': self.sha256_datos.hexdigest(),
+            'sha256_archivo': self._salida.sha256.hexdigest(),
+        }
+
+    def abortar(self):
+        try:
+            self._archivo.close()
+        except Exception:
+            pass
+
+
+class LectorCopy:
+    """
+    Origen de COPY FROM STDIN: descomprime un archivo del backup y va
+    calculando el SHA-256 y las filas de los datos que entrega.
+    """
+
+    def __init__(self, ruta: Path):
+        self._archivo = open(ruta, 'rb')
+        if ruta.name.endswith(EXTENSIONES['zstd']):
+            if zstandard is None:
+                self._archivo.close()
+                raise RuntimeError(f"{ruta.name} está comprimido con zstd: instala 'zstandard'")
+            self._flujo = zstandard.ZstdDecompressor().stream_reader(self._archivo)
+        else:
+            self._flujo = gzip.GzipFile(fileobj=self._archivo, mode='rb')
+        self.sha256_datos = hashlib.sha256()
+        self.bytes_datos = 0
+        self.filas = 0
+
+    def read(self, n: int = -1) -> bytes:
+        datos = self._flujo.read(n if n and n > 0 else _TAM_BLOQUE)
+        if datos:
+            self.sha256_datos.update(datos)
+            self.bytes_datos += len(datos)
+            self.filas += datos.count(b'\n')
+        return datos
+
+    def cerrar(self):
+        self._flujo.close()
+        self._archivo.close()
+
+
+def hash_archivo(ruta: Path) -> str:
+    """SHA-256 de un archivo, leído por bloques."""
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(_TAM_BLOQUE), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+# ========================================
+# ESQUEMA
+# ========================================
+
+def leer_esquema(cur) -> Dict[str, Any]:
+    """Describe el esquema public a partir del catálogo (para recrearlo al restaurar)."""
+    cur.execute("""
+        SELECT c.relname, CASE WHEN c.relkind = 'p' THEN pg_get_partkeydef(c.oid) END
+        FROM pg_class c
+        WHERE c.relnamespace = 'public'::regnamespace AND c.relkind IN ('r', 'p')
+          AND NOT c.relispartition
+        ORDER BY c.relname
+    """)
+    nombres = cur.fetchall()
+
+    tablas = []
+    for nombre, particionado_por in nombres:
+        cur.execute("""
+            SELECT a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull,
+                   pg_get_expr(d.adbin, d.adrelid)
+            FROM pg_attribute a
+            LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attnum
+        """, (f'public."{nombre}"',))
+        tablas.append({
+            'nombre': nombre,
+            'columnas': [
+                {'nombre': col, 'tipo': tipo, 'no_nulo': no_nulo, 'defecto': defecto}
+                for col, tipo, no_nulo, defecto in cur.fetchall()
+            ],
+            'particionado_por': particionado_por,
+        })
+
+    cur.execute("""
+        SELECT c.relname, p.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_class c
+        JOIN pg_inherits h ON h.inhrelid = c.oid
+        JOIN pg_class p ON p.oid = h.inhparent
+        WHERE c.relnamespace = 'public'::regnamespace AND c.relkind = 'r' AND c.relispartition
+        ORDER BY c.relname
+    """)
+    particiones = [{'nombre': n, 'tabla': t, 'limites': l} for n, t, l in cur.fetchall()]
+
+    cur.execute("""
+        SELECT c.conrelid::regclass::text, c.conname, c.contype, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        JOIN pg_class t ON t.oid = c.conrelid
+        WHERE c.connamespace = 'public'::regnamespace AND c.contype IN ('p', 'u', 'c', 'f', 'x')
+          AND NOT t.relispartition
+        ORDER BY c.contype = 'f', c.conrelid::regclass::text, c.conname
+    """)
+    restricciones = [
+        {'tabla': tabla, 'nombre': nombre, 'tipo': tipo, 'definicion': definicion}
+        for tabla, nombre, tipo, definicion in cur.fetchall()
+    ]
+
+    cur.execute("""
+        SELECT i.tablename, i.indexname, i.indexdef
+        FROM pg_indexes i
+        JOIN pg_class t ON t.relname = i.tablename AND t.relnamespace = 'public'::regnamespace
+        WHERE i.schemaname = 'public' AND NOT t.relispartition
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c
+                          WHERE c.conname = i.indexname AND c.connamespace = 'public'::regnamespace)
+        ORDER BY i.tablename, i.indexname
+    """)
+    # En tablas particionadas la definición lleva "ON ONLY" (no crearía el
+    # índice en las particiones): al restaurar se quiere en todas
+    indices = [{'tabla': t, 'nombre': n, 'definicion': d.replace(' ON ONLY ', ' ON ', 1)}
+               for t, n, d in cur.fetchall()]
+
+    cur.execute("""
+        SELECT s.relname, dep.refobjid::regclass::text, a.attname
+        FROM pg_class s
+        LEFT JOIN pg_depend dep ON dep.objid = s.oid AND dep.deptype IN ('a', 'i')
+                               AND dep.classid = 'pg_class'::regclass
+                               AND dep.refclassid = 'pg_class'::regclass
+        LEFT JOIN pg_attribute a ON a.attrelid = dep.refobjid AND a.attnum = dep.refobjsubid
+        WHERE s.relkind = 'S' AND s.relnamespace = 'public'::regnamespace
+        ORDER BY s.relname
+    """)
+    secuencias = []
+    for nombre, tabla, columna in cur.fetchall():
+        cur.execute(f'SELECT last_value, is_called FROM public."{nombre}"')
+        valor, llamada = cur.fetchone()
+        secuencias.append({'nombre': nombre, 'tabla': tabla, 'columna': columna,
+                           'valor': valor, 'llamada': llamada})
+
+    cur.execute("""
+        SELECT c.relname, pg_get_viewdef(c.oid, true)
+        FROM pg_class c
+        WHERE c.relnamespace = 'public'::regnamespace AND c.relkind = 'v'
+        ORDER BY c.oid
+    """)
+    vistas = [{'nombre': n, 'definicion': d} for n, d in cur.fetchall()]
+
+    cur.execute("""
+        SELECT pg_get_functiondef(p.oid)
+        FROM pg_proc p
+        LEFT JOIN pg_depend dep ON dep.objid = p.oid AND dep.deptype = 'e'
+        WHERE p.pronamespace = 'public'::regnamespace AND p.prokind = 'f' AND dep.objid IS NULL
+        ORDER BY p.oid
+    """)
+    funciones = [r[0] for r in cur.fetchall()]
+
+    cur.execute("""
+        SELECT pg_get_triggerdef(t.oid)
+        FROM pg_trigger t
+        JOIN pg_class c ON c.oid = t.tgrelid
+        WHERE c.relnamespace = 'public'::regnamespace AND NOT t.tgisinternal
+          AND t.tgparentid = 0
+        ORDER BY t.oid
+    """)
+    disparadores = [r[0] for r in cur.fetchall()]
+
+    return {
+        'tablas': tablas,
+        'particiones': particiones,
+        'restricciones': restricciones,
+        'indices': indices,
+        'secuencias': secuencias,
+        'vistas': vistas,
+        'funciones': funciones,
+        'disparadores': disparadores,
+    }
+
+
+def sql_crear_tabla(tabla: Dict[str, Any]) -> str:
+    """CREATE TABLE sin restricciones (se añaden después de cargar los datos)."""
+    columnas = []
+    for col in tabla['columnas']:
+        definicion = f'"{col["nombre"]}" {col["tipo"]}'
+        if col['defecto'] is not None:
+            definicion += f" DEFAULT {col['defecto']}"
+        if col['no_nulo']:
+            definicion += " NOT NULL"
+        columnas.append(definicion)
+    sql = f'CREATE TABLE public."{tabla["nombre"]}" (\n  ' + ",\n  ".join(columnas) + "\n)"
+    if tabla.get('particionado_por'):
+        sql += f" PARTITION BY {tabla['particionado_por']}"
+    return sql
+
+
+# ========================================
+# CONCILIACIÓN DE STOCK
+# ========================================
+
+def resumen_stock(cur) -> Optional[Dict[str, Any]]:
+    """
+    Resumen del stock por almacén y artículo según vw_stock: posiciones con
+    stock, unidades totales y una huella MD5 de todas las posiciones.
+
+    Se guarda en el manifiesto al exportar y se recalcula tras restaurar;
+    si coinciden, los movimientos restaurados dan exactamente el mismo stock.
+    None si la BD no tiene vw_stock.
+    """
+    cur.execute("SELECT to_regclass('public.vw_stock')")
+    if cur.fetchone()[0] is None:
+        return None
+    cur.execute("""
+        SELECT COUNT(*), COALESCE(SUM(stock), 0)::text,
+               md5(COALESCE(string_agg(
+                   COALESCE(almacen_id::text, '-') || ':' || articulo_id || ':' || stock,
+                   ',' ORDER BY almacen_id, articulo_id), ''))
+        FROM (
+            SELECT almacen_id, articulo_id, SUM(delta) AS stock
+            FROM vw_stock
+            GROUP BY almacen_id, articulo_id
+            HAVING SUM(delta) <> 0
+        ) s
+    """)
+    posiciones, unidades, huella = cur.fetchone()
+    return {'posiciones': posiciones, 'unidades': unidades, 'huella': huella}
+
+
+# ========================================
+# EXPORTACIÓN
+# ========================================
+
+def _tablas_por_tamano(cur, tablas: List[str]) -> List[str]:
+    """Las tablas más grandes primero (con sus particiones), para repartir mejor entre hilos."""
+    cur.execute("""
+        SELECT c.relname FROM pg_class c
+        WHERE c.relnamespace = 'public'::regnamespace AND c.relname = ANY(%s)
+        ORDER BY (SELECT SUM(pg_total_relation_size(p.relid)) FROM pg_partition_tree(c.oid) p) DESC
+    """, (tablas,))
+    return [r[0] for r in cur.fetchall()]
+
+
+def _leer_marcas(cur, esquema: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """Id máximo y número de filas de cada tabla de solo inserción."""
+    marcas = {}
+    for tabla in esquema['tablas']:
+        if tabla['nombre'] in TABLAS_INCREMENTALES and any(c['nombre'] == 'id' for c in tabla['columnas']):
+            cur.execute(f'SELECT COALESCE(MAX(id), 0), COUNT(*) FROM public."{tabla["nombre"]}"')
+            marca, total = cur.fetchone()
+            marcas[tabla['nombre']] = {'marca': marca, 'total': total}
+    return marcas
+
+
+def _motivo_no_incremental(cur, anterior: Dict[str, Any], marcas: Dict[str, Dict[str, int]]) -> Optional[str]:
+    """
+    None si se puede hacer un incremental sobre `anterior`; si no, el motivo.
+
+    Las filas con id <= la marca anterior deben seguir siendo exactamente las
+    que había: si se borraron (limpieza del historial) o apareció alguna con
+    id antiguo (transacción que confirmó después del backup anterior), el
+    delta no bastaría para reconstruir la tabla.
+    """
+    previas = anterior.get('marcas', {})
+    for tabla, actual in marcas.items():
+        previa = previas.get(tabla)
+        if previa is None:
+            return f"{tabla} no tiene marca en el backup anterior"
+        cur.execute(f'SELECT COUNT(*) FROM public."{tabla}" WHERE id <= %s', (previa['marca'],))
+        if cur.fetchone()[0] != previa['total']:
+            return f"{tabla} cambió por debajo de la marca {previa['marca']}"
+    return None
+
+
+def _repartir(
+    tareas: Dict[str, Callable[[Any], Any]],
+    paralelo: int,
+    preparar: Optional[Callable[[Any, Any], None]] = None,
+    confirmar: bool = False,
+    nombre: str = "backup"
+) -> Dict[str, Any]:
+    """
+    Ejecuta las tareas (nombre -> función(cursor)) en `paralelo` hilos, cada
+    uno con su propia conexión, y devuelve nombre -> resultado.
+
+    Las tareas se reparten en el orden del dict (conviene poner primero las
+    más largas). `preparar(con, cur)` se llama una vez por conexión; con
+    `confirmar` se hace commit tras cada tarea. Al primer error los demás
+    hilos dejan de coger tareas y el error se relanza.
+    """
+    pendientes: "queue.Queue[str]" = queue.Queue()
+    for tarea in tareas:
+        pendientes.put(tarea)
+
+    resultados: Dict[str, Any] = {}
+    errores: List[BaseException] = []
+    lock = threading.Lock()
+
+    def _trabajar():
+        con = None
+        try:
+            con = nueva_conexion()
+            with con.cursor() as cur:
+                if preparar is not None:
+                    preparar(con, cur)
+                while not errores:
+                    try:
+                        tarea = pendientes.get_nowait()
+                    except queue.Empty:
+                        return
+                    resultado = tareas[tarea](cur)
+                    if confirmar:
+                        con.commit()
+                    with lock:
+                        resultados[tarea] = resultado
+        except BaseException as e:
+            with lock:
+                errores.append(e)
+        finally:
+            if con is not None:
+                con.close()
+
+    hilos = [threading.Thread(target=_trabajar, name=f"{nombre}_{i}")
+             for i in range(max(1, min(paralelo, len(tareas))))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    if errores:
+        raise errores[0]
+    return resultados
+
+
+def _exportar_tablas(snapshot: str, consultas: Dict[str, str], carpeta: Path,
+                     compresion: str, paralelo: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Ejecuta la consulta COPY ... TO STDOUT de cada tabla en `paralelo` hilos,
+    todos sobre la misma instantánea.
+    """
+    def _preparar(con, cur):
+        con.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+
+    def _tarea(tabla):
+        def _copiar(cur):
+            inicio = time.perf_counter()
+            archivo = f"{tabla}{EXTENSIONES[compresion]}"
+            sumidero = SumideroCopy(carpeta / archivo, compresion)
+            try:
+                cur.copy_expert(consultas[tabla], sumidero)
+                datos = sumidero.cerrar()
+            except BaseException:
+                sumidero.abortar()
+                raise
+            datos['archivo'] = archivo
+            datos['segundos'] = round(time.perf_counter() - inicio, 3)
+            return datos
+        return _copiar
+
+    return _repartir({t: _tarea(t) for t in consultas}, paralelo,
+                     preparar=_preparar, nombre="backup_copy")
+
+
+def exportar(
+    carpeta: Path,
+    paralelo: int = 2,
+    compresion: Optional[str] = None,
+    anterior: Optional[Path] = None
+) -> Dict[str, Any]:
+    """
+    Vuelca la BD en `carpeta` (que no debe existir) y devuelve el manifiesto.
+
+    Se escribe primero en una carpeta temporal "<carpeta>.parcial" que se
+    renombra al terminar: una carpeta de backup sin ese sufijo está completa.
+
+    Con `anterior` se intenta un backup incremental: las tablas de
+    TABLAS_INCREMENTALES solo guardan las filas con id por encima de la marca
+    del backup anterior y el resto de tablas se copian enteras. Si el
+    incremental no es seguro (ver _motivo_no_incremental) se hace completo.
+
+    Args:
+        carpeta: Carpeta de destino del backup
+        paralelo: Conexiones exportando tablas a la vez
+        compresion: 'zstd' o 'gzip' (por defecto, la mejor disponible)
+        anterior: Backup sobre el que encadenar un incremental
+    """
+    compresion = compresion or compresion_disponible()
+    if compresion == 'zstd' and zstandard is None:
+        raise RuntimeError("Compresión zstd no disponible: instala 'zstandard'")
+
+    manifiesto_anterior = leer_manifiesto(anterior) if anterior else None
+
+    parcial = carpeta.with_name(carpeta.name + ".parcial")
+    parcial.mkdir(parents=True)
+    inicio = time.perf_counter()
+
+    con = nueva_conexion()
+    try:
+        con.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        with con.cursor() as cur:
+            # Debe ser lo primero de la transacción: fija la instantánea
+            cur.execute("SELECT pg_export_snapshot(), current_database(), current_setting('server_version'), now()")
+            snapshot, bd, version, instante = cur.fetchone()
+            esquema = leer_esquema(cur)
+            marcas = _leer_marcas(cur, esquema)
+            stock = resumen_stock(cur)
+            tablas = _tablas_por_tamano(cur, [t['nombre'] for t in esquema['tablas']])
+
+            incremental = False
+            if manifiesto_anterior is not None:
+                motivo = _motivo_no_incremental(cur, manifiesto_anterior, marcas)
+                if motivo:
+                    logger.info(f"BACKUP | Se hace completo en lugar de incremental: {motivo}")
+                else:
+                    incremental = True
+
+        columnas = {t['nombre']: [c['nombre'] for c in t['columnas']] for t in esquema['tablas']}
+        particionadas = {t['nombre'] for t in esquema['tablas'] if t['particionado_por']}
+        consultas = {}
+        rangos = {}
+        for tabla in tablas:
+            lista = ', '.join(f'"{c}"' for c in columnas[tabla])
+            if incremental and tabla in marcas:
+                desde = manifiesto_anterior['marcas'][tabla]['marca']
+                hasta = marcas[tabla]['marca']
+                rangos[tabla] = {'desde': desde, 'hasta': hasta}
+                consultas[tabla] = (
+                    f'COPY (SELECT {lista} FROM public."{tabla}" '
+                    f'WHERE id > {int(desde)} AND id <= {int(hasta)} ORDER BY id) TO STDOUT'
+                )
+            elif tabla in particionadas:
+                # COPY TO no admite tablas particionadas directamente
+                consultas[tabla] = f'COPY (SELECT {lista} FROM public."{tabla}") TO STDOUT'
+            else:
+                consultas[tabla] = f'COPY public."{tabla}" ({lista}) TO STDOUT'
+
+        datos_tablas = _exportar_tablas(snapshot, consultas, parcial, compresion, paralelo)
+    finally:
+        con.rollback()
+        con.close()
+
+    for tabla, datos in datos_tablas.items():
+        datos['columnas'] = columnas[tabla]
+        datos.update(rangos.get(tabla, {}))
+
+    manifiesto = {
+        'formato': FORMATO,
+        'tipo': 'incremental' if incremental else 'completo',
+        'nombre': carpeta.name,
+        'anterior': manifiesto_anterior['nombre'] if incremental else None,
+        'base': (manifiesto_anterior.get('base') or manifiesto_anterior['nombre']) if incremental else None,
+        'creado': datetime.now().isoformat(timespec='seconds'),
+        'instantanea': instante.isoformat(),
+        'bd': bd,
+        'servidor': version,
+        'compresion': compresion,
+        'duracion_s': round(time.perf_counter() - inicio, 3),
+        'marcas': marcas,
+        'stock': stock,
+        'esquema': esquema,
+        'tablas': {t['nombre']: datos_tablas[t['nombre']] for t in esquema['tablas']},
+    }
+    escribir_manifiesto(parcial, manifiesto)
+    parcial.rename(carpeta)
+    return manifiesto
+
+
+def escribir_manifiesto(carpeta: Path, manifiesto: Dict[str, Any]) -> None:
+    ruta = carpeta / MANIFIESTO
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def leer_manifiesto(carpeta: Path) -> Dict[str, Any]:
+    with open(carpeta / MANIFIESTO, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def verificar_archivos(carpeta: Path) -> List[str]:
+    """
+    Comprueba que cada archivo del manifiesto existe y conserva su SHA-256.
+
+    Returns:
+        Lista de problemas encontrados (vacía si el backup está íntegro)
+    """
+    manifiesto = leer_manifiesto(carpeta)
+    problemas = []
+    for tabla, datos in manifiesto['tablas'].items():
+        ruta = carpeta / datos['archivo']
+        if not ruta.exists():
+            problemas.append(f"{tabla}: falta {datos['archivo']}")
+        elif hash_archivo(ruta) != datos['sha256_archivo']:
+            problemas.append(f"{tabla}: {datos['archivo']} está dañado (SHA-256 distinto)")
+    return problemas
+
+
+# ========================================
+# RESTAURACIÓN
+# ========================================
+
+def resolver_cadena(carpeta: Path) -> List[Path]:
+    """
+    Backups necesarios para restaurar `carpeta`: el completo de la base y
+    los incrementales en orden, terminando en `carpeta`.
+    """
+    cadena = [carpeta]
+    manifiesto = leer_manifiesto(carpeta)
+    while manifiesto['tipo'] == 'incremental':
+        anterior = carpeta.parent / manifiesto['anterior']
+        if not (anterior / MANIFIESTO).exists():
+            raise FileNotFoundError(
+                f"Falta {manifiesto['anterior']}, necesario para restaurar {cadena[-1].name}"
+            )
+        cadena.append(anterior)
+        manifiesto = leer_manifiesto(anterior)
+    cadena.reverse()
+    return cadena
+
+
+def planificar_cargas(cadena: List[Path]) -> Dict[str, List[Tuple[Path, Dict[str, Any]]]]:
+    """
+    Archivos que hay que cargar por tabla, en orden.
+
+    Las tablas incrementales del último backup se reconstruyen con la copia
+    completa de la base más cada delta; el resto sale del último backup.
+    """
+    manifiestos = [(c, leer_manifiesto(c)) for c in cadena]
+    ultima_carpeta, ultimo = manifiestos[-1]
+    cargas: Dict[str, List[Tuple[Path, Dict[str, Any]]]] = {}
+
+    for tabla, datos in ultimo['tablas'].items():
+        if 'desde' not in datos:
+            cargas[tabla] = [(ultima_carpeta, datos)]
+            continue
+
+        partes = []
+        hasta_previo = None
+        for carpeta, manifiesto in manifiestos:
+            entrada = manifiesto['tablas'].get(tabla)
+            if entrada is None:
+                raise ValueError(f"{tabla} no está en {carpeta.name}")
+            if 'desde' in entrada:
+                if entrada['desde'] != hasta_previo:
+                    raise ValueError(
+                        f"{tabla}: el delta de {carpeta.name} empieza en {entrada['desde']} "
+                        f"y el anterior terminaba en {hasta_previo}"
+                    )
+                hasta_previo = entrada['hasta']
+            else:
+                # Copia completa: reinicia la tabla (solo la base la tiene)
+                partes = []
+                hasta_previo = manifiesto['marcas'][tabla]['marca']
+            partes.append((carpeta, entrada))
+        cargas[tabla] = partes
+    return cargas
+
+
+def _borrar_esquema_actual(cur) -> None:
+    """Elimina vistas, tablas, secuencias y funciones de public (sin tocar el esquema)."""
+    cur.execute("SELECT relname FROM pg_class WHERE relnamespace = 'public'::regnamespace AND relkind = 'v'")
+    for (vista,) in cur.fetchall():
+        cur.execute(f'DROP VIEW IF EXISTS public."{vista}" CASCADE')
+    cur.execute("""
+        SELECT relname FROM pg_class
+        WHERE relnamespace = 'public'::regnamespace AND relkind IN ('r', 'p') AND NOT relispartition
+    """)
+    for (tabla,) in cur.fetchall():
+        cur.execute(f'DROP TABLE IF EXISTS public."{tabla}" CASCADE')
+    cur.execute("SELECT relname FROM pg_class WHERE relnamespace = 'public'::regnamespace AND relkind = 'S'")
+    for (secuencia,) in cur.fetchall():
+        cur.execute(f'DROP SEQUENCE IF EXISTS public."{secuencia}" CASCADE')
+    cur.execute("""
+        SELECT p.oid::regprocedure::text FROM pg_proc p
+        LEFT JOIN pg_depend dep ON dep.objid = p.oid AND dep.deptype = 'e'
+        WHERE p.pronamespace = 'public'::regnamespace AND p.prokind = 'f' AND dep.objid IS NULL
+    """)
+    for (funcion,) in cur.fetchall():
+        cur.execute(f"DROP FUNCTION IF EXISTS {funcion} CASCADE")
+
+
+def cargar_archivo(cur, tabla: str, carpeta: Path, datos: Dict[str, Any]) -> int:
+    """COPY FROM de un archivo del backup, comprobando filas y SHA-256 de los datos."""
+    lista = ', '.join(f'"{c}"' for c in datos['columnas'])
+    lector = LectorCopy(carpeta / datos['archivo'])
+    try:
+        cur.copy_expert(f'COPY public."{tabla}" ({lista}) FROM STDIN', lector, size=_TAM_BLOQUE)
+    finally:
+        lector.cerrar()
+    if lector.sha256_datos.hexdigest() != datos['sha256_datos'] or lector.filas != datos['filas']:
+        raise RuntimeError(
+            f"{tabla} ({carpeta.name}): los datos no coinciden con el manifiesto "
+            f"({lector.filas} filas leídas, {datos['filas']} esperadas)"
+        )
+    return lector.filas
+
+
+def _crear_esquema(cur, esquema: Dict[str, Any]) -> None:
+    """Sustituye el esquema actual por funciones, secuencias y tablas vacías sin restricciones."""
+    # Las funciones SQL se validan al crearlas y sus tablas aún no existen
+    cur.execute("SET LOCAL check_function_bodies = off")
+    _borrar_esquema_actual(cur)
+    for funcion in esquema['funciones']:
+        cur.execute(funcion)
+    for sec in esquema['secuencias']:
+        cur.execute(f'CREATE SEQUENCE public."{sec["nombre"]}"')
+    for tabla in esquema['tablas']:
+        cur.execute(sql_crear_tabla(tabla))
+    for particion in esquema.get('particiones', []):
+        cur.execute(f'CREATE TABLE public."{particion["nombre"]}" '
+                    f'PARTITION OF public."{particion["tabla"]}" {particion["limites"]}')
+
+
+def _indexar_tabla(cur, esquema: Dict[str, Any], tabla: str) -> None:
+    """Claves, restricciones (salvo FK) e índices de una tabla ya cargada."""
+    nombre = f'"{tabla}"'
+    for restriccion in esquema['restricciones']:
+        if restriccion['tipo'] != 'f' and restriccion['tabla'] in (tabla, nombre):
+            cur.execute(
+                f'ALTER TABLE {restriccion["tabla"]} ADD CONSTRAINT "{restriccion["nombre"]}" '
+                f'{restriccion["definicion"]}'
+            )
+    for indice in esquema['indices']:
+        if indice['tabla'] == tabla:
+            cur.execute(indice['definicion'])
+
+
+def _completar_esquema(cur, esquema: Dict[str, Any]) -> None:
+    """Claves foráneas, vistas, disparadores y valores de secuencia."""
+    for restriccion in esquema['restricciones']:
+        if restriccion['tipo'] == 'f':
+            cur.execute(
+                f'ALTER TABLE {restriccion["tabla"]} ADD CONSTRAINT "{restriccion["nombre"]}" '
+                f'{restriccion["definicion"]}'
+            )
+    for vista in esquema['vistas']:
+        cur.execute(f'CREATE VIEW public."{vista["nombre"]}" AS {vista["definicion"]}')
+    for disparador in esquema['disparadores']:
+        cur.execute(disparador)
+    for sec in esquema['secuencias']:
+        if sec['tabla'] and sec['columna']:
+            cur.execute(f'ALTER SEQUENCE public."{sec["nombre"]}" OWNED BY '
+                        f'{sec["tabla"]}."{sec["columna"]}"')
+        cur.execute("SELECT setval(%s, %s, %s)",
+                    (f'public."{sec["nombre"]}"', sec['valor'], sec['llamada']))
+
+
+def _comprobar_restauracion(cur, cargas: Dict[str, List[Tuple[Path, Dict[str, Any]]]],
+                            stock: Optional[Dict[str, Any]]) -> str:
+    """
+    Compara las filas de cada tabla con las del manifiesto y el resumen de
+    stock con el del momento del backup. Lanza RuntimeError si algo no cuadra.
+
+    Returns:
+        Texto con el resultado de la conciliación de stock
+    """
+    problemas = []
+    for tabla, partes in cargas.items():
+        esperadas = sum(datos['filas'] for _, datos in partes)
+        cur.execute(f'SELECT COUNT(*) FROM public."{tabla}"')
+        filas = cur.fetchone()[0]
+        if filas != esperadas:
+            problemas.append(f"{tabla}: {filas:,} filas, se esperaban {esperadas:,}")
+
+    if stock is None:
+        conciliacion = "stock no conciliado (el backup no guarda el resumen de stock)"
+    else:
+        actual = resumen_stock(cur)
+        if actual != stock:
+            problemas.append(
+                f"stock: {actual['posiciones'] if actual else 0} posiciones y "
+                f"{actual['unidades'] if actual else 0} unidades, se esperaban "
+                f"{stock['posiciones']} posiciones y {stock['unidades']} unidades"
+            )
+        conciliacion = f"stock conciliado ({stock['posiciones']:,} posiciones, {stock['unidades']} unidades)"
+
+    if problemas:
+        raise RuntimeError("La BD restaurada no cuadra con el backup:\n" + "\n".join(problemas))
+    return conciliacion
+
+
+def importar(carpeta: Path, paralelo: int = 1) -> Dict[str, int]:
+    """
+    Sustituye el contenido de la BD por el del backup.
+
+    Si `carpeta` es incremental se reproduce la cadena completa desde su
+    base. Orden: funciones y secuencias, tablas sin restricciones, datos
+    (COPY), claves e índices, claves foráneas, vistas, disparadores y
+    valores de secuencia. Cada archivo se comprueba al cargarlo (filas y
+    SHA-256 de los datos) y al final se comparan las filas de cada tabla y
+    el stock por almacén con los del momento del backup.
+
+    Con paralelo=1 todo va en una transacción: ante cualquier fallo la BD
+    queda como estaba. Con paralelo>1 las tablas se cargan e indexan a la
+    vez en varias conexiones, cada una en su transacción; es mucho más
+    rápido con BD grandes, pero si algo falla la BD queda a medias y hay
+    que repetir la restauración.
+
+    Returns:
+        Dict tabla -> filas restauradas
+    """
+    inicio = time.perf_counter()
+    cadena = resolver_cadena(carpeta)
+    cargas = planificar_cargas(cadena)
+    manifiesto = leer_manifiesto(cadena[-1])
+    esquema = manifiesto['esquema']
+    # Primero las tablas con más datos, para repartir mejor entre hilos
+    orden = sorted(cargas, key=lambda t: -sum(d['bytes_datos'] for _, d in cargas[t]))
+
+    a_medias = False
+    con = nueva_conexion()
+    try:
+        with con.cursor() as cur:
+            _crear_esquema(cur, esquema)
+
+            if paralelo <= 1:
+                filas = {t: sum(cargar_archivo(cur, t, c, d) for c, d in cargas[t]) for t in orden}
+                for tabla in orden:
+                    _indexar_tabla(cur, esquema, tabla)
+            else:
+                con.commit()
+                a_medias = True
+
+                def _preparar(con_hilo, cur_hilo):
+                    # Datos reproducibles desde el backup: no hace falta esperar al WAL
+                    cur_hilo.execute("SET synchronous_commit = off")
+                    cur_hilo.execute("SET maintenance_work_mem = '256MB'")
+
+                def _cargar(tabla):
+                    return lambda cur_hilo: sum(cargar_archivo(cur_hilo, tabla, c, d) for c, d in cargas[tabla])
+
+                def _indexar(tabla):
+                    return lambda cur_hilo: _indexar_tabla(cur_hilo, esquema, tabla)
+
+                filas = _repartir({t: _cargar(t) for t in orden}, paralelo, preparar=_preparar,
+                                  confirmar=True, nombre="restaurar_copy")
+                _repartir({t: _indexar(t) for t in orden}, paralelo, preparar=_preparar,
+                          confirmar=True, nombre="restaurar_indices")
+
+            _completar_esquema(cur, esquema)
+            for tabla in orden:
+                cur.execute(f'ANALYZE public."{tabla}"')
+            conciliacion = _comprobar_restauracion(cur, cargas, manifiesto.get('stock'))
+        con.commit()
+    except Exception:
+        con.rollback()
+        if a_medias:
+            logger.error("BACKUP | Restauración en paralelo interrumpida: la BD ha quedado incompleta")
+        raise
+    finally:
+        con.close()
+
+    logger.info(f"BACKUP | Restaurado {manifiesto['nombre']} ({len(cadena)} backup(s) en la cadena) "
+                f"| {sum(filas.values()):,} filas | {conciliacion} "
+                f"| {time.perf_counter() - inicio:.1f} s con {max(1, paralelo)} conexión(es)")
+    return filas
@@ -0,0 +1,308 @@
+# ========================================
+# CACHÉ DE DATOS MAESTROS
+# ========================================
+"""
+Caché de proceso para los datos maestros (familias, almacenes, ubicaciones,
+proveedores, operarios y furgonetas).
+
+Cada conjunto se lee entero de la BD la primera vez que se pide y después
+se sirve desde memoria: abrir una ventana o rellenar un combo no lanza
+consultas de maestros mientras nadie los cambie.
+
+Invalidación:
+    - Los repos de maestros llaman a invalidar() tras escribir, así que en
+      este proceso los cambios se ven al momento.
+    - Los cambios de otros puestos llegan por LISTEN/NOTIFY: los disparadores
+      de db/versiones_maestros.sql notifican en el canal 'maestros' con el
+      nombre de la tabla y un hilo en segundo plano invalida ese conjunto.
+    - Si no se puede escuchar (sin conexión, pgbouncer en modo transacción...)
+      se comparan los contadores de versiones_maestros como mucho cada
+      COMPROBAR_CADA segundos. Si la tabla no existe (BD sin migrar) la
+      caché caduca por tiempo con el mismo intervalo.
+
+Los accesores devuelven copias: el llamador puede modificar las filas sin
+ensuciar la caché.
+
+generacion(tabla) cambia cada vez que se invalida una tabla, también las que
+no se guardan aquí pero tienen disparador (articulos): las ventanas que
+listan una tabla entera la comparan para recargar solo cuando ha cambiado.
+movimientos no tiene disparador: su generación solo la avanzan las escrituras
+de este proceso (ver movimientos_repo).
+"""
+import select
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+
+from src.core.db_utils import fetch_all, fetch_one, nueva_conexion
+from src.core.logger import logger
+
+CANAL = "maestros"
+
+# Segundos entre comprobaciones de versiones cuando no hay escucha
+COMPROBAR_CADA = 30
+# Segundos de espera del hilo de escucha antes de comprobar que la conexión sigue viva
+LATIDO = 60
+# Segundos antes de reintentar la escucha tras perder la conexión
+REINTENTO = 15
+
+# Conjunto -> consulta que lo carga (misma forma que devolvían los repos)
+_CONSULTAS = {
+    'familias': "SELECT id, nombre FROM familias ORDER BY nombre",
+    'ubicaciones': "SELECT id, nombre FROM ubicaciones ORDER BY nombre",
+    'proveedores': """
+        SELECT id, nombre, telefono, contacto, email, notas
+        FROM proveedores
+        ORDER BY nombre
+    """,
+    'almacenes': "SELECT id, nombre, tipo FROM almacenes ORDER BY nombre",
+    'operarios': """
+        SELECT id, nombre, rol_operario, activo
+        FROM operarios
+        ORDER BY rol_operario DESC, nombre
+    """,
+    'furgonetas': "SELECT * FROM furgonetas ORDER BY numero, matricula",
+}
+
+TABLAS = tuple(_CONSULTAS)
+
+_lock = threading.Lock()
+_datos: Dict[str, List[Dict[str, Any]]] = {}
+# Se incrementa en cada invalidación: una carga que empezó antes no se guarda
+_generacion: Dict[str, int] = {}
+_versiones: Dict[str, int] = {}
+_ultima_comprobacion = 0.0
+# None = aún sin comprobar si existe versiones_maestros
+_sin_versiones: Optional[bool] = None
+_escucha: Optional["_Escucha"] = None
+
+
+# ========================================
+# ACCESORES
+# ========================================
+
+def familias() -> List[Dict[str, Any]]:
+    """Familias (id, nombre) ordenadas por nombre."""
+    return _copiar(_obtener('familias'))
+
+
+def ubicaciones() -> List[Dict[str, Any]]:
+    """Ubicaciones (id, nombre) ordenadas por nombre."""
+    return _copiar(_obtener('ubicaciones'))
+
+
+def proveedores() -> List[Dict[str, Any]]:
+    """Proveedores con sus datos de contacto, ordenados por nombre."""
+    return _copiar(_obtener('proveedores'))
+
+
+def almacenes(tipo: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Almacenes (id, nombre, tipo) ordenados por nombre.
+
+    Args:
+        tipo: 'almacen' o 'furgoneta' para filtrar; None para todos
+    """
+    filas = _obtener('almacenes')
+    if tipo is not None:
+        filas = [a for a in filas if a['tipo'] == tipo]
+    return _copiar(filas)
+
+
+def operarios(solo_activos: Optional[bool] = True, rol: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Operarios (id, nombre, rol_operario, activo), oficiales primero.
+
+    Args:
+        solo_activos: True solo activos, False solo inactivos, None todos
+        rol: 'oficial' o 'ayudante' para filtrar; None para todos
+    """
+    filas = _obtener('operarios')
+    if solo_activos is not None:
+        activo = 1 if solo_activos else 0
+        filas = [o for o in filas if o['activo'] == activo]
+    if rol:
+        filas = [o for o in filas if o['rol_operario'] == rol]
+    return _copiar(filas)
+
+
+def furgonetas(solo_activas: bool = False) -> List[Dict[str, Any]]:
+    """Furgonetas ordenadas por número y matrícula."""
+    filas = _obtener('furgonetas')
+    if solo_activas:
+        filas = [f for f in filas if f['activa'] == 1]
+    return _copiar(filas)
+
+
+def invalidar(tabla: Optional[str] = None) -> None:
+    """
+    Descarta un conjunto (o todos con None) para que se relea en el próximo acceso.
+
+    Con tablas que no se guardan aquí solo avanza su generación.
+    """
+    with _lock:
+        nombres = set(TABLAS) | set(_generacion) if tabla is None else (tabla,)
+        for nombre in nombres:
+            _datos.pop(nombre, None)
+            _generacion[nombre] = _generacion.get(nombre, 0) + 1
+
+
+def generacion(tabla: str) -> int:
+    """
+    Contador de cambios de una tabla, tras comprobar que la caché sigue vigente.
+
+    Con la escucha activa no consulta la BD; sin ella, como mucho una vez
+    cada COMPROBAR_CADA segundos.
+    """
+    _comprobar_vigencia()
+    with _lock:
+        return _generacion.get(tabla, 0)
+
+
+def detener() -> None:
+    """Para el hilo de escucha (al cerrar la aplicación)."""
+    global _escucha
+    with _lock:
+        escucha, _escucha = _escucha, None
+    if escucha is not None:
+        escucha.parar()
+
+
+# ========================================
+# CARGA Y VALIDEZ
+# ========================================
+
+def _copiar(filas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [dict(fila) for fila in filas]
+
+
+def _comprobar_vigencia() -> None:
+    _arrancar_escucha()
+    if not (_escucha is not None and _escucha.activa):
+        _comprobar_versiones()
+
+
+def _obtener(tabla: str) -> List[Dict[str, Any]]:
+    """Filas del conjunto, desde memoria si siguen siendo válidas."""
+    _comprobar_vigencia()
+
+    with _lock:
+        filas = _datos.get(tabla)
+        leida = _generacion.get(tabla, 0)
+    if filas is not None:
+        return filas
+
+    filas = fetch_all(_CONSULTAS[tabla])
+    with _lock:
+        # Si se invalidó mientras leíamos, la lectura puede ser anterior al cambio
+        if _generacion.get(tabla, 0) == leida:
+            _datos[tabla] = filas
+    return filas
+
+
+def _comprobar_versiones() -> None:
+    """
+    Sin escucha: invalida los conjuntos cuya versión ha cambiado.
+
+    Como mucho una consulta cada COMPROBAR_CADA segundos. Sin la tabla
+    versiones_maestros invalida todo con ese mismo intervalo.
+    """
+    global _ultima_comprobacion, _sin_versiones
+    ahora = time.monotonic()
+    with _lock:
+        if ahora - _ultima_comprobacion < COMPROBAR_CADA:
+            return
+        _ultima_comprobacion = ahora
+
+    try:
+        if _sin_versiones is None:
+            # Se pregunta por la tabla en vez de esperar el UndefinedTable, que
+            # db_utils registraría como error en cada arranque
+            _sin_versiones = not fetch_one(
+                "SELECT to_regclass('versiones_maestros') IS NOT NULL AS existe"
+            )['existe']
+            if _sin_versiones:
+                logger.warning(
+                    "Caché de maestros sin versiones_maestros; se releerán cada "
+                    f"{COMPROBAR_CADA} s. Aplica scripts/crear_versiones_maestros.py"
+                )
+        if _sin_versiones:
+            invalidar()
+            return
+        filas = fetch_all("SELECT tabla, version FROM versiones_maestros")
+    except Exception:
+        # Sin poder comprobarlo no sabemos si siguen vigentes
+        invalidar()
+        return
+
+    versiones = {f['tabla']: f['version'] for f in filas}
+    for tabla in set(TABLAS) | set(versiones) | set(_versiones):
+        if versiones.get(tabla) != _versiones.get(tabla):
+            invalidar(tabla)
+    _versiones.clear()
+    _versiones.update(versiones)
+
+
+# ========================================
+# ESCUCHA DE NOTIFICACIONES
+# ========================================
+
+def _arrancar_escucha() -> None:
+    global _escucha
+    if _escucha is not None:
+        return
+    with _lock:
+        if _escucha is None:
+            _escucha = _Escucha()
+            _escucha.start()
+
+
+class _Escucha(threading.Thread):
+    """Hilo con una conexión dedicada en LISTEN sobre el canal de maestros."""
+
+    def __init__(self):
+        super().__init__(name="cache_maestros", daemon=True)
+        self.activa = False
+        self._parar = threading.Event()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def run(self) -> None:
+        while not self._parar.is_set():
+            con = None
+            try:
+                con = nueva_conexion()
+                con.autocommit = True
+                with con.cursor() as cur:
+                    cur.execute(f"LISTEN {CANAL}")
+                # Lo que cambiase mientras no escuchábamos no ha llegado
+                invalidar()
+                self.activa = True
+                self._escuchar(con)
+            except Exception as e:
+                if self.activa:
+                    logger.warning(f"Caché de maestros: se perdió la escucha de cambios ({e})")
+                else:
+                    logger.debug(f"Caché de maestros: no se pudo escuchar cambios ({e})")
+            finally:
+                self.activa = False
+                if con is not None:
+                    try:
+                        con.close()
+                    except Exception:
+                        pass
+            self._parar.wait(REINTENTO)
+
+    def _escuchar(self, con) -> None:
+        while not self._parar.is_set():
+            listos, _, _ = select.select([con], [], [], LATIDO)
+            if not listos:
+                # Sin notificaciones: comprobar que la conexión no ha muerto
+                with con.cursor() as cur:
+                    cur.execute("SELECT 1")
+            con.poll()
+            while con.notifies:
+                aviso = con.notifies.pop(0)
+                invalidar(aviso.payload or None)
@@ -0,0 +1,261 @@
+# ========================================
+# COLUMNAR — RESULTADOS COMPACTOS POR COLUMNAS
+# ========================================
+"""
+Resultado de consulta almacenado por columnas en lugar de una lista de dicts.
+
+Cada columna numérica se guarda en un array NumPy (int64 o float64, con los
+Decimal de PostgreSQL ya convertidos) y el resto en un array de objetos.
+Las claves no se repiten por fila, así que un resultado grande ocupa una
+fracción de la memoria de List[Dict] y se puede usar directamente en código
+vectorizado:
+
+    res = fetch_columnar("SELECT id, stock, min_alerta FROM ...")
+    bajo_minimo = res.columna('stock') < res.columna('min_alerta')
+
+Para el código existente que espera filas tipo dict, cada fila es una vista
+(FilaColumnar) que admite row['col'], row.get('col'), keys(), items()...
+Los NULL se devuelven como None en la vista y como NaN en columnas float.
+
+Si se conocen los tipos de PostgreSQL de las columnas (tipos_postgres), las
+numéricas se guardan siempre como arrays numéricos, también cuando todas
+sus filas son NULL o el resultado está vacío.
+"""
+from collections.abc import Mapping, Sequence
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence as Seq
+
+import numpy as np
+
+# Tipos de columna
+_INT = 'int'            # int64 sin nulos
+_INT_NULO = 'int_nulo'  # enteros con nulos: float64 + NaN (la vista devuelve int/None)
+_FLOAT = 'float'        # float64 (NaN = NULL)
+_OBJ = 'obj'            # cualquier otro tipo
+
+# OIDs de PostgreSQL de los tipos numéricos (cursor.description[i].type_code)
+_OIDS_ENTEROS = {20, 21, 23}        # int8, int2, int4
+_OIDS_REALES = {700, 701, 1700}     # float4, float8, numeric
+
+
+def tipos_postgres(oids: Iterable[int]) -> List[Optional[str]]:
+    """
+    Traduce los OIDs de tipo del cursor al tipo de almacenamiento de cada
+    columna: _INT para enteros, _FLOAT para reales/numeric y None para el
+    resto (se deduce de los valores).
+    """
+    return [
+        _INT if oid in _OIDS_ENTEROS else _FLOAT if oid in _OIDS_REALES else None
+        for oid in oids
+    ]
+
+
+def _detectar_tipo(valores: Seq[Any]) -> str:
+    """Deduce el tipo de almacenamiento de una columna a partir de sus valores."""
+    hay_nulos = False
+    hay_decimales = False
+    hay_numeros = False
+    for v in valores:
+        if v is None:
+            hay_nulos = True
+        elif isinstance(v, bool):
+            return _OBJ
+        elif isinstance(v, int):
+            hay_numeros = True
+        elif isinstance(v, (float, Decimal)):
+            hay_numeros = True
+            hay_decimales = True
+        else:
+            return _OBJ
+    if not hay_numeros:
+        return _OBJ
+    if hay_decimales:
+        return _FLOAT
+    return _INT_NULO if hay_nulos else _INT
+
+
+def _construir_array(valores: Seq[Any], tipo: str) -> np.ndarray:
+    if tipo == _INT:
+        return np.fromiter(valores, dtype=np.int64, count=len(valores))
+    if tipo in (_FLOAT, _INT_NULO):
+        return np.fromiter(
+            (np.nan if v is None else float(v) for v in valores),
+            dtype=np.float64, count=len(valores)
+        )
+    arr = np.empty(len(valores), dtype=object)
+    arr[:] = list(valores)
+    return arr
+
+
+class FilaColumnar(Mapping):
+    """Vista de solo lectura de una fila de un ResultadoColumnar."""
+
+    __slots__ = ('_resultado', '_indice')
+
+    def __init__(self, resultado: 'ResultadoColumnar', indice: int):
+        self._resultado = resultado
+        self._indice = indice
+
+    def __getitem__(self, clave: str) -> Any:
+        return self._resultado._valor(clave, self._indice)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._resultado.columnas)
+
+    def __len__(self) -> int:
+        return len(self._resultado.columnas)
+
+    def __repr__(self) -> str:
+        return f"FilaColumnar({dict(self)})"
+
+
+class ResultadoColumnar(Sequence):
+    """
+    Conjunto de filas almacenado por columnas.
+
+    Se comporta como una secuencia de filas tipo dict (len, índice, iteración)
+    y además expone las columnas como arrays NumPy.
+    """
+
+    __slots__ = ('columnas', '_datos', '_tipos', '_n')
+
+    def __init__(self, columnas: List[str], datos: Dict[str, np.ndarray], tipos: Dict[str, str]):
+        self.columnas = list(columnas)
+        self._datos = datos
+        self._tipos = tipos
+        self._n = len(datos[columnas[0]]) if columnas else 0
+
+    # ---------- Construcción ----------
+    @classmethod
+    def desde_tuplas(
+        cls,
+        columnas: List[str],
+        filas: Seq[Seq[Any]],
+        tipos: Optional[Seq[Optional[str]]] = None
+    ) -> 'ResultadoColumnar':
+        """
+        Construye el resultado a partir de filas en forma de tupla (cursor normal).
+
+        tipos: tipo de almacenamiento conocido de cada columna (tipos_postgres);
+        None, o None en una columna, para deducirlo de los valores.
+        """
+        return cls.desde_bloques(columnas, [filas], tipos)
+
+    @classmethod
+    def desde_bloques(
+        cls,
+        columnas: List[str],
+        bloques: Iterable[Seq[Seq[Any]]],
+        tipos: Optional[Seq[Optional[str]]] = None
+    ) -> 'ResultadoColumnar':
+        """
+        Construye el resultado a partir de bloques de filas (cursor.fetchmany).
+
+        Cada bloque se pasa a arrays por columna y se descarta antes de leer el
+        siguiente, así que nunca están todas las tuplas en memoria a la vez.
+        Las columnas de tipo conocido (tipos) son numéricas aunque todas sus
+        filas sean NULL: enteras sin nulos en int64, el resto en float64 + NaN.
+        """
+        tipos = list(tipos) if tipos is not None else [None] * len(columnas)
+        partes: List[List[np.ndarray]] = [[] for _ in columnas]
+        con_nulos = [False] * len(columnas)
+
+        for filas in bloques:
+            if not filas:
+                continue
+            for i, tipo in enumerate(tipos):
+                valores = [fila[i] for fila in filas]
+                if tipo == _INT and None in valores:
+                    con_nulos[i] = True
+                    partes[i].append(_construir_array(valores, _INT_NULO))
+                elif tipo is not None:
+                    partes[i].append(_construir_array(valores, tipo))
+                else:
+                    partes[i].append(_construir_array(valores, _OBJ))
+
+        datos: Dict[str, np.ndarray] = {}
+        tipos_finales: Dict[str, str] = {}
+        for i, col in enumerate(columnas):
+            tipo = tipos[i]
+            if tipo is None:
+                valores = np.concatenate(partes[i]) if partes[i] else np.empty(0, dtype=object)
+                tipo = _detectar_tipo(valores)
+                datos[col] = valores if tipo == _OBJ else _construir_array(valores, tipo)
+            else:
+                if tipo == _INT and con_nulos[i]:
+                    tipo = _INT_NULO
+                dtype = np.int64 if tipo == _INT else np.float64
+                # int64 + float64 se concatenan como float64 (bloques con y sin nulos)
+                datos[col] = np.concatenate(partes[i]).astype(dtype, copy=False) if partes[i] \
+                    else np.empty(0, dtype=dtype)
+            tipos_finales[col] = tipo
+        return cls(columnas, datos, tipos_finales)
+
+    @classmethod
+    def desde_dicts(cls, filas: Iterable[Dict[str, Any]], columnas: Optional[List[str]] = None) -> 'ResultadoColumnar':
+        """Construye el resultado a partir de una lista de dicts."""
+        filas = list(filas)
+        if columnas is None:
+            columnas = list(filas[0].keys()) if filas else []
+        return cls.desde_tuplas(columnas, [[f.get(c) for c in columnas] for f in filas])
+
+    # ---------- Acceso ----------
+    def _valor(self, columna: str, indice: int) -> Any:
+        valor = self._datos[columna][indice]
+        tipo = self._tipos[columna]
+        if tipo == _INT:
+            return int(valor)
+        if tipo == _FLOAT:
+            return None if np.isnan(valor) else float(valor)
+        if tipo == _INT_NULO:
+            return None if np.isnan(valor) else int(valor)
+        return valor
+
+    def columna(self, nombre: str) -> np.ndarray:
+        """Devuelve la columna como array NumPy (sin copiar)."""
+        return self._datos[nombre]
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return self._subconjunto(np.arange(self._n)[indice])
+        if indice < 0:
+            indice += self._n
+        if not 0 <= indice < self._n:
+            raise IndexError(indice)
+        return FilaColumnar(self, indice)
+
+    def __iter__(self) -> Iterator[FilaColumnar]:
+        for i in range(self._n):
+            yield FilaColumnar(self, i)
+
+    def __repr__(self) -> str:
+        return f"ResultadoColumnar({self._n} filas, columnas={self.columnas})"
+
+    # ---------- Operaciones ----------
+    def _subconjunto(self, indices: np.ndarray) -> 'ResultadoColumnar':
+        return ResultadoColumnar(
+            self.columnas,
+            {c: arr[indices] for c, arr in self._datos.items()},
+            self._tipos
+        )
+
+    def filtrar(self, mascara: np.ndarray) -> 'ResultadoColumnar':
+        """Devuelve las filas donde la máscara booleana es True."""
+        return self._subconjunto(np.flatnonzero(mascara))
+
+    def indexar_por(self, columna: str) -> Dict[Any, FilaColumnar]:
+        """Devuelve {valor_columna: fila} para búsquedas por clave (p. ej. id)."""
+        claves = self._datos[columna]
+        return {self._valor(columna, i): FilaColumnar(self, i) for i in range(len(claves))}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convierte a List[Dict] (para código que necesite dicts mutables)."""
+        return [dict(fila) for fila in self]
+
+    def to_dataframe(self):
+        """Convierte a pandas.DataFrame sin pasar por filas."""
+        import pandas as pd
+        return pd.DataFrame({c: self._datos[c] for c in self.columnas}, columns=self.columnas)
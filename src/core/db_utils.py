@@ -1,12 +1,27 @@
 # ========================================
 # DB UTILS — GESTIÓN DE BASE DE DATOS POSTGRESQL
 # ========================================
+import os
 import sys
+import time
+import uuid
+import random
+import functools
+import threading
+import weakref
 import hashlib
 import configparser
 import bcrypt
+from collections import namedtuple
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Callable, TypeVar
+
+from src.core.logger import logger
+from src.core.exceptions import ConnectionError as BDNoDisponibleError
+
+# Errores de BD: mismo pipeline asíncrono que el resto del log
+_logger_bd = logger.getChild("db")
 
 # ----------------------------------------
 # DETECCIÓN DE LA RAÍZ DEL PROYECTO
@@ -28,19 +43,35 @@ PROJECT_ROOT = _find_project_root(_THIS)
 # ----------------------------------------
 # CONFIGURACIÓN DE POSTGRESQL
 # ----------------------------------------
+# config.ini se lee la primera vez que se necesita (al abrir el pool), no al
+# importar el módulo: así importar repos/servicios no toca disco ni falla
+# antes de que se muestre la ventana de login.
 config = configparser.ConfigParser()
 config_path = PROJECT_ROOT / "config.ini"
+_config_leida = False
 
-if not config_path.exists():
-    raise FileNotFoundError(
-        f"No se encontró config.ini en {config_path}\n"
-        "Debe existir para configurar la conexión PostgreSQL"
-    )
-
-config.read(config_path)
+def _leer_config() -> configparser.ConfigParser:
+    """
+    Lee config.ini una sola vez y devuelve la configuración.
 
-LOG_PATH = PROJECT_ROOT / "logs" / "app.log"
-LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    La variable de entorno CLIMATOT_DB_NAME sustituye a [database] NAME
+    (la usan los benchmarks para trabajar sobre una BD desechable).
+    """
+    global _config_leida
+    if not _config_leida:
+        if not config_path.exists():
+            raise FileNotFoundError(
+                f"No se encontró config.ini en {config_path}\n"
+                "Debe existir para configurar la conexión PostgreSQL"
+            )
+        config.read(config_path)
+        nombre_bd = os.getenv("CLIMATOT_DB_NAME")
+        if nombre_bd:
+            if not config.has_section('database'):
+                config.add_section('database')
+            config.set('database', 'NAME', nombre_bd)
+        _config_leida = True
+    return config
 
 # ----------------------------------------
 # POOL DE CONEXIONES POSTGRESQL
@@ -56,44 +87,276 @@ except ImportError as e:
 
 # Pool de conexiones global
 _connection_pool = None
+_pool_lock = threading.Lock()
+
+# Una conexión que lleva más de estos segundos libre en el pool se comprueba
+# (SELECT 1) antes de entregarla: puede haber muerto por un reinicio del
+# servidor o un corte de red mientras nadie la usaba
+VALIDAR_TRAS_INACTIVIDAD = 30.0
+# Instante (time.monotonic) en que se devolvió cada conexión, por id().
+# Lo tocan a la vez el hilo de la interfaz y los workers (exportaciones,
+# login, precalentado): siempre con _ultimo_uso_lock
+_ultimo_uso: Dict[int, float] = {}
+_ultimo_uso_lock = threading.Lock()
+
+# Reintentos de lecturas (y escrituras marcadas como seguras) cuando se pierde
+# la conexión: espera exponencial con jitter completo entre intentos
+MAX_REINTENTOS_BD = 3
+ESPERA_BASE_REINTENTO = 0.2
+ESPERA_MAX_REINTENTO = 2.0
+
+# Unidades de trabajo que PostgreSQL aborta por concurrencia (conflicto de
+# serialización 40001 o interbloqueo 40P01): se repiten enteras
+MAX_REINTENTOS_TRANSACCION = 3
+_ERRORES_CONCURRENCIA = ('40001', '40P01')
+
+# Cortacircuitos: tras estos fallos de conexión seguidos no se vuelve a
+# intentar conectar durante la pausa (con jitter, para que los puestos no
+# lleguen todos a la vez al servidor que se está recuperando)
+FALLOS_PARA_ABRIR = 5
+PAUSA_CORTACIRCUITOS = 10.0
+
+_ERRORES_CONEXION = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+T = TypeVar("T")
+
+
+def _es_conexion_perdida(error: Exception) -> bool:
+    """
+    True si el error es de conexión y no de la consulta.
+
+    Los errores del cliente (sin pgcode: no se pudo conectar, el servidor
+    cerró la conexión...) y los SQLSTATE 08xxx / 57P01-57P03 (servidor
+    apagándose o reiniciando) se pueden reintentar con otra conexión. Un
+    statement_timeout o un conflicto de serialización, no.
+    """
+    if not isinstance(error, _ERRORES_CONEXION):
+        return False
+    codigo = getattr(error, 'pgcode', None)
+    return codigo is None or codigo.startswith('08') or codigo in ('57P01', '57P02', '57P03')
+
+
+class _Cortacircuitos:
+    """
+    Deja de intentar conectar mientras el servidor no responde.
+
+    Cerrado: todo pasa. Tras FALLOS_PARA_ABRIR fallos de conexión seguidos se
+    abre y get_connection() falla al momento con BDNoDisponibleError. Pasada
+    la pausa deja pasar un solo intento (medio abierto): si sale bien se
+    cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+
+    def comprobar(self) -> None:
+        with self._lock:
+            if not self._abierto_hasta:
+                return
+            ahora = time.monotonic()
+            if ahora < self._abierto_hasta:
+                raise BDNoDisponibleError(
+                    "La base de datos no responde",
+                    f"Se reintentará en {self._abierto_hasta - ahora:.0f} s"
+                )
+            # Medio abierto: pasa este intento; los demás esperan otra pausa
+            self._abierto_hasta = ahora + self._pausa()
+
+    def exito(self) -> None:
+        with self._lock:
+            if self._abierto_hasta:
+                _logger_bd.info("Conexión con la base de datos recuperada")
+            self._fallos = 0
+            self._abierto_hasta = 0.0
+
+    def fallo(self) -> None:
+        with self._lock:
+            self._fallos += 1
+            if self._fallos >= FALLOS_PARA_ABRIR:
+                if not self._abierto_hasta:
+                    _logger_bd.warning(
+                        f"Base de datos no disponible tras {self._fallos} fallos de conexión; "
+                        f"se deja de intentar durante unos {PAUSA_CORTACIRCUITOS:.0f} s"
+                    )
+                self._abierto_hasta = time.monotonic() + self._pausa()
+
+    @staticmethod
+    def _pausa() -> float:
+        return PAUSA_CORTACIRCUITOS * random.uniform(0.5, 1.5)
+
+
+_cortacircuitos = _Cortacircuitos()
+
+
+def _reintentar(operacion: Callable[[], T], nombre: str) -> T:
+    """
+    Ejecuta operacion() y la repite con otra conexión si se perdió la conexión.
+
+    Solo para operaciones que se pueden repetir sin efectos dobles (lecturas
+    o escrituras idempotentes) y fuera de una transacción: la conexión muerta
+    ya se descartó al devolverla al pool y get_connection() abre otra.
+    """
+    intento = 1
+    while True:
+        try:
+            resultado = operacion()
+        except Exception as e:
+            if not _es_conexion_perdida(e):
+                raise
+            if intento >= MAX_REINTENTOS_BD:
+                raise
+            espera = random.uniform(0, min(ESPERA_MAX_REINTENTO, ESPERA_BASE_REINTENTO * 2 ** (intento - 1)))
+            _logger_bd.warning(
+                f"{nombre}: conexión perdida ({str(e).strip()}); "
+                f"reintento {intento}/{MAX_REINTENTOS_BD - 1} en {espera:.2f} s"
+            )
+            time.sleep(espera)
+            intento += 1
+        else:
+            _cortacircuitos.exito()
+            return resultado
+
+
+def parametros_conexion() -> Dict[str, Any]:
+    """Parámetros de psycopg2.connect() según config.ini."""
+    config = _leer_config()
+    return {
+        'host': config.get('database', 'HOST', fallback='localhost'),
+        'port': config.getint('database', 'PORT', fallback=5432),
+        'database': config.get('database', 'NAME', fallback='climatot_almacen'),
+        'user': config.get('database', 'USER', fallback='climatot'),
+        'password': config.get('database', 'PASSWORD', fallback=''),
+    }
+
+
+def nueva_conexion():
+    """
+    Abre una conexión dedicada, fuera del pool.
+
+    Para trabajos largos (backups, restauraciones) que no deben ocupar una
+    conexión del pool mientras la aplicación sigue en uso. Hay que cerrarla
+    con close().
+    """
+    return psycopg2.connect(**parametros_conexion())
+
 
 def _init_pool():
     """Inicializa el pool de conexiones PostgreSQL"""
     global _connection_pool
-    if _connection_pool is None:
+    with _pool_lock:
+        if _connection_pool is not None:
+            return
         try:
-            _connection_pool = psycopg2.pool.SimpleConnectionPool(
+            parametros = parametros_conexion()
+            # ThreadedConnectionPool: las exportaciones en segundo plano piden
+            # conexiones desde otro hilo mientras la interfaz sigue usando el pool
+            _connection_pool = psycopg2.pool.ThreadedConnectionPool(
                 minconn=2,
                 maxconn=20,
-                host=config.get('database', 'HOST', fallback='localhost'),
-                port=config.getint('database', 'PORT', fallback=5432),
-                database=config.get('database', 'NAME', fallback='climatot_almacen'),
-                user=config.get('database', 'USER', fallback='climatot'),
-                password=config.get('database', 'PASSWORD', fallback='')
+                **parametros
             )
-            print(f"[DB] Pool de conexiones PostgreSQL inicializado (host: {config.get('database', 'HOST')})")
+            print(f"[DB] Pool de conexiones PostgreSQL inicializado (host: {parametros['host']})")
         except Exception as e:
             print(f"[DB] ERROR al inicializar pool PostgreSQL: {e}")
             raise
 
+
+def precalentar_pool() -> threading.Thread:
+    """
+    Abre el pool de conexiones en un hilo en segundo plano.
+
+    Se llama al arrancar, mientras se muestra la ventana de login, para que la
+    primera consulta no pague el coste de conectar. Los errores se registran y
+    se vuelven a producir en la primera get_connection().
+    """
+    def _abrir():
+        try:
+            _init_pool()
+        except Exception as e:
+            log_aviso(f"No se pudo precalentar el pool de conexiones: {e}")
+
+    hilo = threading.Thread(target=_abrir, name="precalentar_pool", daemon=True)
+    hilo.start()
+    return hilo
+
 def get_connection():
     """
     Obtiene una conexión del pool PostgreSQL.
     IMPORTANTE: Debe liberarse con release_connection()
+
+    Nunca entrega una conexión muerta: las cerradas se descartan y las que
+    llevan un rato libres se comprueban antes. Si el servidor no responde
+    (cortacircuitos abierto) falla al momento con BDNoDisponibleError.
     """
     global _connection_pool
-    if _connection_pool is None:
-        _init_pool()
+    _cortacircuitos.comprobar()
     try:
-        conn = _connection_pool.getconn()
-        return conn
+        if _connection_pool is None:
+            _init_pool()
+        # Como mucho una pasada por las conexiones libres; si todas estaban
+        # muertas, getconn() acaba abriendo una nueva
+        for _ in range(_connection_pool.maxconn + 1):
+            conn = _connection_pool.getconn()
+            if _conexion_viva(conn):
+                return conn
+            _descartar(conn)
+        raise psycopg2.OperationalError("No se pudo obtener una conexión válida del pool")
+    except _ERRORES_CONEXION as e:
+        _cortacircuitos.fallo()
+        log_error(f"Error al obtener conexión del pool: {e}")
+        raise
     except Exception as e:
         log_error(f"Error al obtener conexión del pool: {e}")
         raise
 
+
+def _conexion_viva(conn) -> bool:
+    """Comprueba una conexión recién sacada del pool (ver VALIDAR_TRAS_INACTIVIDAD)."""
+    if conn.closed:
+        return False
+    with _ultimo_uso_lock:
+        libre_desde = _ultimo_uso.get(id(conn))
+    if libre_desde is None:
+        # Recién abierta: el servidor responde
+        _cortacircuitos.exito()
+        return True
+    if time.monotonic() - libre_desde < VALIDAR_TRAS_INACTIVIDAD:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+    except _ERRORES_CONEXION:
+        return False
+    _cortacircuitos.exito()
+    return True
+
+
+def _descartar(conn) -> None:
+    """Cierra una conexión y la saca del pool."""
+    with _ultimo_uso_lock:
+        _ultimo_uso.pop(id(conn), None)
+    try:
+        _connection_pool.putconn(conn, close=True)
+    except Exception:
+        pass
+
 def release_connection(conn):
-    """Devuelve una conexión al pool"""
+    """Devuelve una conexión al pool (o la descarta si se perdió)"""
     if _connection_pool and conn:
+        if conn.closed:
+            _descartar(conn)
+            _cortacircuitos.fallo()
+            # Si una se perdió, las que esperan en el pool seguramente también:
+            # que se comprueben todas antes de volver a entregarlas
+            with _ultimo_uso_lock:
+                for clave in _ultimo_uso:
+                    _ultimo_uso[clave] = 0.0
+            return
+        with _ultimo_uso_lock:
+            _ultimo_uso[id(conn)] = time.monotonic()
         _connection_pool.putconn(conn)
 
 def close_all_connections():
@@ -102,6 +365,8 @@ def close_all_connections():
     if _connection_pool:
         _connection_pool.closeall()
         _connection_pool = None
+        with _ultimo_uso_lock:
+            _ultimo_uso.clear()
 
 # ----------------------------------------
 # ALIAS DE COMPATIBILIDAD
@@ -110,48 +375,456 @@ def get_con():
     """Alias de compatibilidad para código antiguo"""
     return get_connection()
 
+# ----------------------------------------
+# TRANSACCIONES (UNIDAD DE TRABAJO)
+# ----------------------------------------
+_tx_hilo = threading.local()
+
+
+class Transaccion:
+    """
+    Conexión del pool fijada durante una operación de negocio.
+
+    Se obtiene con transaccion(). Se pasa como `tx` a fetch_all, fetch_one,
+    execute_query y a los repos que la aceptan: todas sus sentencias van por
+    esta conexión y se confirman juntas al salir del bloque.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return self.conn.cursor(*args, **kwargs)
+
+
+@contextmanager
+def transaccion() -> Iterator[Transaccion]:
+    """
+    Unidad de trabajo: with transaccion() as tx: ...
+
+    Confirma al salir del bloque y deshace todo si sale por una excepción,
+    que se vuelve a lanzar. Dentro de otra transaccion() del mismo hilo
+    reutiliza la exterior, que es la única que confirma.
+    """
+    exterior = getattr(_tx_hilo, 'tx', None)
+    if exterior is not None:
+        yield exterior
+        return
+
+    conn = get_connection()
+    tx = Transaccion(conn)
+    _tx_hilo.tx = tx
+    try:
+        _validar_preparadas(conn)
+        yield tx
+        conn.commit()
+    except BaseException:
+        # Si se perdió la conexión no hay nada que deshacer (y rollback fallaría)
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        _tx_hilo.tx = None
+        release_connection(conn)
+
+
+def en_transaccion(operacion: Callable[[Transaccion], T], nombre: str = "transaccion") -> T:
+    """
+    Ejecuta operacion(tx) en una transaccion() y la repite entera si
+    PostgreSQL la aborta por concurrencia (serialización o interbloqueo).
+
+    Es lo que hace crear_movimientos_batch() por su cuenta cuando no recibe
+    tx, pero para una unidad de trabajo con varias llamadas: lo que se leyó
+    dentro ya no vale y hay que volver a empezar desde el principio, así
+    que operacion no debe tener efectos fuera de la BD. Dentro de otra
+    transaccion() no reintenta: la repite quien abrió la exterior.
+    """
+    anidada = getattr(_tx_hilo, 'tx', None) is not None
+    intento = 1
+    while True:
+        try:
+            with transaccion() as tx:
+                return operacion(tx)
+        except psycopg2.Error as e:
+            if anidada or getattr(e, 'pgcode', None) not in _ERRORES_CONCURRENCIA:
+                raise
+            if intento >= MAX_REINTENTOS_TRANSACCION:
+                raise
+            _logger_bd.warning(
+                f"{nombre}: transacción abortada por concurrencia ({e.pgcode}), "
+                f"reintento {intento}/{MAX_REINTENTOS_TRANSACCION - 1}"
+            )
+            time.sleep(random.uniform(0.05, 0.2) * intento)
+            intento += 1
+
+
+@contextmanager
+def instantanea() -> Iterator[Transaccion]:
+    """
+    Lectura consistente para informes: with instantanea(): ...
+
+    Fija una conexión en una transacción REPEATABLE READ READ ONLY: todas las
+    consultas del bloque ven la BD tal y como estaba en la primera, aunque
+    otros puestos confirmen movimientos entretanto. Mientras dura, fetch_all,
+    fetch_one y fetch_columnar de este hilo la usan aunque no reciban tx, así
+    que los repos no necesitan cambios. execute_query no: las escrituras van
+    siempre por su propia conexión o por una transaccion() explícita.
+
+    Dentro de una transaccion() o de otra instantanea() reutiliza la exterior,
+    también para las lecturas del bloque que no reciben tx.
+    """
+    exterior = getattr(_tx_hilo, 'tx', None) or getattr(_tx_hilo, 'lectura', None)
+    if exterior is not None:
+        anterior = getattr(_tx_hilo, 'lectura', None)
+        _tx_hilo.lectura = exterior
+        try:
+            yield exterior
+        finally:
+            _tx_hilo.lectura = anterior
+        return
+
+    conn = get_connection()
+    tx = Transaccion(conn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        _validar_preparadas(conn)
+        _tx_hilo.lectura = tx
+        yield tx
+    finally:
+        _tx_hilo.lectura = None
+        # Solo lectura: no hay nada que confirmar
+        if not conn.closed:
+            conn.rollback()
+        release_connection(conn)
+
+
+def _tx_lectura(tx: Optional[Transaccion]) -> Optional[Transaccion]:
+    """tx explícita o, si no la hay, la instantanea() activa en este hilo."""
+    return tx if tx is not None else getattr(_tx_hilo, 'lectura', None)
+
+
+def _lectura_reintentable(funcion):
+    """
+    Reintenta una función de lectura (query, params, tx) si se pierde la
+    conexión. Dentro de una transacción o instantánea no se reintenta: la
+    transacción entera se perdió con la conexión y la repite quien la abrió.
+    """
+    @functools.wraps(funcion)
+    def envoltura(query: str, params: tuple = (), tx: Optional[Transaccion] = None, **kwargs):
+        if _tx_lectura(tx) is not None:
+            return funcion(query, params, tx, **kwargs)
+        return _reintentar(lambda: funcion(query, params, tx, **kwargs), funcion.__name__)
+    return envoltura
+
+# ----------------------------------------
+# SENTENCIAS PREPARADAS
+# ----------------------------------------
+# Consultas cortas que se repiten mucho con distintos parámetros (escáner,
+# comprobaciones de notificaciones): fetch_one/fetch_all(..., preparada=nombre)
+# las prepara (PREPARE) la primera vez en cada conexión y después solo las
+# ejecuta (EXECUTE), sin que PostgreSQL vuelva a analizar y planificar el SQL.
+# Las sentencias preparadas viven en la sesión del servidor, así que se
+# conservan mientras la conexión siga en el pool; al descartarla se olvidan.
+USAR_SENTENCIAS_PREPARADAS = True
+
+# nombre -> (SQL con %s, SQL con $1..$n, nº de parámetros)
+_sentencias: Dict[str, tuple] = {}
+_sentencias_lock = threading.Lock()
+# Nombres ya preparados en cada conexión (se liberan con la conexión). Varios
+# hilos usan conexiones distintas a la vez: se consulta y modifica con
+# _sentencias_lock
+_preparadas_conexion: "weakref.WeakKeyDictionary[Any, set]" = weakref.WeakKeyDictionary()
+
+
+def _sentencia(nombre: str, query: str) -> tuple:
+    """Registra (la primera vez) y devuelve la sentencia `nombre`."""
+    sentencia = _sentencias.get(nombre)
+    if sentencia is None:
+        if not nombre.isidentifier():
+            raise ValueError(f"Nombre de sentencia preparada no válido: {nombre!r}")
+        # %s -> $1, $2...; %% -> %
+        partes = query.replace('%%', '\x00').split('%s')
+        sql_pg = partes[0]
+        for i, parte in enumerate(partes[1:], start=1):
+            sql_pg += f"${i}{parte}"
+        sentencia = (query, sql_pg.replace('\x00', '%'), len(partes) - 1)
+        with _sentencias_lock:
+            sentencia = _sentencias.setdefault(nombre, sentencia)
+    if sentencia[0] != query:
+        raise ValueError(f"La sentencia preparada {nombre!r} ya existe con otro SQL")
+    return sentencia
+
+
+def _validar_preparadas(conn) -> None:
+    """
+    Al empezar una transaccion() o instantanea(): olvida las sentencias que
+    se daban por preparadas en la conexión y la sesión ya no tiene (DISCARD
+    ALL, sesión reiniciada por un pooler...).
+
+    Dentro de la transacción un EXECUTE fallido la abortaría entera; con esta
+    comprobación, una por transacción y solo si hay algo preparado, los
+    EXECUTE de dentro van sin protección (_ejecutar).
+    """
+    with _sentencias_lock:
+        if not _preparadas_conexion.get(conn):
+            return
+    with conn.cursor() as cur:
+        cur.execute("SELECT name FROM pg_prepared_statements")
+        # PREPARE pasa a minúsculas los nombres sin comillas
+        en_sesion = {fila[0] for fila in cur.fetchall()}
+    with _sentencias_lock:
+        hechas = _preparadas_conexion.get(conn, set())
+        hechas -= {n for n in hechas if n.lower() not in en_sesion}
+
+
+def _ejecutar(cur, query: str, params: tuple, preparada: Optional[str], tx: Optional[Transaccion]) -> None:
+    """cur.execute(query, params), o EXECUTE de la sentencia preparada."""
+    if not preparada or not USAR_SENTENCIAS_PREPARADAS:
+        cur.execute(query, params)
+        return
+
+    _, sql_pg, n_params = _sentencia(preparada, query)
+    conn = cur.connection
+    ejecutar = f"EXECUTE {preparada}" + (f" ({', '.join(['%s'] * n_params)})" if n_params else "")
+
+    with _sentencias_lock:
+        hechas = _preparadas_conexion.setdefault(conn, set())
+        preparar = preparada not in hechas
+    if preparar:
+        cur.execute(f"PREPARE {preparada} AS {sql_pg}")
+        with _sentencias_lock:
+            hechas.add(preparada)
+        cur.execute(ejecutar, params)
+        return
+
+    # En una transacción la sesión se comprobó al empezar (_validar_preparadas)
+    if tx is not None:
+        cur.execute(ejecutar, params)
+        return
+
+    # 26000: la sesión ya no la tiene (DISCARD ALL, conexión reabierta...).
+    # Fuera de una transacción se deshace la sentencia fallida y se vuelve a
+    # preparar
+    try:
+        cur.execute(ejecutar, params)
+    except psycopg2.Error as e:
+        if getattr(e, 'pgcode', None) != '26000':
+            raise
+        conn.rollback()
+        cur.execute(f"PREPARE {preparada} AS {sql_pg}")
+        cur.execute(ejecutar, params)
+
 # ----------------------------------------
 # FUNCIONES DE CONSULTA
 # ----------------------------------------
-def fetch_all(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+# Filas por paso de fetchmany en fetch_all y fetch_columnar
+_FETCH_ALL_BLOQUE = 2000
+
+
+@_lectura_reintentable
+def fetch_all(
+    query: str,
+    params: tuple = (),
+    tx: Optional[Transaccion] = None,
+    preparada: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
     Ejecuta una consulta SELECT y devuelve todas las filas como lista de diccionarios.
+
+    Lee con un cursor normal (tuplas) y construye los dicts por bloques, en vez
+    de crear un RealDictRow por fila y copiarlo después a un dict nuevo.
+    Con tx (o dentro de una instantanea()) se ejecuta en esa transacción.
+    Con preparada=nombre se ejecuta como sentencia preparada.
     """
-    conn = get_connection()
+    tx = _tx_lectura(tx)
+    conn = tx.conn if tx is not None else get_connection()
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query, params)
-            rows = cur.fetchall()
-            return [dict(row) for row in rows]
+        with conn.cursor() as cur:
+            _ejecutar(cur, query, params, preparada, tx)
+            if cur.description is None:
+                return []
+            columnas = [col.name for col in cur.description]
+            resultado = []
+            while True:
+                bloque = cur.fetchmany(_FETCH_ALL_BLOQUE)
+                if not bloque:
+                    break
+                resultado.extend(dict(zip(columnas, fila)) for fila in bloque)
+            return resultado
     except Exception as e:
         log_error(f"Error ejecutando fetch_all: {e}\n{query}\nParams: {params}")
         raise
     finally:
-        release_connection(conn)
+        if tx is None:
+            release_connection(conn)
+
 
+@_lectura_reintentable
+def fetch_columnar(query: str, params: tuple = (), tx: Optional[Transaccion] = None):
+    """
+    Ejecuta una consulta SELECT y devuelve un ResultadoColumnar (src.core.columnar).
 
-def fetch_one(query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
+    Pensado para lecturas grandes y calientes (stock, consumos, pedido ideal):
+    las columnas numéricas llegan como arrays NumPy en float64/int64 y cada
+    fila sigue pudiéndose leer como dict (row['col'], row.get('col')).
+    Con tx (o dentro de una instantanea()) se ejecuta en esa transacción.
+    """
+    from src.core.columnar import ResultadoColumnar, tipos_postgres
+
+    tx = _tx_lectura(tx)
+    conn = tx.conn if tx is not None else get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            if cur.description is None:
+                return ResultadoColumnar.desde_tuplas([], [])
+            columnas = [col.name for col in cur.description]
+            tipos = tipos_postgres(col.type_code for col in cur.description)
+            # Por bloques: cada bloque de tuplas se descarta al pasarlo a arrays
+            bloques = iter(lambda: cur.fetchmany(_FETCH_ALL_BLOQUE), [])
+            return ResultadoColumnar.desde_bloques(columnas, bloques, tipos)
+    except Exception as e:
+        log_error(f"Error ejecutando fetch_columnar: {e}\n{query}\nParams: {params}")
+        raise
+    finally:
+        if tx is None:
+            release_connection(conn)
+
+
+@_lectura_reintentable
+def fetch_one(
+    query: str,
+    params: tuple = (),
+    tx: Optional[Transaccion] = None,
+    preparada: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
     """
     Ejecuta una consulta SELECT y devuelve una sola fila (o None).
+    Con tx (o dentro de una instantanea()) se ejecuta en esa transacción.
+    Con preparada=nombre se ejecuta como sentencia preparada.
     """
-    conn = get_connection()
+    tx = _tx_lectura(tx)
+    conn = tx.conn if tx is not None else get_connection()
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query, params)
+            _ejecutar(cur, query, params, preparada, tx)
             row = cur.fetchone()
             return dict(row) if row else None
     except Exception as e:
         log_error(f"Error ejecutando fetch_one: {e}\n{query}\nParams: {params}")
         raise
     finally:
+        if tx is None:
+            release_connection(conn)
+
+
+# ----------------------------------------
+# LECTURA EN STREAMING (CURSORES CON NOMBRE)
+# ----------------------------------------
+FILA_DICT = 'dict'
+FILA_TUPLA = 'tuple'
+FILA_NAMEDTUPLE = 'namedtuple'
+
+
+def _convertidor_filas(columnas: Sequence[str], row_type: str):
+    """Devuelve una función que convierte una tupla de BD al tipo de fila pedido."""
+    if row_type == FILA_TUPLA:
+        return None
+    if row_type == FILA_NAMEDTUPLE:
+        Fila = namedtuple('Fila', columnas, rename=True)
+        return Fila._make
+    if row_type == FILA_DICT:
+        return lambda fila: dict(zip(columnas, fila))
+    raise ValueError(f"row_type no soportado: {row_type}")
+
+
+def iter_chunks(
+    query: str,
+    params: tuple = (),
+    chunk_size: int = 2000,
+    row_type: str = FILA_DICT
+) -> Iterator[List[Any]]:
+    """
+    Ejecuta una consulta SELECT con un cursor con nombre (server-side) y
+    devuelve las filas por bloques de como máximo chunk_size.
+
+    El resultado nunca se materializa entero en el cliente: PostgreSQL envía
+    cada bloque bajo demanda, así que la memoria queda acotada por chunk_size.
+    La conexión queda ocupada mientras el generador está vivo; se libera al
+    agotarlo o al cerrarlo (close() o salir de un for con break).
+
+    Args:
+        query: Consulta SELECT
+        params: Parámetros de la consulta
+        chunk_size: Filas por viaje al servidor (itersize del cursor)
+        row_type: 'dict', 'tuple' o 'namedtuple'
+    """
+    conn = get_connection()
+    try:
+        nombre = f"iter_{uuid.uuid4().hex[:16]}"
+        with conn.cursor(name=nombre) as cur:
+            cur.itersize = chunk_size
+            cur.execute(query, params)
+            convertir = None
+            while True:
+                bloque = cur.fetchmany(chunk_size)
+                if not bloque:
+                    break
+                if convertir is None and row_type != FILA_TUPLA:
+                    columnas = [col.name for col in cur.description]
+                    convertir = _convertidor_filas(columnas, row_type)
+                yield [convertir(f) for f in bloque] if convertir else bloque
+    except Exception as e:
+        log_error(f"Error ejecutando iter_chunks: {e}\n{query}\nParams: {params}")
+        raise
+    finally:
+        # Cerrar la transacción abierta por el cursor con nombre (solo lectura)
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass
         release_connection(conn)
 
 
-def execute_query(query: str, params: tuple = ()) -> int:
+def iter_rows(
+    query: str,
+    params: tuple = (),
+    chunk_size: int = 2000,
+    row_type: str = FILA_DICT
+) -> Iterator[Any]:
+    """
+    Igual que iter_chunks() pero devuelve las filas de una en una.
+
+    Ejemplo:
+        for mov in iter_rows("SELECT * FROM movimientos", row_type='namedtuple'):
+            total += mov.cantidad
+    """
+    chunks = iter_chunks(query, params, chunk_size, row_type)
+    try:
+        for bloque in chunks:
+            yield from bloque
+    finally:
+        chunks.close()
+
+
+def execute_query(
+    query: str,
+    params: tuple = (),
+    tx: Optional[Transaccion] = None,
+    reintentable: bool = False
+) -> int:
     """
     Ejecuta una consulta de escritura (INSERT, UPDATE, DELETE)
     y confirma automáticamente.
 
+    Con tx no confirma ni deshace: lo hace transaccion() al terminar el bloque.
+
+    reintentable=True indica que repetir la escritura no tiene efectos dobles
+    (UPDATE ... SET x = valor fijo, DELETE por clave...): si se pierde la
+    conexión se repite con otra. Sin él no se reintenta nunca, porque el
+    servidor pudo confirmar la escritura antes de que se cortara la conexión.
+
     Returns:
         Para INSERT con RETURNING: el ID del registro insertado
         Para UPDATE/DELETE: número de filas afectadas
@@ -159,11 +832,19 @@ def execute_query(query: str, params: tuple = ()) -> int:
     Raises:
         psycopg2.Error: Si hay error de base de datos
     """
-    conn = get_connection()
+    if reintentable and tx is None:
+        return _reintentar(lambda: _execute_query(query, params, None), "execute_query")
+    return _execute_query(query, params, tx)
+
+
+def _execute_query(query: str, params: tuple, tx: Optional[Transaccion]) -> int:
+    """Cuerpo de execute_query()."""
+    conn = tx.conn if tx is not None else get_connection()
     try:
         with conn.cursor() as cur:
             cur.execute(query, params)
-            conn.commit()
+            if tx is None:
+                conn.commit()
 
             # PostgreSQL: Si es INSERT con RETURNING, obtener el ID
             if query.strip().upper().startswith('INSERT'):
@@ -179,23 +860,31 @@ def execute_query(query: str, params: tuple = ()) -> int:
                 # UPDATE/DELETE: devolver rowcount
                 return cur.rowcount
     except psycopg2.IntegrityError as e:
-        conn.rollback()
-        log_error(f"Error de integridad: {e}\n{query}\nParams: {params}")
+        _deshacer(conn, tx)
+        log_aviso(f"Error de integridad: {e}\n{query}\nParams: {params}")
         raise
     except psycopg2.OperationalError as e:
-        conn.rollback()
+        _deshacer(conn, tx)
         log_error(f"Error operacional BD: {e}\n{query}\nParams: {params}")
         raise
     except psycopg2.Error as e:
-        conn.rollback()
+        _deshacer(conn, tx)
         log_error(f"Error de BD: {e}\n{query}\nParams: {params}")
         raise
     except Exception as e:
-        conn.rollback()
+        _deshacer(conn, tx)
         log_error(f"Error inesperado ejecutando query: {e}\n{query}\nParams: {params}")
         raise
     finally:
-        release_connection(conn)
+        if tx is None:
+            release_connection(conn)
+
+
+def _deshacer(conn, tx: Optional[Transaccion]) -> None:
+    # Dentro de una transacción el rollback lo hace transaccion() al propagarse
+    # el error; con la conexión perdida no hay nada que deshacer
+    if tx is None and not conn.closed:
+        conn.rollback()
 
 
 # Alias de compatibilidad
@@ -206,12 +895,12 @@ exec_query = execute_query
 # ----------------------------------------
 # INICIALIZACIÓN DE BASE DE DATOS
 # ----------------------------------------
-def init_db_if_missing(schema_file: str = "schema_postgres.sql") -> None:
+def init_db_if_missing(schema_file: str = "schema_postgres_full.sql") -> None:
     """
     Crea la base de datos PostgreSQL si no existe, aplicando el esquema.
 
     Args:
-        schema_file: Nombre del archivo de schema (por defecto: schema_postgres.sql)
+        schema_file: Nombre del archivo de schema (por defecto: schema_postgres_full.sql)
     """
     # Verificar si hay tablas
     try:
@@ -231,7 +920,7 @@ def init_db_if_missing(schema_file: str = "schema_postgres.sql") -> None:
         print(f"[DB] Error al verificar tablas PostgreSQL: {e}")
         return
 
-    # Inicializar con schema_postgres.sql
+    # Inicializar con el esquema
     schema_path = PROJECT_ROOT / "db" / schema_file
 
     if not schema_path.exists():
@@ -254,23 +943,66 @@ def init_db_if_missing(schema_file: str = "schema_postgres.sql") -> None:
     finally:
         release_connection(conn)
 
+    asegurar_particiones_movimientos()
+
+
+def asegurar_particiones_movimientos(anio: Optional[int] = None) -> int:
+    """
+    Crea, si faltan, las particiones de movimientos del año en curso y del
+    siguiente (crear_particiones_movimientos).
+
+    Sin ellas los movimientos nuevos se acumulan en movimientos_default. Se
+    llama al inicializar la BD y en cada arranque de la aplicación; con las
+    particiones ya creadas solo cuesta una consulta. Si movimientos no está
+    particionada no hace nada, y si falla (p. ej. el usuario no puede crear
+    tablas) deja un aviso en el log.
+
+    Returns:
+        Número de particiones creadas
+    """
+    anio = anio or time.localtime().tm_year
+    try:
+        with transaccion() as tx:
+            with tx.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT to_regprocedure('crear_particiones_movimientos(integer, integer)') IS NOT NULL
+                       AND EXISTS (SELECT 1 FROM pg_partitioned_table
+                                   WHERE partrelid = to_regclass('movimientos'))
+                """)
+                if not cur.fetchone()[0]:
+                    return 0
+                cur.execute("SELECT crear_particiones_movimientos(%s, %s)", (anio, anio + 1))
+                creadas = cur.fetchone()[0]
+    except Exception as e:
+        log_aviso(f"No se pudieron crear las particiones de movimientos {anio}-{anio + 1}: {e}")
+        return 0
+
+    if creadas:
+        _logger_bd.info(f"Creadas {creadas} particiones de movimientos ({anio}-{anio + 1})")
+    return creadas
+
 
 # ----------------------------------------
 # LOGGING BÁSICO
 # ----------------------------------------
 def log_error(message: str) -> None:
     """
-    Registra errores o eventos en /logs/app.log
+    Registra errores de base de datos en el log central (src.core.logger).
+
+    Antes abría y escribía logs/app.log en cada llamada, en el hilo que hacía
+    la consulta; ahora solo encola el registro y la escritura la hace el hilo
+    del QueueListener.
     """
-    try:
-        with open(LOG_PATH, "a", encoding="utf-8") as f:
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f"[{timestamp}] [ERROR] {message}\n")
-    except (IOError, OSError):
-        # Evitar bucles si hay fallo en logging
-        # No podemos hacer nada si no podemos escribir al log
-        pass
+    _logger_bd.error(message)
+
+
+def log_aviso(message: str) -> None:
+    """
+    Registra como aviso (WARNING) un fallo de base de datos que el llamador
+    tiene previsto y resuelve: duplicados que el servicio traduce a un mensaje,
+    un valor de configuración que se sustituye por el de defecto...
+    """
+    _logger_bd.warning(message)
 
 
 # ----------------------------------------
@@ -291,15 +1023,41 @@ def hash_pwd(password: str) -> str:
     return hashlib.sha256(password.encode("utf-8")).hexdigest()
 
 
-def hash_password_seguro(password: str) -> str:
+# Coste bcrypt por defecto si config.ini no define [security] BCRYPT_ROUNDS.
+# Usar scripts/calibrar_bcrypt.py para elegirlo según el hardware.
+BCRYPT_ROUNDS_DEFECTO = 12
+BCRYPT_ROUNDS_MIN = 10
+BCRYPT_ROUNDS_MAX = 16
+_bcrypt_rounds: Optional[int] = None
+
+
+def get_bcrypt_rounds() -> int:
+    """
+    Devuelve el factor de coste bcrypt configurado ([security] BCRYPT_ROUNDS
+    en config.ini), acotado a [BCRYPT_ROUNDS_MIN, BCRYPT_ROUNDS_MAX].
+    """
+    global _bcrypt_rounds
+    if _bcrypt_rounds is None:
+        rounds = BCRYPT_ROUNDS_DEFECTO
+        try:
+            rounds = _leer_config().getint('security', 'BCRYPT_ROUNDS', fallback=BCRYPT_ROUNDS_DEFECTO)
+        except (FileNotFoundError, ValueError) as e:
+            log_aviso(f"BCRYPT_ROUNDS no válido, se usa {BCRYPT_ROUNDS_DEFECTO}: {e}")
+        _bcrypt_rounds = max(BCRYPT_ROUNDS_MIN, min(BCRYPT_ROUNDS_MAX, rounds))
+    return _bcrypt_rounds
+
+
+def hash_password_seguro(password: str, rounds: Optional[int] = None) -> str:
     """
     Hash seguro de contraseña usando bcrypt.
 
-    Genera un hash con salt automático y 12 rondas de hashing.
+    Genera un hash con salt automático y el factor de coste configurado
+    (get_bcrypt_rounds(), 12 por defecto).
     Es computacionalmente costoso para prevenir ataques de fuerza bruta.
 
     Args:
         password: Contraseña en texto plano
+        rounds: Factor de coste; None = el configurado
 
     Returns:
         Hash bcrypt en formato string (incluye salt y configuración)
@@ -315,21 +1073,57 @@ def hash_password_seguro(password: str) -> str:
     if not password:
         return ""
 
-    # Generar salt y hashear (12 rondas = seguro y rápido en 2025)
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=rounds or get_bcrypt_rounds())
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
 
     # Retornar como string para almacenar en BD
     return hashed.decode('utf-8')
 
 
+def rounds_de_hash(password_hash: str) -> Optional[int]:
+    """Devuelve el factor de coste de un hash bcrypt ('$2b$12$...' -> 12), o None."""
+    if es_hash_envuelto(password_hash):
+        password_hash = password_hash[len(PREFIJO_BCRYPT_SHA256):]
+    if not password_hash or not password_hash.startswith('$2'):
+        return None
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def necesita_rehash(password_hash: str) -> bool:
+    """
+    Indica si un hash debe regenerarse tras un login correcto: hashes legacy
+    (SHA256), SHA256 envueltos en bcrypt o bcrypt con un coste menor que el
+    configurado.
+    """
+    if es_hash_legacy(password_hash) or es_hash_envuelto(password_hash):
+        return True
+    rounds = rounds_de_hash(password_hash)
+    return rounds is not None and rounds < get_bcrypt_rounds()
+
+
+def medir_bcrypt(rounds: int, repeticiones: int = 3) -> float:
+    """
+    Mide el tiempo medio (en milisegundos) de verificar una contraseña con
+    el coste indicado en esta máquina. Lo usa scripts/calibrar_bcrypt.py.
+    """
+    import time
+    hashed = bcrypt.hashpw(b"calibracion-bcrypt", bcrypt.gensalt(rounds=rounds))
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        bcrypt.checkpw(b"calibracion-bcrypt", hashed)
+    return (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
 def verificar_password(password: str, password_hash: str) -> bool:
     """
     Verifica si una contraseña coincide con su hash bcrypt.
 
     Args:
         password: Contraseña en texto plano a verificar
-        password_hash: Hash bcrypt almacenado en BD
+        password_hash: Hash almacenado en BD (bcrypt o bcrypt-sha256$...)
 
     Returns:
         True si la contraseña es correcta, False en caso contrario
@@ -349,6 +1143,13 @@ def verificar_password(password: str, password_hash: str) -> bool:
         return False
 
     try:
+        if es_hash_envuelto(password_hash):
+            # bcrypt(sha256(password)): migración masiva sin texto plano
+            return bcrypt.checkpw(
+                hash_pwd(password).encode('utf-8'),
+                password_hash[len(PREFIJO_BCRYPT_SHA256):].encode('utf-8')
+            )
+
         # bcrypt.checkpw maneja la comparación de forma segura
         return bcrypt.checkpw(
             password.encode('utf-8'),
@@ -359,6 +1160,35 @@ def verificar_password(password: str, password_hash: str) -> bool:
         return False
 
 
+# Hashes SHA256 legacy migrados en bloque sin conocer la contraseña:
+# 'bcrypt-sha256$' + bcrypt(sha256_hex(password)).
+PREFIJO_BCRYPT_SHA256 = 'bcrypt-sha256$'
+
+
+def es_hash_envuelto(password_hash: str) -> bool:
+    """Indica si el hash es un SHA256 legacy envuelto en bcrypt."""
+    return bool(password_hash) and password_hash.startswith(PREFIJO_BCRYPT_SHA256)
+
+
+def envolver_hash_legacy(hash_sha256: str, rounds: Optional[int] = None) -> str:
+    """
+    Envuelve un hash SHA256 legacy en bcrypt sin necesitar la contraseña.
+
+    verificar_password() acepta el resultado, y el primer login correcto lo
+    sustituye por un bcrypt normal (necesita_rehash() devuelve True).
+
+    Args:
+        hash_sha256: Hash SHA256 hexadecimal guardado en usuarios.pass_hash
+        rounds: Factor de coste; None = el configurado
+
+    Returns:
+        'bcrypt-sha256$$2b$12$...'
+    """
+    salt = bcrypt.gensalt(rounds=rounds or get_bcrypt_rounds())
+    envuelto = bcrypt.hashpw(hash_sha256.lower().encode('utf-8'), salt)
+    return PREFIJO_BCRYPT_SHA256 + envuelto.decode('utf-8')
+
+
 def es_hash_legacy(password_hash: str) -> bool:
     """
     Determina si un hash de contraseña es del formato legacy (SHA256).
@@ -387,10 +1217,10 @@ def es_hash_legacy(password_hash: str) -> bool:
 # TEST MANUAL
 # ----------------------------------------
 if __name__ == "__main__":
+    _leer_config()
     print(f"Motor BD: PostgreSQL")
     print(f"Host: {config.get('database', 'HOST')}")
     print(f"Base de datos: {config.get('database', 'NAME')}")
-    print(f"Ruta LOG: {LOG_PATH}")
 
     try:
         conn = get_connection()
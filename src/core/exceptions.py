@@ -97,12 +97,14 @@ class BusinessRuleError(ClimatotAlmacenError):
 
 class InsufficientStockError(BusinessRuleError):
     """Stock insuficiente para realizar operación"""
-    def __init__(self, articulo: str, solicitado: float, disponible: float):
+    def __init__(self, articulo: str, solicitado: float, disponible: float, faltas=None):
         mensaje = (
             f"Stock insuficiente de '{articulo}'. "
             f"Solicitado: {solicitado}, Disponible: {disponible}"
         )
         super().__init__(mensaje)
+        # Todas las faltas de la operación (dicts con articulo_id, requerido, disponible...)
+        self.faltas = faltas or []
 
 
 class DuplicateEntryError(BusinessRuleError):
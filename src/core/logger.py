@@ -2,15 +2,25 @@
 Sistema de Logging Centralizado para ClimatotAlmacen
 Este módulo configura el logging de toda la aplicación
 """
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
 import sys
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from datetime import datetime
 
 # ========================================
 # CONFIGURACIÓN DEL LOGGER
 # ========================================
+# Los módulos escriben en una cola (QueueHandler, no bloquea); un hilo
+# aparte (QueueListener) formatea y hace la E/S a disco y consola. Así
+# ni el hilo de la interfaz ni los que consultan la BD esperan al disco.
 
 # Crear carpeta de logs si no existe
 LOG_DIR = Path(__file__).parent.parent.parent / "logs"
@@ -19,32 +29,106 @@ LOG_DIR.mkdir(exist_ok=True)
 # Archivo principal de logs
 LOG_FILE = LOG_DIR / "climatot.log"
 
+# Archivo JSON-lines (solo si formato = json)
+LOG_FILE_JSON = LOG_DIR / "climatot.jsonl"
+
+# Formatos de archivo disponibles
+FORMATO_TEXTO = "texto"
+FORMATO_JSON = "json"
+
+# Atributos estándar de LogRecord: lo demás son campos extra (duracion_ms...)
+_CAMPOS_ESTANDAR = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class FormateadorJSON(logging.Formatter):
+    """
+    Una línea JSON por registro. Incluye los campos pasados con `extra=`
+    (p. ej. duracion_ms, filas), que es donde van los tiempos de medir().
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "modulo": record.module,
+            "funcion": record.funcName,
+            "hilo": record.threadName,
+            "mensaje": record.getMessage(),
+        }
+        for clave, valor in record.__dict__.items():
+            if clave not in _CAMPOS_ESTANDAR and not clave.startswith("_"):
+                datos[clave] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos["excepcion"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class _QueueHandlerEstructurado(QueueHandler):
+    """
+    QueueHandler que deja la traza de la excepción en exc_text en lugar de
+    pegarla al mensaje, para que el JSON la tenga en su propio campo.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def _formato_configurado() -> str:
+    """
+    Formato del archivo de log: variable CLIMATOT_LOG_FORMATO o
+    [logging] formato en config/app.ini ('texto' por defecto).
+    """
+    formato = os.getenv("CLIMATOT_LOG_FORMATO")
+    if not formato:
+        try:
+            from src.core.config_utils import load_config
+            formato = load_config().get("logging", "formato", fallback=FORMATO_TEXTO)
+        except Exception:
+            formato = FORMATO_TEXTO
+    formato = formato.strip().lower()
+    return formato if formato in (FORMATO_TEXTO, FORMATO_JSON) else FORMATO_TEXTO
+
+
 # Crear el logger principal
 logger = logging.getLogger("ClimatotAlmacen")
 logger.setLevel(logging.DEBUG)  # Captura TODO (desde DEBUG hasta CRITICAL)
 
+_listener = None
+
 # Evitar duplicados si ya está configurado
 if not logger.handlers:
     
     # ========================================
-    # HANDLER 1: Archivo rotativo
+    # HANDLER 1: Archivo rotativo (texto o JSON-lines)
     # ========================================
     # Rotación: 10MB máximo, mantiene 20 archivos históricos
+    formato_archivo = _formato_configurado()
     file_handler = RotatingFileHandler(
-        LOG_FILE,
+        LOG_FILE_JSON if formato_archivo == FORMATO_JSON else LOG_FILE,
         maxBytes=10 * 1024 * 1024,  # 10 MB
         backupCount=20,              # 20 archivos de respaldo
         encoding='utf-8'
     )
     file_handler.setLevel(logging.DEBUG)
     
-    # Formato para archivo: incluye TODO el detalle
-    file_formatter = logging.Formatter(
-        '%(asctime)s | %(levelname)-8s | %(name)s | %(funcName)s | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+    if formato_archivo == FORMATO_JSON:
+        file_handler.setFormatter(FormateadorJSON())
+    else:
+        # Formato para archivo: incluye TODO el detalle
+        file_formatter = logging.Formatter(
+            '%(asctime)s | %(levelname)-8s | %(name)s | %(funcName)s | %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        file_handler.setFormatter(file_formatter)
     
     # ========================================
     # HANDLER 2: Consola (solo errores)
@@ -57,7 +141,54 @@ if not logger.handlers:
         '%(levelname)s: %(message)s'
     )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+
+    # ========================================
+    # COLA: el logger solo encola; el listener escribe
+    # ========================================
+    _cola_logs = queue.SimpleQueue()
+    logger.addHandler(_QueueHandlerEstructurado(_cola_logs))
+    _listener = QueueListener(
+        _cola_logs, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def detener_logging():
+    """Vacía la cola y detiene el hilo de escritura (se llama al salir)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(detener_logging)
+
+
+@contextmanager
+def medir(operacion: str, nivel: int = logging.INFO, **campos):
+    """
+    Registra cuánto tarda un bloque, con la duración como campo estructurado.
+
+    Uso:
+        with medir("informe_furgoneta", furgoneta_id=3) as extra:
+            ...
+            extra["filas"] = len(filas)
+
+    En formato JSON sale como {"operacion": ..., "duracion_ms": ..., "filas": ...}.
+    """
+    extra = dict(campos)
+    inicio = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        extra["operacion"] = operacion
+        extra["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        detalles = " | ".join(f"{k}={v}" for k, v in extra.items() if k not in ("operacion", "duracion_ms"))
+        mensaje = f"TIEMPO | {operacion} | {extra['duracion_ms']} ms"
+        if detalles:
+            mensaje += f" | {detalles}"
+        # stacklevel=3: atribuir el registro a quien usa el with, no a medir()
+        logger.log(nivel, mensaje, extra=extra, stacklevel=3)
 
 # ========================================
 # FUNCIONES DE AYUDA
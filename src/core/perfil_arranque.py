@@ -0,0 +1,181 @@
+# ========================================
+# PERFIL DE ARRANQUE (--profile-startup)
+# ========================================
+"""
+Mide cuánto tarda el arranque de la aplicación hasta mostrar el login.
+
+Se activa con `python app.py --profile-startup`. Registra:
+- El tiempo de importación de cada módulo (propio y acumulado, incluyendo
+  lo que importa a su vez), mediante un finder en sys.meta_path.
+- El tiempo de las fases de inicialización marcadas con `fase(nombre)`
+  (crear QApplication, construir el login, abrir el pool...).
+
+Al mostrarse el login se vuelca un informe a consola y a
+logs/perfil_arranque_<fecha>.txt.
+
+Solo usa la librería estándar: debe poder importarse antes que PySide6 y
+que cualquier módulo de src para que sus tiempos queden medidos.
+"""
+import sys
+import time
+import importlib.abc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_inicio = time.perf_counter()
+_activo = False
+
+# modulo -> [acumulado, propio]
+_tiempos_import: Dict[str, List[float]] = {}
+# Pila de imports en curso: [modulo, inicio, tiempo_hijos]
+_pila: List[list] = []
+# (fase, segundos, instante desde el inicio)
+_fases: List[Tuple[str, float, float]] = []
+
+
+class _LoaderCronometrado(importlib.abc.Loader):
+    """Envuelve el loader real y mide exec_module()."""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        nombre = module.__name__
+        entrada = [nombre, time.perf_counter(), 0.0]
+        _pila.append(entrada)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            _pila.pop()
+            acumulado = time.perf_counter() - entrada[1]
+            propio = acumulado - entrada[2]
+            _tiempos_import[nombre] = [acumulado, propio]
+            if _pila:
+                _pila[-1][2] += acumulado
+
+    def __getattr__(self, nombre):
+        # get_source, get_filename, is_package... van al loader real
+        return getattr(self._loader, nombre)
+
+
+class _FinderCronometrado(importlib.abc.MetaPathFinder):
+    """Busca con el resto de finders y envuelve el loader encontrado."""
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _LoaderCronometrado(spec.loader)
+                return spec
+        return None
+
+
+_finder = _FinderCronometrado()
+
+
+def activar() -> None:
+    """Empieza a medir imports. Llamar lo antes posible en app.py."""
+    global _activo
+    if not _activo:
+        sys.meta_path.insert(0, _finder)
+        _activo = True
+
+
+def desactivar() -> None:
+    """Deja de medir imports (las fases siguen pudiéndose registrar)."""
+    global _activo
+    if _finder in sys.meta_path:
+        sys.meta_path.remove(_finder)
+    _activo = False
+
+
+def esta_activo() -> bool:
+    return _activo
+
+
+@contextmanager
+def fase(nombre: str):
+    """Mide una fase de inicialización. No hace nada si el perfil no está activo."""
+    if not _activo:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        t1 = time.perf_counter()
+        _fases.append((nombre, t1 - t0, t1 - _inicio))
+
+
+def marcar(nombre: str) -> None:
+    """Registra un instante del arranque (p. ej. 'Login en pantalla')."""
+    if _activo:
+        _fases.append((nombre, 0.0, time.perf_counter() - _inicio))
+
+
+def informe(top: int = 30) -> str:
+    """Genera el informe de texto con fases e imports más lentos."""
+    total = time.perf_counter() - _inicio
+    lineas = [
+        "=" * 72,
+        f"PERFIL DE ARRANQUE - {datetime.now():%Y-%m-%d %H:%M:%S}",
+        f"Tiempo total hasta el informe: {total * 1000:.0f} ms",
+        "=" * 72,
+        "",
+        "FASES DE INICIALIZACIÓN",
+        f"{'fase':<44}{'duración':>12}{'instante':>14}",
+    ]
+    for nombre, duracion, instante in _fases:
+        lineas.append(f"{nombre:<44}{duracion * 1000:>10.1f}ms{instante * 1000:>12.0f}ms")
+
+    # Tiempo de import agregado por paquete raíz (PySide6, src, psycopg2...)
+    por_paquete: Dict[str, float] = {}
+    for nombre, (_, propio) in _tiempos_import.items():
+        raiz = nombre.split('.')[0]
+        por_paquete[raiz] = por_paquete.get(raiz, 0.0) + propio
+
+    lineas += [
+        "",
+        f"IMPORTS POR PAQUETE ({len(_tiempos_import)} módulos)",
+        f"{'paquete':<44}{'propio':>12}",
+    ]
+    for raiz, propio in sorted(por_paquete.items(), key=lambda x: -x[1])[:15]:
+        lineas.append(f"{raiz:<44}{propio * 1000:>10.1f}ms")
+
+    lineas += [
+        "",
+        f"MÓDULOS MÁS LENTOS (top {top}, por tiempo acumulado)",
+        f"{'módulo':<52}{'acumulado':>10}{'propio':>10}",
+    ]
+    ordenados = sorted(_tiempos_import.items(), key=lambda x: -x[1][0])[:top]
+    for nombre, (acumulado, propio) in ordenados:
+        lineas.append(f"{nombre[:51]:<52}{acumulado * 1000:>8.1f}ms{propio * 1000:>8.1f}ms")
+
+    lineas.append("=" * 72)
+    return "\n".join(lineas)
+
+
+def volcar_informe(directorio: Optional[Path] = None, top: int = 30) -> Optional[Path]:
+    """Imprime el informe por consola y lo guarda en logs/. Devuelve la ruta del archivo."""
+    texto = informe(top)
+    print(texto)
+
+    directorio = directorio or Path(__file__).parent.parent.parent / "logs"
+    try:
+        directorio.mkdir(parents=True, exist_ok=True)
+        ruta = directorio / f"perfil_arranque_{datetime.now():%Y%m%d_%H%M%S}.txt"
+        ruta.write_text(texto, encoding="utf-8")
+    except OSError:
+        return None
+
+    from src.core.logger import logger
+    logger.info(f"Perfil de arranque guardado en {ruta}")
+    return ruta
@@ -0,0 +1,150 @@
+# ========================================
+# TELEMETRÍA DE RENDIMIENTO POR PANTALLA
+# ========================================
+"""
+Tiempos de carga de cada ventana, separados por fase:
+
+- consulta: tiempo esperando a la BD (service/repo)
+- proceso:  post-procesado en Python (filtros, cálculos, agrupaciones)
+- render:   volcado de los datos a la tabla/widgets
+- carga:    consulta y render juntos, cuando el código no los separa
+
+Las muestras se guardan solo en memoria (las últimas MAX_MUESTRAS por
+pantalla y fase) y se resumen en percentiles para el diálogo de
+diagnóstico del administrador. Opcionalmente se suben a la tabla
+`metricas_rendimiento` para comparar equipos (ver metricas_repo).
+
+Uso en una ventana:
+    with telemetria.medir(self, telemetria.FASE_CONSULTA):
+        datos = service.obtener_...()
+    with telemetria.medir(self, telemetria.FASE_RENDER):
+        self.cargar_tabla(datos)
+
+o, en métodos largos que hacen todo seguido, con tiempos parciales:
+    crono = telemetria.Cronometro(self)
+    rows = service.obtener_...()
+    crono.marcar(telemetria.FASE_CONSULTA)
+    ...bucle que rellena la tabla...
+    crono.marcar(telemetria.FASE_RENDER)
+
+No depende de Qt ni de la BD: medir cuesta dos perf_counter() y un append.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+FASE_CONSULTA = "consulta"
+FASE_PROCESO = "proceso"
+FASE_RENDER = "render"
+FASE_CARGA = "carga"
+FASE_GUARDADO = "guardado"
+
+# Orden en que se muestran las fases en el diagnóstico
+ORDEN_FASES = (FASE_CONSULTA, FASE_PROCESO, FASE_RENDER, FASE_CARGA, FASE_GUARDADO)
+
+# Muestras que se conservan por (pantalla, fase); las más antiguas se descartan
+MAX_MUESTRAS = 500
+
+# (pantalla, fase) -> duraciones en ms
+_muestras: Dict[Tuple[str, str], Deque[float]] = {}
+_lock = threading.Lock()
+
+
+def _nombre_pantalla(pantalla: Union[str, Any]) -> str:
+    """Admite el nombre o la propia ventana (se usa el nombre de su clase)."""
+    return pantalla if isinstance(pantalla, str) else type(pantalla).__name__
+
+
+def registrar(pantalla: Union[str, Any], fase: str, duracion_ms: float) -> None:
+    """Añade una muestra de duración (en ms) para una pantalla y fase."""
+    clave = (_nombre_pantalla(pantalla), fase)
+    with _lock:
+        cola = _muestras.get(clave)
+        if cola is None:
+            cola = _muestras[clave] = deque(maxlen=MAX_MUESTRAS)
+        cola.append(duracion_ms)
+
+
+@contextmanager
+def medir(pantalla: Union[str, Any], fase: str):
+    """Mide el bloque y lo registra como una muestra de `fase`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(pantalla, fase, (time.perf_counter() - inicio) * 1000)
+
+
+class Cronometro:
+    """
+    Tiempos parciales: cada marcar(fase) registra lo transcurrido desde la
+    marca anterior (o desde la creación) como una muestra de esa fase.
+    """
+
+    def __init__(self, pantalla: Union[str, Any]):
+        self.pantalla = _nombre_pantalla(pantalla)
+        self._ultimo = time.perf_counter()
+
+    def marcar(self, fase: str) -> float:
+        """Registra el parcial y devuelve su duración en ms."""
+        ahora = time.perf_counter()
+        duracion_ms = (ahora - self._ultimo) * 1000
+        self._ultimo = ahora
+        registrar(self.pantalla, fase, duracion_ms)
+        return duracion_ms
+
+
+def percentil(valores_ordenados: List[float], p: float) -> float:
+    """Percentil p (0-100) con interpolación lineal sobre una lista ya ordenada."""
+    if not valores_ordenados:
+        return 0.0
+    k = (len(valores_ordenados) - 1) * p / 100
+    i = int(k)
+    if i + 1 >= len(valores_ordenados):
+        return valores_ordenados[-1]
+    return valores_ordenados[i] + (valores_ordenados[i + 1] - valores_ordenados[i]) * (k - i)
+
+
+def _orden_fase(fase: str) -> Tuple[int, str]:
+    # Admite subfases ("carga.stock"): ordenan por la fase base
+    base = fase.split(".", 1)[0]
+    return (ORDEN_FASES.index(base) if base in ORDEN_FASES else len(ORDEN_FASES), fase)
+
+
+def estadisticas(pantalla: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Resumen por pantalla y fase.
+
+    Returns:
+        Lista de dicts con: pantalla, fase, muestras, media_ms, p50_ms,
+        p90_ms, p99_ms, max_ms; ordenada por pantalla y fase
+    """
+    with _lock:
+        copia = {clave: list(cola) for clave, cola in _muestras.items()
+                 if pantalla is None or clave[0] == pantalla}
+
+    resultado = []
+    for (nombre, fase), valores in copia.items():
+        if not valores:
+            continue
+        valores.sort()
+        resultado.append({
+            'pantalla': nombre,
+            'fase': fase,
+            'muestras': len(valores),
+            'media_ms': round(sum(valores) / len(valores), 1),
+            'p50_ms': round(percentil(valores, 50), 1),
+            'p90_ms': round(percentil(valores, 90), 1),
+            'p99_ms': round(percentil(valores, 99), 1),
+            'max_ms': round(valores[-1], 1),
+        })
+    resultado.sort(key=lambda e: (e['pantalla'], _orden_fase(e['fase'])))
+    return resultado
+
+
+def reiniciar() -> None:
+    """Borra todas las muestras acumuladas."""
+    with _lock:
+        _muestras.clear()
@@ -1,19 +1,11 @@
 """
 Repositorios - Capa de acceso a datos
+
+Los submódulos se importan bajo demanda (PEP 562): `from src.repos import x`
+y `src.repos.x` siguen funcionando, pero importar el paquete ya no arrastra
+todos los módulos ni sus dependencias al arrancar la aplicación.
 """
-from . import albaranes_repo
-from . import almacenes_repo
-from . import articulos_repo
-from . import familias_repo
-from . import historial_repo
-from . import inventarios_repo
-from . import movimientos_repo
-from . import operarios_repo
-from . import proveedores_repo
-from . import sistema_repo
-from . import stock_repo
-from . import ubicaciones_repo
-from . import usuarios_repo
+import importlib
 
 __all__ = [
     'albaranes_repo',
@@ -22,6 +14,7 @@ __all__ = [
     'familias_repo',
     'historial_repo',
     'inventarios_repo',
+    'metricas_repo',
     'movimientos_repo',
     'operarios_repo',
     'proveedores_repo',
@@ -30,3 +23,9 @@ __all__ = [
     'ubicaciones_repo',
     'usuarios_repo',
 ]
+
+
+def __getattr__(nombre):
+    if nombre in __all__:
+        return importlib.import_module(f"{__name__}.{nombre}")
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
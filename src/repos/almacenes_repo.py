@@ -3,6 +3,7 @@ Repositorio de Almacenes - Consultas SQL para gestión de almacenes y furgonetas
 """
 from typing import List, Dict, Any, Optional
 from src.core.db_utils import fetch_all, fetch_one, execute_query
+from src.core import cache_maestros
 
 
 def get_todos(filtro_texto: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
@@ -25,14 +26,7 @@ def get_todos(filtro_texto: Optional[str] = None, limit: int = 1000) -> List[Dic
             LIMIT %s
         """
         return fetch_all(sql, (f"%{filtro_texto}%", limit))
-    else:
-        sql = """
-            SELECT id, nombre, tipo
-            FROM almacenes
-            ORDER BY nombre
-            LIMIT %s
-        """
-        return fetch_all(sql, (limit,))
+    return cache_maestros.almacenes()[:limit]
 
 
 def get_by_id(almacen_id: int) -> Optional[Dict[str, Any]]:
@@ -57,13 +51,7 @@ def get_by_tipo(tipo: str) -> List[Dict[str, Any]]:
     Returns:
         Lista de almacenes del tipo especificado
     """
-    sql = """
-        SELECT id, nombre, tipo
-        FROM almacenes
-        WHERE tipo = %s
-        ORDER BY nombre
-    """
-    return fetch_all(sql, (tipo,))
+    return cache_maestros.almacenes(tipo)
 
 
 def get_almacenes() -> List[Dict[str, Any]]:
@@ -88,13 +76,16 @@ def crear_almacen(nombre: str, tipo: str = 'almacen') -> int:
         ID del almacén creado
     """
     sql = "INSERT INTO almacenes(nombre, tipo) VALUES(%s, %s)"
-    return execute_query(sql, (nombre, tipo))
+    nuevo_id = execute_query(sql, (nombre, tipo))
+    cache_maestros.invalidar('almacenes')
+    return nuevo_id
 
 
 def actualizar_almacen(almacen_id: int, nombre: str, tipo: str) -> bool:
     """Actualiza un almacén existente."""
     sql = "UPDATE almacenes SET nombre=%s, tipo=%s WHERE id=%s"
     execute_query(sql, (nombre, tipo, almacen_id))
+    cache_maestros.invalidar('almacenes')
     return True
 
 
@@ -102,6 +93,7 @@ def eliminar_almacen(almacen_id: int) -> bool:
     """Elimina un almacén (fallará si tiene movimientos asociados)."""
     sql = "DELETE FROM almacenes WHERE id=%s"
     execute_query(sql, (almacen_id,))
+    cache_maestros.invalidar('almacenes')
     return True
 
 
@@ -140,6 +132,7 @@ def get_stock_almacen(almacen_id: int) -> List[Dict[str, Any]]:
             ), 0) as stock
         FROM articulos a
         LEFT JOIN movimientos m ON a.id = m.articulo_id
+                               AND m.fecha >= fecha_apertura_movimientos()
         WHERE a.activo = 1
         GROUP BY a.id, a.nombre, a.u_medida
         HAVING COALESCE(SUM(
@@ -172,7 +165,8 @@ def get_estadisticas_almacen(almacen_id: int) -> Dict[str, Any]:
                 END
             ), 0) as cantidad_total
         FROM movimientos m
-        WHERE m.origen_id = %s OR m.destino_id = %s
+        WHERE (m.origen_id = %s OR m.destino_id = %s)
+          AND m.fecha >= fecha_apertura_movimientos()
     """
     result = fetch_one(sql, (almacen_id, almacen_id, almacen_id, almacen_id))
     return result if result else {}
@@ -3,6 +3,7 @@ Repositorio de Artículos - Consultas SQL para gestión de artículos del almac
 """
 from typing import List, Dict, Any, Optional
 from src.core.db_utils import fetch_all, fetch_one, execute_query, get_con
+from src.core import cache_maestros
 
 
 # ========================================
@@ -52,6 +53,8 @@ def get_todos(
             a.ean,
             a.ref_proveedor,
             a.nombre,
+            a.palabras_clave,
+            a.familia_id,
             f.nombre AS familia_nombre,
             a.u_medida,
             a.min_alerta,
@@ -293,8 +296,7 @@ def get_familias() -> List[Dict[str, Any]]:
     Returns:
         Lista de familias ordenadas por nombre
     """
-    sql = "SELECT id, nombre FROM familias ORDER BY nombre"
-    return fetch_all(sql)
+    return cache_maestros.familias()
 
 
 def get_ubicaciones() -> List[Dict[str, Any]]:
@@ -304,8 +306,7 @@ def get_ubicaciones() -> List[Dict[str, Any]]:
     Returns:
         Lista de ubicaciones ordenadas por nombre
     """
-    sql = "SELECT id, nombre FROM ubicaciones ORDER BY nombre"
-    return fetch_all(sql)
+    return cache_maestros.ubicaciones()
 
 
 def get_proveedores() -> List[Dict[str, Any]]:
@@ -315,8 +316,7 @@ def get_proveedores() -> List[Dict[str, Any]]:
     Returns:
         Lista de proveedores ordenados por nombre
     """
-    sql = "SELECT id, nombre FROM proveedores ORDER BY nombre"
-    return fetch_all(sql)
+    return cache_maestros.proveedores()
 
 
 def verificar_movimientos(articulo_id: int) -> bool:
@@ -358,14 +358,17 @@ def get_articulos_bajo_minimo() -> List[Dict[str, Any]]:
     return fetch_all(sql)
 
 
-def buscar_articulos_por_texto(texto: str, limit: int = 10) -> List[Dict[str, Any]]:
+def buscar_articulos_por_texto(texto: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
     """
     Busca artículos por EAN, referencia, nombre o palabras clave.
-    Los resultados se ordenan por relevancia: coincidencias exactas primero.
+    Los resultados se ordenan por relevancia: coincidencias exactas primero,
+    y a igual relevancia por nombre e id, para que las páginas sean estables
+    entre llamadas.
 
     Args:
         texto: Texto de búsqueda (EAN, referencia, nombre, etc.)
         limit: Número máximo de resultados a devolver
+        offset: Resultados a saltar (página * limit)
 
     Returns:
         Lista de artículos ordenados por relevancia
@@ -385,13 +388,14 @@ def buscar_articulos_por_texto(texto: str, limit: int = 10) -> List[Dict[str, An
                 WHEN ref_proveedor = %s THEN 2
                 WHEN nombre ILIKE %s THEN 3
                 ELSE 4
-            END
-        LIMIT %s
+            END,
+            nombre, id
+        LIMIT %s OFFSET %s
     """
     params = (
         f"%{texto}%", f"%{texto}%", f"%{texto}%", f"%{texto}%",
         texto, texto, f"{texto}%",
-        limit
+        limit, offset
     )
     return fetch_all(sql, params)
 
@@ -513,10 +517,13 @@ def buscar_articulo_exacto(
         WHERE a.activo=1 AND (a.ean=%s OR a.ref_proveedor=%s)
     """
     params = [texto, texto]
+    # Una sentencia preparada por combinación de filtros (es la consulta del escáner)
+    preparada = "articulo_exacto"
 
     if filtro_proveedor_id:
         query += " AND a.proveedor_id=%s"
         params.append(filtro_proveedor_id)
+        preparada += "_proveedor"
 
     if filtro_almacen_id:
         query += """ AND EXISTS (
@@ -524,10 +531,11 @@ def buscar_articulo_exacto(
             WHERE v.articulo_id=a.id AND v.almacen_id=%s AND v.delta > 0
         )"""
         params.append(filtro_almacen_id)
+        preparada += "_almacen"
 
     query += " LIMIT 1"
 
-    return fetch_one(query, tuple(params))
+    return fetch_one(query, tuple(params), preparada=preparada)
 
 
 def get_ultimas_entradas(articulo_id: int, limit: int = 50) -> List[Dict[str, Any]]:
@@ -557,3 +565,155 @@ def get_ultimas_entradas(articulo_id: int, limit: int = 50) -> List[Dict[str, An
     """
 
     return fetch_all(sql, (articulo_id, limit))
+
+
+def get_ficha(
+    articulo_id: int,
+    fecha_30d: str,
+    tipo: Optional[str] = None,
+    limit_historial: Optional[int] = 50,
+    limit_entradas: int = 50
+) -> Optional[Dict[str, Any]]:
+    """
+    Todos los datos de la ficha de un artículo en una sola consulta.
+
+    Sustituye a get_by_id, stock_repo.get_stock_total_articulo,
+    stock_repo.get_stock_articulo_por_almacen,
+    movimientos_repo.get_movimientos_articulo,
+    movimientos_repo.get_estadisticas_articulo y get_ultimas_entradas:
+    cada bloque es una subconsulta que devuelve JSON, y los movimientos del
+    artículo se leen una vez (CTE mov) para todas las estadísticas.
+
+    Args:
+        articulo_id: ID del artículo
+        fecha_30d: Fecha (YYYY-MM-DD) desde la que cuentan los últimos 30 días
+        tipo: Filtro de tipo del historial (None = todos)
+        limit_historial: Movimientos del historial (None = todos)
+        limit_entradas: Últimas entradas de proveedor
+
+    Returns:
+        Diccionario con las mismas claves que devolvían esas funciones
+        (articulo, stock_total, stock_almacenes, historial, totales,
+        stats_30d, top_ots, ultimas_entradas) más ultimo_movimiento_id y
+        num_movimientos (ver movimientos_repo.get_marca_movimientos_articulo),
+        o None si el artículo no existe
+    """
+    sql = """
+        WITH art AS (
+            SELECT
+                a.id, a.ean, a.ref_proveedor, a.nombre, a.palabras_clave,
+                a.u_medida, a.min_alerta, a.ubicacion_id, a.proveedor_id,
+                a.familia_id, a.marca, a.coste, a.pvp_sin, a.iva, a.activo,
+                u.nombre AS ubicacion_nombre,
+                p.nombre AS proveedor_nombre,
+                f.nombre AS familia_nombre
+            FROM articulos a
+            LEFT JOIN ubicaciones u ON a.ubicacion_id = u.id
+            LEFT JOIN proveedores p ON a.proveedor_id = p.id
+            LEFT JOIN familias f ON a.familia_id = f.id
+            WHERE a.id = %(id)s
+        ),
+        mov AS (
+            SELECT id, fecha, tipo, cantidad, ot
+            FROM movimientos
+            WHERE articulo_id = %(id)s
+        ),
+        stock AS (
+            SELECT almacen_id, SUM(delta) AS stock
+            FROM vw_stock
+            WHERE articulo_id = %(id)s
+            GROUP BY almacen_id
+        )
+        SELECT
+            (SELECT row_to_json(art) FROM art) AS articulo,
+            (SELECT COALESCE(SUM(stock), 0) FROM stock) AS stock_total,
+            (
+                SELECT COALESCE(json_agg(t ORDER BY t.almacen), '[]'::json)
+                FROM (
+                    SELECT alm.id AS almacen_id, alm.nombre AS almacen, s.stock
+                    FROM stock s
+                    JOIN almacenes alm ON alm.id = s.almacen_id
+                    WHERE s.stock > 0
+                ) t
+            ) AS stock_almacenes,
+            (
+                SELECT COALESCE(json_agg(t), '[]'::json)
+                FROM (
+                    SELECT
+                        m.id, m.fecha, m.tipo, m.cantidad, m.coste_unit,
+                        m.motivo, m.ot, m.responsable,
+                        origen.nombre AS origen_nombre,
+                        destino.nombre AS destino_nombre,
+                        op.nombre AS operario_nombre
+                    FROM movimientos m
+                    LEFT JOIN almacenes origen ON m.origen_id = origen.id
+                    LEFT JOIN almacenes destino ON m.destino_id = destino.id
+                    LEFT JOIN operarios op ON m.operario_id = op.id
+                    WHERE m.articulo_id = %(id)s
+                      AND (%(tipo)s::text IS NULL OR m.tipo = %(tipo)s)
+                    ORDER BY m.fecha DESC, m.id DESC
+                    LIMIT %(limit_historial)s
+                ) t
+            ) AS historial,
+            (
+                SELECT row_to_json(t)
+                FROM (
+                    SELECT
+                        SUM(CASE WHEN tipo = 'ENTRADA' THEN cantidad ELSE 0 END) as entradas,
+                        SUM(CASE WHEN tipo IN ('IMPUTACION', 'PERDIDA', 'DEVOLUCION') THEN cantidad ELSE 0 END) as salidas,
+                        SUM(CASE WHEN tipo = 'TRASPASO' THEN cantidad ELSE 0 END) as traspasos,
+                        SUM(CASE WHEN tipo = 'IMPUTACION' THEN cantidad ELSE 0 END) as imputaciones,
+                        SUM(CASE WHEN tipo = 'PERDIDA' THEN cantidad ELSE 0 END) as perdidas
+                    FROM mov
+                ) t
+            ) AS totales,
+            (
+                SELECT row_to_json(t)
+                FROM (
+                    SELECT
+                        SUM(CASE WHEN tipo = 'ENTRADA' THEN cantidad ELSE 0 END) as entradas,
+                        SUM(CASE WHEN tipo IN ('IMPUTACION', 'PERDIDA', 'DEVOLUCION') THEN cantidad ELSE 0 END) as consumo
+                    FROM mov
+                    WHERE fecha >= %(fecha_30d)s
+                ) t
+            ) AS stats_30d,
+            (
+                SELECT COALESCE(json_agg(t), '[]'::json)
+                FROM (
+                    SELECT ot, SUM(cantidad) as total
+                    FROM mov
+                    WHERE tipo = 'IMPUTACION' AND ot IS NOT NULL
+                    GROUP BY ot
+                    ORDER BY total DESC
+                    LIMIT 5
+                ) t
+            ) AS top_ots,
+            (
+                SELECT COALESCE(json_agg(t), '[]'::json)
+                FROM (
+                    SELECT m.fecha, m.cantidad, p.nombre AS proveedor, m.albaran, m.coste_unit
+                    FROM movimientos m
+                    LEFT JOIN proveedores p ON m.origen_id = p.id
+                    WHERE m.articulo_id = %(id)s
+                      AND m.tipo = 'ENTRADA'
+                    ORDER BY m.fecha DESC, m.id DESC
+                    LIMIT %(limit_entradas)s
+                ) t
+            ) AS ultimas_entradas,
+            (SELECT COALESCE(MAX(id), 0) FROM mov) AS ultimo_movimiento_id,
+            (SELECT COUNT(*) FROM mov) AS num_movimientos
+    """
+    params = {
+        'id': articulo_id,
+        'fecha_30d': fecha_30d,
+        'tipo': tipo,
+        'limit_historial': limit_historial,
+        'limit_entradas': limit_entradas,
+    }
+    ficha = fetch_one(sql, params)
+    if not ficha or ficha['articulo'] is None:
+        return None
+    # Los agregados sin filas llegan como null (igual que SUM en las consultas sueltas)
+    ficha['totales'] = ficha['totales'] or {}
+    ficha['stats_30d'] = ficha['stats_30d'] or {}
+    return ficha
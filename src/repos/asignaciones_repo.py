@@ -4,7 +4,7 @@ Sistema unificado de asignaciones furgoneta-operario.
 Soporta turnos (mañana, tarde, completo) y consultas por fecha.
 """
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from src.core.db_utils import get_con, fetch_one, fetch_all, execute_query
 from src.core.logger import logger
 
@@ -182,7 +182,7 @@ def get_furgoneta_asignada(
               AND af.fecha = %s
               AND af.turno = %s
         """
-        return fetch_one(sql, (operario_id, fecha, turno))
+        return fetch_one(sql, (operario_id, fecha, turno), preparada="furgoneta_asignada_turno")
 
     except Exception as e:
         logger.exception(f"Error al obtener furgoneta asignada: {e}")
@@ -300,15 +300,16 @@ def get_operarios_en_furgoneta(
         return []
 
 
-def buscar_asignaciones_filtradas(
+def construir_consulta_asignaciones(
     fecha_desde: Optional[str] = None,
     fecha_hasta: Optional[str] = None,
     operario_id: Optional[int] = None,
     furgoneta_id: Optional[int] = None,
     turno: Optional[str] = None
-) -> List[Dict[str, Any]]:
+) -> Tuple[str, Tuple[Any, ...]]:
     """
-    Busca asignaciones con múltiples filtros opcionales.
+    Construye la consulta de asignaciones con múltiples filtros opcionales.
+    La usan buscar_asignaciones_filtradas() y las exportaciones en streaming.
 
     Args:
         fecha_desde: Fecha inicial (YYYY-MM-DD)
@@ -318,48 +319,74 @@ def buscar_asignaciones_filtradas(
         turno: Filtrar por turno ('manana', 'tarde', 'completo')
 
     Returns:
-        Lista de asignaciones que cumplen los filtros
+        Tupla (sql, params)
     """
-    try:
-        sql = """
-            SELECT
-                af.fecha,
-                af.turno,
-                af.operario_id,
-                o.nombre as operario_nombre,
-                o.rol_operario,
-                af.furgoneta_id,
-                a.nombre as furgoneta_nombre
-            FROM asignaciones_furgoneta af
-            JOIN operarios o ON af.operario_id = o.id
-            JOIN almacenes a ON af.furgoneta_id = a.id
-            WHERE 1=1
-        """
-        params = []
+    sql = """
+        SELECT
+            af.fecha,
+            af.turno,
+            af.operario_id,
+            o.nombre as operario_nombre,
+            o.rol_operario,
+            af.furgoneta_id,
+            a.nombre as furgoneta_nombre
+        FROM asignaciones_furgoneta af
+        JOIN operarios o ON af.operario_id = o.id
+        JOIN almacenes a ON af.furgoneta_id = a.id
+        WHERE 1=1
+    """
+    params = []
 
-        if fecha_desde:
-            sql += " AND af.fecha >= %s"
-            params.append(fecha_desde)
+    if fecha_desde:
+        sql += " AND af.fecha >= %s"
+        params.append(fecha_desde)
 
-        if fecha_hasta:
-            sql += " AND af.fecha <= %s"
-            params.append(fecha_hasta)
+    if fecha_hasta:
+        sql += " AND af.fecha <= %s"
+        params.append(fecha_hasta)
 
-        if operario_id:
-            sql += " AND af.operario_id = %s"
-            params.append(operario_id)
+    if operario_id:
+        sql += " AND af.operario_id = %s"
+        params.append(operario_id)
 
-        if furgoneta_id:
-            sql += " AND af.furgoneta_id = %s"
-            params.append(furgoneta_id)
+    if furgoneta_id:
+        sql += " AND af.furgoneta_id = %s"
+        params.append(furgoneta_id)
 
-        if turno:
-            sql += " AND af.turno = %s"
-            params.append(turno)
+    if turno:
+        sql += " AND af.turno = %s"
+        params.append(turno)
 
-        sql += " ORDER BY af.fecha DESC, af.turno, o.nombre"
+    sql += " ORDER BY af.fecha DESC, af.turno, o.nombre"
 
-        return fetch_all(sql, tuple(params))
+    return sql, tuple(params)
+
+
+def buscar_asignaciones_filtradas(
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    operario_id: Optional[int] = None,
+    furgoneta_id: Optional[int] = None,
+    turno: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Busca asignaciones con múltiples filtros opcionales.
+
+    Args:
+        fecha_desde: Fecha inicial (YYYY-MM-DD)
+        fecha_hasta: Fecha final (YYYY-MM-DD)
+        operario_id: Filtrar por operario
+        furgoneta_id: Filtrar por furgoneta
+        turno: Filtrar por turno ('manana', 'tarde', 'completo')
+
+    Returns:
+        Lista de asignaciones que cumplen los filtros
+    """
+    try:
+        sql, params = construir_consulta_asignaciones(
+            fecha_desde, fecha_hasta, operario_id, furgoneta_id, turno
+        )
+        return fetch_all(sql, params)
 
     except Exception as e:
         logger.exception(f"Error al buscar asignaciones filtradas: {e}")
@@ -1,24 +1,24 @@
 """
 Repositorio de Consumos - Consultas SQL para análisis de consumos
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import date
-from src.core.db_utils import fetch_all, fetch_one
+from src.core.db_utils import fetch_all, fetch_one, fetch_columnar
+from src.core import cache_maestros
+from src.core.logger import logger
 
 
 # ========================================
 # CONSUMOS POR OT
 # ========================================
 
-def get_consumos_por_ot(ot: str) -> List[Dict[str, Any]]:
+def construir_consulta_consumos_por_ot(ot: str) -> Tuple[str, Tuple[Any, ...]]:
     """
-    Obtiene el detalle de material consumido en una OT específica.
-    
-    Args:
-        ot: Número de orden de trabajo
-        
+    Construye la consulta de get_consumos_por_ot().
+    La comparten la pantalla y la exportación en streaming.
+
     Returns:
-        Lista de diccionarios con: articulo, cantidad, coste_unit, coste_total
+        Tupla (sql, params)
     """
     sql = """
         SELECT 
@@ -36,7 +36,21 @@ def get_consumos_por_ot(ot: str) -> List[Dict[str, Any]]:
           AND m.ot = %s
         ORDER BY m.fecha DESC, a.nombre
     """
-    return fetch_all(sql, (ot,))
+    return sql, (ot,)
+
+
+def get_consumos_por_ot(ot: str) -> List[Dict[str, Any]]:
+    """
+    Obtiene el detalle de material consumido en una OT específica.
+    
+    Args:
+        ot: Número de orden de trabajo
+        
+    Returns:
+        Lista de diccionarios con: articulo, cantidad, coste_unit, coste_total
+    """
+    sql, params = construir_consulta_consumos_por_ot(ot)
+    return fetch_all(sql, params)
 
 
 def get_resumen_ot(ot: str) -> Optional[Dict[str, Any]]:
@@ -90,17 +104,14 @@ def get_ots_recientes(limit: int = 50) -> List[Dict[str, Any]]:
 # CONSUMOS POR OPERARIO
 # ========================================
 
-def get_consumos_por_operario(operario_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> List[Dict[str, Any]]:
+def construir_consulta_consumos_por_operario(operario_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> Tuple[str, Tuple[Any, ...]]:
     """
-    Obtiene el detalle de consumos de un operario en un período.
-
-    Args:
-        operario_id: ID del operario
-        fecha_desde: Fecha inicio (formato ISO: yyyy-mm-dd)
-        fecha_hasta: Fecha fin (formato ISO: yyyy-mm-dd)
+    Construye la consulta del detalle de imputaciones de un operario, una fila
+    por movimiento. La usa la exportación en streaming; la pantalla muestra
+    el mismo período agregado por día desde el cubo de consumos.
 
     Returns:
-        Lista con detalle de imputaciones
+        Tupla (sql, params)
     """
     condiciones = ["m.tipo = 'IMPUTACION'", "m.operario_id = %s"]
     params = [operario_id]
@@ -129,97 +140,21 @@ def get_consumos_por_operario(operario_id: int, fecha_desde: str = None, fecha_h
         WHERE {where_clause}
         ORDER BY m.fecha DESC
     """
-    return fetch_all(sql, tuple(params))
-
-
-def get_resumen_operario(operario_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> Optional[Dict[str, Any]]:
-    """
-    Obtiene el resumen de actividad de un operario.
-
-    Returns:
-        Dict con: total_imputaciones, total_ots, coste_total, operario_nombre
-    """
-    condiciones = ["m.tipo = 'IMPUTACION'", "m.operario_id = %s"]
-    params = [operario_id]
-
-    if fecha_desde:
-        condiciones.append("m.fecha >= %s")
-        params.append(fecha_desde)
-
-    if fecha_hasta:
-        condiciones.append("m.fecha <= %s")
-        params.append(fecha_hasta)
-    
-    where_clause = " AND ".join(condiciones)
-    
-    sql = f"""
-        SELECT 
-            o.nombre AS operario_nombre,
-            COUNT(*) AS total_imputaciones,
-            COUNT(DISTINCT m.ot) AS total_ots,
-            SUM(m.cantidad * COALESCE(m.coste_unit, a.coste, 0)) AS coste_total
-        FROM movimientos m
-        INNER JOIN articulos a ON m.articulo_id = a.id
-        INNER JOIN operarios o ON m.operario_id = o.id
-        WHERE {where_clause}
-        GROUP BY o.nombre
-    """
-    return fetch_one(sql, tuple(params))
-
-
-def get_top_articulos_operario(operario_id: int, fecha_desde: str = None, fecha_hasta: str = None, limit: int = 10) -> List[Dict[str, Any]]:
-    """
-    Obtiene los artículos más usados por un operario.
-
-    Returns:
-        Lista con: articulo, cantidad_total, veces_usado, coste_total
-    """
-    condiciones = ["m.tipo = 'IMPUTACION'", "m.operario_id = %s"]
-    params = [operario_id]
-
-    if fecha_desde:
-        condiciones.append("m.fecha >= %s")
-        params.append(fecha_desde)
-
-    if fecha_hasta:
-        condiciones.append("m.fecha <= %s")
-        params.append(fecha_hasta)
-
-    where_clause = " AND ".join(condiciones)
-    params.append(limit)
-
-    sql = f"""
-        SELECT
-            a.nombre AS articulo,
-            a.u_medida AS unidad,
-            SUM(m.cantidad) AS cantidad_total,
-            COUNT(*) AS veces_usado,
-            SUM(m.cantidad * COALESCE(m.coste_unit, a.coste, 0)) AS coste_total
-        FROM movimientos m
-        INNER JOIN articulos a ON m.articulo_id = a.id
-        WHERE {where_clause}
-        GROUP BY a.id, a.nombre, a.u_medida
-        ORDER BY cantidad_total DESC
-        LIMIT %s
-    """
-    return fetch_all(sql, tuple(params))
+    return sql, tuple(params)
 
 
 # ========================================
 # CONSUMOS POR FURGONETA
 # ========================================
 
-def get_consumos_por_furgoneta(furgoneta_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> List[Dict[str, Any]]:
+def construir_consulta_consumos_por_furgoneta(furgoneta_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> Tuple[str, Tuple[Any, ...]]:
     """
-    Obtiene consumos realizados desde una furgoneta específica.
-
-    Args:
-        furgoneta_id: ID de la furgoneta (almacén tipo furgoneta)
-        fecha_desde: Fecha inicio
-        fecha_hasta: Fecha fin
+    Construye la consulta del detalle de imputaciones hechas desde una furgoneta, una fila
+    por movimiento. La usa la exportación en streaming; la pantalla muestra
+    el mismo período agregado por día desde el cubo de consumos.
 
     Returns:
-        Lista con detalle de imputaciones desde esa furgoneta
+        Tupla (sql, params)
     """
     condiciones = ["m.tipo = 'IMPUTACION'", "m.origen_id = %s"]
     params = [furgoneta_id]
@@ -249,41 +184,7 @@ def get_consumos_por_furgoneta(furgoneta_id: int, fecha_desde: str = None, fecha
         WHERE {where_clause}
         ORDER BY m.fecha DESC
     """
-    return fetch_all(sql, tuple(params))
-
-
-def get_resumen_furgoneta(furgoneta_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> Optional[Dict[str, Any]]:
-    """
-    Obtiene resumen de consumos de una furgoneta.
-
-    Returns:
-        Dict con: furgoneta_nombre, total_imputaciones, coste_total
-    """
-    condiciones = ["m.tipo = 'IMPUTACION'", "m.origen_id = %s"]
-    params = [furgoneta_id]
-
-    if fecha_desde:
-        condiciones.append("m.fecha >= %s")
-        params.append(fecha_desde)
-
-    if fecha_hasta:
-        condiciones.append("m.fecha <= %s")
-        params.append(fecha_hasta)
-    
-    where_clause = " AND ".join(condiciones)
-    
-    sql = f"""
-        SELECT 
-            al.nombre AS furgoneta_nombre,
-            COUNT(*) AS total_imputaciones,
-            SUM(m.cantidad * COALESCE(m.coste_unit, a.coste, 0)) AS coste_total
-        FROM movimientos m
-        INNER JOIN articulos a ON m.articulo_id = a.id
-        INNER JOIN almacenes al ON m.origen_id = al.id
-        WHERE {where_clause}
-        GROUP BY al.nombre
-    """
-    return fetch_one(sql, tuple(params))
+    return sql, tuple(params)
 
 
 # ========================================
@@ -313,66 +214,18 @@ def get_resumen_periodo(fecha_desde: str, fecha_hasta: str) -> Dict[str, Any]:
     return result if result else {}
 
 
-def get_articulos_mas_consumidos_periodo(fecha_desde: str, fecha_hasta: str, limit: int = 10) -> List[Dict[str, Any]]:
-    """
-    Obtiene los artículos más consumidos en un período.
-    
-    Returns:
-        Lista con: articulo, cantidad_total, coste_total, veces_usado
-    """
-    sql = """
-        SELECT 
-            a.nombre AS articulo,
-            a.u_medida AS unidad,
-            SUM(m.cantidad) AS cantidad_total,
-            COUNT(*) AS veces_usado,
-            SUM(m.cantidad * COALESCE(m.coste_unit, a.coste, 0)) AS coste_total
-        FROM movimientos m
-        INNER JOIN articulos a ON m.articulo_id = a.id
-        WHERE m.tipo = 'IMPUTACION'
-          AND m.fecha BETWEEN %s AND %s
-        GROUP BY a.id, a.nombre, a.u_medida
-        ORDER BY cantidad_total DESC
-        LIMIT %s
-    """
-    return fetch_all(sql, (fecha_desde, fecha_hasta, limit))
-
-
-def get_operarios_mas_activos_periodo(fecha_desde: str, fecha_hasta: str, limit: int = 10) -> List[Dict[str, Any]]:
-    """
-    Obtiene los operarios más activos en un período.
-    
-    Returns:
-        Lista con: operario, total_imputaciones, coste_total
-    """
-    sql = """
-        SELECT 
-            o.nombre AS operario,
-            COUNT(*) AS total_imputaciones,
-            SUM(m.cantidad * COALESCE(m.coste_unit, a.coste, 0)) AS coste_total
-        FROM movimientos m
-        INNER JOIN articulos a ON m.articulo_id = a.id
-        LEFT JOIN operarios o ON m.operario_id = o.id
-        WHERE m.tipo = 'IMPUTACION'
-          AND m.fecha BETWEEN %s AND %s
-          AND o.nombre IS NOT NULL
-        GROUP BY o.id, o.nombre
-        ORDER BY total_imputaciones DESC
-        LIMIT %s
-    """
-    return fetch_all(sql, (fecha_desde, fecha_hasta, limit))
-
-
 # ========================================
 # CONSUMOS POR ARTÍCULO
 # ========================================
 
-def get_consumos_por_articulo(articulo_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> List[Dict[str, Any]]:
+def construir_consulta_consumos_por_articulo(articulo_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> Tuple[str, Tuple[Any, ...]]:
     """
-    Obtiene el histórico de consumos de un artículo específico.
+    Construye la consulta del detalle de imputaciones de un artículo, una fila
+    por movimiento. La usa la exportación en streaming; la pantalla muestra
+    el mismo período agregado por día desde el cubo de consumos.
 
     Returns:
-        Lista con: fecha, ot, operario, cantidad, coste_total
+        Tupla (sql, params)
     """
     condiciones = ["m.tipo = 'IMPUTACION'", "m.articulo_id = %s"]
     params = [articulo_id]
@@ -401,42 +254,7 @@ def get_consumos_por_articulo(articulo_id: int, fecha_desde: str = None, fecha_h
         WHERE {where_clause}
         ORDER BY m.fecha DESC
     """
-    return fetch_all(sql, tuple(params))
-
-
-def get_resumen_articulo(articulo_id: int, fecha_desde: str = None, fecha_hasta: str = None) -> Optional[Dict[str, Any]]:
-    """
-    Obtiene el resumen de consumos de un artículo.
-
-    Returns:
-        Dict con: articulo_nombre, cantidad_total, veces_usado, coste_total
-    """
-    condiciones = ["m.tipo = 'IMPUTACION'", "m.articulo_id = %s"]
-    params = [articulo_id]
-
-    if fecha_desde:
-        condiciones.append("m.fecha >= %s")
-        params.append(fecha_desde)
-
-    if fecha_hasta:
-        condiciones.append("m.fecha <= %s")
-        params.append(fecha_hasta)
-    
-    where_clause = " AND ".join(condiciones)
-    
-    sql = f"""
-        SELECT 
-            a.nombre AS articulo_nombre,
-            a.u_medida AS unidad,
-            SUM(m.cantidad) AS cantidad_total,
-            COUNT(*) AS veces_usado,
-            SUM(m.cantidad * COALESCE(m.coste_unit, a.coste, 0)) AS coste_total
-        FROM movimientos m
-        INNER JOIN articulos a ON m.articulo_id = a.id
-        WHERE {where_clause}
-        GROUP BY a.nombre, a.u_medida
-    """
-    return fetch_one(sql, tuple(params))
+    return sql, tuple(params)
 
 
 # ========================================
@@ -467,15 +285,7 @@ def get_lista_furgonetas() -> List[Dict[str, Any]]:
     Returns:
         Lista con: id, nombre, tipo
     """
-    # Primero intentamos con la tabla furgonetas si existe
-    sql_furgonetas = """
-        SELECT id, matricula as nombre, 'furgoneta' as tipo
-        FROM furgonetas
-        WHERE activa = 1
-        ORDER BY matricula
-    """
-    
-    # Si no existe, usamos almacenes
+    # Si no existe la tabla furgonetas, usamos almacenes
     sql_almacenes = """
         SELECT id, nombre, tipo
         FROM almacenes
@@ -484,7 +294,12 @@ def get_lista_furgonetas() -> List[Dict[str, Any]]:
     """
     
     try:
-        return fetch_all(sql_furgonetas)
+        # Primero intentamos con la tabla furgonetas (caché de maestros)
+        furgonetas = cache_maestros.furgonetas(solo_activas=True)
+        return sorted(
+            ({'id': f['id'], 'nombre': f['matricula'], 'tipo': 'furgoneta'} for f in furgonetas),
+            key=lambda f: f['nombre']
+        )
     except Exception as e:
         # Si falla la query de furgonetas, intentar con todos los almacenes
         logger.warning(f"Error al obtener furgonetas, usando todos los almacenes: {e}")
@@ -508,3 +323,102 @@ def buscar_articulo_por_nombre(nombre: str) -> List[Dict[str, Any]]:
     """
     patron = f"%{nombre}%"
     return fetch_all(sql, (patron, patron, patron, patron))
+
+
+# ========================================
+# ROLLUP PARA EL CUBO DE CONSUMOS
+# ========================================
+
+def get_rollup_consumos(fecha_desde: str = None, fecha_hasta: str = None, columnar: bool = False):
+    """
+    Obtiene el rollup diario de imputaciones al grano más fino del cubo:
+    día × artículo × operario × furgoneta × OT.
+
+    Es la única consulta que necesita el cubo de consumos; cualquier otra
+    agregación (por familia, semana, mes...) se calcula en memoria.
+
+    Args:
+        fecha_desde: Fecha inicio (formato ISO: yyyy-mm-dd)
+        fecha_hasta: Fecha fin (formato ISO: yyyy-mm-dd)
+        columnar: Si True, devuelve un ResultadoColumnar (cantidad y coste
+            como float64) en lugar de List[Dict]
+
+    Returns:
+        Lista con: fecha, articulo_id, articulo, unidad, familia_id, familia,
+        operario_id, operario, furgoneta_id, furgoneta, ot, cantidad, coste,
+        imputaciones
+    """
+    condiciones = ["m.tipo = 'IMPUTACION'"]
+    params = []
+
+    if fecha_desde:
+        condiciones.append("m.fecha >= %s")
+        params.append(fecha_desde)
+
+    if fecha_hasta:
+        condiciones.append("m.fecha <= %s")
+        params.append(fecha_hasta)
+
+    where_clause = " AND ".join(condiciones)
+
+    sql = f"""
+        SELECT
+            m.fecha,
+            a.id AS articulo_id,
+            a.nombre AS articulo,
+            a.u_medida AS unidad,
+            f.id AS familia_id,
+            COALESCE(f.nombre, 'SIN FAMILIA') AS familia,
+            o.id AS operario_id,
+            COALESCE(o.nombre, 'SIN OPERARIO') AS operario,
+            al.id AS furgoneta_id,
+            COALESCE(al.nombre, 'SIN ORIGEN') AS furgoneta,
+            COALESCE(NULLIF(m.ot, ''), 'SIN OT') AS ot,
+            SUM(m.cantidad) AS cantidad,
+            SUM(m.cantidad * COALESCE(m.coste_unit, a.coste, 0)) AS coste,
+            COUNT(*) AS imputaciones
+        FROM movimientos m
+        INNER JOIN articulos a ON m.articulo_id = a.id
+        LEFT JOIN familias f ON a.familia_id = f.id
+        LEFT JOIN operarios o ON m.operario_id = o.id
+        LEFT JOIN almacenes al ON m.origen_id = al.id
+        WHERE {where_clause}
+        GROUP BY m.fecha, a.id, a.nombre, a.u_medida, f.id, f.nombre,
+                 o.id, o.nombre, al.id, al.nombre, COALESCE(NULLIF(m.ot, ''), 'SIN OT')
+    """
+    if columnar:
+        return fetch_columnar(sql, tuple(params))
+    return fetch_all(sql, tuple(params))
+
+
+def get_marca_imputaciones(desde_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Marca de agua de movimientos para invalidar el cubo de consumos.
+
+    Los movimientos solo se añaden: lo nuevo desde la marca anterior son las
+    filas con id mayor. La consulta va por el índice de la clave primaria y
+    no recorre la tabla.
+
+    Args:
+        desde_id: Marca anterior (None = primera vez, solo el último id)
+
+    Returns:
+        Dict con: max_id, fecha_min, fecha_max (rango de fechas de las
+        imputaciones nuevas; None si no hay ninguna)
+    """
+    if desde_id is None:
+        sql = """
+            SELECT COALESCE(MAX(id), 0) AS max_id, NULL AS fecha_min, NULL AS fecha_max
+            FROM movimientos
+        """
+        return fetch_one(sql)
+
+    sql = """
+        SELECT
+            COALESCE(MAX(id), %s) AS max_id,
+            MIN(fecha) FILTER (WHERE tipo = 'IMPUTACION') AS fecha_min,
+            MAX(fecha) FILTER (WHERE tipo = 'IMPUTACION') AS fecha_max
+        FROM movimientos
+        WHERE id > %s
+    """
+    return fetch_one(sql, (desde_id, desde_id))
@@ -3,6 +3,7 @@ Repositorio de Familias - Consultas SQL para gestión de familias de artículos
 """
 from typing import List, Dict, Any, Optional
 from src.core.db_utils import fetch_all, fetch_one, execute_query
+from src.core import cache_maestros
 
 
 def get_todos(filtro_texto: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
@@ -25,14 +26,7 @@ def get_todos(filtro_texto: Optional[str] = None, limit: int = 1000) -> List[Dic
             LIMIT %s
         """
         return fetch_all(sql, (f"%{filtro_texto}%", limit))
-    else:
-        sql = """
-            SELECT id, nombre
-            FROM familias
-            ORDER BY nombre
-            LIMIT %s
-        """
-        return fetch_all(sql, (limit,))
+    return cache_maestros.familias()[:limit]
 
 
 def get_by_id(familia_id: int) -> Optional[Dict[str, Any]]:
@@ -50,13 +44,16 @@ def get_by_nombre(nombre: str) -> Optional[Dict[str, Any]]:
 def crear_familia(nombre: str) -> int:
     """Crea una nueva familia."""
     sql = "INSERT INTO familias(nombre) VALUES(%s)"
-    return execute_query(sql, (nombre,))
+    nuevo_id = execute_query(sql, (nombre,))
+    cache_maestros.invalidar('familias')
+    return nuevo_id
 
 
 def actualizar_familia(familia_id: int, nombre: str) -> bool:
     """Actualiza una familia existente."""
     sql = "UPDATE familias SET nombre=%s WHERE id=%s"
     execute_query(sql, (nombre, familia_id))
+    cache_maestros.invalidar('familias')
     return True
 
 
@@ -64,6 +61,7 @@ def eliminar_familia(familia_id: int) -> bool:
     """Elimina una familia (fallará si tiene artículos asociados)."""
     sql = "DELETE FROM familias WHERE id=%s"
     execute_query(sql, (familia_id,))
+    cache_maestros.invalidar('familias')
     return True
 
 
@@ -5,6 +5,7 @@ from datetime import date
 from pathlib import Path
 
 from src.core.db_utils import execute_query, fetch_all, fetch_one, get_con, release_connection
+from src.core import cache_maestros
 
 
 # -----------------------------
@@ -15,11 +16,7 @@ from src.core.db_utils import execute_query, fetch_all, fetch_one, get_con, rele
 
 def list_furgonetas(include_inactive: bool = True) -> List[Dict[str, Any]]:
     """Lista furgonetas desde la tabla furgonetas."""
-    sql = "SELECT * FROM furgonetas"
-    if not include_inactive:
-        sql += " WHERE activa = 1"
-    sql += " ORDER BY numero, matricula"
-    return fetch_all(sql)
+    return cache_maestros.furgonetas(solo_activas=not include_inactive)
 
 
 def get_furgoneta(fid: int) -> Optional[Dict[str, Any]]:
@@ -53,6 +50,9 @@ def create_furgoneta(matricula: str, marca: str = None, modelo: str = None, anio
         raise e
     finally:
         release_connection(conn)
+        # También cambia almacenes
+        cache_maestros.invalidar('furgonetas')
+        cache_maestros.invalidar('almacenes')
 
 
 def update_furgoneta(fid: int, matricula: str, marca: str = None, modelo: str = None, anio: int = None, activa: int = 1, notas: str = None, numero: int = None) -> None:
@@ -85,6 +85,8 @@ def update_furgoneta(fid: int, matricula: str, marca: str = None, modelo: str =
         raise e
     finally:
         release_connection(conn)
+        cache_maestros.invalidar('furgonetas')
+        cache_maestros.invalidar('almacenes')
 
 
 def delete_furgoneta(fid: int) -> None:
@@ -111,6 +113,8 @@ def delete_furgoneta(fid: int) -> None:
         raise e
     finally:
         release_connection(conn)
+        cache_maestros.invalidar('furgonetas')
+        cache_maestros.invalidar('almacenes')
 
 
 def list_asignaciones(fid: int) -> List[Dict[str, Any]]:
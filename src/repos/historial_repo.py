@@ -2,7 +2,7 @@
 Repositorio de historial de operaciones
 """
 from typing import List, Dict, Any, Optional
-from src.core.db_utils import execute_query, fetch_all, get_con
+from src.core.db_utils import execute_query, fetch_all, get_con, Transaccion
 from src.core.logger import logger
 
 
@@ -14,7 +14,8 @@ def insertar_historial(
     cantidad: float,
     u_medida: str,
     fecha_hora: str,
-    datos_adicionales: Optional[str] = None
+    datos_adicionales: Optional[str] = None,
+    tx: Optional[Transaccion] = None
 ) -> bool:
     """
     Inserta un registro en el historial de operaciones.
@@ -28,6 +29,8 @@ def insertar_historial(
         u_medida: Unidad de medida
         fecha_hora: Fecha y hora en formato ISO
         datos_adicionales: JSON string con datos adicionales (opcional)
+        tx: Transacción en curso (opcional). Dentro de una transacción los
+            errores se propagan: la transacción ya no se puede confirmar
 
     Returns:
         True si se insertó correctamente
@@ -39,11 +42,14 @@ def insertar_historial(
             (usuario_id, tipo_operacion, articulo_id, articulo_nombre, cantidad, u_medida, fecha_hora, datos_adicionales)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             """,
-            (usuario_id, tipo_operacion, articulo_id, articulo_nombre, cantidad, u_medida, fecha_hora, datos_adicionales)
+            (usuario_id, tipo_operacion, articulo_id, articulo_nombre, cantidad, u_medida, fecha_hora, datos_adicionales),
+            tx=tx
         )
         return True
     except Exception as e:
         logger.exception(f"Error al insertar en historial: {e}")
+        if tx is not None:
+            raise
         return False
 
 
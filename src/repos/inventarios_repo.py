@@ -2,7 +2,8 @@
 Repositorio de Inventarios - Consultas SQL para gestión de inventarios físicos
 """
 from typing import List, Dict, Any, Optional
-from src.core.db_utils import fetch_all, fetch_one, execute_query, get_con
+from src.core.db_utils import fetch_all, fetch_one, execute_query, get_con, Transaccion
+from src.core import cache_maestros
 
 
 # ========================================
@@ -64,12 +65,19 @@ def get_todos(
     return fetch_all(sql, params)
 
 
-def get_by_id(inventario_id: int) -> Optional[Dict[str, Any]]:
+def get_by_id(
+    inventario_id: int,
+    bloquear: bool = False,
+    tx: Optional[Transaccion] = None
+) -> Optional[Dict[str, Any]]:
     """
     Obtiene un inventario específico por su ID.
 
     Args:
         inventario_id: ID del inventario
+        bloquear: Bloquear la cabecera hasta el final de la transacción
+                  (FOR UPDATE), para que nadie la cambie a la vez
+        tx: Transacción en curso (opcional)
 
     Returns:
         Diccionario con información del inventario o None
@@ -88,7 +96,9 @@ def get_by_id(inventario_id: int) -> Optional[Dict[str, Any]]:
         JOIN almacenes a ON i.almacen_id = a.id
         WHERE i.id = %s
     """
-    return fetch_one(sql, (inventario_id,))
+    if bloquear:
+        sql += " FOR UPDATE OF i"
+    return fetch_one(sql, (inventario_id,), tx=tx)
 
 
 def get_inventario_abierto_usuario(usuario: str) -> Optional[Dict[str, Any]]:
@@ -144,13 +154,18 @@ def crear_inventario(
     return execute_query(sql, (fecha, responsable, almacen_id, observaciones))
 
 
-def finalizar_inventario(inventario_id: int, fecha_cierre: str) -> bool:
+def finalizar_inventario(
+    inventario_id: int,
+    fecha_cierre: str,
+    tx: Optional[Transaccion] = None
+) -> bool:
     """
     Marca un inventario como finalizado.
 
     Args:
         inventario_id: ID del inventario
         fecha_cierre: Fecha de cierre (YYYY-MM-DD HH:MM:SS)
+        tx: Transacción en curso (opcional)
 
     Returns:
         True si se actualizó correctamente
@@ -160,7 +175,7 @@ def finalizar_inventario(inventario_id: int, fecha_cierre: str) -> bool:
         SET estado = 'FINALIZADO', fecha_cierre = %s
         WHERE id = %s
     """
-    execute_query(sql, (fecha_cierre, inventario_id))
+    execute_query(sql, (fecha_cierre, inventario_id), tx=tx)
     return True
 
 
@@ -308,16 +323,18 @@ def actualizar_conteo(detalle_id: int, stock_contado: float) -> bool:
             diferencia = %s - stock_teorico
         WHERE id = %s
     """
-    execute_query(sql, (stock_contado, stock_contado, detalle_id))
+    # Idempotente (fija el conteo): se puede repetir si se corta la Wi-Fi
+    execute_query(sql, (stock_contado, stock_contado, detalle_id), reintentable=True)
     return True
 
 
-def get_diferencias(inventario_id: int) -> List[Dict[str, Any]]:
+def get_diferencias(inventario_id: int, tx: Optional[Transaccion] = None) -> List[Dict[str, Any]]:
     """
     Obtiene solo las líneas con diferencias de un inventario.
 
     Args:
         inventario_id: ID del inventario
+        tx: Transacción en curso (opcional)
 
     Returns:
         Lista de líneas con diferencia != 0
@@ -337,15 +354,16 @@ def get_diferencias(inventario_id: int) -> List[Dict[str, Any]]:
         WHERE id.inventario_id = %s AND id.diferencia != 0
         ORDER BY ABS(id.diferencia) DESC
     """
-    return fetch_all(sql, (inventario_id,))
+    return fetch_all(sql, (inventario_id,), tx=tx)
 
 
-def get_estadisticas_inventario(inventario_id: int) -> Dict[str, Any]:
+def get_estadisticas_inventario(inventario_id: int, tx: Optional[Transaccion] = None) -> Dict[str, Any]:
     """
     Obtiene estadísticas resumidas de un inventario.
 
     Args:
         inventario_id: ID del inventario
+        tx: Transacción en curso (opcional)
 
     Returns:
         Diccionario con estadísticas
@@ -362,7 +380,7 @@ def get_estadisticas_inventario(inventario_id: int) -> Dict[str, Any]:
         FROM inventario_detalle
         WHERE inventario_id = %s
     """
-    result = fetch_one(sql, (inventario_id,))
+    result = fetch_one(sql, (inventario_id,), tx=tx)
     return result if result else {}
 
 
@@ -377,12 +395,7 @@ def get_almacenes() -> List[Dict[str, Any]]:
     Returns:
         Lista de almacenes
     """
-    sql = """
-        SELECT id, nombre, tipo
-        FROM almacenes
-        ORDER BY nombre
-    """
-    return fetch_all(sql)
+    return cache_maestros.almacenes()
 
 
 def get_articulos_sin_inventario_reciente(dias: int = 90) -> List[Dict[str, Any]]:
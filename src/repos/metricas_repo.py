@@ -0,0 +1,79 @@
+"""
+Repositorio de Métricas de Rendimiento - Subida de la telemetría por pantalla
+"""
+from typing import List, Dict, Any
+from psycopg2 import errors
+from src.core.db_utils import get_con, release_connection, fetch_all
+from src.core.logger import logger
+
+
+def insertar_resumen(usuario: str, hostname: str, filas: List[Dict[str, Any]]) -> int:
+    """
+    Guarda el resumen de telemetria.estadisticas() de este equipo.
+
+    La tabla está en db/schema_postgres_full.sql; en las BD instaladas
+    antes se crea con scripts/crear_tabla_metricas.py.
+
+    Args:
+        usuario: Usuario de la sesión
+        hostname: Equipo que envía las métricas
+        filas: Salida de telemetria.estadisticas()
+
+    Returns:
+        Número de filas insertadas
+    """
+    if not filas:
+        return 0
+
+    from psycopg2.extras import execute_values
+
+    valores = [
+        (usuario, hostname, f['pantalla'], f['fase'], f['muestras'],
+         f['media_ms'], f['p50_ms'], f['p90_ms'], f['p99_ms'], f['max_ms'])
+        for f in filas
+    ]
+    con = get_con()
+    try:
+        with con.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO metricas_rendimiento(
+                    usuario, hostname, pantalla, fase, muestras,
+                    media_ms, p50_ms, p90_ms, p99_ms, max_ms)
+                VALUES %s
+            """, valores)
+        con.commit()
+        return len(valores)
+    except errors.UndefinedTable:
+        con.rollback()
+        logger.warning("Falta la tabla metricas_rendimiento: ejecute scripts/crear_tabla_metricas.py")
+        raise
+    except Exception as e:
+        con.rollback()
+        logger.exception(f"Error al subir métricas de rendimiento: {e}")
+        raise
+    finally:
+        release_connection(con)
+
+
+def get_resumen_flota(dias: int = 30) -> List[Dict[str, Any]]:
+    """
+    Percentil 90 medio por pantalla, fase y equipo en los últimos días.
+
+    Returns:
+        Lista con: pantalla, fase, hostname, envios, muestras, p90_ms, max_ms
+    """
+    sql = """
+        SELECT
+            pantalla,
+            fase,
+            hostname,
+            COUNT(*) AS envios,
+            SUM(muestras) AS muestras,
+            ROUND(AVG(p90_ms), 1) AS p90_ms,
+            MAX(max_ms) AS max_ms
+        FROM metricas_rendimiento
+        WHERE fecha >= NOW() - make_interval(days => %s)
+        GROUP BY pantalla, fase, hostname
+        ORDER BY pantalla, fase, p90_ms DESC
+    """
+    return fetch_all(sql, (dias,))
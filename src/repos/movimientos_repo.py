@@ -1,16 +1,31 @@
 """
 Repositorio de Movimientos - Consultas SQL para operaciones de movimientos de almacén
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import date
-from src.core.db_utils import fetch_all, fetch_one, execute_query, get_con
+import random
+import time
+
+from psycopg2 import errors
+
+from src.core.db_utils import (
+    fetch_all, fetch_one, execute_query, get_con, release_connection, Transaccion
+)
+from src.core import cache_maestros
+from src.core.exceptions import InsufficientStockError
+from src.core.logger import logger
+
+# Tipos que restan stock del almacén de origen
+TIPOS_SALIDA = ('TRASPASO', 'IMPUTACION', 'PERDIDA', 'DEVOLUCION')
+# Intentos de un lote de movimientos abortado por concurrencia
+MAX_REINTENTOS_MOVIMIENTOS = 3
 
 
 # ========================================
 # CONSULTAS DE LECTURA
 # ========================================
 
-def get_todos(
+def construir_consulta_todos(
     fecha_desde: Optional[str] = None,
     fecha_hasta: Optional[str] = None,
     tipo: Optional[str] = None,
@@ -20,10 +35,13 @@ def get_todos(
     articulo_texto: Optional[str] = None,
     ot: Optional[str] = None,
     responsable: Optional[str] = None,
-    limit: int = 1000
-) -> List[Dict[str, Any]]:
+    limit: Optional[int] = 1000
+) -> Tuple[str, List[Any]]:
     """
-    Obtiene movimientos con filtros opcionales.
+    Construye la consulta de movimientos con filtros opcionales.
+
+    La comparten get_todos() (pantalla, con LIMIT) y las exportaciones
+    completas (limit=None), que la recorren en streaming.
 
     Args:
         fecha_desde: Fecha inicio (formato YYYY-MM-DD)
@@ -35,10 +53,10 @@ def get_todos(
         articulo_texto: Texto para buscar en nombre, EAN o referencia del artículo
         ot: Número de orden de trabajo
         responsable: Nombre del responsable
-        limit: Límite de resultados
+        limit: Límite de resultados (None = sin límite)
 
     Returns:
-        Lista de movimientos con información completa
+        Tupla (sql, params)
     """
     condiciones = []
     params = []
@@ -110,10 +128,47 @@ def get_todos(
         LEFT JOIN operarios op ON m.operario_id = op.id
         WHERE {where_clause}
         ORDER BY m.fecha DESC, m.id DESC
-        LIMIT %s
     """
-    params.append(limit)
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+
+    return sql, params
+
+
+def get_todos(
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    tipo: Optional[str] = None,
+    articulo_id: Optional[int] = None,
+    almacen_id: Optional[int] = None,
+    operario_id: Optional[int] = None,
+    articulo_texto: Optional[str] = None,
+    ot: Optional[str] = None,
+    responsable: Optional[str] = None,
+    limit: int = 1000
+) -> List[Dict[str, Any]]:
+    """
+    Obtiene movimientos con filtros opcionales.
+
+    Args:
+        Ver construir_consulta_todos()
 
+    Returns:
+        Lista de movimientos con información completa
+    """
+    sql, params = construir_consulta_todos(
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        tipo=tipo,
+        articulo_id=articulo_id,
+        almacen_id=almacen_id,
+        operario_id=operario_id,
+        articulo_texto=articulo_texto,
+        ot=ot,
+        responsable=responsable,
+        limit=limit
+    )
     return fetch_all(sql, params)
 
 
@@ -213,6 +268,23 @@ def get_movimientos_articulo(
     return fetch_all(sql, params)
 
 
+def get_marca_movimientos_articulo(articulo_id: int) -> Tuple[int, int]:
+    """
+    (ID del último movimiento, número de movimientos) de un artículo.
+
+    Los movimientos no se modifican, solo se añaden: mientras la marca no
+    cambie, tampoco cambia nada de lo que se calcula a partir de ellos. El
+    máximo solo no basta: una transacción que confirma tarde puede añadir un
+    id menor que el último ya visible, pero el recuento sí cambia.
+    """
+    sql = """
+        SELECT COALESCE(MAX(id), 0) AS ultimo, COUNT(*) AS total
+        FROM movimientos WHERE articulo_id = %s
+    """
+    fila = fetch_one(sql, (articulo_id,))
+    return (int(fila['ultimo']), int(fila['total'])) if fila else (0, 0)
+
+
 def get_estadisticas_articulo(articulo_id: int) -> Dict[str, Any]:
     """
     Obtiene estadísticas de movimientos de un artículo.
@@ -292,6 +364,45 @@ def get_stock_por_almacen(articulo_id: int) -> List[Dict[str, Any]]:
     return fetch_all(sql, (articulo_id,))
 
 
+def get_stock_articulos_en_almacen(
+    almacen_id: int,
+    articulo_ids: List[int],
+    tx: Optional[Transaccion] = None
+) -> Dict[int, float]:
+    """
+    Stock de varios artículos en un almacén con una sola consulta.
+
+    Args:
+        almacen_id: ID del almacén
+        articulo_ids: IDs de los artículos
+        tx: Transacción en curso (opcional)
+
+    Returns:
+        Diccionario articulo_id -> stock (los que no tienen movimientos no aparecen)
+    """
+    if not articulo_ids:
+        return {}
+    sql = """
+        SELECT articulo_id, COALESCE(SUM(delta), 0) AS stock
+        FROM vw_stock
+        WHERE almacen_id = %s AND articulo_id = ANY(%s)
+        GROUP BY articulo_id
+    """
+    filas = fetch_all(sql, (almacen_id, list(articulo_ids)), tx=tx)
+    return {f['articulo_id']: f['stock'] for f in filas}
+
+
+def get_fecha_apertura() -> str:
+    """
+    Primer día del ejercicio abierto ('' si no hay ejercicios cerrados).
+
+    Desde esa fecha, los movimientos de APERTURA recogen el stock de los
+    ejercicios cerrados (ver scripts/particionar_movimientos.py).
+    """
+    result = fetch_one("SELECT fecha_apertura_movimientos() AS apertura")
+    return result['apertura'] if result else ''
+
+
 # ========================================
 # OPERACIONES DE ESCRITURA
 # ========================================
@@ -324,255 +435,266 @@ def crear_entrada(
         INSERT INTO movimientos(fecha, tipo, destino_id, articulo_id, cantidad, coste_unit, albaran, responsable)
         VALUES(%s, 'ENTRADA', %s, %s, %s, %s, %s, %s)
     """
-    return execute_query(sql, (fecha, destino_id, articulo_id, cantidad, coste_unit, albaran, responsable))
-
-
-def crear_traspaso(
-    fecha: str,
-    articulo_id: int,
-    origen_id: int,
-    destino_id: int,
-    cantidad: float,
-    operario_id: Optional[int] = None,
-    responsable: Optional[str] = None,
-    motivo: Optional[str] = None
-) -> int:
-    """
-    Crea un movimiento de TRASPASO entre almacenes.
-
-    Args:
-        fecha: Fecha del movimiento
-        articulo_id: ID del artículo
-        origen_id: ID del almacén origen
-        destino_id: ID del almacén destino
-        cantidad: Cantidad a traspasar
-        operario_id: ID del operario que realiza el traspaso
-        responsable: Nombre del responsable
-        motivo: Motivo del traspaso
-
-    Returns:
-        ID del movimiento creado
-    """
-    sql = """
-        INSERT INTO movimientos(fecha, tipo, origen_id, destino_id, articulo_id, cantidad, operario_id, responsable, motivo)
-        VALUES(%s, 'TRASPASO', %s, %s, %s, %s, %s, %s, %s)
-    """
-    return execute_query(sql, (fecha, origen_id, destino_id, articulo_id, cantidad, operario_id, responsable, motivo))
-
-
-def crear_imputacion(
-    fecha: str,
-    articulo_id: int,
-    origen_id: int,
-    cantidad: float,
-    operario_id: Optional[int] = None,
-    ot: Optional[str] = None,
-    motivo: Optional[str] = None
-) -> int:
-    """
-    Crea un movimiento de IMPUTACION (consumo en obra).
-
-    Args:
-        fecha: Fecha del movimiento
-        articulo_id: ID del artículo
-        origen_id: ID del almacén origen (usualmente furgoneta)
-        cantidad: Cantidad consumida
-        operario_id: ID del operario
-        ot: Número de orden de trabajo
-        motivo: Motivo/descripción
-
-    Returns:
-        ID del movimiento creado
-    """
-    sql = """
-        INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, operario_id, ot, motivo)
-        VALUES(%s, 'IMPUTACION', %s, %s, %s, %s, %s, %s)
-    """
-    return execute_query(sql, (fecha, origen_id, articulo_id, cantidad, operario_id, ot, motivo))
-
-
-def crear_perdida(
-    fecha: str,
-    articulo_id: int,
-    origen_id: int,
-    cantidad: float,
-    motivo: str,
-    responsable: Optional[str] = None
-) -> int:
-    """
-    Crea un movimiento de PERDIDA (material perdido/dañado).
-
-    Args:
-        fecha: Fecha del movimiento
-        articulo_id: ID del artículo
-        origen_id: ID del almacén origen
-        cantidad: Cantidad perdida
-        motivo: Motivo de la pérdida (obligatorio)
-        responsable: Responsable
-
-    Returns:
-        ID del movimiento creado
-    """
-    sql = """
-        INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, motivo, responsable)
-        VALUES(%s, 'PERDIDA', %s, %s, %s, %s, %s)
-    """
-    return execute_query(sql, (fecha, origen_id, articulo_id, cantidad, motivo, responsable))
-
-
-def crear_devolucion(
-    fecha: str,
-    articulo_id: int,
-    origen_id: int,
-    cantidad: float,
-    motivo: Optional[str] = None,
-    responsable: Optional[str] = None
-) -> int:
-    """
-    Crea un movimiento de DEVOLUCION (devolución a proveedor).
+    movimiento_id = execute_query(sql, (fecha, destino_id, articulo_id, cantidad, coste_unit, albaran, responsable))
+    _avisar_cambio()
+    return movimiento_id
 
-    Args:
-        fecha: Fecha del movimiento
-        articulo_id: ID del artículo
-        origen_id: ID del almacén origen
-        cantidad: Cantidad devuelta
-        motivo: Motivo de la devolución
-        responsable: Responsable
 
-    Returns:
-        ID del movimiento creado
-    """
-    sql = """
-        INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, motivo, responsable)
-        VALUES(%s, 'DEVOLUCION', %s, %s, %s, %s, %s)
+def crear_movimientos_batch(
+    movimientos: List[Dict[str, Any]],
+    comprobar_stock: bool = False,
+    tx: Optional[Transaccion] = None
+) -> List[int]:
     """
-    return execute_query(sql, (fecha, origen_id, articulo_id, cantidad, motivo, responsable))
+    Crea múltiples movimientos en una sola transacción.
 
+    Con comprobar_stock, antes de insertar se bloquea cada par (almacén de
+    origen, artículo) de las salidas y se vuelve a comprobar el stock con el
+    bloqueo ya tomado. Dos operaciones que sacan el mismo artículo del mismo
+    almacén a la vez se esperan: la segunda ve la salida de la primera y
+    falla si ya no queda stock. Las de otros almacenes o artículos siguen en
+    paralelo. Si la transacción aborta por interbloqueo o por fallo de
+    serialización se repite entera (hasta MAX_REINTENTOS_MOVIMIENTOS veces).
 
-def crear_movimientos_batch(movimientos: List[Dict[str, Any]]) -> List[int]:
-    """
-    Crea múltiples movimientos en una sola transacción.
+    Con tx los movimientos se insertan en esa transacción, sin confirmar ni
+    reintentar: eso le corresponde a quien la abrió. Los bloqueos se
+    mantienen hasta que se confirme.
 
     Args:
         movimientos: Lista de diccionarios con datos de movimientos
                     Cada uno debe tener: tipo, fecha, articulo_id, cantidad, y otros campos según tipo
+        comprobar_stock: Bloquear y validar el stock de origen de las salidas
+        tx: Transacción en curso (opcional)
 
     Returns:
         Lista de IDs de los movimientos creados
-    """
-    con = get_con()
-    cur = con.cursor()
-    ids_creados = []
-
-    try:
-        for mov in movimientos:
-            tipo = mov['tipo']
-
-            if tipo == 'ENTRADA':
-                sql = """
-                    INSERT INTO movimientos(fecha, tipo, destino_id, articulo_id, cantidad, coste_unit, albaran, responsable)
-                    VALUES(%s, 'ENTRADA', %s, %s, %s, %s, %s, %s)
-                """
-                cur.execute(sql, (
-                    mov['fecha'],
-                    mov['destino_id'],
-                    mov['articulo_id'],
-                    mov['cantidad'],
-                    mov.get('coste_unit'),
-                    mov.get('albaran'),
-                    mov.get('responsable')
-                ))
-
-            elif tipo == 'TRASPASO':
-                sql = """
-                    INSERT INTO movimientos(fecha, tipo, origen_id, destino_id, articulo_id, cantidad, operario_id, responsable, motivo)
-                    VALUES(%s, 'TRASPASO', %s, %s, %s, %s, %s, %s, %s)
-                """
-                cur.execute(sql, (
-                    mov['fecha'],
-                    mov['origen_id'],
-                    mov['destino_id'],
-                    mov['articulo_id'],
-                    mov['cantidad'],
-                    mov.get('operario_id'),
-                    mov.get('responsable'),
-                    mov.get('motivo')
-                ))
-
-            elif tipo == 'IMPUTACION':
-                sql = """
-                    INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, operario_id, ot, motivo)
-                    VALUES(%s, 'IMPUTACION', %s, %s, %s, %s, %s, %s)
-                """
-                cur.execute(sql, (
-                    mov['fecha'],
-                    mov['origen_id'],
-                    mov['articulo_id'],
-                    mov['cantidad'],
-                    mov.get('operario_id'),
-                    mov.get('ot'),
-                    mov.get('motivo')
-                ))
-
-            elif tipo == 'PERDIDA':
-                sql = """
-                    INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, motivo, responsable)
-                    VALUES(%s, 'PERDIDA', %s, %s, %s, %s, %s)
-                """
-                cur.execute(sql, (
-                    mov['fecha'],
-                    mov['origen_id'],
-                    mov['articulo_id'],
-                    mov['cantidad'],
-                    mov['motivo'],
-                    mov.get('responsable')
-                ))
-
-            elif tipo == 'DEVOLUCION':
-                sql = """
-                    INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, motivo, responsable)
-                    VALUES(%s, 'DEVOLUCION', %s, %s, %s, %s, %s)
-                """
-                cur.execute(sql, (
-                    mov['fecha'],
-                    mov['origen_id'],
-                    mov['articulo_id'],
-                    mov['cantidad'],
-                    mov.get('motivo'),
-                    mov.get('responsable')
-                ))
-
-            ids_creados.append(cur.lastrowid)
-
-        con.commit()
-        return ids_creados
-
-    except Exception as e:
-        con.rollback()
-        raise e
-    finally:
-        con.close()
+
+    Raises:
+        InsufficientStockError: Si con comprobar_stock no hay stock suficiente
+    """
+    if tx is not None:
+        with tx.cursor() as cur:
+            return _crear_movimientos(cur, movimientos, comprobar_stock)
+
+    for intento in range(1, MAX_REINTENTOS_MOVIMIENTOS + 1):
+        con = get_con()
+        try:
+            with con.cursor() as cur:
+                ids_creados = _crear_movimientos(cur, movimientos, comprobar_stock)
+            con.commit()
+            _avisar_cambio()
+            return ids_creados
+
+        except (errors.SerializationFailure, errors.DeadlockDetected) as e:
+            con.rollback()
+            if intento == MAX_REINTENTOS_MOVIMIENTOS:
+                raise
+            logger.warning(
+                f"Movimientos: transacción abortada por concurrencia ({e.pgcode}), "
+                f"reintento {intento}/{MAX_REINTENTOS_MOVIMIENTOS - 1}"
+            )
+            time.sleep(random.uniform(0.05, 0.2) * intento)
+
+        except Exception:
+            con.rollback()
+            raise
+
+        finally:
+            release_connection(con)
+
+
+def _avisar_cambio() -> None:
+    """
+    Avanza la generación de movimientos en la caché de este proceso: el cubo
+    de consumos comprueba entonces su marca de agua en la siguiente consulta
+    en vez de esperar a la comprobación periódica. Los demás puestos no se
+    avisan; lo ven en su propia comprobación.
+    """
+    cache_maestros.invalidar('movimientos')
+
+
+def _crear_movimientos(cur, movimientos: List[Dict[str, Any]], comprobar_stock: bool) -> List[int]:
+    if comprobar_stock:
+        _bloquear_y_validar_stock(cur, movimientos)
+    return [_insertar_movimiento(cur, mov) for mov in movimientos]
+
+
+def _bloquear_y_validar_stock(cur, movimientos: List[Dict[str, Any]]) -> None:
+    """
+    Bloquea el stock de origen de las salidas y comprueba que alcanza.
+
+    No hay una tabla de stock cuyas filas bloquear (sale de vw_stock), así que
+    se usa un bloqueo consultivo de transacción por (almacén, artículo). Se
+    toman siempre ordenados, por lo que dos lotes no pueden interbloquearse
+    entre sí, y se liberan solos con el commit o el rollback.
+
+    Raises:
+        InsufficientStockError: Con todas las faltas en su atributo faltas
+            (almacen_id, articulo_id, requerido, disponible, falta)
+    """
+    requerido: Dict[Tuple[int, int], float] = {}
+    for mov in movimientos:
+        if mov['tipo'] in TIPOS_SALIDA and mov.get('origen_id'):
+            clave = (mov['origen_id'], mov['articulo_id'])
+            requerido[clave] = requerido.get(clave, 0) + mov['cantidad']
+    if not requerido:
+        return
+
+    claves = sorted(requerido)
+    almacenes = [almacen_id for almacen_id, _ in claves]
+    articulos = [articulo_id for _, articulo_id in claves]
+
+    # ORDER BY: PostgreSQL evalúa la lista del SELECT después de ordenar, así
+    # que los bloqueos se toman en ese orden y no en el que salgan de unnest
+    cur.execute(
+        "SELECT pg_advisory_xact_lock(a, b) FROM unnest(%s::int[], %s::int[]) AS t(a, b) "
+        "ORDER BY a, b",
+        (almacenes, articulos)
+    )
+
+    # Con el bloqueo tomado: cada sentencia ve lo confirmado por los lotes anteriores
+    cur.execute("""
+        SELECT almacen_id, articulo_id, COALESCE(SUM(delta), 0)
+        FROM vw_stock
+        WHERE almacen_id = ANY(%s) AND articulo_id = ANY(%s)
+        GROUP BY almacen_id, articulo_id
+    """, (sorted(set(almacenes)), sorted(set(articulos))))
+    stock = {(almacen_id, articulo_id): delta for almacen_id, articulo_id, delta in cur.fetchall()}
+
+    faltas = []
+    for almacen_id, articulo_id in claves:
+        disponible = float(stock.get((almacen_id, articulo_id), 0))
+        cantidad = requerido[(almacen_id, articulo_id)]
+        if disponible < cantidad:
+            faltas.append({
+                'almacen_id': almacen_id,
+                'articulo_id': articulo_id,
+                'requerido': cantidad,
+                'disponible': disponible,
+                'falta': cantidad - disponible
+            })
+    if faltas:
+        primera = faltas[0]
+        raise InsufficientStockError(
+            f"ID {primera['articulo_id']} (almacén {primera['almacen_id']})",
+            primera['requerido'], primera['disponible'], faltas=faltas
+        )
+
+
+def _insertar_movimiento(cur, mov: Dict[str, Any]) -> int:
+    """Inserta un movimiento según su tipo y devuelve su ID."""
+    tipo = mov['tipo']
+
+    if tipo == 'ENTRADA':
+        sql = """
+            INSERT INTO movimientos(fecha, tipo, destino_id, articulo_id, cantidad, coste_unit, albaran, responsable)
+            VALUES(%s, 'ENTRADA', %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        """
+        params = (
+            mov['fecha'],
+            mov['destino_id'],
+            mov['articulo_id'],
+            mov['cantidad'],
+            mov.get('coste_unit'),
+            mov.get('albaran'),
+            mov.get('responsable')
+        )
+
+    elif tipo == 'TRASPASO':
+        sql = """
+            INSERT INTO movimientos(fecha, tipo, origen_id, destino_id, articulo_id, cantidad, operario_id, responsable, motivo)
+            VALUES(%s, 'TRASPASO', %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        """
+        params = (
+            mov['fecha'],
+            mov['origen_id'],
+            mov['destino_id'],
+            mov['articulo_id'],
+            mov['cantidad'],
+            mov.get('operario_id'),
+            mov.get('responsable'),
+            mov.get('motivo')
+        )
+
+    elif tipo == 'IMPUTACION':
+        sql = """
+            INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, operario_id, ot, motivo)
+            VALUES(%s, 'IMPUTACION', %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        """
+        params = (
+            mov['fecha'],
+            mov['origen_id'],
+            mov['articulo_id'],
+            mov['cantidad'],
+            mov.get('operario_id'),
+            mov.get('ot'),
+            mov.get('motivo')
+        )
+
+    elif tipo == 'PERDIDA':
+        sql = """
+            INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, motivo, responsable)
+            VALUES(%s, 'PERDIDA', %s, %s, %s, %s, %s)
+            RETURNING id
+        """
+        params = (
+            mov['fecha'],
+            mov['origen_id'],
+            mov['articulo_id'],
+            mov['cantidad'],
+            mov['motivo'],
+            mov.get('responsable')
+        )
+
+    elif tipo == 'DEVOLUCION':
+        sql = """
+            INSERT INTO movimientos(fecha, tipo, origen_id, articulo_id, cantidad, motivo, responsable)
+            VALUES(%s, 'DEVOLUCION', %s, %s, %s, %s, %s)
+            RETURNING id
+        """
+        params = (
+            mov['fecha'],
+            mov['origen_id'],
+            mov['articulo_id'],
+            mov['cantidad'],
+            mov.get('motivo'),
+            mov.get('responsable')
+        )
+
+    else:
+        raise ValueError(f"Tipo de movimiento no válido: {tipo}")
+
+    cur.execute(sql, params)
+    return cur.fetchone()[0]
 
 
 # ========================================
 # OPERACIONES AUXILIARES
 # ========================================
 
-def get_almacen_by_nombre(nombre: str) -> Optional[Dict[str, Any]]:
+def get_almacen_by_nombre(nombre: str, tx: Optional[Transaccion] = None) -> Optional[Dict[str, Any]]:
     """
     Obtiene un almacén por su nombre.
 
     Args:
         nombre: Nombre del almacén
+        tx: Transacción en curso (opcional)
 
     Returns:
         Diccionario con id y nombre o None
     """
     sql = "SELECT id, nombre, tipo FROM almacenes WHERE nombre = %s"
-    return fetch_one(sql, (nombre,))
+    return fetch_one(sql, (nombre,), tx=tx)
 
 
-def get_furgoneta_asignada(operario_id: int, fecha: str) -> Optional[Dict[str, Any]]:
+def get_furgoneta_asignada(
+    operario_id: int,
+    fecha: str,
+    tx: Optional[Transaccion] = None
+) -> Optional[Dict[str, Any]]:
     """
     Obtiene la furgoneta asignada a un operario en una fecha específica.
     NUEVO: Usa la tabla asignaciones_furgoneta con soporte de turnos.
@@ -580,6 +702,7 @@ def get_furgoneta_asignada(operario_id: int, fecha: str) -> Optional[Dict[str, A
     Args:
         operario_id: ID del operario
         fecha: Fecha (YYYY-MM-DD)
+        tx: Transacción en curso (opcional)
 
     Returns:
         Diccionario con furgoneta_id y nombre o None
@@ -602,7 +725,7 @@ def get_furgoneta_asignada(operario_id: int, fecha: str) -> Optional[Dict[str, A
             END
         LIMIT 1
     """
-    return fetch_one(sql, (operario_id, fecha))
+    return fetch_one(sql, (operario_id, fecha), tx=tx, preparada="furgoneta_asignada")
 
 
 def get_operarios_activos() -> List[Dict[str, Any]]:
@@ -612,10 +735,4 @@ def get_operarios_activos() -> List[Dict[str, Any]]:
     Returns:
         Lista de operarios con id, nombre y rol
     """
-    sql = """
-        SELECT id, nombre, rol_operario
-        FROM operarios
-        WHERE activo = 1
-        ORDER BY rol_operario DESC, nombre
-    """
-    return fetch_all(sql)
+    return cache_maestros.operarios()
@@ -3,6 +3,7 @@ Repositorio de Operarios - Consultas SQL para gestión de operarios/técnicos
 """
 from typing import List, Dict, Any, Optional
 from src.core.db_utils import fetch_all, fetch_one, execute_query
+from src.core import cache_maestros
 
 
 # ========================================
@@ -27,12 +28,11 @@ def get_todos(
     Returns:
         Lista de operarios
     """
-    condiciones = []
-    params = []
+    if not filtro_texto:
+        return cache_maestros.operarios(solo_activos=solo_activos, rol=solo_rol)[:limit]
 
-    if filtro_texto:
-        condiciones.append("nombre ILIKE %s")
-        params.append(f"%{filtro_texto}%")
+    condiciones = ["nombre ILIKE %s"]
+    params = [f"%{filtro_texto}%"]
 
     if solo_rol:
         condiciones.append("rol_operario = %s")
@@ -42,7 +42,7 @@ def get_todos(
         condiciones.append("activo = %s")
         params.append(1 if solo_activos else 0)
 
-    where_clause = " AND ".join(condiciones) if condiciones else "1=1"
+    where_clause = " AND ".join(condiciones)
 
     sql = f"""
         SELECT id, nombre, rol_operario, activo
@@ -112,7 +112,9 @@ def crear_operario(
         INSERT INTO operarios(nombre, rol_operario, activo)
         VALUES(%s, %s, %s)
     """
-    return execute_query(sql, (nombre, rol_operario, 1 if activo else 0))
+    nuevo_id = execute_query(sql, (nombre, rol_operario, 1 if activo else 0))
+    cache_maestros.invalidar('operarios')
+    return nuevo_id
 
 
 def actualizar_operario(
@@ -139,6 +141,7 @@ def actualizar_operario(
         WHERE id=%s
     """
     execute_query(sql, (nombre, rol_operario, 1 if activo else 0, operario_id))
+    cache_maestros.invalidar('operarios')
     return True
 
 
@@ -159,6 +162,7 @@ def eliminar_operario(operario_id: int) -> bool:
     """
     sql = "DELETE FROM operarios WHERE id=%s"
     execute_query(sql, (operario_id,))
+    cache_maestros.invalidar('operarios')
     return True
 
 
@@ -175,6 +179,7 @@ def activar_desactivar_operario(operario_id: int, activo: bool) -> bool:
     """
     sql = "UPDATE operarios SET activo=%s WHERE id=%s"
     execute_query(sql, (1 if activo else 0, operario_id))
+    cache_maestros.invalidar('operarios')
     return True
 
 
@@ -253,13 +258,7 @@ def get_oficiales_activos() -> List[Dict[str, Any]]:
     Returns:
         Lista de oficiales activos
     """
-    sql = """
-        SELECT id, nombre
-        FROM operarios
-        WHERE rol_operario = 'oficial' AND activo = 1
-        ORDER BY nombre
-    """
-    return fetch_all(sql)
+    return cache_maestros.operarios(rol='oficial')
 
 
 def get_ayudantes_activos() -> List[Dict[str, Any]]:
@@ -269,13 +268,7 @@ def get_ayudantes_activos() -> List[Dict[str, Any]]:
     Returns:
         Lista de ayudantes activos
     """
-    sql = """
-        SELECT id, nombre
-        FROM operarios
-        WHERE rol_operario = 'ayudante' AND activo = 1
-        ORDER BY nombre
-    """
-    return fetch_all(sql)
+    return cache_maestros.operarios(rol='ayudante')
 
 
 def get_operarios_activos() -> List[Dict[str, Any]]:
@@ -285,13 +278,7 @@ def get_operarios_activos() -> List[Dict[str, Any]]:
     Returns:
         Lista de operarios activos
     """
-    sql = """
-        SELECT id, nombre, rol_operario
-        FROM operarios
-        WHERE activo = 1
-        ORDER BY rol_operario DESC, nombre
-    """
-    return fetch_all(sql)
+    return cache_maestros.operarios()
 
 
 def get_estadisticas_operario(operario_id: int) -> Dict[str, Any]:
@@ -3,19 +3,21 @@ Repositorio de Pedido Ideal - Consultas SQL para cálculo de pedidos
 """
 from typing import List, Dict, Any, Optional
 from datetime import date, timedelta
-from src.core.db_utils import fetch_all, fetch_one
+from src.core.db_utils import fetch_all, fetch_one, fetch_columnar
 
 
 # ========================================
 # CONSULTAS PARA ANÁLISIS DE CONSUMO
 # ========================================
 
-def get_articulos_para_analizar(incluir_sin_alerta: bool = False) -> List[Dict[str, Any]]:
+def get_articulos_para_analizar(incluir_sin_alerta: bool = False, columnar: bool = False):
     """
     Obtiene artículos candidatos para análisis de pedido.
     
     Args:
         incluir_sin_alerta: Si True, incluye todos los artículos activos
+        columnar: Si True, devuelve un ResultadoColumnar (stock, nivel_alerta
+            y coste como float64) en lugar de List[Dict]
         
     Returns:
         Lista de artículos con su info básica
@@ -63,6 +65,8 @@ def get_articulos_para_analizar(incluir_sin_alerta: bool = False) -> List[Dict[s
             COALESCE(a.critico, 0) DESC,
             a.nombre
     """
+    if columnar:
+        return fetch_columnar(sql)
     return fetch_all(sql)
 
 
@@ -104,27 +108,60 @@ def get_estadisticas_consumo(articulo_id: int, dias: int) -> Optional[Dict[str,
     
     sql = """
         SELECT 
-            SUM(m.cantidad) AS total_consumido,
-            COUNT(DISTINCT DATE(m.fecha)) AS dias_con_movimiento,
+            SUM(daily.cantidad_dia) AS total_consumido,
+            COUNT(*) AS dias_con_movimiento,
             AVG(daily.cantidad_dia) AS consumo_diario_medio,
             MAX(daily.cantidad_dia) AS consumo_maximo
-        FROM movimientos m
-        LEFT JOIN (
+        FROM (
             SELECT 
-                articulo_id,
                 DATE(fecha) AS fecha_dia,
                 SUM(cantidad) AS cantidad_dia
             FROM movimientos
             WHERE tipo = 'IMPUTACION'
               AND fecha >= %s
               AND articulo_id = %s
+            GROUP BY DATE(fecha)
+        ) daily
+    """
+    return fetch_one(sql, (fecha_inicio, articulo_id))
+
+
+def get_estadisticas_consumo_todos(dias: int):
+    """
+    Obtiene las estadísticas de consumo de todos los artículos en una sola consulta.
+    
+    Sustituye a llamar a get_estadisticas_consumo() una vez por artículo
+    cuando se calcula el pedido ideal completo.
+    
+    Args:
+        dias: Número de días hacia atrás
+        
+    Returns:
+        ResultadoColumnar con: articulo_id, total_consumido, dias_con_movimiento,
+        consumo_diario_medio, consumo_maximo (solo artículos con consumo)
+    """
+    fecha_inicio = (date.today() - timedelta(days=dias)).isoformat()
+    
+    sql = """
+        SELECT 
+            daily.articulo_id,
+            SUM(daily.cantidad_dia) AS total_consumido,
+            COUNT(*) AS dias_con_movimiento,
+            AVG(daily.cantidad_dia) AS consumo_diario_medio,
+            MAX(daily.cantidad_dia) AS consumo_maximo
+        FROM (
+            SELECT 
+                articulo_id,
+                DATE(fecha) AS fecha_dia,
+                SUM(cantidad) AS cantidad_dia
+            FROM movimientos
+            WHERE tipo = 'IMPUTACION'
+              AND fecha >= %s
             GROUP BY articulo_id, DATE(fecha)
-        ) daily ON m.articulo_id = daily.articulo_id
-        WHERE m.tipo = 'IMPUTACION'
-          AND m.fecha >= %s
-          AND m.articulo_id = %s
+        ) daily
+        GROUP BY daily.articulo_id
     """
-    return fetch_one(sql, (fecha_inicio, articulo_id, fecha_inicio, articulo_id))
+    return fetch_columnar(sql, (fecha_inicio,))
 
 
 # ========================================
@@ -3,6 +3,7 @@ Repositorio de Proveedores - Consultas SQL para gestión de proveedores
 """
 from typing import List, Dict, Any, Optional
 from src.core.db_utils import fetch_all, fetch_one, execute_query
+from src.core import cache_maestros
 
 
 # ========================================
@@ -33,14 +34,7 @@ def get_todos(filtro_texto: Optional[str] = None, limit: int = 1000) -> List[Dic
         """
         patron = f"%{filtro_texto}%"
         return fetch_all(sql, (patron, patron, patron, patron, limit))
-    else:
-        sql = """
-            SELECT id, nombre, telefono, contacto, email, notas
-            FROM proveedores
-            ORDER BY nombre
-            LIMIT %s
-        """
-        return fetch_all(sql, (limit,))
+    return cache_maestros.proveedores()[:limit]
 
 
 def get_by_id(proveedor_id: int) -> Optional[Dict[str, Any]]:
@@ -103,7 +97,9 @@ def crear_proveedor(
         INSERT INTO proveedores(nombre, telefono, contacto, email, notas)
         VALUES(%s, %s, %s, %s, %s)
     """
-    return execute_query(sql, (nombre, telefono, contacto, email, notas))
+    nuevo_id = execute_query(sql, (nombre, telefono, contacto, email, notas))
+    cache_maestros.invalidar('proveedores')
+    return nuevo_id
 
 
 def actualizar_proveedor(
@@ -134,6 +130,7 @@ def actualizar_proveedor(
         WHERE id=%s
     """
     execute_query(sql, (nombre, telefono, contacto, email, notas, proveedor_id))
+    cache_maestros.invalidar('proveedores')
     return True
 
 
@@ -154,6 +151,7 @@ def eliminar_proveedor(proveedor_id: int) -> bool:
     """
     sql = "DELETE FROM proveedores WHERE id=%s"
     execute_query(sql, (proveedor_id,))
+    cache_maestros.invalidar('proveedores')
     return True
 
 
@@ -1,5 +1,9 @@
 """
 Repositorio de Sesiones - Gestión de sesiones de usuario
+
+Todas las escrituras ponen valores fijos (upsert, ping, borrados), así que se
+pueden repetir sin efectos dobles: se marcan reintentables para que el ping
+periódico sobreviva a un corte de red breve.
 """
 from typing import Optional, Dict, Any
 from src.core.db_utils import execute_query, fetch_one, fetch_all
@@ -25,7 +29,7 @@ def registrar_sesion(usuario: str, inicio_utc: int, hostname: str) -> bool:
             inicio_utc = EXCLUDED.inicio_utc,
             ultimo_ping_utc = EXCLUDED.ultimo_ping_utc
     """
-    execute_query(sql, (usuario, inicio_utc, inicio_utc, hostname))
+    execute_query(sql, (usuario, inicio_utc, inicio_utc, hostname), reintentable=True)
     return True
 
 
@@ -46,7 +50,7 @@ def actualizar_ping(usuario: str, hostname: str, ultimo_ping_utc: int) -> bool:
         SET ultimo_ping_utc = %s
         WHERE usuario = %s AND hostname = %s
     """
-    execute_query(sql, (ultimo_ping_utc, usuario, hostname))
+    execute_query(sql, (ultimo_ping_utc, usuario, hostname), reintentable=True)
     return True
 
 
@@ -100,7 +104,7 @@ def eliminar_sesion(usuario: str, hostname: str) -> bool:
         True si se eliminó correctamente
     """
     sql = "DELETE FROM sesiones WHERE usuario = %s AND hostname = %s"
-    execute_query(sql, (usuario, hostname))
+    execute_query(sql, (usuario, hostname), reintentable=True)
     return True
 
 
@@ -118,4 +122,4 @@ def limpiar_sesiones_antiguas(dias: int = 7) -> int:
     limite = int(time.time()) - (dias * 24 * 3600)
 
     sql = "DELETE FROM sesiones WHERE ultimo_ping_utc < %s"
-    return execute_query(sql, (limite,))
+    return execute_query(sql, (limite,), reintentable=True)
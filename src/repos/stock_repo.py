@@ -1,19 +1,20 @@
 """
 Repositorio de Stock - Consultas SQL para obtener stock de artículos
 """
-from typing import List, Dict, Any, Optional
-from src.core.db_utils import fetch_all
+from typing import List, Dict, Any, Optional, Tuple
+from src.core.db_utils import fetch_all, fetch_columnar
 
 
-def get_stock_completo(
+def construir_consulta_stock_completo(
     filtro_texto: Optional[str] = None,
     familia: Optional[str] = None,
     almacen: Optional[int] = None,
     solo_con_stock: bool = False,
     solo_alertas: bool = False
-) -> List[Dict[str, Any]]:
+) -> Tuple[str, List[Any]]:
     """
-    Obtiene el stock completo de todos los artículos con filtros opcionales.
+    Construye la consulta de stock completo con filtros opcionales.
+    La usan get_stock_completo() y las exportaciones en streaming.
 
     Args:
         filtro_texto: Búsqueda por nombre, EAN o referencia
@@ -23,7 +24,7 @@ def get_stock_completo(
         solo_alertas: Si True, solo artículos con stock < mínimo
 
     Returns:
-        Lista de artículos con su stock por almacén
+        Tupla (sql, params)
     """
     query = """
         SELECT
@@ -74,6 +75,41 @@ def get_stock_completo(
 
     query += " ORDER BY a.nombre, alm.nombre"
 
+    return query, params
+
+
+def get_stock_completo(
+    filtro_texto: Optional[str] = None,
+    familia: Optional[str] = None,
+    almacen: Optional[int] = None,
+    solo_con_stock: bool = False,
+    solo_alertas: bool = False,
+    columnar: bool = False
+):
+    """
+    Obtiene el stock completo de todos los artículos con filtros opcionales.
+
+    Args:
+        filtro_texto: Búsqueda por nombre, EAN o referencia
+        familia: Filtro por nombre de familia
+        almacen: Filtro por ID de almacén
+        solo_con_stock: Si True, solo artículos con stock > 0
+        solo_alertas: Si True, solo artículos con stock < mínimo
+        columnar: Si True, devuelve un ResultadoColumnar (stock y min_alerta
+            como float64) en lugar de List[Dict]
+
+    Returns:
+        Lista de artículos con su stock por almacén
+    """
+    query, params = construir_consulta_stock_completo(
+        filtro_texto=filtro_texto,
+        familia=familia,
+        almacen=almacen,
+        solo_con_stock=solo_con_stock,
+        solo_alertas=solo_alertas
+    )
+    if columnar:
+        return fetch_columnar(query, params)
     return fetch_all(query, params)
 
 
@@ -98,7 +134,7 @@ def get_stock_articulo_por_almacen(articulo_id: int) -> List[Dict[str, Any]]:
         HAVING COALESCE(SUM(v.delta), 0) > 0
         ORDER BY alm.nombre
     """
-    return fetch_all(query, (articulo_id,))
+    return fetch_all(query, (articulo_id,), preparada="stock_articulo_por_almacen")
 
 
 def get_stock_total_articulo(articulo_id: int) -> float:
@@ -3,6 +3,7 @@ Repositorio de Ubicaciones - Consultas SQL para gestión de ubicaciones del alma
 """
 from typing import List, Dict, Any, Optional
 from src.core.db_utils import fetch_all, fetch_one, execute_query
+from src.core import cache_maestros
 
 
 def get_todos(filtro_texto: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
@@ -25,14 +26,7 @@ def get_todos(filtro_texto: Optional[str] = None, limit: int = 1000) -> List[Dic
             LIMIT %s
         """
         return fetch_all(sql, (f"%{filtro_texto}%", limit))
-    else:
-        sql = """
-            SELECT id, nombre
-            FROM ubicaciones
-            ORDER BY nombre
-            LIMIT %s
-        """
-        return fetch_all(sql, (limit,))
+    return cache_maestros.ubicaciones()[:limit]
 
 
 def get_by_id(ubicacion_id: int) -> Optional[Dict[str, Any]]:
@@ -50,13 +44,16 @@ def get_by_nombre(nombre: str) -> Optional[Dict[str, Any]]:
 def crear_ubicacion(nombre: str) -> int:
     """Crea una nueva ubicación."""
     sql = "INSERT INTO ubicaciones(nombre) VALUES(%s)"
-    return execute_query(sql, (nombre,))
+    nuevo_id = execute_query(sql, (nombre,))
+    cache_maestros.invalidar('ubicaciones')
+    return nuevo_id
 
 
 def actualizar_ubicacion(ubicacion_id: int, nombre: str) -> bool:
     """Actualiza una ubicación existente."""
     sql = "UPDATE ubicaciones SET nombre=%s WHERE id=%s"
     execute_query(sql, (nombre, ubicacion_id))
+    cache_maestros.invalidar('ubicaciones')
     return True
 
 
@@ -64,6 +61,7 @@ def eliminar_ubicacion(ubicacion_id: int) -> bool:
     """Elimina una ubicación (fallará si tiene artículos asociados)."""
     sql = "DELETE FROM ubicaciones WHERE id=%s"
     execute_query(sql, (ubicacion_id,))
+    cache_maestros.invalidar('ubicaciones')
     return True
 
 
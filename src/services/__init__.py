@@ -1,23 +1,19 @@
 """
 Servicios - Capa de lógica de negocio
+
+Los submódulos se importan bajo demanda (PEP 562): `from src.services import x`
+y `src.services.x` siguen funcionando, pero importar el paquete ya no arrastra
+todos los módulos ni sus dependencias al arrancar la aplicación.
 """
-from . import almacenes_service
-from . import articulos_service
-from . import familias_service
-from . import inventarios_service
-from . import movimientos_service
-from . import notificaciones_service
-from . import operarios_service
-from . import proveedores_service
-from . import stock_service
-from . import ubicaciones_service
-from . import usuarios_service
+import importlib
 
 __all__ = [
     'almacenes_service',
     'articulos_service',
+    'backup_service',
     'familias_service',
     'inventarios_service',
+    'metricas_service',
     'movimientos_service',
     'notificaciones_service',
     'operarios_service',
@@ -26,3 +22,9 @@ __all__ = [
     'ubicaciones_service',
     'usuarios_service',
 ]
+
+
+def __getattr__(nombre):
+    if nombre in __all__:
+        return importlib.import_module(f"{__name__}.{nombre}")
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -2,10 +2,25 @@
 Servicio de Artículos - Lógica de negocio para gestión de artículos del almacén
 """
 from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from datetime import date, timedelta
+import threading
+import time
 import psycopg2
-from src.repos import articulos_repo
+from src.repos import articulos_repo, movimientos_repo
+from src.core import cache_maestros
 from src.core.logger import logger, log_operacion, log_validacion, log_error_bd
 
+# Segundos que una ficha de artículo se sirve sin comprobar nada en la BD
+TTL_FICHA = 5
+MAX_FICHAS_CACHE = 64
+# Maestros cuyos nombres aparecen en la ficha
+_TABLAS_FICHA = ('articulos', 'familias', 'ubicaciones', 'proveedores', 'almacenes', 'operarios')
+
+_lock_fichas = threading.Lock()
+# (articulo_id, tipo, limit_historial) -> (instante, marca, ficha)
+_cache_fichas: "OrderedDict[Tuple, Tuple[float, Tuple, Dict[str, Any]]]" = OrderedDict()
+
 
 # ========================================
 # VALIDACIONES
@@ -544,6 +559,106 @@ def obtener_articulo(articulo_id: int) -> Optional[Dict[str, Any]]:
         return None
 
 
+def buscar_articulos_pagina(texto: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Página de artículos activos que coinciden con el texto, por relevancia.
+
+    Args:
+        texto: EAN, referencia, nombre o palabras clave
+        limit: Tamaño de la página
+        offset: Resultados a saltar
+
+    Returns:
+        Lista de artículos de la página
+    """
+    try:
+        return articulos_repo.buscar_articulos_por_texto(texto, limit=limit, offset=offset)
+    except Exception as e:
+        log_error_bd("articulos", "buscar_articulos_pagina", e)
+        return []
+
+
+def obtener_ficha(
+    articulo_id: int,
+    tipo: Optional[str] = None,
+    limit_historial: Optional[int] = 50
+) -> Optional[Dict[str, Any]]:
+    """
+    Todos los datos de la ficha de un artículo (articulos_repo.get_ficha).
+
+    Se guardan en caché por artículo y filtros del historial. Durante
+    TTL_FICHA segundos se sirven sin tocar la BD; después siguen valiendo
+    mientras el último movimiento y el número de movimientos del artículo
+    sean los mismos, lo que se comprueba con una consulta trivial. Un cambio en los maestros que
+    aparecen en la ficha (artículo, familia, proveedor...) la descarta.
+
+    La ficha devuelta se comparte con la caché: no modificarla.
+
+    Args:
+        articulo_id: ID del artículo
+        tipo: Filtro de tipo del historial (None = todos)
+        limit_historial: Movimientos del historial (None = todos)
+
+    Returns:
+        Diccionario de la ficha o None si no existe o hay error
+    """
+    clave = (articulo_id, tipo, limit_historial)
+    try:
+        generaciones = tuple(cache_maestros.generacion(t) for t in _TABLAS_FICHA)
+        ahora = time.monotonic()
+        with _lock_fichas:
+            entrada = _cache_fichas.get(clave)
+            if entrada is not None:
+                _cache_fichas.move_to_end(clave)
+
+        if entrada is not None:
+            instante, (marca_movimientos, generaciones_ficha), ficha = entrada
+            if generaciones_ficha == generaciones:
+                if ahora - instante < TTL_FICHA:
+                    return ficha
+                if movimientos_repo.get_marca_movimientos_articulo(articulo_id) == marca_movimientos:
+                    _guardar_ficha(clave, ahora, (marca_movimientos, generaciones), ficha)
+                    return ficha
+
+        fecha_30d = (date.today() - timedelta(days=30)).strftime("%Y-%m-%d")
+        ficha = articulos_repo.get_ficha(
+            articulo_id,
+            fecha_30d=fecha_30d,
+            tipo=tipo,
+            limit_historial=limit_historial
+        )
+    except Exception as e:
+        log_error_bd("articulos", "obtener_ficha", e)
+        return None
+
+    if ficha is None:
+        with _lock_fichas:
+            _cache_fichas.pop(clave, None)
+        return None
+
+    marca_movimientos = (int(ficha['ultimo_movimiento_id']), int(ficha['num_movimientos']))
+    _guardar_ficha(clave, ahora, (marca_movimientos, generaciones), ficha)
+    return ficha
+
+
+def _guardar_ficha(clave: Tuple, instante: float, marca: Tuple, ficha: Dict[str, Any]) -> None:
+    with _lock_fichas:
+        _cache_fichas[clave] = (instante, marca, ficha)
+        _cache_fichas.move_to_end(clave)
+        while len(_cache_fichas) > MAX_FICHAS_CACHE:
+            _cache_fichas.popitem(last=False)
+
+
+def invalidar_fichas(articulo_id: Optional[int] = None) -> None:
+    """Descarta las fichas en caché de un artículo (o todas con None)."""
+    with _lock_fichas:
+        if articulo_id is None:
+            _cache_fichas.clear()
+            return
+        for clave in [c for c in _cache_fichas if c[0] == articulo_id]:
+            del _cache_fichas[clave]
+
+
 def obtener_articulos_bajo_minimo() -> List[Dict[str, Any]]:
     """
     Obtiene artículos con stock por debajo del mínimo configurado.
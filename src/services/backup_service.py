@@ -0,0 +1,285 @@
+"""
+Servicio de backups - Copias lógicas de PostgreSQL con retención
+
+Cada backup es una carpeta climatot_AAAAMMDD_HHMMSS dentro de la ruta
+configurada en config_backups (ver src.core.backup_pg para el formato).
+La retención (max_backups, retencion_dias) y la regla de un backup por día
+se leen de backup_config_service.
+
+Por defecto se alternan backups completos e incrementales: tras un completo
+se encadenan hasta INCREMENTALES_POR_COMPLETO incrementales (solo las filas
+nuevas de movimientos e historial) antes de volver a hacer uno completo.
+"""
+import shutil
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core import backup_pg
+from src.core.db_utils import PROJECT_ROOT
+from src.core.logger import logger
+from src.services import backup_config_service
+
+PREFIJO = "climatot_"
+
+# Conexiones que exportan tablas a la vez
+PARALELO = 2
+
+# Longitud máxima de una cadena de incrementales antes de hacer un completo
+INCREMENTALES_POR_COMPLETO = 6
+
+MODOS = ('auto', 'completo', 'incremental')
+
+# Conexiones que cargan e indexan tablas a la vez al restaurar con
+# --paralelo. No es el valor por defecto: en paralelo un fallo deja la BD a
+# medias, mientras que con una sola conexión todo va en una transacción
+PARALELO_RESTAURACION = 4
+
+# Evita dos backups simultáneos (p. ej. el de inicio de sesión y el de cierre)
+_lock_backup = threading.Lock()
+
+
+def ruta_backups(config=None) -> Path:
+    """Carpeta de backups configurada (o db/backups)."""
+    config = config or backup_config_service.obtener_configuracion()
+    if config.ruta_backups:
+        return Path(config.ruta_backups)
+    return PROJECT_ROOT / "db" / "backups"
+
+
+def _carpetas_backup(directorio: Path) -> List[Path]:
+    """Backups terminados (con manifiesto) del directorio, del más reciente al más antiguo."""
+    if not directorio.exists():
+        return []
+    carpetas = [
+        p for p in directorio.glob(f"{PREFIJO}*")
+        if p.is_dir() and not p.name.endswith(".parcial") and (p / backup_pg.MANIFIESTO).exists()
+    ]
+    # El nombre lleva la fecha: ordena igual que la fecha de creación
+    return sorted(carpetas, key=lambda p: p.name, reverse=True)
+
+
+def _fecha_backup(carpeta: Path) -> datetime:
+    return datetime.strptime(carpeta.name[len(PREFIJO):len(PREFIJO) + 15], "%Y%m%d_%H%M%S")
+
+
+def hay_backup_hoy(directorio: Optional[Path] = None) -> bool:
+    """True si ya existe un backup con la fecha de hoy."""
+    directorio = directorio or ruta_backups()
+    hoy = datetime.now().strftime("%Y%m%d")
+    return any(c.name.startswith(f"{PREFIJO}{hoy}_") for c in _carpetas_backup(directorio))
+
+
+def _backup_anterior(directorio: Path, modo: str) -> Optional[Path]:
+    """Backup sobre el que encadenar un incremental, o None para hacer uno completo."""
+    if modo == 'completo':
+        return None
+    backups = _carpetas_backup(directorio)
+    if not backups:
+        return None
+    try:
+        cadena = backup_pg.resolver_cadena(backups[0])
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"BACKUP | Cadena de {backups[0].name} incompleta, se hace completo: {e}")
+        return None
+    if modo == 'auto' and len(cadena) > INCREMENTALES_POR_COMPLETO:
+        return None
+    return backups[0]
+
+
+def crear_backup(forzar: bool = False, modo: str = 'auto') -> Tuple[bool, str, Optional[Path]]:
+    """
+    Crea un backup de la BD y aplica la retención configurada.
+
+    Args:
+        forzar: Si True, ignora la restricción de un backup por día
+        modo: 'completo', 'incremental' (sobre el último backup) o 'auto'
+            (incremental salvo que la cadena alcance INCREMENTALES_POR_COMPLETO).
+            Si un incremental no es seguro se hace completo igualmente.
+
+    Returns:
+        Tuple[bool, str, Optional[Path]]: (éxito, mensaje, carpeta del backup)
+    """
+    if modo not in MODOS:
+        return False, f"Modo de backup desconocido: {modo}", None
+    if not _lock_backup.acquire(blocking=False):
+        return False, "Ya hay un backup en curso", None
+
+    try:
+        config = backup_config_service.obtener_configuracion()
+        directorio = ruta_backups(config)
+
+        if not forzar and not config.permitir_multiples_diarios and hay_backup_hoy(directorio):
+            logger.info("BACKUP | Ya existe un backup del día de hoy, operación omitida")
+            return False, "Ya existe un backup de hoy", None
+
+        carpeta = directorio / f"{PREFIJO}{datetime.now():%Y%m%d_%H%M%S}"
+        try:
+            anterior = _backup_anterior(directorio, modo)
+            manifiesto = backup_pg.exportar(carpeta, paralelo=PARALELO, anterior=anterior)
+        except Exception as e:
+            parcial = carpeta.with_name(carpeta.name + ".parcial")
+            shutil.rmtree(parcial, ignore_errors=True)
+            logger.error(f"BACKUP | Error al crear backup: {type(e).__name__}: {e}")
+            return False, f"Error al crear backup: {e}", None
+
+        filas = sum(t['filas'] for t in manifiesto['tablas'].values())
+        tamanio_mb = sum(t['bytes_archivo'] for t in manifiesto['tablas'].values()) / (1024 * 1024)
+        logger.info(
+            f"BACKUP | Backup {manifiesto['tipo']} creado: {carpeta.name} | {len(manifiesto['tablas'])} tablas | "
+            f"{filas:,} filas | {tamanio_mb:.2f} MB ({manifiesto['compresion']}) | "
+            f"{manifiesto['duracion_s']:.1f} s"
+        )
+
+        limpiar_backups_antiguos(directorio, config)
+        return True, f"Backup {manifiesto['tipo']} creado: {carpeta.name} ({tamanio_mb:.2f} MB)", carpeta
+    finally:
+        _lock_backup.release()
+
+
+def crear_backup_en_segundo_plano(forzar: bool = False) -> threading.Thread:
+    """
+    Lanza crear_backup() en un hilo y devuelve enseguida.
+
+    El hilo no es daemon: si se lanza al cerrar la aplicación, la ventana se
+    cierra en el acto pero el proceso espera a que el backup termine en vez
+    de dejarlo a medias.
+    """
+    def _ejecutar():
+        try:
+            crear_backup(forzar=forzar)
+        except Exception as e:
+            logger.error(f"BACKUP | Error en el backup en segundo plano: {e}")
+
+    hilo = threading.Thread(target=_ejecutar, name="backup_bd", daemon=False)
+    hilo.start()
+    return hilo
+
+
+def limpiar_backups_antiguos(directorio: Path, config=None) -> int:
+    """
+    Elimina los backups que exceden max_backups o son más antiguos que
+    retencion_dias.
+
+    Nunca se borra un backup del que dependa otro que se conserva (su base o
+    un incremental intermedio de su cadena); los incrementales cuya cadena
+    ya está rota no se pueden restaurar y se eliminan.
+
+    Returns:
+        Número de backups eliminados
+    """
+    config = config or backup_config_service.obtener_configuracion()
+    backups = _carpetas_backup(directorio)
+
+    a_eliminar = set(backups[config.max_backups:])
+    if config.retencion_dias:
+        limite = datetime.now() - timedelta(days=config.retencion_dias)
+        a_eliminar.update(b for b in backups if _fecha_backup(b) < limite)
+
+    necesarios = set()
+    for carpeta in backups:
+        try:
+            cadena = backup_pg.resolver_cadena(carpeta)
+        except (OSError, ValueError, KeyError):
+            a_eliminar.add(carpeta)
+            continue
+        if carpeta not in a_eliminar:
+            necesarios.update(cadena)
+    a_eliminar -= necesarios
+
+    for carpeta in sorted(a_eliminar):
+        try:
+            shutil.rmtree(carpeta)
+            logger.info(f"BACKUP | Backup antiguo eliminado: {carpeta.name}")
+        except OSError as e:
+            logger.error(f"BACKUP | No se pudo eliminar {carpeta.name}: {e}")
+            a_eliminar.discard(carpeta)
+
+    # Restos de backups interrumpidos (se llama desde crear_backup, con el
+    # lock tomado: no hay ningún otro backup escribiendo)
+    for parcial in directorio.glob(f"{PREFIJO}*.parcial"):
+        shutil.rmtree(parcial, ignore_errors=True)
+
+    return len(a_eliminar)
+
+
+def listar_backups(directorio: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    Backups disponibles, del más reciente al más antiguo.
+
+    Returns:
+        Lista de dicts con: nombre, ruta, fecha, tipo, base, tablas, filas, tamanio_mb
+        (en los incrementales, filas cuenta solo las del delta)
+    """
+    directorio = directorio or ruta_backups()
+    backups = []
+    for carpeta in _carpetas_backup(directorio):
+        try:
+            manifiesto = backup_pg.leer_manifiesto(carpeta)
+        except (OSError, ValueError) as e:
+            logger.warning(f"BACKUP | Manifiesto ilegible en {carpeta.name}: {e}")
+            continue
+        tablas = manifiesto['tablas'].values()
+        backups.append({
+            'nombre': carpeta.name,
+            'ruta': carpeta,
+            'fecha': _fecha_backup(carpeta),
+            'tipo': manifiesto['tipo'],
+            'base': manifiesto.get('base'),
+            'tablas': len(manifiesto['tablas']),
+            'filas': sum(t['filas'] for t in tablas),
+            'tamanio_mb': sum(t['bytes_archivo'] for t in tablas) / (1024 * 1024),
+        })
+    return backups
+
+
+def verificar_backup(carpeta: Path) -> Tuple[bool, str]:
+    """
+    Comprueba los archivos del backup (y, si es incremental, los de toda su
+    cadena) contra los SHA-256 de sus manifiestos.
+
+    Returns:
+        Tuple[bool, str]: (íntegro, mensaje)
+    """
+    try:
+        cadena = backup_pg.resolver_cadena(carpeta)
+        backup_pg.planificar_cargas(cadena)
+        problemas = []
+        for eslabon in cadena:
+            problemas.extend(f"{eslabon.name}: {p}" for p in backup_pg.verificar_archivos(eslabon))
+    except (OSError, ValueError, KeyError) as e:
+        return False, f"No se pudo leer el backup: {e}"
+    if problemas:
+        return False, "\n".join(problemas)
+    return True, "Backup íntegro"
+
+
+def restaurar_backup(carpeta: Path, paralelo: int = 1) -> Tuple[bool, str]:
+    """
+    Sustituye los datos de la BD por los del backup. Un incremental se
+    restaura reproduciendo su cadena desde el backup completo de la base.
+
+    Antes de tocar la BD se comprueban los SHA-256 de todos los archivos
+    y al final se comparan filas y stock con los del backup. Por defecto
+    todo va en una transacción y, si algo falla, la BD queda como estaba.
+    Con paralelo>1 las tablas se cargan e indexan en varias conexiones:
+    más rápido, pero un fallo deja la BD a medias y hay que repetir la
+    restauración.
+
+    Returns:
+        Tuple[bool, str]: (éxito, mensaje)
+    """
+    valido, mensaje = verificar_backup(carpeta)
+    if not valido:
+        logger.error(f"BACKUP | El backup no es válido: {carpeta} | {mensaje}")
+        return False, f"El backup no es válido:\n{mensaje}"
+
+    try:
+        filas = backup_pg.importar(carpeta, paralelo=paralelo)
+    except Exception as e:
+        logger.error(f"BACKUP | Error al restaurar {carpeta.name}: {type(e).__name__}: {e}")
+        return False, f"Error al restaurar: {e}"
+
+    return True, (f"Restaurado {carpeta.name}: {len(filas)} tablas, {sum(filas.values()):,} filas "
+                  f"(verificado contra el manifiesto)")
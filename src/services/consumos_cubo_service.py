@@ -0,0 +1,416 @@
+"""
+Servicio de Cubo de Consumos - Análisis multidimensional de imputaciones
+
+El cubo se construye a partir de un único rollup diario
+(consumos_repo.get_rollup_consumos) y responde en memoria, con pandas,
+a cualquier combinación de agrupación, filtro y drill-down sobre las
+dimensiones y medidas definidas abajo.
+
+Cachés:
+    - Rollup base por rango de fechas.
+    - Cortes agregados por (rango, dimensiones, filtros, medidas).
+
+Invalidación:
+    - Movimientos: marca de agua con el último id de movimientos, comprobada
+      como mucho cada COMPROBAR_MOVIMIENTOS_CADA segundos (o en la siguiente
+      consulta si este proceso ha escrito movimientos). Si hay imputaciones
+      nuevas solo se descartan los rangos que incluyen alguna de sus fechas:
+      lo normal es que sean de hoy, y los cortes de meses cerrados siguen
+      sirviéndose desde memoria. Los movimientos no se modifican; tras una
+      corrección a mano en la BD hay que llamar a invalidar_cache().
+    - Etiquetas: cuando cambia la generación (src.core.cache_maestros) de
+      artículos, familias, operarios o almacenes se vacía todo.
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from datetime import date
+import threading
+import time
+
+import pandas as pd
+
+from src.repos import consumos_repo
+from src.core import cache_maestros
+from src.core.columnar import ResultadoColumnar
+from src.core.logger import logger
+
+
+# ========================================
+# DEFINICIÓN DEL CUBO
+# ========================================
+
+# Dimensión -> (columna clave, columna etiqueta)
+DIMENSIONES = {
+    'articulo': ('articulo_id', 'articulo'),
+    'familia': ('familia_id', 'familia'),
+    'operario': ('operario_id', 'operario'),
+    'furgoneta': ('furgoneta_id', 'furgoneta'),
+    'ot': ('ot', 'ot'),
+    'dia': ('dia', 'dia'),
+    'semana': ('semana', 'semana'),
+    'mes': ('mes', 'mes'),
+}
+
+MEDIDAS = ('cantidad', 'coste', 'imputaciones')
+
+# Jerarquías de drill-down por defecto (de lo general a lo concreto)
+JERARQUIAS = {
+    'familia': 'articulo',
+    'mes': 'semana',
+    'semana': 'dia',
+    'furgoneta': 'operario',
+    'operario': 'ot',
+    'ot': 'articulo',
+}
+
+MAX_CORTES_CACHE = 64
+
+# Atributos que acompañan a una dimensión en los cortes (dependen de su clave)
+ATRIBUTOS = {
+    'articulo': ('unidad',),
+}
+
+# Tablas de las que salen las etiquetas del rollup
+_TABLAS_ETIQUETAS = ('articulos', 'familias', 'operarios', 'almacenes')
+# Segundos entre comprobaciones de la marca de agua de movimientos
+COMPROBAR_MOVIMIENTOS_CADA = 10
+
+_lock = threading.Lock()
+_cache_base: Dict[Tuple, pd.DataFrame] = {}
+_cache_cortes: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+_marca_etiquetas: Optional[Tuple[int, ...]] = None
+_marca_movimientos: Optional[int] = None
+_generacion_movimientos = 0
+_comprobado_en = 0.0
+
+
+# ========================================
+# CONSTRUCCIÓN Y CACHÉ
+# ========================================
+
+def _a_iso(valor) -> Optional[str]:
+    if valor is None:
+        return None
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _construir_base(filas) -> pd.DataFrame:
+    """
+    Convierte el rollup en un DataFrame tipado con las columnas de tiempo derivadas.
+
+    Acepta un ResultadoColumnar (las columnas pasan tal cual a pandas, sin
+    construir un dict por fila) o una lista de dicts.
+    """
+    columnas = [
+        'fecha', 'articulo_id', 'articulo', 'unidad', 'familia_id', 'familia',
+        'operario_id', 'operario', 'furgoneta_id', 'furgoneta', 'ot',
+        'cantidad', 'coste', 'imputaciones'
+    ]
+    if isinstance(filas, ResultadoColumnar) and len(filas):
+        df = filas.to_dataframe()[columnas]
+    else:
+        df = pd.DataFrame.from_records(list(filas), columns=columnas)
+
+    df['cantidad'] = pd.to_numeric(df['cantidad'], errors='coerce').fillna(0.0).astype('float64')
+    df['coste'] = pd.to_numeric(df['coste'], errors='coerce').fillna(0.0).astype('float64')
+    df['imputaciones'] = pd.to_numeric(df['imputaciones'], errors='coerce').fillna(0).astype('int64')
+    for col in ('articulo_id', 'familia_id', 'operario_id', 'furgoneta_id'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(-1).astype('int64')
+
+    fechas = pd.to_datetime(df['fecha'])
+    df['dia'] = fechas.dt.strftime('%Y-%m-%d')
+    iso = fechas.dt.isocalendar()
+    df['semana'] = iso['year'].astype(str) + '-S' + iso['week'].astype(str).str.zfill(2)
+    df['mes'] = fechas.dt.strftime('%Y-%m')
+
+    df['unidad'] = df['unidad'].fillna('')
+
+    # Las etiquetas se repiten muchísimo: categorías ahorran memoria y aceleran groupby
+    for col in ('articulo', 'unidad', 'familia', 'operario', 'furgoneta', 'ot', 'dia', 'semana', 'mes'):
+        df[col] = df[col].astype('category')
+
+    return df.drop(columns=['fecha'])
+
+
+def _comprobar_marca() -> None:
+    """
+    Descarta de las cachés lo que haya cambiado desde la última comprobación.
+
+    Las etiquetas se comparan sin consultar la BD. La marca de agua de
+    movimientos cuesta una consulta por índice y se comprueba como mucho cada
+    COMPROBAR_MOVIMIENTOS_CADA segundos.
+    """
+    global _marca_etiquetas, _marca_movimientos, _generacion_movimientos, _comprobado_en
+
+    etiquetas = tuple(cache_maestros.generacion(tabla) for tabla in _TABLAS_ETIQUETAS)
+    with _lock:
+        if etiquetas != _marca_etiquetas:
+            if _marca_etiquetas is not None:
+                logger.debug("Cubo de consumos: etiquetas cambiadas, invalidando caché")
+            _cache_base.clear()
+            _cache_cortes.clear()
+            _marca_etiquetas = etiquetas
+
+    generacion = cache_maestros.generacion('movimientos')
+    ahora = time.monotonic()
+    if (
+        _marca_movimientos is not None
+        and generacion == _generacion_movimientos
+        and ahora - _comprobado_en < COMPROBAR_MOVIMIENTOS_CADA
+    ):
+        return
+
+    marca = consumos_repo.get_marca_imputaciones(_marca_movimientos)
+    with _lock:
+        if _marca_movimientos is None:
+            # Primera comprobación: lo que haya en caché se cargó sin marca
+            _cache_base.clear()
+            _cache_cortes.clear()
+        elif marca['fecha_min'] is not None:
+            _descartar_rango(_a_iso(marca['fecha_min']), _a_iso(marca['fecha_max']))
+        _marca_movimientos = int(marca['max_id'])
+        _generacion_movimientos = generacion
+        _comprobado_en = ahora
+
+
+def _descartar_rango(fecha_min: str, fecha_max: str) -> None:
+    """Quita de las cachés los rangos que se solapan con [fecha_min, fecha_max] (con _lock)."""
+    def afectado(desde: Optional[str], hasta: Optional[str]) -> bool:
+        return (hasta is None or hasta >= fecha_min) and (desde is None or desde <= fecha_max)
+
+    for clave in [c for c in _cache_base if afectado(*c)]:
+        del _cache_base[clave]
+    for clave in [c for c in _cache_cortes if afectado(c[0], c[1])]:
+        del _cache_cortes[clave]
+    logger.debug(f"Cubo de consumos: imputaciones nuevas del {fecha_min} al {fecha_max}, rangos afectados descartados")
+
+
+def _obtener_base(fecha_desde: Optional[str], fecha_hasta: Optional[str]) -> pd.DataFrame:
+    clave = (fecha_desde, fecha_hasta)
+    with _lock:
+        base = _cache_base.get(clave)
+    if base is not None:
+        return base
+
+    filas = consumos_repo.get_rollup_consumos(fecha_desde, fecha_hasta, columnar=True)
+    base = _construir_base(filas)
+    with _lock:
+        _cache_base[clave] = base
+    logger.debug(f"Cubo de consumos: rollup {clave} cargado ({len(base)} filas)")
+    return base
+
+
+def invalidar_cache() -> None:
+    """Vacía todas las cachés del cubo (p. ej. tras una corrección masiva)."""
+    global _marca_etiquetas, _marca_movimientos
+    with _lock:
+        _cache_base.clear()
+        _cache_cortes.clear()
+        _marca_etiquetas = None
+        _marca_movimientos = None
+
+
+# ========================================
+# CONSULTA DEL CUBO
+# ========================================
+
+def _normalizar_filtros(filtros: Optional[Dict[str, Any]]) -> Tuple:
+    """Convierte los filtros en una tupla ordenada y hashable para la clave de caché."""
+    if not filtros:
+        return ()
+    normalizados = []
+    for dim, valor in filtros.items():
+        if dim not in DIMENSIONES:
+            raise ValueError(f"Dimensión de filtro desconocida: {dim}")
+        if isinstance(valor, (list, tuple, set, frozenset)):
+            valor = tuple(sorted(valor, key=str))
+        else:
+            valor = (valor,)
+        normalizados.append((dim, valor))
+    return tuple(sorted(normalizados))
+
+
+def _aplicar_filtros(df: pd.DataFrame, filtros: Tuple) -> pd.DataFrame:
+    for dim, valores in filtros:
+        col_clave, col_etiqueta = DIMENSIONES[dim]
+        # Se admite filtrar por id o por etiqueta indistintamente
+        mascara = df[col_clave].isin(valores)
+        if col_etiqueta != col_clave:
+            mascara |= df[col_etiqueta].isin(valores)
+        df = df[mascara]
+    return df
+
+
+def consultar(
+    dimensiones: List[str],
+    filtros: Optional[Dict[str, Any]] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    medidas: Optional[List[str]] = None,
+    ordenar_por: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Agrega el cubo por las dimensiones indicadas.
+
+    Args:
+        dimensiones: Dimensiones de agrupación (ver DIMENSIONES). Vacío = total general
+        filtros: {dimension: valor | [valores]} por id o por etiqueta
+        fecha_desde: Fecha inicio del rollup
+        fecha_hasta: Fecha fin del rollup
+        medidas: Medidas a devolver (por defecto todas)
+        ordenar_por: Columna por la que ordenar de mayor a menor: una medida
+            (por defecto 'coste') o la etiqueta de una dimensión ('dia'...)
+        limit: Número máximo de filas
+
+    Returns:
+        Lista de dicts con las etiquetas de cada dimensión, '<dim>_id' cuando la
+        dimensión tiene clave numérica, sus ATRIBUTOS y las medidas agregadas
+
+    Raises:
+        ValueError: Si se pide una dimensión o medida inexistente
+        psycopg2.Error: Si falla la carga del rollup o la marca de agua
+    """
+    dimensiones = list(dimensiones or [])
+    for dim in dimensiones:
+        if dim not in DIMENSIONES:
+            raise ValueError(f"Dimensión desconocida: {dim}")
+    medidas = list(medidas or MEDIDAS)
+    for medida in medidas:
+        if medida not in MEDIDAS:
+            raise ValueError(f"Medida desconocida: {medida}")
+    ordenar_por = ordenar_por or ('coste' if 'coste' in medidas else medidas[0])
+
+    desde = _a_iso(fecha_desde)
+    hasta = _a_iso(fecha_hasta)
+    filtros_norm = _normalizar_filtros(filtros)
+
+    _comprobar_marca()
+
+    clave = (desde, hasta, tuple(dimensiones), filtros_norm, tuple(medidas))
+    with _lock:
+        corte = _cache_cortes.get(clave)
+        if corte is not None:
+            _cache_cortes.move_to_end(clave)
+
+    if corte is None:
+        corte = _calcular_corte(_obtener_base(desde, hasta), dimensiones, filtros_norm, medidas)
+        with _lock:
+            _cache_cortes[clave] = corte
+            while len(_cache_cortes) > MAX_CORTES_CACHE:
+                _cache_cortes.popitem(last=False)
+
+    resultado = corte
+    if ordenar_por in resultado.columns:
+        resultado = resultado.sort_values(ordenar_por, ascending=False, kind='stable')
+    if limit:
+        resultado = resultado.head(limit)
+    return resultado.to_dict('records')
+
+
+def _calcular_corte(
+    base: pd.DataFrame,
+    dimensiones: List[str],
+    filtros: Tuple,
+    medidas: List[str]
+) -> pd.DataFrame:
+    """Filtra y agrega la base; el resultado se guarda en la caché de cortes."""
+    df = _aplicar_filtros(base, filtros)
+
+    if not dimensiones:
+        totales = {m: df[m].sum() for m in medidas}
+        return pd.DataFrame([totales])
+
+    columnas_grupo = []
+    for dim in dimensiones:
+        col_clave, col_etiqueta = DIMENSIONES[dim]
+        if col_clave != col_etiqueta:
+            columnas_grupo.append(col_clave)
+        columnas_grupo.append(col_etiqueta)
+        columnas_grupo.extend(ATRIBUTOS.get(dim, ()))
+
+    corte = (
+        df.groupby(columnas_grupo, observed=True, sort=False, dropna=False)[medidas]
+        .sum()
+        .reset_index()
+    )
+    for col in corte.columns:
+        if isinstance(corte[col].dtype, pd.CategoricalDtype):
+            corte[col] = corte[col].astype(str)
+    return corte
+
+
+def drill_down(
+    dimensiones: List[str],
+    seleccion: Dict[str, Any],
+    filtros: Optional[Dict[str, Any]] = None,
+    nueva_dimension: Optional[str] = None,
+    **kwargs
+) -> Tuple[List[str], Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Baja un nivel desde una celda de un corte.
+
+    La selección se añade a los filtros y la última dimensión se sustituye por
+    su siguiente nivel (JERARQUIAS) o por la nueva dimensión indicada.
+
+    Args:
+        dimensiones: Dimensiones del corte actual
+        seleccion: {dimension: valor} de la celda pulsada
+        filtros: Filtros del corte actual
+        nueva_dimension: Dimensión a la que bajar (None = jerarquía por defecto)
+        **kwargs: Resto de argumentos de consultar() (fechas, medidas, limit...)
+
+    Returns:
+        Tupla (dimensiones, filtros, filas) del nuevo corte
+    """
+    if not dimensiones:
+        raise ValueError("No hay dimensión desde la que hacer drill-down")
+
+    ultima = dimensiones[-1]
+    destino = nueva_dimension or JERARQUIAS.get(ultima)
+    if not destino:
+        raise ValueError(f"La dimensión '{ultima}' no tiene nivel inferior definido")
+
+    nuevos_filtros = dict(filtros or {})
+    nuevos_filtros.update(seleccion)
+    nuevas_dimensiones = [d for d in dimensiones if d not in seleccion] + [destino]
+    nuevas_dimensiones = list(dict.fromkeys(nuevas_dimensiones))
+
+    filas = consultar(nuevas_dimensiones, nuevos_filtros, **kwargs)
+    return nuevas_dimensiones, nuevos_filtros, filas
+
+
+def pivotar(
+    filas_dim: str,
+    columnas_dim: str,
+    medida: str = 'coste',
+    filtros: Optional[Dict[str, Any]] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Devuelve una tabla cruzada lista para pintar en un QTableWidget.
+
+    Returns:
+        Dict con 'filas' (etiquetas), 'columnas' (etiquetas) y 'valores'
+        (matriz de floats filas × columnas)
+    """
+    registros = consultar(
+        [filas_dim, columnas_dim], filtros, fecha_desde, fecha_hasta, medidas=[medida]
+    )
+    if not registros:
+        return {'filas': [], 'columnas': [], 'valores': []}
+
+    etiqueta_filas = DIMENSIONES[filas_dim][1]
+    etiqueta_columnas = DIMENSIONES[columnas_dim][1]
+    tabla = pd.DataFrame.from_records(registros).pivot_table(
+        index=etiqueta_filas, columns=etiqueta_columnas, values=medida,
+        aggfunc='sum', fill_value=0.0
+    )
+    return {
+        'filas': [str(v) for v in tabla.index],
+        'columnas': [str(v) for v in tabla.columns],
+        'valores': tabla.to_numpy(dtype=float).tolist(),
+    }
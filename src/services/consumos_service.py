@@ -4,6 +4,7 @@ Servicio de Consumos - Lógica de negocio para análisis de consumos
 from typing import List, Dict, Any, Optional
 from datetime import date, datetime, timedelta
 from src.repos import consumos_repo
+from src.core.db_utils import instantanea
 
 
 # ========================================
@@ -17,8 +18,10 @@ def obtener_consumos_ot(ot: str) -> Dict[str, Any]:
     Returns:
         Dict con 'detalle' (lista) y 'resumen' (dict)
     """
-    detalle = consumos_repo.get_consumos_por_ot(ot)
-    resumen = consumos_repo.get_resumen_ot(ot)
+    # Detalle y resumen de la misma instantánea: los totales cuadran con las filas
+    with instantanea():
+        detalle = consumos_repo.get_consumos_por_ot(ot)
+        resumen = consumos_repo.get_resumen_ot(ot)
     
     return {
         'detalle': detalle,
@@ -41,33 +44,6 @@ def obtener_ots_recientes(limit: int = 50) -> List[Dict[str, Any]]:
 # SERVICIOS POR OPERARIO
 # ========================================
 
-def obtener_consumos_operario(operario_id: int, fecha_desde: date = None, fecha_hasta: date = None) -> Dict[str, Any]:
-    """
-    Obtiene análisis completo de consumos de un operario.
-    
-    Returns:
-        Dict con 'detalle', 'resumen', 'top_articulos'
-    """
-    # Convertir fechas a string ISO
-    desde_str = fecha_desde.isoformat() if fecha_desde else None
-    hasta_str = fecha_hasta.isoformat() if fecha_hasta else None
-    
-    detalle = consumos_repo.get_consumos_por_operario(operario_id, desde_str, hasta_str)
-    resumen = consumos_repo.get_resumen_operario(operario_id, desde_str, hasta_str)
-    top_articulos = consumos_repo.get_top_articulos_operario(operario_id, desde_str, hasta_str, 10)
-    
-    return {
-        'detalle': detalle,
-        'resumen': resumen if resumen else {
-            'operario_nombre': 'Desconocido',
-            'total_imputaciones': 0,
-            'total_ots': 0,
-            'coste_total': 0.0
-        },
-        'top_articulos': top_articulos
-    }
-
-
 def obtener_operarios_con_consumos() -> List[Dict[str, Any]]:
     """
     Obtiene lista de operarios que han hecho imputaciones.
@@ -85,29 +61,6 @@ def obtener_operarios_con_consumos() -> List[Dict[str, Any]]:
 # SERVICIOS POR FURGONETA
 # ========================================
 
-def obtener_consumos_furgoneta(furgoneta_id: int, fecha_desde: date = None, fecha_hasta: date = None) -> Dict[str, Any]:
-    """
-    Obtiene análisis de consumos de una furgoneta.
-    
-    Returns:
-        Dict con 'detalle' y 'resumen'
-    """
-    desde_str = fecha_desde.isoformat() if fecha_desde else None
-    hasta_str = fecha_hasta.isoformat() if fecha_hasta else None
-    
-    detalle = consumos_repo.get_consumos_por_furgoneta(furgoneta_id, desde_str, hasta_str)
-    resumen = consumos_repo.get_resumen_furgoneta(furgoneta_id, desde_str, hasta_str)
-    
-    return {
-        'detalle': detalle,
-        'resumen': resumen if resumen else {
-            'furgoneta_nombre': 'Desconocida',
-            'total_imputaciones': 0,
-            'coste_total': 0.0
-        }
-    }
-
-
 def obtener_lista_furgonetas() -> List[Dict[str, Any]]:
     """
     Obtiene lista de furgonetas disponibles.
@@ -119,25 +72,17 @@ def obtener_lista_furgonetas() -> List[Dict[str, Any]]:
 # SERVICIOS POR PERÍODO
 # ========================================
 
-def obtener_analisis_periodo(fecha_desde: date, fecha_hasta: date) -> Dict[str, Any]:
+def obtener_resumen_periodo(fecha_desde: date, fecha_hasta: date) -> Dict[str, Any]:
     """
-    Obtiene análisis completo de un período.
-    
+    Obtiene los totales de movimientos de un período (entradas, imputaciones,
+    pérdidas, devoluciones). Los rankings de imputaciones salen del cubo de
+    consumos (consumos_cubo_service).
+
     Returns:
-        Dict con 'resumen', 'articulos_top', 'operarios_top'
+        Dict con total_entradas, total_imputaciones, total_perdidas,
+        total_devoluciones, total_ots y total_movimientos
     """
-    desde_str = fecha_desde.isoformat()
-    hasta_str = fecha_hasta.isoformat()
-    
-    resumen = consumos_repo.get_resumen_periodo(desde_str, hasta_str)
-    articulos = consumos_repo.get_articulos_mas_consumidos_periodo(desde_str, hasta_str, 10)
-    operarios = consumos_repo.get_operarios_mas_activos_periodo(desde_str, hasta_str, 10)
-    
-    return {
-        'resumen': resumen if resumen else {},
-        'articulos_top': articulos,
-        'operarios_top': operarios
-    }
+    return consumos_repo.get_resumen_periodo(fecha_desde.isoformat(), fecha_hasta.isoformat())
 
 
 def obtener_periodo_mes_actual() -> tuple[date, date]:
@@ -179,30 +124,6 @@ def obtener_periodo_mes_anterior() -> tuple[date, date]:
 # SERVICIOS POR ARTÍCULO
 # ========================================
 
-def obtener_consumos_articulo(articulo_id: int, fecha_desde: date = None, fecha_hasta: date = None) -> Dict[str, Any]:
-    """
-    Obtiene análisis de consumos de un artículo específico.
-    
-    Returns:
-        Dict con 'detalle' y 'resumen'
-    """
-    desde_str = fecha_desde.isoformat() if fecha_desde else None
-    hasta_str = fecha_hasta.isoformat() if fecha_hasta else None
-    
-    detalle = consumos_repo.get_consumos_por_articulo(articulo_id, desde_str, hasta_str)
-    resumen = consumos_repo.get_resumen_articulo(articulo_id, desde_str, hasta_str)
-    
-    return {
-        'detalle': detalle,
-        'resumen': resumen if resumen else {
-            'articulo_nombre': 'Desconocido',
-            'cantidad_total': 0,
-            'veces_usado': 0,
-            'coste_total': 0.0
-        }
-    }
-
-
 def buscar_articulos(texto: str) -> List[Dict[str, Any]]:
     """
     Busca artículos por texto.
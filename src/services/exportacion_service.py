@@ -0,0 +1,366 @@
+"""
+Servicio de Exportación - Exportaciones completas a Excel/CSV en streaming
+
+En lugar de recorrer la QTableWidget (que solo contiene lo que cabe en el
+LIMIT de pantalla), cada exportación ejecuta la misma consulta del repo sin
+límite a través de un cursor con nombre de PostgreSQL (server-side) y
+escribe las filas por bloques en un CSV o en un libro openpyxl en modo
+write-only. La memoria usada queda acotada por el tamaño del bloque.
+
+Uso:
+    filas = exportacion_service.exportar(
+        'movimientos', ruta, filtros={'fecha_desde': '2025-01-01'},
+        progreso=lambda hechas, total: ...
+    )
+"""
+import csv
+from dataclasses import dataclass, field
+from datetime import datetime, date
+from decimal import Decimal
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterator, Union
+
+from src.core.db_utils import iter_chunks, fetch_one
+from src.core.logger import logger
+from src.repos import (
+    stock_repo, movimientos_repo, asignaciones_repo, consumos_repo
+)
+
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+TAMANO_BLOQUE = 5000          # Filas por viaje al servidor
+MAX_FILAS_HOJA_EXCEL = 1_048_576  # Límite de filas por hoja de Excel
+
+FORMATO_CSV = 'csv'
+FORMATO_EXCEL = 'xlsx'
+
+# Columna: (cabecera, clave del dict | función fila -> valor)
+Columna = Tuple[str, Union[str, Callable[[Dict[str, Any]], Any]]]
+
+
+@dataclass
+class EspecificacionExportacion:
+    """Describe una exportación: qué consulta ejecutar y cómo volcar cada fila."""
+    construir_consulta: Callable[..., Tuple[str, Any]]
+    columnas: List[Columna]
+    hoja: str
+    prefijo_archivo: str
+    filtros_fijos: Dict[str, Any] = field(default_factory=dict)
+
+
+def _estado_stock(fila: Dict[str, Any]) -> str:
+    stock = fila.get('stock') or 0
+    minimo = fila.get('min_alerta') or 0
+    if stock < minimo:
+        return "BAJO"
+    if stock == 0:
+        return "VACÍO"
+    return "OK"
+
+
+_TURNOS = {'manana': 'Mañana', 'tarde': 'Tarde', 'completo': 'Completo'}
+
+
+def _dias_desde(fila: Dict[str, Any]) -> str:
+    fecha = fila.get('fecha')
+    if isinstance(fecha, str):
+        fecha = datetime.strptime(fecha, "%Y-%m-%d").date()
+    if not isinstance(fecha, date):
+        return ""
+    dias = (date.today() - fecha).days
+    if dias == 0:
+        return "Hoy"
+    if dias == 1:
+        return "Ayer"
+    return f"Hace {dias} días"
+
+
+EXPORTACIONES: Dict[str, EspecificacionExportacion] = {
+    'stock': EspecificacionExportacion(
+        construir_consulta=stock_repo.construir_consulta_stock_completo,
+        columnas=[
+            ("Artículo", 'nombre'),
+            ("EAN", 'ean'),
+            ("Familia", 'familia'),
+            ("Almacén", 'almacen'),
+            ("Stock", 'stock'),
+            ("Unidad", 'u_medida'),
+            ("Mínimo", 'min_alerta'),
+            ("Estado", _estado_stock),
+        ],
+        hoja="Stock",
+        prefijo_archivo="stock",
+    ),
+    'movimientos': EspecificacionExportacion(
+        construir_consulta=movimientos_repo.construir_consulta_todos,
+        columnas=[
+            ("Fecha", 'fecha'),
+            ("Tipo", 'tipo'),
+            ("Origen", 'origen_nombre'),
+            ("Destino", 'destino_nombre'),
+            ("Artículo", 'articulo_nombre'),
+            ("Cantidad", 'cantidad'),
+            ("Coste", 'coste_unit'),
+            ("OT", 'ot'),
+            ("Responsable", 'responsable'),
+            ("Motivo", 'motivo'),
+        ],
+        hoja="Movimientos",
+        prefijo_archivo="movimientos",
+        filtros_fijos={'limit': None},
+    ),
+    'asignaciones': EspecificacionExportacion(
+        construir_consulta=asignaciones_repo.construir_consulta_asignaciones,
+        columnas=[
+            ("Fecha", 'fecha'),
+            ("Turno", lambda f: _TURNOS.get(f.get('turno'), f.get('turno'))),
+            ("Operario", 'operario_nombre'),
+            ("Rol", 'rol_operario'),
+            ("Furgoneta", 'furgoneta_nombre'),
+            ("Días", _dias_desde),
+        ],
+        hoja="Asignaciones",
+        prefijo_archivo="asignaciones_furgonetas",
+    ),
+    'consumos_ot': EspecificacionExportacion(
+        construir_consulta=consumos_repo.construir_consulta_consumos_por_ot,
+        columnas=[
+            ("Artículo", 'articulo'),
+            ("Unidad", 'unidad'),
+            ("Cantidad", 'cantidad'),
+            ("Coste unit.", 'coste_unit'),
+            ("Coste total", 'coste_total'),
+            ("Fecha", 'fecha'),
+            ("Operario", 'operario'),
+        ],
+        hoja="Consumos OT",
+        prefijo_archivo="consumos_ot",
+    ),
+    'consumos_operario': EspecificacionExportacion(
+        construir_consulta=consumos_repo.construir_consulta_consumos_por_operario,
+        columnas=[
+            ("Fecha", 'fecha'),
+            ("OT", 'ot'),
+            ("Artículo", 'articulo'),
+            ("Cantidad", 'cantidad'),
+            ("Unidad", 'unidad'),
+            ("Coste unit.", 'coste_unit'),
+            ("Coste total", 'coste_total'),
+        ],
+        hoja="Consumos operario",
+        prefijo_archivo="consumos_operario",
+    ),
+    'consumos_furgoneta': EspecificacionExportacion(
+        construir_consulta=consumos_repo.construir_consulta_consumos_por_furgoneta,
+        columnas=[
+            ("Fecha", 'fecha'),
+            ("OT", 'ot'),
+            ("Artículo", 'articulo'),
+            ("Cantidad", 'cantidad'),
+            ("Operario", 'operario'),
+            ("Coste total", 'coste_total'),
+            ("Unidad", 'unidad'),
+        ],
+        hoja="Consumos furgoneta",
+        prefijo_archivo="consumos_furgoneta",
+    ),
+    'consumos_articulo': EspecificacionExportacion(
+        construir_consulta=consumos_repo.construir_consulta_consumos_por_articulo,
+        columnas=[
+            ("Fecha", 'fecha'),
+            ("OT", 'ot'),
+            ("Operario", 'operario'),
+            ("Cantidad", 'cantidad'),
+            ("Coste total", 'coste_total'),
+            ("Unidad", 'unidad'),
+        ],
+        hoja="Consumos artículo",
+        prefijo_archivo="consumos_articulo",
+    ),
+}
+
+
+class ExportacionCancelada(Exception):
+    """Se lanza cuando el usuario cancela una exportación en curso."""
+    pass
+
+
+# ========================================
+# PROGRESO
+# ========================================
+
+def contar_filas(sql: str, params: Any) -> int:
+    """Cuenta las filas que devolverá una consulta (para la barra de progreso)."""
+    resultado = fetch_one(f"SELECT COUNT(*) AS total FROM ({sql}) AS sub", params)
+    return int(resultado['total']) if resultado else 0
+
+
+def _valor_celda(valor: Any) -> Any:
+    """Normaliza un valor de BD a un tipo que CSV/openpyxl escriben bien."""
+    if valor is None:
+        return ""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+def _extraer_fila(fila: Dict[str, Any], columnas: List[Columna]) -> List[Any]:
+    return [
+        _valor_celda(origen(fila) if callable(origen) else fila.get(origen))
+        for _, origen in columnas
+    ]
+
+
+# ========================================
+# ESCRITORES
+# ========================================
+
+def _escribir_csv(
+    ruta: Path,
+    bloques: Iterator[List[Dict[str, Any]]],
+    columnas: List[Columna],
+    titulo: Optional[str],
+    notificar: Callable[[int], None]
+) -> int:
+    total = 0
+    with open(ruta, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=';')
+        if titulo:
+            writer.writerow([titulo])
+            writer.writerow(['Fecha exportación:', datetime.now().strftime("%d/%m/%Y %H:%M")])
+            writer.writerow([])
+        writer.writerow([cabecera for cabecera, _ in columnas])
+
+        for bloque in bloques:
+            writer.writerows(_extraer_fila(fila, columnas) for fila in bloque)
+            total += len(bloque)
+            notificar(total)
+    return total
+
+
+def _escribir_excel(
+    ruta: Path,
+    bloques: Iterator[List[Dict[str, Any]]],
+    columnas: List[Columna],
+    hoja: str,
+    titulo: Optional[str],
+    notificar: Callable[[int], None]
+) -> int:
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    cabeceras = [cabecera for cabecera, _ in columnas]
+
+    def nueva_hoja(numero: int):
+        """Crea la hoja con su cabecera; devuelve (hoja, filas ya ocupadas)."""
+        nombre = hoja if numero == 1 else f"{hoja} ({numero})"
+        ws = libro.create_sheet(title=nombre[:31])
+        ocupadas = 0
+        if titulo and numero == 1:
+            ws.append([titulo])
+            ws.append([])
+            ocupadas += 2
+        ws.append(cabeceras)
+        return ws, ocupadas + 1
+
+    numero_hoja = 1
+    ws, filas_hoja = nueva_hoja(numero_hoja)
+    total = 0
+
+    for bloque in bloques:
+        for fila in bloque:
+            # Excel no admite más de ~1M filas por hoja: continuar en otra
+            if filas_hoja >= MAX_FILAS_HOJA_EXCEL:
+                numero_hoja += 1
+                ws, filas_hoja = nueva_hoja(numero_hoja)
+            ws.append(_extraer_fila(fila, columnas))
+            filas_hoja += 1
+        total += len(bloque)
+        notificar(total)
+
+    libro.save(ruta)
+    return total
+
+
+# ========================================
+# API PÚBLICA
+# ========================================
+
+def nombre_archivo_sugerido(nombre: str, formato: str = FORMATO_EXCEL, sufijo: str = "") -> str:
+    """Devuelve un nombre de archivo con timestamp para una exportación."""
+    espec = EXPORTACIONES[nombre]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sufijo = f"_{sufijo}" if sufijo else ""
+    return f"{espec.prefijo_archivo}{sufijo}_{timestamp}.{formato}"
+
+
+def exportar(
+    nombre: str,
+    ruta: Union[str, Path],
+    filtros: Optional[Dict[str, Any]] = None,
+    formato: Optional[str] = None,
+    titulo: Optional[str] = None,
+    progreso: Optional[Callable[[int, int], None]] = None,
+    cancelado: Optional[Callable[[], bool]] = None,
+    tamano_bloque: int = TAMANO_BLOQUE
+) -> int:
+    """
+    Ejecuta una exportación completa en streaming.
+
+    Args:
+        nombre: Clave en EXPORTACIONES ('stock', 'movimientos', ...)
+        ruta: Archivo de destino
+        filtros: Argumentos para la función construir_consulta del repo
+        formato: 'csv' o 'xlsx' (None = deducir de la extensión)
+        titulo: Título opcional en la cabecera del archivo
+        progreso: Callback (filas_escritas, total_estimado)
+        cancelado: Callback que devuelve True si hay que abortar
+        tamano_bloque: Filas por bloque leído del servidor
+
+    Returns:
+        Número de filas exportadas
+
+    Raises:
+        KeyError: Si la exportación no existe
+        ExportacionCancelada: Si el usuario cancela
+    """
+    espec = EXPORTACIONES[nombre]
+    ruta = Path(ruta)
+    formato = formato or (FORMATO_CSV if ruta.suffix.lower() == '.csv' else FORMATO_EXCEL)
+
+    argumentos = dict(filtros or {})
+    argumentos.update(espec.filtros_fijos)
+    sql, params = espec.construir_consulta(**argumentos)
+
+    total_estimado = contar_filas(sql, params) if progreso else 0
+
+    def notificar(hechas: int) -> None:
+        if cancelado and cancelado():
+            raise ExportacionCancelada()
+        if progreso:
+            progreso(hechas, total_estimado)
+
+    inicio = datetime.now()
+    bloques = iter_chunks(sql, params, chunk_size=tamano_bloque)
+    try:
+        if formato == FORMATO_CSV:
+            total = _escribir_csv(ruta, bloques, espec.columnas, titulo, notificar)
+        else:
+            total = _escribir_excel(ruta, bloques, espec.columnas, espec.hoja, titulo, notificar)
+    except ExportacionCancelada:
+        ruta.unlink(missing_ok=True)
+        logger.info(f"EXPORTACION | {nombre} | cancelada por el usuario")
+        raise
+    except Exception:
+        # No dejar un archivo a medias que parezca una exportación completa
+        ruta.unlink(missing_ok=True)
+        raise
+    finally:
+        bloques.close()
+
+    segundos = (datetime.now() - inicio).total_seconds()
+    logger.info(f"EXPORTACION | {nombre} | {total} filas en {segundos:.1f}s -> {ruta}")
+    return total
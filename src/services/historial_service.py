@@ -9,6 +9,7 @@ from datetime import datetime
 import json
 
 from src.repos import historial_repo
+from src.core.db_utils import Transaccion
 from src.core.logger import logger
 
 
@@ -19,7 +20,8 @@ def guardar_en_historial(
     articulo_nombre: str,
     cantidad: float,
     u_medida: str = "unidad",
-    datos_adicionales: Optional[Dict[str, Any]] = None
+    datos_adicionales: Optional[Dict[str, Any]] = None,
+    tx: Optional[Transaccion] = None
 ) -> bool:
     """
     Guarda una operación en el historial.
@@ -32,6 +34,7 @@ def guardar_en_historial(
         cantidad: Cantidad usada
         u_medida: Unidad de medida
         datos_adicionales: Dict con info extra (ej: {'ot': '12345', 'modo': 'entregar'})
+        tx: Transacción en curso (opcional)
 
     Returns:
         True si se guardó correctamente, False en caso contrario
@@ -47,7 +50,8 @@ def guardar_en_historial(
         cantidad=cantidad,
         u_medida=u_medida,
         fecha_hora=fecha_hora,
-        datos_adicionales=datos_json
+        datos_adicionales=datos_json,
+        tx=tx
     )
 
 
@@ -6,10 +6,11 @@ Calcula stock inicial, movimientos diarios (E/D/G) y stock final.
 
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict
 
-from src.core.db_utils import fetch_all, fetch_one
-from src.core.logger import logger
+from src.core.db_utils import fetch_all, fetch_one, fetch_columnar, instantanea
+from src.core.logger import logger, medir
+from src.repos import movimientos_repo
 
 
 def calcular_lunes_de_semana(fecha: str) -> str:
@@ -52,27 +53,36 @@ def calcular_stock_inicial_furgoneta(furgoneta_id: int, fecha_inicio_semana: str
 
         stock = defaultdict(float)
 
+        # Con ejercicios cerrados: si la fecha cae en el ejercicio abierto se
+        # parte de los saldos de APERTURA (y no se leen las particiones
+        # cerradas); si cae en uno cerrado, se suman los movimientos reales
+        apertura = movimientos_repo.get_fecha_apertura()
+        if fecha_limite >= apertura:
+            filtro_ejercicio, params_ejercicio = "AND fecha >= %s", (apertura,)
+        else:
+            filtro_ejercicio, params_ejercicio = "AND tipo <> 'APERTURA'", ()
+
         # ENTRADAS: destino_id = furgoneta (suma al stock)
-        query_entradas = """
+        query_entradas = f"""
             SELECT articulo_id, SUM(cantidad) as total
             FROM movimientos
-            WHERE destino_id = %s AND fecha <= %s
+            WHERE destino_id = %s AND fecha <= %s {filtro_ejercicio}
             GROUP BY articulo_id
         """
-        entradas = fetch_all(query_entradas, (furgoneta_id, fecha_limite))
-        for row in entradas:
-            stock[row['articulo_id']] += float(row['total'])  # Convertir Decimal a float
+        entradas = fetch_columnar(query_entradas, (furgoneta_id, fecha_limite) + params_ejercicio)
+        for art_id, total in zip(entradas.columna('articulo_id').tolist(), entradas.columna('total').tolist()):
+            stock[art_id] += total
 
         # SALIDAS: origen_id = furgoneta (resta al stock)
-        query_salidas = """
+        query_salidas = f"""
             SELECT articulo_id, SUM(cantidad) as total
             FROM movimientos
-            WHERE origen_id = %s AND fecha <= %s
+            WHERE origen_id = %s AND fecha <= %s {filtro_ejercicio}
             GROUP BY articulo_id
         """
-        salidas = fetch_all(query_salidas, (furgoneta_id, fecha_limite))
-        for row in salidas:
-            stock[row['articulo_id']] -= float(row['total'])  # Convertir Decimal a float
+        salidas = fetch_columnar(query_salidas, (furgoneta_id, fecha_limite) + params_ejercicio)
+        for art_id, total in zip(salidas.columna('articulo_id').tolist(), salidas.columna('total').tolist()):
+            stock[art_id] -= total
 
         return dict(stock)
 
@@ -127,13 +137,17 @@ def obtener_movimientos_semana(
             LEFT JOIN operarios o ON m.operario_id = o.id
             WHERE m.fecha BETWEEN %s AND %s
               AND (m.origen_id = %s OR m.destino_id = %s)
+              AND m.tipo <> 'APERTURA'
             ORDER BY m.fecha, a.nombre
         """
 
-        rows = fetch_all(query, (fecha_inicio, fecha_fin, furgoneta_id, furgoneta_id))
-        logger.info(f"Filas obtenidas de BD: {len(rows)}")
+        # Columnar: cantidad llega ya como float y origen/destino como int
+        rows = fetch_columnar(query, (fecha_inicio, fecha_fin, furgoneta_id, furgoneta_id))
+        logger.debug(f"Filas obtenidas de BD: {len(rows)}")
 
         movimientos = []
+        # Los no clasificados se cuentan por tipo y se avisa una sola vez
+        sin_clasificar = Counter()
         for row in rows:
             fecha = row['fecha']
             art_id = row['articulo_id']
@@ -183,9 +197,15 @@ def obtener_movimientos_semana(
                     'operario_nombre': op_nombre
                 })
             else:
-                logger.warning(f"Movimiento sin clasificar: tipo={tipo}, origen={origen}, destino={destino}, furgoneta={furgoneta_id}")
+                sin_clasificar[tipo] += 1
 
-        logger.info(f"Movimientos clasificados: {len(movimientos)} de {len(rows)} filas")
+        if sin_clasificar:
+            resumen = ", ".join(f"{t}={n}" for t, n in sorted(sin_clasificar.items(), key=lambda x: str(x[0])))
+            logger.warning(
+                f"Movimientos sin clasificar en furgoneta {furgoneta_id}: "
+                f"{sum(sin_clasificar.values())} ({resumen})"
+            )
+        logger.debug(f"Movimientos clasificados: {len(movimientos)} de {len(rows)} filas")
         return movimientos
 
     except Exception as e:
@@ -230,10 +250,24 @@ def generar_datos_informe(
             ]
         }
     """
+    # Una sola línea de resumen (con duración) por informe en lugar de
+    # un log por cada paso del cálculo. Todas las consultas leen la misma
+    # instantánea: un movimiento guardado a mitad del informe no descuadra
+    # el stock inicial con los totales de la semana
+    with medir("informe_furgoneta", furgoneta_id=furgoneta_id, semana=fecha_lunes) as extra, instantanea():
+        return _generar_datos_informe(furgoneta_id, fecha_lunes, extra)
+
+
+def _generar_datos_informe(
+    furgoneta_id: int,
+    fecha_lunes: str,
+    extra: Dict[str, Any]
+) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+    """Cuerpo de generar_datos_informe(); rellena `extra` con los totales."""
     try:
         # 1. Validar lunes
         lunes = calcular_lunes_de_semana(fecha_lunes)
-        logger.info(f"Generando informe para furgoneta_id={furgoneta_id}, semana={lunes}")
+        logger.debug(f"Generando informe para furgoneta_id={furgoneta_id}, semana={lunes}")
 
         # 2. Obtener datos de la furgoneta
         furgoneta_query = "SELECT id, nombre FROM almacenes WHERE id = %s AND tipo = 'furgoneta'"
@@ -244,7 +278,7 @@ def generar_datos_informe(
             return False, "Furgoneta no encontrada o no es válida", None
 
         furgoneta_nombre = furgoneta['nombre']
-        logger.info(f"Furgoneta encontrada: {furgoneta_nombre} (ID: {furgoneta_id})")
+        logger.debug(f"Furgoneta encontrada: {furgoneta_nombre} (ID: {furgoneta_id})")
 
         # 3. Determinar rango de fechas (L-V o L-S si hay movimientos el sábado)
         viernes = datetime.strptime(lunes, "%Y-%m-%d") + timedelta(days=4)
@@ -258,7 +292,7 @@ def generar_datos_informe(
 
         incluir_sabado = movs_sabado and movs_sabado['count'] > 0
         fecha_fin = sabado.strftime("%Y-%m-%d") if incluir_sabado else viernes.strftime("%Y-%m-%d")
-        logger.info(f"Rango de fechas: {lunes} a {fecha_fin} (incluye sábado: {incluir_sabado})")
+        logger.debug(f"Rango de fechas: {lunes} a {fecha_fin} (incluye sábado: {incluir_sabado})")
 
         # 4. Generar lista de días
         dias_semana = []
@@ -276,11 +310,11 @@ def generar_datos_informe(
 
         # 5. Calcular stock inicial (domingo anterior)
         stock_inicial_dict = calcular_stock_inicial_furgoneta(furgoneta_id, lunes)
-        logger.info(f"Stock inicial calculado: {len(stock_inicial_dict)} artículos")
+        logger.debug(f"Stock inicial calculado: {len(stock_inicial_dict)} artículos")
 
         # 6. Obtener movimientos de la semana
         movimientos = obtener_movimientos_semana(furgoneta_id, lunes, fecha_fin)
-        logger.info(f"Movimientos obtenidos: {len(movimientos)} registros")
+        logger.debug(f"Movimientos obtenidos: {len(movimientos)} registros")
 
         # 7. Organizar datos por artículo
         articulos_dict = defaultdict(lambda: {
@@ -299,7 +333,7 @@ def generar_datos_informe(
             art_id = mov['articulo_id']
             fecha = mov['fecha']
             tipo = mov['tipo_movimiento']
-            cantidad = float(mov['cantidad'])  # Convertir Decimal a float
+            cantidad = mov['cantidad']
 
             articulos_dict[art_id]['familia'] = mov['familia_nombre']
             articulos_dict[art_id]['articulo_nombre'] = mov['articulo_nombre']
@@ -357,8 +391,15 @@ def generar_datos_informe(
         # Ordenar por familia y luego por nombre de artículo
         articulos_lista.sort(key=lambda x: (x['familia'], x['articulo_nombre']))
 
-        logger.info(f"Artículos procesados: {len(articulos_lista)}")
-        logger.info(f"Operarios únicos: {len(operarios_set)}")
+        extra.update(
+            dias=num_dias,
+            movimientos=len(movimientos),
+            articulos=len(articulos_lista),
+            operarios=len(operarios_set),
+        )
+
+        logger.debug(f"Artículos procesados: {len(articulos_lista)}")
+        logger.debug(f"Operarios únicos: {len(operarios_set)}")
 
         # 9. Construir resultado
         resultado = {
@@ -4,6 +4,7 @@ Servicio de Inventarios - Lógica de negocio para gestión de inventarios físic
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import date, datetime, timedelta
 from src.repos import inventarios_repo, movimientos_repo
+from src.core.db_utils import en_transaccion, Transaccion
 from src.core.logger import logger, log_operacion, log_validacion, log_error_bd
 
 
@@ -181,6 +182,9 @@ def finalizar_inventario(
     """
     Finaliza un inventario y opcionalmente aplica los ajustes al stock.
 
+    Los ajustes y el cambio de estado van en una sola transacción, que se
+    repite entera si PostgreSQL la aborta por concurrencia.
+
     Args:
         inventario_id: ID del inventario
         aplicar_ajustes: Si True, crea movimientos para ajustar el stock
@@ -190,67 +194,73 @@ def finalizar_inventario(
         Tupla (exito, mensaje, estadisticas)
     """
     try:
-        # Obtener inventario
-        inventario = inventarios_repo.get_by_id(inventario_id)
-        if not inventario:
-            return False, f"No se encontró el inventario {inventario_id}", None
-
-        if inventario['estado'] == 'FINALIZADO':
-            return False, "Este inventario ya está finalizado", None
-
-        # Obtener estadísticas
-        stats = inventarios_repo.get_estadisticas_inventario(inventario_id)
-
-        if stats['lineas_contadas'] == 0:
-            return False, "No se ha contado ningún artículo. No se puede finalizar", None
-
-        # Si se deben aplicar ajustes
-        if aplicar_ajustes:
-            diferencias = inventarios_repo.get_diferencias(inventario_id)
-
-            if diferencias:
-                # Crear movimientos de ajuste por inventario
-                from src.repos.movimientos_repo import crear_movimientos_batch
-
-                movimientos = []
-                fecha_hoy = date.today().isoformat()
-
-                for diff in diferencias:
-                    if diff['diferencia'] > 0:
-                        # Sobrante: crear ENTRADA
-                        movimientos.append({
-                            'tipo': 'ENTRADA',
-                            'fecha': fecha_hoy,
-                            'articulo_id': diff['articulo_id'],
-                            'destino_id': inventario['almacen_id'],
-                            'cantidad': abs(diff['diferencia']),
-                            'coste_unit': None,
-                            'albaran': f"INV-{inventario_id}",
-                            'responsable': f"Ajuste Inventario {inventario_id}"
-                        })
-                    elif diff['diferencia'] < 0:
-                        # Faltante: crear PERDIDA
-                        movimientos.append({
-                            'tipo': 'PERDIDA',
-                            'fecha': fecha_hoy,
-                            'articulo_id': diff['articulo_id'],
-                            'origen_id': inventario['almacen_id'],
-                            'cantidad': abs(diff['diferencia']),
-                            'motivo': f"Ajuste por inventario {inventario_id}",
-                            'responsable': usuario
-                        })
-
-                # Crear movimientos en batch
-                crear_movimientos_batch(movimientos)
-
-                logger.info(
-                    f"Inventario {inventario_id} | Ajustes aplicados | "
-                    f"Movimientos creados: {len(movimientos)}"
-                )
-
-        # Marcar como finalizado
-        fecha_cierre = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        inventarios_repo.finalizar_inventario(inventario_id, fecha_cierre)
+        def _finalizar(tx: Transaccion) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+            # Obtener inventario (bloqueado: dos cierres a la vez no pueden
+            # aplicar los ajustes dos veces)
+            inventario = inventarios_repo.get_by_id(inventario_id, bloquear=True, tx=tx)
+            if not inventario:
+                return False, f"No se encontró el inventario {inventario_id}", None
+
+            if inventario['estado'] == 'FINALIZADO':
+                return False, "Este inventario ya está finalizado", None
+
+            # Obtener estadísticas
+            stats = inventarios_repo.get_estadisticas_inventario(inventario_id, tx=tx)
+
+            if stats['lineas_contadas'] == 0:
+                return False, "No se ha contado ningún artículo. No se puede finalizar", None
+
+            # Si se deben aplicar ajustes
+            if aplicar_ajustes:
+                diferencias = inventarios_repo.get_diferencias(inventario_id, tx=tx)
+
+                if diferencias:
+                    # Crear movimientos de ajuste por inventario
+                    movimientos = []
+                    fecha_hoy = date.today().isoformat()
+
+                    for diff in diferencias:
+                        if diff['diferencia'] > 0:
+                            # Sobrante: crear ENTRADA
+                            movimientos.append({
+                                'tipo': 'ENTRADA',
+                                'fecha': fecha_hoy,
+                                'articulo_id': diff['articulo_id'],
+                                'destino_id': inventario['almacen_id'],
+                                'cantidad': abs(diff['diferencia']),
+                                'coste_unit': None,
+                                'albaran': f"INV-{inventario_id}",
+                                'responsable': f"Ajuste Inventario {inventario_id}"
+                            })
+                        elif diff['diferencia'] < 0:
+                            # Faltante: crear PERDIDA
+                            movimientos.append({
+                                'tipo': 'PERDIDA',
+                                'fecha': fecha_hoy,
+                                'articulo_id': diff['articulo_id'],
+                                'origen_id': inventario['almacen_id'],
+                                'cantidad': abs(diff['diferencia']),
+                                'motivo': f"Ajuste por inventario {inventario_id}",
+                                'responsable': usuario
+                            })
+
+                    # Crear movimientos en batch
+                    movimientos_repo.crear_movimientos_batch(movimientos, tx=tx)
+
+                    logger.info(
+                        f"Inventario {inventario_id} | Ajustes aplicados | "
+                        f"Movimientos creados: {len(movimientos)}"
+                    )
+
+            # Marcar como finalizado
+            fecha_cierre = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            inventarios_repo.finalizar_inventario(inventario_id, fecha_cierre, tx=tx)
+
+            return True, "", stats
+
+        exito, mensaje, stats = en_transaccion(_finalizar, "finalizar_inventario")
+        if not exito:
+            return False, mensaje, None
 
         # Logging
         detalles = (
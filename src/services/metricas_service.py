@@ -0,0 +1,45 @@
+"""
+Servicio de métricas de rendimiento - Envío de la telemetría por pantalla a la BD
+"""
+from typing import Tuple
+
+from src.core import telemetria
+from src.core.config_utils import load_config
+from src.core.logger import logger
+from src.repos import metricas_repo
+
+
+def subida_automatica_activada() -> bool:
+    """[telemetria] subir_al_cerrar en config/app.ini (desactivado por defecto)."""
+    try:
+        return load_config().getboolean("telemetria", "subir_al_cerrar", fallback=False)
+    except Exception:
+        return False
+
+
+def subir_metricas(usuario: str, hostname: str, reiniciar: bool = True) -> Tuple[bool, str]:
+    """
+    Sube a metricas_rendimiento el resumen de la telemetría de esta sesión.
+
+    Args:
+        usuario: Usuario de la sesión
+        hostname: Equipo que envía las métricas
+        reiniciar: Si True, vacía las muestras tras subirlas para no
+            volver a enviarlas en la siguiente subida
+
+    Returns:
+        Tuple[bool, str]: (éxito, mensaje)
+    """
+    filas = telemetria.estadisticas()
+    if not filas:
+        return True, "No hay métricas que subir"
+
+    try:
+        insertadas = metricas_repo.insertar_resumen(usuario, hostname, filas)
+    except Exception as e:
+        return False, f"Error al subir métricas: {e}"
+
+    if reiniciar:
+        telemetria.reiniciar()
+    logger.info(f"Métricas de rendimiento subidas | {insertadas} filas | Host: {hostname}")
+    return True, f"Se han subido {insertadas} resúmenes de métricas"
@@ -4,6 +4,9 @@ Servicio de Movimientos - Lógica de negocio para operaciones de movimientos de
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import date, datetime
 from src.repos import movimientos_repo
+from src.services import historial_service
+from src.core.db_utils import en_transaccion, Transaccion
+from src.core.exceptions import InsufficientStockError
 from src.core.logger import logger, log_operacion, log_validacion, log_error_bd
 
 
@@ -75,13 +78,8 @@ def validar_stock_disponible(articulo_id: int, almacen_id: int, cantidad_requeri
         Tupla (hay_stock, mensaje, stock_actual)
     """
     try:
-        stock_por_almacen = movimientos_repo.get_stock_por_almacen(articulo_id)
-
-        stock_actual = 0
-        for s in stock_por_almacen:
-            if s['almacen_id'] == almacen_id:
-                stock_actual = s['stock']
-                break
+        stock = movimientos_repo.get_stock_articulos_en_almacen(almacen_id, [articulo_id])
+        stock_actual = stock.get(articulo_id, 0)
 
         if stock_actual < cantidad_requerida:
             mensaje = f"Stock insuficiente. Disponible: {stock_actual:.2f}, Requerido: {cantidad_requerida:.2f}"
@@ -95,6 +93,24 @@ def validar_stock_disponible(articulo_id: int, almacen_id: int, cantidad_requeri
         return False, f"Error al verificar stock: {str(e)}", 0
 
 
+def _mensaje_stock_insuficiente(e: InsufficientStockError) -> str:
+    """
+    Mensaje para el usuario del InsufficientStockError de
+    crear_movimientos_batch(comprobar_stock=True), que comprueba el stock con
+    el bloqueo tomado: una línea por artículo sin stock suficiente.
+    """
+    if e.faltas:
+        mensaje = "\n".join(
+            f"Artículo ID {f['articulo_id']}: Stock insuficiente. "
+            f"Disponible: {f['disponible']:.2f}, Requerido: {f['requerido']:.2f}"
+            for f in e.faltas
+        )
+    else:
+        mensaje = str(e)
+    log_validacion("movimientos", "stock", mensaje)
+    return mensaje
+
+
 # ========================================
 # OPERACIONES DE TRASPASO
 # ========================================
@@ -104,17 +120,25 @@ def crear_traspaso_almacen_furgoneta(
     operario_id: int,
     articulos: List[Dict[str, Any]],
     usuario: str,
-    modo: str = "ENTREGAR"
+    modo: str = "ENTREGAR",
+    usuario_historial: Optional[str] = None
 ) -> Tuple[bool, str, Optional[List[int]]]:
     """
     Crea traspasos entre almacén y furgoneta para un operario.
 
+    Las consultas, la validación de stock, los movimientos y el historial van
+    en una sola transacción: o se guarda todo o no se guarda nada. Si
+    PostgreSQL la aborta por concurrencia se repite entera (en_transaccion).
+
     Args:
         fecha: Fecha del movimiento (YYYY-MM-DD)
         operario_id: ID del operario
-        articulos: Lista de dicts con 'id' y 'cantidad'
+        articulos: Lista de dicts con 'id' y 'cantidad' ('nombre' y
+                   'u_medida' si se guarda el historial)
         usuario: Usuario que realiza la operación
         modo: "ENTREGAR" (Almacén→Furgoneta) o "RECIBIR" (Furgoneta→Almacén)
+        usuario_historial: Usuario de sesión con el que guardar cada artículo
+                           en el historial de operaciones (opcional)
 
     Returns:
         Tupla (exito, mensaje, lista_ids_movimientos)
@@ -129,58 +153,74 @@ def crear_traspaso_almacen_furgoneta(
         if not articulos or len(articulos) == 0:
             return False, "No hay artículos para procesar", None
 
-        # Obtener almacén principal
-        almacen = movimientos_repo.get_almacen_by_nombre("Almacén")
-        if not almacen:
-            return False, "No se encontró el almacén principal", None
-
-        almacen_id = almacen['id']
-
-        # Obtener furgoneta asignada al operario
-        furgoneta = movimientos_repo.get_furgoneta_asignada(operario_id, fecha)
-        if not furgoneta:
-            return False, "El operario no tiene furgoneta asignada para esta fecha", None
-
-        furgoneta_id = furgoneta['furgoneta_id']
-
-        # Determinar origen y destino según el modo
-        if modo == "ENTREGAR":
-            origen_id = almacen_id
-            destino_id = furgoneta_id
-        else:  # RECIBIR
-            origen_id = furgoneta_id
-            destino_id = almacen_id
-
-        # Validar stock disponible en origen (solo para salidas)
+        # Validar cantidades
         for art in articulos:
             valido, mensaje = validar_cantidad(art['cantidad'])
             if not valido:
                 return False, f"Artículo ID {art['id']}: {mensaje}", None
 
-            # Validar stock en origen
-            hay_stock, mensaje_stock, stock_actual = validar_stock_disponible(
-                art['id'], origen_id, art['cantidad']
+        def _traspasar(tx: Transaccion) -> Tuple[bool, str, Optional[List[int]]]:
+            # Obtener almacén principal
+            almacen = movimientos_repo.get_almacen_by_nombre("Almacén", tx=tx)
+            if not almacen:
+                return False, "No se encontró el almacén principal", None
+
+            almacen_id = almacen['id']
+
+            # Obtener furgoneta asignada al operario
+            furgoneta = movimientos_repo.get_furgoneta_asignada(operario_id, fecha, tx=tx)
+            if not furgoneta:
+                return False, "El operario no tiene furgoneta asignada para esta fecha", None
+
+            furgoneta_id = furgoneta['furgoneta_id']
+
+            # Determinar origen y destino según el modo
+            if modo == "ENTREGAR":
+                origen_id = almacen_id
+                destino_id = furgoneta_id
+            else:  # RECIBIR
+                origen_id = furgoneta_id
+                destino_id = almacen_id
+
+            # Crear movimientos
+            movimientos = []
+            for art in articulos:
+                movimientos.append({
+                    'tipo': 'TRASPASO',
+                    'fecha': fecha,
+                    'articulo_id': art['id'],
+                    'origen_id': origen_id,
+                    'destino_id': destino_id,
+                    'cantidad': art['cantidad'],
+                    'operario_id': operario_id,
+                    'responsable': usuario,
+                    'motivo': f"{modo.capitalize()} material"
+                })
+
+            # Bloquea el stock de origen y lo comprueba antes de insertar
+            ids = movimientos_repo.crear_movimientos_batch(
+                movimientos, comprobar_stock=True, tx=tx
             )
 
-            if not hay_stock:
-                return False, f"Artículo ID {art['id']}: {mensaje_stock}", None
-
-        # Crear movimientos
-        movimientos = []
-        for art in articulos:
-            movimientos.append({
-                'tipo': 'TRASPASO',
-                'fecha': fecha,
-                'articulo_id': art['id'],
-                'origen_id': origen_id,
-                'destino_id': destino_id,
-                'cantidad': art['cantidad'],
-                'operario_id': operario_id,
-                'responsable': usuario,
-                'motivo': f"{modo.capitalize()} material"
-            })
-
-        ids_creados = movimientos_repo.crear_movimientos_batch(movimientos)
+            # Historial de operaciones (cada artículo individualmente)
+            if usuario_historial:
+                for art in articulos:
+                    historial_service.guardar_en_historial(
+                        usuario=usuario_historial,
+                        tipo_operacion='movimiento',
+                        articulo_id=art['id'],
+                        articulo_nombre=art.get('nombre', ''),
+                        cantidad=art['cantidad'],
+                        u_medida=art.get('u_medida', 'unidad'),
+                        datos_adicionales={'modo': modo.lower()},
+                        tx=tx
+                    )
+
+            return True, "", ids
+
+        exito, mensaje, ids_creados = en_transaccion(_traspasar, "crear_traspaso_almacen_furgoneta")
+        if not exito:
+            return False, mensaje, None
 
         # Logging
         detalles = f"Modo: {modo}, Operario ID: {operario_id}, Artículos: {len(articulos)}"
@@ -189,6 +229,9 @@ def crear_traspaso_almacen_furgoneta(
 
         return True, f"{len(articulos)} artículo(s) procesado(s) correctamente", ids_creados
 
+    except InsufficientStockError as e:
+        return False, _mensaje_stock_insuficiente(e), None
+
     except Exception as e:
         log_error_bd("movimientos", "crear_traspaso_almacen_furgoneta", e)
         return False, f"Error al crear traspasos: {str(e)}", None
@@ -319,19 +362,12 @@ def crear_imputacion_obra(
 
         furgoneta_id = furgoneta['furgoneta_id']
 
-        # Validar stock y cantidades
+        # Validar cantidades
         for art in articulos:
             valido, mensaje = validar_cantidad(art['cantidad'])
             if not valido:
                 return False, f"Artículo ID {art['articulo_id']}: {mensaje}", None
 
-            hay_stock, mensaje_stock, _ = validar_stock_disponible(
-                art['articulo_id'], furgoneta_id, art['cantidad']
-            )
-
-            if not hay_stock:
-                return False, f"Artículo ID {art['articulo_id']}: {mensaje_stock}", None
-
         # Crear movimientos
         movimientos = []
         for art in articulos:
@@ -346,7 +382,8 @@ def crear_imputacion_obra(
                 'motivo': motivo
             })
 
-        ids_creados = movimientos_repo.crear_movimientos_batch(movimientos)
+        # Bloquea el stock de origen y lo comprueba antes de insertar
+        ids_creados = movimientos_repo.crear_movimientos_batch(movimientos, comprobar_stock=True)
 
         # Logging
         detalles = f"OT: {ot}, Operario ID: {operario_id}, Artículos: {len(articulos)}"
@@ -355,6 +392,9 @@ def crear_imputacion_obra(
 
         return True, f"{len(articulos)} artículo(s) imputado(s) a OT {ot}", ids_creados
 
+    except InsufficientStockError as e:
+        return False, _mensaje_stock_insuficiente(e), None
+
     except Exception as e:
         log_error_bd("movimientos", "crear_imputacion_obra", e)
         return False, f"Error al crear imputación: {str(e)}", None
@@ -398,19 +438,12 @@ def crear_material_perdido(
         if not articulos:
             return False, "No hay artículos para registrar", None
 
-        # Validar stock y cantidades
+        # Validar cantidades
         for art in articulos:
             valido, mensaje = validar_cantidad(art['cantidad'])
             if not valido:
                 return False, f"Artículo ID {art['articulo_id']}: {mensaje}", None
 
-            hay_stock, mensaje_stock, _ = validar_stock_disponible(
-                art['articulo_id'], almacen_id, art['cantidad']
-            )
-
-            if not hay_stock:
-                return False, f"Artículo ID {art['articulo_id']}: {mensaje_stock}", None
-
         # Crear movimientos
         movimientos = []
         for art in articulos:
@@ -424,7 +457,8 @@ def crear_material_perdido(
                 'responsable': usuario
             })
 
-        ids_creados = movimientos_repo.crear_movimientos_batch(movimientos)
+        # Bloquea el stock de origen y lo comprueba antes de insertar
+        ids_creados = movimientos_repo.crear_movimientos_batch(movimientos, comprobar_stock=True)
 
         # Logging
         detalles = f"Almacén ID: {almacen_id}, Motivo: {motivo}, Artículos: {len(articulos)}"
@@ -433,6 +467,9 @@ def crear_material_perdido(
 
         return True, f"{len(articulos)} artículo(s) registrado(s) como perdido(s)", ids_creados
 
+    except InsufficientStockError as e:
+        return False, _mensaje_stock_insuficiente(e), None
+
     except Exception as e:
         log_error_bd("movimientos", "crear_material_perdido", e)
         return False, f"Error al registrar pérdida: {str(e)}", None
@@ -468,19 +505,12 @@ def crear_devolucion_proveedor(
         if not articulos:
             return False, "No hay artículos para devolver", None
 
-        # Validar stock y cantidades
+        # Validar cantidades
         for art in articulos:
             valido, mensaje = validar_cantidad(art['cantidad'])
             if not valido:
                 return False, f"Artículo ID {art['articulo_id']}: {mensaje}", None
 
-            hay_stock, mensaje_stock, _ = validar_stock_disponible(
-                art['articulo_id'], almacen_id, art['cantidad']
-            )
-
-            if not hay_stock:
-                return False, f"Artículo ID {art['articulo_id']}: {mensaje_stock}", None
-
         # Crear movimientos
         movimientos = []
         for art in articulos:
@@ -494,7 +524,8 @@ def crear_devolucion_proveedor(
                 'responsable': usuario
             })
 
-        ids_creados = movimientos_repo.crear_movimientos_batch(movimientos)
+        # Bloquea el stock de origen y lo comprueba antes de insertar
+        ids_creados = movimientos_repo.crear_movimientos_batch(movimientos, comprobar_stock=True)
 
         # Logging
         detalles = f"Almacén ID: {almacen_id}, Motivo: {motivo or 'N/A'}, Artículos: {len(articulos)}"
@@ -503,6 +534,9 @@ def crear_devolucion_proveedor(
 
         return True, f"{len(articulos)} artículo(s) devuelto(s)", ids_creados
 
+    except InsufficientStockError as e:
+        return False, _mensaje_stock_insuficiente(e), None
+
     except Exception as e:
         log_error_bd("movimientos", "crear_devolucion_proveedor", e)
         return False, f"Error al registrar devolución: {str(e)}", None
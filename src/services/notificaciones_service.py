@@ -71,6 +71,23 @@ def generar_notificaciones_usuario(usuario: str) -> int:
         return 0
 
 
+def _existe_notificacion_reciente(usuario: str, tipo: str, datos: Dict[str, Any]) -> bool:
+    """
+    True si el usuario ya tiene una notificación de ese tipo y con esos datos
+    en las últimas 24 horas. Se llama una vez por artículo o inventario al
+    generar notificaciones, así que va como sentencia preparada.
+    """
+    existe = fetch_one("""
+        SELECT id FROM notificaciones
+        WHERE usuario = %s
+        AND tipo = %s
+        AND datos_adicionales::jsonb @> %s::jsonb
+        AND fecha_creacion > NOW() - INTERVAL '24 hours'
+        LIMIT 1
+    """, (usuario, tipo, json.dumps(datos)), preparada="notificacion_reciente")
+    return existe is not None
+
+
 def _generar_notificaciones_stock_critico(usuario: str) -> int:
     """Genera notificaciones de stock crítico (stock <= 0)"""
     try:
@@ -86,13 +103,7 @@ def _generar_notificaciones_stock_critico(usuario: str) -> int:
         contador = 0
         for art in articulos:
             # Verificar si ya existe una notificación reciente (últimas 24 horas)
-            existe = fetch_one("""
-                SELECT id FROM notificaciones
-                WHERE usuario = %s
-                AND tipo = 'stock_critico'
-                AND datos_adicionales::jsonb @> %s::jsonb
-                AND fecha_creacion > NOW() - INTERVAL '24 hours'
-            """, (usuario, json.dumps({'articulo_id': art["id"]})))
+            existe = _existe_notificacion_reciente(usuario, 'stock_critico', {'articulo_id': art["id"]})
 
             if not existe:
                 mensaje = f"❌ {art['nombre']} - Stock agotado: {art['stock']:.2f} {art['u_medida']}"
@@ -130,13 +141,7 @@ def _generar_notificaciones_stock_bajo(usuario: str) -> int:
         contador = 0
         for art in articulos:
             # Verificar si ya existe una notificación reciente (últimas 24 horas)
-            existe = fetch_one("""
-                SELECT id FROM notificaciones
-                WHERE usuario = %s
-                AND tipo = 'stock_bajo'
-                AND datos_adicionales::jsonb @> %s::jsonb
-                AND fecha_creacion > NOW() - INTERVAL '24 hours'
-            """, (usuario, json.dumps({'articulo_id': art["id"]})))
+            existe = _existe_notificacion_reciente(usuario, 'stock_bajo', {'articulo_id': art["id"]})
 
             if not existe:
                 mensaje = f"⚠️ {art['nombre']} - Stock bajo: {art['stock']:.2f}/{art['min_alerta']:.2f} {art['u_medida']}"
@@ -169,13 +174,7 @@ def _generar_notificaciones_inventario_pendiente(usuario: str) -> int:
         contador = 0
         for inv in inventarios:
             # Verificar si ya existe una notificación reciente (últimas 24 horas)
-            existe = fetch_one("""
-                SELECT id FROM notificaciones
-                WHERE usuario = %s
-                AND tipo = 'inventario_pendiente'
-                AND datos_adicionales::jsonb @> %s::jsonb
-                AND fecha_creacion > NOW() - INTERVAL '24 hours'
-            """, (usuario, json.dumps({'inventario_id': inv['id']})))
+            existe = _existe_notificacion_reciente(usuario, 'inventario_pendiente', {'inventario_id': inv['id']})
 
             if not existe:
                 dias = int(inv['dias_pendiente'])
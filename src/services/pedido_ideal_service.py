@@ -1,10 +1,13 @@
 """
 Servicio de Pedido Ideal - Lógica de negocio para cálculo de pedidos óptimos
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Mapping
 from datetime import date, timedelta
 import math
+import numpy as np
 from src.repos import pedido_ideal_repo
+from src.core.columnar import ResultadoColumnar
+from src.core.db_utils import instantanea
 
 
 # ========================================
@@ -18,6 +21,17 @@ CONFIG_DEFAULT = {
     'min_dias_datos': 7,       # Mínimo de días con datos para calcular
 }
 
+# Prioridades por orden_prioridad: (prioridad, emoji)
+_PRIORIDADES = {
+    0: ("🚨 CRÍTICO URGENTE", "🔴"),
+    1: ("CRÍTICO", "🔴"),
+    2: ("PREVENTIVO", "🟡"),
+    3: ("NORMAL", "🟢"),
+    997: ("STOCK SUFICIENTE", "✅"),
+    998: ("BAJO CONSUMO", "⚪"),
+    999: ("SIN DATOS", "⚪"),
+}
+
 
 # ========================================
 # CÁLCULO DEL PEDIDO IDEAL
@@ -27,23 +41,25 @@ def calcular_pedido_articulo(
     articulo: Dict[str, Any],
     dias_cobertura: int = 20,
     dias_seguridad: int = None,
-    periodo_analisis: int = 90
+    periodo_analisis: int = 90,
+    stats: Optional[Mapping[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Calcula el pedido ideal para un artículo específico.
     
     Args:
-        articulo: Diccionario con datos del artículo
+        articulo: Diccionario (o fila columnar) con datos del artículo
         dias_cobertura: Días de stock que queremos tener
         dias_seguridad: Días de stock de seguridad (None = usar el del artículo)
         periodo_analisis: Días hacia atrás para analizar consumo
+        stats: Estadísticas de consumo ya cargadas (None = consultarlas)
         
     Returns:
         Dict con pedido_sugerido, consumo_diario, prioridad, etc.
     """
     articulo_id = articulo['id']
-    stock_actual = articulo.get('stock', 0)
-    nivel_alerta = articulo.get('nivel_alerta', 0)
+    stock_actual = articulo.get('stock') or 0
+    nivel_alerta = articulo.get('nivel_alerta') or 0
     unidad_compra = articulo.get('unidad_compra', 1) or 1
     
     # Usar días de seguridad del artículo si no se especifica
@@ -51,10 +67,11 @@ def calcular_pedido_articulo(
         dias_seguridad = articulo.get('dias_seguridad', 5)
     
     # Obtener estadísticas de consumo
-    stats = pedido_ideal_repo.get_estadisticas_consumo(articulo_id, periodo_analisis)
+    if stats is None:
+        stats = pedido_ideal_repo.get_estadisticas_consumo(articulo_id, periodo_analisis)
     
     # Si no hay datos de consumo
-    if not stats or stats.get('dias_con_movimiento', 0) < CONFIG_DEFAULT['min_dias_datos']:
+    if not stats or (stats.get('dias_con_movimiento') or 0) < CONFIG_DEFAULT['min_dias_datos']:
         return {
             'articulo_id': articulo_id,
             'articulo_nombre': articulo['nombre'],
@@ -183,54 +200,200 @@ def calcular_pedido_articulo(
     }
 
 
+def obtener_datos_analisis(incluir_sin_alerta: bool, periodo_analisis: int = 90):
+    """
+    Lee los artículos a analizar y sus estadísticas de consumo.
+
+    Las dos consultas leen la misma instantánea, para que el stock actual de
+    cada artículo y su consumo del periodo no queden descuadrados por un
+    movimiento guardado entre una y otra.
+
+    Returns:
+        Tupla (articulos, estadisticas) de ResultadoColumnar para
+        calcular_pedidos_multiples
+    """
+    with instantanea():
+        articulos = pedido_ideal_repo.get_articulos_para_analizar(incluir_sin_alerta, columnar=True)
+        estadisticas = pedido_ideal_repo.get_estadisticas_consumo_todos(periodo_analisis)
+    return articulos, estadisticas
+
+
+def _columna(articulos: ResultadoColumnar, nombre: str, defecto: float) -> np.ndarray:
+    """Columna numérica como float64, con defecto donde falta o es NULL."""
+    if nombre not in articulos.columnas:
+        return np.full(len(articulos), defecto, dtype=np.float64)
+    valores = articulos.columna(nombre)
+    if valores.dtype == object:
+        valores = np.array([np.nan if v is None else float(v) for v in valores], dtype=np.float64)
+    valores = valores.astype(np.float64, copy=False)
+    return np.where(np.isnan(valores), defecto, valores)
+
+
+def _consumo_por_articulo(ids: np.ndarray, estadisticas: ResultadoColumnar):
+    """
+    Alinea las estadísticas de consumo con los artículos (por articulo_id).
+
+    Returns:
+        Tupla (total_consumido, dias_con_movimiento) en float64, 0 para los
+        artículos sin imputaciones en el periodo
+    """
+    total = np.zeros(len(ids), dtype=np.float64)
+    dias = np.zeros(len(ids), dtype=np.float64)
+    if len(estadisticas) == 0:
+        return total, dias
+    claves = estadisticas.columna('articulo_id')
+    orden = np.argsort(claves, kind='stable')
+    claves = claves[orden]
+    pos = np.minimum(np.searchsorted(claves, ids), len(claves) - 1)
+    encontrados = claves[pos] == ids
+    fila = orden[pos[encontrados]]
+    total[encontrados] = np.nan_to_num(
+        estadisticas.columna('total_consumido')[fila].astype(np.float64)
+    )
+    dias[encontrados] = estadisticas.columna('dias_con_movimiento')[fila]
+    return total, dias
+
+
 def calcular_pedidos_multiples(
-    articulos: List[Dict[str, Any]],
+    articulos,
     dias_cobertura: int = 20,
     dias_seguridad: int = None,
     periodo_analisis: int = 90,
-    filtros: Dict[str, bool] = None
+    filtros: Dict[str, bool] = None,
+    estadisticas: Optional[ResultadoColumnar] = None
 ) -> List[Dict[str, Any]]:
     """
     Calcula pedidos ideales para múltiples artículos.
+
+    Aplica las mismas reglas que calcular_pedido_articulo, pero con operaciones
+    NumPy sobre las columnas (consumo, cobertura, pedido, prioridad y filtros);
+    solo se construye un dict por cada artículo que pasa los filtros.
     
     Args:
-        articulos: Lista de diccionarios con datos de artículos
+        articulos: Artículos a analizar (ResultadoColumnar o List[Dict])
         dias_cobertura: Días de cobertura deseados
         dias_seguridad: Días de seguridad (None = usar el de cada artículo)
         periodo_analisis: Días hacia atrás para analizar
         filtros: Diccionario con filtros a aplicar
+        estadisticas: Estadísticas ya leídas con obtener_datos_analisis()
+                      (None = consultarlas aquí)
         
     Returns:
         Lista de pedidos calculados
     """
     filtros = filtros or {}
-    resultados = []
+    if not isinstance(articulos, ResultadoColumnar):
+        articulos = ResultadoColumnar.desde_dicts(articulos)
+    if len(articulos) == 0:
+        return []
+    
+    # Estadísticas de todos los artículos en una sola consulta (en vez de una por artículo)
+    if estadisticas is None:
+        estadisticas = pedido_ideal_repo.get_estadisticas_consumo_todos(periodo_analisis)
+    
+    ids = articulos.columna('id')
+    stock = _columna(articulos, 'stock', 0)
+    nivel_alerta = _columna(articulos, 'nivel_alerta', 0)
+    unidad_compra = _columna(articulos, 'unidad_compra', 1)
+    coste = _columna(articulos, 'coste', 0)
+    es_critico = _columna(articulos, 'critico', 0) == 1
+    if dias_seguridad is None:
+        seguridad = _columna(articulos, 'dias_seguridad', 5)
+    else:
+        seguridad = np.full(len(articulos), dias_seguridad, dtype=np.float64)
+    
+    # Consumo diario medio
+    total_consumido, dias_con_movimiento = _consumo_por_articulo(ids, estadisticas)
+    sin_datos = dias_con_movimiento < CONFIG_DEFAULT['min_dias_datos']
+    consumo_diario = np.divide(
+        total_consumido, dias_con_movimiento,
+        out=np.zeros(len(articulos)), where=~sin_datos
+    )
     
-    for articulo in articulos:
-        pedido = calcular_pedido_articulo(
-            articulo,
-            dias_cobertura,
-            dias_seguridad,
-            periodo_analisis
-        )
-        
-        # Aplicar filtros
-        if filtros.get('solo_criticos') and pedido['prioridad'] not in ['CRÍTICO', '🚨 CRÍTICO URGENTE']:
-            continue
-        
-        if filtros.get('solo_bajo_alerta') and pedido['stock_actual'] >= pedido['nivel_alerta']:
-            continue
-        
-        if filtros.get('excluir_sin_consumo') and not pedido['requiere_pedido']:
-            continue
-        
-        if filtros.get('solo_con_proveedor') and not pedido.get('proveedor_id'):
-            continue
-        
-        resultados.append(pedido)
+    # Necesidades y pedido bruto
+    bajo_consumo = ~sin_datos & (consumo_diario < 0.1)
+    pedido_bruto = consumo_diario * (dias_cobertura + seguridad) - stock
+    suficiente = ~sin_datos & ~bajo_consumo & (pedido_bruto <= 0)
+    requiere = ~sin_datos & ~bajo_consumo & ~suficiente
+    
+    # Redondear a unidad de compra
+    pedido_final = np.where(
+        unidad_compra > 1,
+        np.ceil(pedido_bruto / unidad_compra) * unidad_compra,
+        np.ceil(pedido_bruto)
+    )
+    pedido_final = np.where(requiere, pedido_final, 0).astype(np.int64)
+    
+    # Prioridad
+    orden = np.select(
+        [sin_datos, bajo_consumo, suficiente,
+         stock < nivel_alerta, stock < nivel_alerta * 1.5],
+        [999, 998, 997, np.where(es_critico, 0, 1), 2],
+        default=3
+    )
+    dias_restantes = np.divide(
+        stock, consumo_diario,
+        out=np.full(len(articulos), 999.0), where=~sin_datos & (consumo_diario > 0)
+    )
+    coste_estimado = np.where(requiere, pedido_final * coste, 0)
+    
+    # Filtros
+    incluir = np.ones(len(articulos), dtype=bool)
+    if filtros.get('solo_criticos'):
+        incluir &= orden <= 1
+    if filtros.get('solo_bajo_alerta'):
+        incluir &= stock < nivel_alerta
+    if filtros.get('excluir_sin_consumo'):
+        incluir &= requiere
+    if filtros.get('solo_con_proveedor'):
+        # Solo los pedidos a reponer llevan proveedor_id
+        incluir &= requiere & (_columna(articulos, 'proveedor_id', 0) != 0)
     
     # Ordenar por prioridad y luego por nombre
-    resultados.sort(key=lambda x: (x['orden_prioridad'], x['articulo_nombre']))
+    indices = np.flatnonzero(incluir)
+    nombres = articulos.columna('nombre')[indices]
+    indices = indices[np.argsort(nombres, kind='stable')]
+    indices = indices[np.argsort(orden[indices], kind='stable')]
+    
+    resultados = []
+    for i in indices.tolist():
+        articulo = articulos[i]
+        prioridad, emoji = _PRIORIDADES[int(orden[i])]
+        pedido = {
+            'articulo_id': articulo['id'],
+            'articulo_nombre': articulo['nombre'],
+            'stock_actual': articulo.get('stock') or 0,
+            'nivel_alerta': articulo.get('nivel_alerta') or 0,
+            'pedido_sugerido': int(pedido_final[i]),
+            'consumo_diario': float(consumo_diario[i]),
+            'dias_restantes': float(dias_restantes[i]),
+            'prioridad': prioridad,
+            'emoji': emoji,
+            'orden_prioridad': int(orden[i]),
+            'coste_estimado': float(coste_estimado[i]),
+            'unidad_compra': articulo.get('unidad_compra', 1) or 1,
+            'requiere_pedido': bool(requiere[i])
+        }
+        if sin_datos[i]:
+            pedido['razon'] = 'Sin consumo reciente'
+        elif bajo_consumo[i]:
+            pedido['razon'] = 'Consumo muy bajo'
+        elif suficiente[i]:
+            pedido['razon'] = f'Stock actual cubre {dias_restantes[i]:.1f} días'
+        else:
+            seguridad_articulo = dias_seguridad if dias_seguridad is not None \
+                else articulo.get('dias_seguridad', 5)
+            pedido.update({
+                'ean': articulo.get('ean', ''),
+                'ref_proveedor': articulo.get('ref_proveedor', ''),
+                'razon': f'Cobertura {dias_cobertura} días + seguridad {seguridad_articulo} días',
+                'coste_unitario': articulo.get('coste', 0) or 0,
+                'u_medida': articulo.get('u_medida', ''),
+                'proveedor_id': articulo.get('proveedor_id'),
+                'proveedor_nombre': articulo.get('proveedor_nombre', 'SIN PROVEEDOR'),
+                'es_critico': bool(es_critico[i])
+            })
+        resultados.append(pedido)
     
     return resultados
 
@@ -11,8 +11,9 @@ def obtener_stock_completo(
     familia: Optional[str] = None,
     almacen: Optional[int] = None,
     solo_con_stock: bool = False,
-    solo_alertas: bool = False
-) -> List[Dict[str, Any]]:
+    solo_alertas: bool = False,
+    columnar: bool = False
+):
     """
     Obtiene el stock completo de todos los artículos con filtros opcionales.
 
@@ -22,6 +23,7 @@ def obtener_stock_completo(
         almacen: Filtro por ID de almacén (no por nombre)
         solo_con_stock: Si True, solo artículos con stock > 0
         solo_alertas: Si True, solo artículos con stock < mínimo
+        columnar: Si True, devuelve un ResultadoColumnar (ver src.core.columnar)
 
     Returns:
         Lista de artículos con su stock por almacén
@@ -32,7 +34,8 @@ def obtener_stock_completo(
             familia=familia,
             almacen=almacen,
             solo_con_stock=solo_con_stock,
-            solo_alertas=solo_alertas
+            solo_alertas=solo_alertas,
+            columnar=columnar
         )
     except Exception as e:
         log_error_bd("stock", "obtener_stock_completo", e)
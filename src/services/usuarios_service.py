@@ -4,12 +4,15 @@ Servicio de Usuarios - Lógica de negocio para gestión de usuarios y autenticac
 from typing import List, Dict, Any, Optional, Tuple
 import psycopg2
 import re
+import threading
 from src.repos import usuarios_repo
 from src.core.db_utils import (
     hash_pwd,  # Legacy - para compatibilidad
     hash_password_seguro,  # Nuevo - bcrypt
     verificar_password,  # Nuevo - verificación bcrypt
-    es_hash_legacy  # Nuevo - detectar formato
+    es_hash_legacy,  # Nuevo - detectar formato
+    necesita_rehash,
+    get_bcrypt_rounds
 )
 from src.core.logger import logger, log_operacion, log_validacion, log_error_bd
 
@@ -85,9 +88,14 @@ def autenticar_usuario(usuario: str, password: str) -> Tuple[bool, str, Optional
     - Hashes legacy (SHA256) - para compatibilidad
     - Hashes modernos (bcrypt) - seguro
 
-    MIGRACIÓN AUTOMÁTICA:
-    Si el login es exitoso con hash legacy, automáticamente re-hashea
-    con bcrypt para migrar progresivamente sin resetear contraseñas.
+    MIGRACIÓN:
+    Si el login es correcto y el hash es legacy (o bcrypt con menos rondas
+    que las configuradas), user_data['requiere_rehash'] es True. El re-hash
+    no se hace aquí para no alargar el login: la ventana llama después a
+    actualizar_hash_en_segundo_plano().
+
+    Tarda lo que tarde bcrypt (~250 ms con 12 rondas en un PC lento): desde
+    la interfaz debe llamarse fuera del hilo principal.
     """
     try:
         if not usuario or not password:
@@ -112,25 +120,6 @@ def autenticar_usuario(usuario: str, password: str) -> Tuple[bool, str, Optional
             # Hash legacy (SHA256) - verificar con método antiguo
             password_hash_sha256 = hash_pwd(password)
             password_correcta = (password_hash_sha256 == stored_hash)
-
-            # ✨ MIGRACIÓN AUTOMÁTICA ✨
-            # Si la contraseña es correcta, re-hashear con bcrypt
-            if password_correcta:
-                try:
-                    nuevo_hash_bcrypt = hash_password_seguro(password)
-                    usuarios_repo.actualizar_usuario(
-                        usuario,
-                        nuevo_hash_bcrypt,
-                        None,  # No cambiar rol
-                        None   # No cambiar estado activo
-                    )
-                    logger.info(f"🔐 Contraseña migrada a bcrypt | {usuario}")
-                    log_operacion("usuarios", "migrar_password", usuario,
-                                "Contraseña migrada de SHA256 a bcrypt")
-                except Exception as e:
-                    # Si falla la migración, continuar (login sigue siendo válido)
-                    logger.warning(f"⚠️ Falló migración de contraseña | {usuario} | {e}")
-
         else:
             # Hash moderno (bcrypt) - verificar con bcrypt
             password_correcta = verificar_password(password, stored_hash)
@@ -145,7 +134,8 @@ def autenticar_usuario(usuario: str, password: str) -> Tuple[bool, str, Optional
 
         return True, "Inicio de sesión exitoso", {
             'usuario': user_data['usuario'],
-            'rol': user_data['rol']
+            'rol': user_data['rol'],
+            'requiere_rehash': necesita_rehash(stored_hash)
         }
 
     except Exception as e:
@@ -153,6 +143,47 @@ def autenticar_usuario(usuario: str, password: str) -> Tuple[bool, str, Optional
         return False, f"Error al autenticar: {str(e)}", None
 
 
+def actualizar_hash_password(usuario: str, password: str) -> bool:
+    """
+    Regenera el hash de la contraseña (ya verificada) con bcrypt y el coste
+    configurado. Se usa para migrar hashes SHA256 o bcrypt de menos rondas.
+
+    Returns:
+        True si se actualizó el hash
+    """
+    try:
+        nuevo_hash_bcrypt = hash_password_seguro(password)
+        usuarios_repo.actualizar_usuario(
+            usuario,
+            nuevo_hash_bcrypt,
+            None,  # No cambiar rol
+            None   # No cambiar estado activo
+        )
+        logger.info(f"🔐 Contraseña migrada a bcrypt ({get_bcrypt_rounds()} rondas) | {usuario}")
+        log_operacion("usuarios", "migrar_password", usuario,
+                    "Contraseña re-hasheada con bcrypt")
+        return True
+    except Exception as e:
+        # Si falla la migración no pasa nada: se reintenta en el próximo login
+        logger.warning(f"⚠️ Falló migración de contraseña | {usuario} | {e}")
+        return False
+
+
+def actualizar_hash_en_segundo_plano(usuario: str, password: str) -> threading.Thread:
+    """
+    Lanza actualizar_hash_password() en un hilo para no retrasar la entrada
+    a la aplicación tras el login.
+    """
+    hilo = threading.Thread(
+        target=actualizar_hash_password,
+        args=(usuario, password),
+        name=f"rehash_{usuario}",
+        daemon=True
+    )
+    hilo.start()
+    return hilo
+
+
 def crear_usuario(usuario: str, password: str, rol: str = "almacen",
                   activo: bool = True, usuario_creador: str = "admin") -> Tuple[bool, str]:
     """Crea un nuevo usuario con validaciones."""
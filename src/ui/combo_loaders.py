@@ -5,19 +5,19 @@ Funciones centralizadas para cargar datos en combos (QComboBox).
 Este módulo proporciona una interfaz estándar para llenar combos con datos
 de la base de datos, eliminando código duplicado en múltiples ventanas.
 
+Los maestros (familias, proveedores, almacenes, operarios, ubicaciones) salen
+por defecto de la caché de maestros (src/core/cache_maestros.py), así que
+rellenar un combo no consulta la BD mientras no cambien.
+
 Uso:
     from src.ui.combo_loaders import ComboLoader
-    from src.repos import articulos_repo
 
     # En tu ventana:
-    ComboLoader.cargar_familias(
-        self.cmb_familia,
-        articulos_repo.get_familias,
-        opcion_vacia=True
-    )
+    ComboLoader.cargar_familias(self.cmb_familia, opcion_vacia=True)
 """
 
 from PySide6.QtWidgets import QComboBox, QMessageBox
+from src.core import cache_maestros
 from src.core.logger import logger
 from typing import Callable, List, Dict, Any, Optional
 
@@ -72,7 +72,7 @@ class ComboLoader:
     @staticmethod
     def cargar_familias(
         combo: QComboBox,
-        repo_func: Callable[[], List[Dict[str, Any]]],
+        repo_func: Optional[Callable[[], List[Dict[str, Any]]]] = None,
         opcion_vacia: bool = True,
         texto_vacio: str = "(Sin familia)"
     ) -> bool:
@@ -81,7 +81,7 @@ class ComboLoader:
 
         Args:
             combo: QComboBox destino
-            repo_func: Función que retorna lista de familias
+            repo_func: Función que retorna lista de familias (por defecto, la caché de maestros)
             opcion_vacia: Si incluir opción vacía
             texto_vacio: Texto para la opción vacía
 
@@ -97,7 +97,7 @@ class ComboLoader:
             )
         """
         try:
-            familias = repo_func()
+            familias = (repo_func or cache_maestros.familias)()
             opcion = (texto_vacio, None) if opcion_vacia else None
             ComboLoader.cargar_items(combo, familias, 'nombre', 'id', opcion)
             return True
@@ -112,7 +112,7 @@ class ComboLoader:
     @staticmethod
     def cargar_proveedores(
         combo: QComboBox,
-        repo_func: Callable[[], List[Dict[str, Any]]],
+        repo_func: Optional[Callable[[], List[Dict[str, Any]]]] = None,
         opcion_vacia: bool = True,
         texto_vacio: str = "(Sin proveedor)"
     ) -> bool:
@@ -121,7 +121,7 @@ class ComboLoader:
 
         Args:
             combo: QComboBox destino
-            repo_func: Función que retorna lista de proveedores
+            repo_func: Función que retorna lista de proveedores (por defecto, la caché de maestros)
             opcion_vacia: Si incluir opción vacía
             texto_vacio: Texto para la opción vacía
 
@@ -137,7 +137,7 @@ class ComboLoader:
             )
         """
         try:
-            proveedores = repo_func()
+            proveedores = (repo_func or cache_maestros.proveedores)()
             opcion = (texto_vacio, None) if opcion_vacia else None
             ComboLoader.cargar_items(combo, proveedores, 'nombre', 'id', opcion)
             return True
@@ -151,7 +151,7 @@ class ComboLoader:
     @staticmethod
     def cargar_almacenes(
         combo: QComboBox,
-        repo_func: Callable[[], List[Dict[str, Any]]],
+        repo_func: Optional[Callable[[], List[Dict[str, Any]]]] = None,
         opcion_vacia: bool = True,
         texto_vacio: str = "Todos"
     ) -> bool:
@@ -160,7 +160,7 @@ class ComboLoader:
 
         Args:
             combo: QComboBox destino
-            repo_func: Función que retorna lista de almacenes
+            repo_func: Función que retorna lista de almacenes (por defecto, la caché de maestros)
             opcion_vacia: Si incluir opción vacía
             texto_vacio: Texto para la opción vacía (por defecto: "Todos")
 
@@ -176,7 +176,7 @@ class ComboLoader:
             )
         """
         try:
-            almacenes = repo_func()
+            almacenes = (repo_func or cache_maestros.almacenes)()
             opcion = (texto_vacio, None) if opcion_vacia else None
             ComboLoader.cargar_items(combo, almacenes, 'nombre', 'id', opcion)
             return True
@@ -190,7 +190,7 @@ class ComboLoader:
     @staticmethod
     def cargar_operarios(
         combo: QComboBox,
-        repo_func: Callable[[], List[Dict[str, Any]]],
+        repo_func: Optional[Callable[[], List[Dict[str, Any]]]] = None,
         opcion_vacia: bool = True,
         texto_vacio: str = "(Seleccione operario)",
         con_emoji: bool = True
@@ -200,7 +200,7 @@ class ComboLoader:
 
         Args:
             combo: QComboBox destino
-            repo_func: Función que retorna lista de operarios
+            repo_func: Función que retorna lista de operarios (por defecto, la caché de maestros)
             opcion_vacia: Si incluir opción vacía
             texto_vacio: Texto para la opción vacía
             con_emoji: Si True, añade emoji según rol del operario
@@ -217,7 +217,7 @@ class ComboLoader:
             )
         """
         try:
-            operarios = repo_func()
+            operarios = (repo_func or cache_maestros.operarios)()
 
             def formatter(op):
                 if con_emoji:
@@ -239,7 +239,7 @@ class ComboLoader:
     @staticmethod
     def cargar_ubicaciones(
         combo: QComboBox,
-        repo_func: Callable[[], List[Dict[str, Any]]],
+        repo_func: Optional[Callable[[], List[Dict[str, Any]]]] = None,
         opcion_vacia: bool = True,
         texto_vacio: str = "(Sin ubicación)"
     ) -> bool:
@@ -248,7 +248,7 @@ class ComboLoader:
 
         Args:
             combo: QComboBox destino
-            repo_func: Función que retorna lista de ubicaciones
+            repo_func: Función que retorna lista de ubicaciones (por defecto, la caché de maestros)
             opcion_vacia: Si incluir opción vacía
             texto_vacio: Texto para la opción vacía
 
@@ -264,7 +264,7 @@ class ComboLoader:
             )
         """
         try:
-            ubicaciones = repo_func()
+            ubicaciones = (repo_func or cache_maestros.ubicaciones)()
             opcion = (texto_vacio, None) if opcion_vacia else None
             ComboLoader.cargar_items(combo, ubicaciones, 'nombre', 'id', opcion)
             return True
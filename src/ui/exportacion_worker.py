@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Exportaciones en segundo plano con barra de progreso.
+
+Lanza exportacion_service.exportar() en un QThread para que la interfaz no
+se bloquee mientras se vuelca una consulta completa (p. ej. un año de
+movimientos) a Excel o CSV.
+
+Uso:
+    from src.ui.exportacion_worker import exportar_en_segundo_plano
+
+    exportar_en_segundo_plano(
+        self, 'movimientos', filtros={'tipo': 'ENTRADA'}, formato='xlsx'
+    )
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from PySide6.QtCore import QThread, Signal, Qt
+from PySide6.QtWidgets import QWidget, QProgressDialog, QFileDialog, QMessageBox
+
+from src.core.logger import logger
+from src.services import exportacion_service
+
+
+class ExportacionWorker(QThread):
+    """Hilo que ejecuta una exportación y notifica progreso por señales."""
+
+    progreso = Signal(int, int)      # (filas_escritas, total_estimado)
+    terminado = Signal(str, int)     # (ruta, filas)
+    error = Signal(str)
+    cancelado = Signal()
+
+    def __init__(
+        self,
+        nombre: str,
+        ruta: Path,
+        filtros: Optional[Dict[str, Any]] = None,
+        formato: Optional[str] = None,
+        titulo: Optional[str] = None,
+        parent=None
+    ):
+        super().__init__(parent)
+        self.nombre = nombre
+        self.ruta = Path(ruta)
+        self.filtros = filtros or {}
+        self.formato = formato
+        self.titulo = titulo
+        self._cancelar = False
+
+    def cancelar(self):
+        """Solicita la cancelación; se hace efectiva al terminar el bloque en curso."""
+        self._cancelar = True
+
+    def run(self):
+        try:
+            filas = exportacion_service.exportar(
+                self.nombre,
+                self.ruta,
+                filtros=self.filtros,
+                formato=self.formato,
+                titulo=self.titulo,
+                progreso=lambda hechas, total: self.progreso.emit(hechas, total),
+                cancelado=lambda: self._cancelar
+            )
+            self.terminado.emit(str(self.ruta), filas)
+        except exportacion_service.ExportacionCancelada:
+            self.cancelado.emit()
+        except Exception as e:
+            logger.exception(f"Error en exportación '{self.nombre}': {e}")
+            self.error.emit(str(e))
+
+
+def exportar_en_segundo_plano(
+    parent: QWidget,
+    nombre: str,
+    filtros: Optional[Dict[str, Any]] = None,
+    formato: str = exportacion_service.FORMATO_EXCEL,
+    titulo: Optional[str] = None,
+    ruta: Optional[Path] = None,
+    sufijo: str = ""
+) -> Optional[ExportacionWorker]:
+    """
+    Pide la ruta (si no se indica), lanza la exportación y muestra el progreso.
+
+    Args:
+        parent: Ventana que lanza la exportación
+        nombre: Clave en exportacion_service.EXPORTACIONES
+        filtros: Filtros de la consulta (los mismos que usa la pantalla)
+        formato: 'xlsx' o 'csv'
+        titulo: Título opcional en la cabecera del archivo
+        ruta: Ruta de destino; si es None se pregunta al usuario
+        sufijo: Texto añadido al nombre de archivo sugerido
+
+    Returns:
+        El worker lanzado, o None si el usuario canceló el diálogo
+    """
+    if ruta is None:
+        sugerido = exportacion_service.nombre_archivo_sugerido(nombre, formato, sufijo)
+        filtro_dialogo = (
+            "CSV Files (*.csv);;All Files (*)" if formato == exportacion_service.FORMATO_CSV
+            else "Excel Files (*.xlsx);;All Files (*)"
+        )
+        ruta_str, _ = QFileDialog.getSaveFileName(parent, "Guardar exportación", sugerido, filtro_dialogo)
+        if not ruta_str:
+            return None
+        ruta = Path(ruta_str)
+
+    dialogo = QProgressDialog("Preparando exportación...", "Cancelar", 0, 0, parent)
+    dialogo.setWindowTitle("📤 Exportando")
+    dialogo.setWindowModality(Qt.WindowModal)
+    dialogo.setMinimumDuration(300)
+    dialogo.setAutoClose(False)
+    dialogo.setAutoReset(False)
+
+    worker = ExportacionWorker(nombre, ruta, filtros, formato, titulo, parent)
+
+    def on_progreso(hechas: int, total: int):
+        if total > 0:
+            dialogo.setMaximum(total)
+            dialogo.setValue(min(hechas, total))
+        dialogo.setLabelText(f"Exportando... {hechas:,} filas".replace(",", "."))
+
+    def on_terminado(ruta_final: str, filas: int):
+        dialogo.close()
+        QMessageBox.information(
+            parent, "✅ Éxito",
+            f"Datos exportados correctamente:\n\n{ruta_final}\n\nTotal filas: {filas}"
+        )
+
+    def on_error(mensaje: str):
+        dialogo.close()
+        QMessageBox.critical(parent, "❌ Error", f"Error al exportar:\n{mensaje}")
+
+    worker.progreso.connect(on_progreso)
+    worker.terminado.connect(on_terminado)
+    worker.error.connect(on_error)
+    worker.cancelado.connect(dialogo.close)
+    worker.finished.connect(worker.deleteLater)
+    dialogo.canceled.connect(worker.cancelar)
+
+    worker.start()
+    return worker
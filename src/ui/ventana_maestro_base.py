@@ -42,11 +42,44 @@ from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QTableWidgetItem, QLineEdit, QLabel, QMessageBox, QHeaderView
 )
-from PySide6.QtCore import Qt
+import inspect
+
+from PySide6.QtCore import Qt, QTimer
 
 from src.ui.estilos import ESTILO_VENTANA
 from src.ui.widgets_base import TituloVentana, DescripcionVentana, TablaEstandar
 from src.core.session_manager import session_manager
+from src.core import cache_maestros, telemetria
+from src.core.logger import logger
+from src.utils.texto_busqueda import clave_busqueda, normalizar
+
+# Items que se cargan de una vez; el buscador filtra sobre ellos en memoria
+LIMITE_CARGA = 100000
+
+# Cada cuánto se mira si han cambiado las tablas vigiladas (no consulta la BD
+# mientras la caché de maestros esté escuchando cambios)
+INTERVALO_CAMBIOS_MS = 2000
+
+# Rol del item de la columna 0 donde se guarda el índice del item en los datos
+_ROL_INDICE = Qt.UserRole + 1
+
+# (clase de ventana, acción) -> método del service ya resuelto
+_METODOS = {}
+
+
+def _parametros_obligatorios(funcion):
+    """Nombres de los parámetros sin valor por defecto ([] si no se puede inspeccionar)."""
+    try:
+        firma = inspect.signature(funcion)
+    except (ValueError, TypeError):
+        return []
+    return [
+        p.name for p in firma.parameters.values()
+        if p.default is inspect.Parameter.empty and p.kind not in (
+            inspect.Parameter.VAR_POSITIONAL,
+            inspect.Parameter.VAR_KEYWORD
+        )
+    ]
 
 
 # Metaclass que combina QWidget y ABCMeta
@@ -72,10 +105,20 @@ class VentanaMaestroBase(QWidget, metaclass=QABCMeta):
 
     Métodos opcionales que PUEDEN sobrescribir las clases hijas:
     - configurar_dimensiones(): Personaliza tamaño de ventana
+    - obtener_datos(): Obtiene la lista completa de items (default: método de listado del service)
     - cargar_datos_en_tabla(datos): Personaliza cómo se muestran los datos
+    - texto_busqueda(item): Define en qué campos busca el buscador (default: los de texto)
+    - filtrar_fila(item): Filtros adicionales al texto (combos)
     - get_nombre_item(fila): Define qué nombre mostrar al eliminar (default: columna 1)
+
+    Los datos se cargan una sola vez y el buscador filtra en memoria
+    ocultando filas. Si tablas_vigiladas indica tablas de la caché de
+    maestros, la ventana se recarga sola cuando cambian.
     """
 
+    # Tablas cuyos cambios recargan la ventana (ver src/core/cache_maestros.py)
+    tablas_vigiladas = ()
+
     def __init__(
         self,
         titulo: str,
@@ -108,12 +151,26 @@ class VentanaMaestroBase(QWidget, metaclass=QABCMeta):
         # Dimensiones (pueden sobrescribirse en hijas)
         self.configurar_dimensiones()
 
+        # Datos cargados y estado del filtro en memoria
+        self._datos = []
+        self._claves = []
+        self._visibles = set()
+        self._filas = None
+        self._filtro_aplicado = ""
+        self._generacion = None
+
         # Crear interfaz
         self._crear_interfaz()
 
         # Cargar datos iniciales
         self.cargar_datos()
 
+        if self.tablas_vigiladas:
+            self.timer_cambios = QTimer(self)
+            self.timer_cambios.setInterval(INTERVALO_CAMBIOS_MS)
+            self.timer_cambios.timeout.connect(self._comprobar_cambios)
+            self.timer_cambios.start()
+
     def configurar_dimensiones(self):
         """
         Configura las dimensiones de la ventana.
@@ -167,6 +224,7 @@ class VentanaMaestroBase(QWidget, metaclass=QABCMeta):
         self.configurar_tabla()  # Método abstracto - implementado en hijas
         self.tabla.itemSelectionChanged.connect(self.seleccion_cambiada)
         self.tabla.doubleClicked.connect(self.editar_item)
+        self.tabla.horizontalHeader().sortIndicatorChanged.connect(self._orden_cambiado)
 
         layout.addWidget(self.tabla)
 
@@ -219,98 +277,206 @@ class VentanaMaestroBase(QWidget, metaclass=QABCMeta):
         """
         pass
 
-    def cargar_datos(self, filtro=""):
+    def cargar_datos(self):
         """
-        Carga los datos en la tabla usando el service.
+        Carga todos los datos del service y aplica el filtro actual.
 
-        Args:
-            filtro (str): Texto para filtrar los resultados
+        Solo se llama al abrir la ventana y cuando los datos cambian (tras
+        crear, editar o eliminar, o al avisar la caché de maestros). Escribir
+        en el buscador filtra en memoria sin volver a la BD.
         """
         try:
-            filtro_texto = filtro if filtro else None
-            service = self.get_service()
-
-            # Obtener método de listado del service
-            # Los services pueden tener diferentes métodos:
-            # - obtener_familias(), obtener_proveedores(), etc. (plurales, sin parámetros obligatorios)
-            # - obtener_familia(id), obtener_proveedor(id), etc. (singulares, con parámetro)
-            # Buscamos métodos que empiecen con 'obtener_' o 'listar_' y que NO requieran parámetros
-            # EXCLUIMOS métodos como obtener_estadisticas_generales que no retornan listas de items
-            import inspect
-            metodo_listar = None
-            metodos_candidatos = []
-
-            for attr_name in dir(service):
-                if attr_name.startswith('obtener_') or attr_name.startswith('listar_'):
-                    # Excluir métodos que no son de listado de items
-                    if 'estadisticas' in attr_name or 'estadistica' in attr_name:
-                        continue
-
-                    attr = getattr(service, attr_name)
-                    if callable(attr):
-                        # Verificar que el método no requiera parámetros obligatorios
-                        try:
-                            sig = inspect.signature(attr)
-                            # Contar parámetros obligatorios (sin valor default)
-                            required_params = [
-                                p for p in sig.parameters.values()
-                                if p.default == inspect.Parameter.empty and p.kind not in (
-                                    inspect.Parameter.VAR_POSITIONAL,
-                                    inspect.Parameter.VAR_KEYWORD
-                                )
-                            ]
-                            # Si no tiene parámetros obligatorios, es candidato
-                            if len(required_params) == 0:
-                                metodos_candidatos.append((attr_name, attr))
-                        except (ValueError, TypeError):
-                            # Si falla la inspección debido a problemas con la firma, intentar de todos modos
-                            pass
-
-            # Priorizar métodos plurales (obtener_proveedores sobre obtener_proveedor)
-            # y métodos que empiecen con 'listar_' sobre 'obtener_'
-            # Además, priorizar métodos más cortos/generales (obtener_operarios sobre obtener_ayudantes_activos)
-
-            # 1. Priorizar listar_
-            for nombre, metodo in metodos_candidatos:
-                if nombre.startswith('listar_'):
-                    metodo_listar = metodo
-                    break
-
-            # 2. Si no hay listar_, buscar obtener_ en plural, priorizando los más cortos
-            if not metodo_listar:
-                candidatos_plurales = [
-                    (nombre, metodo) for nombre, metodo in metodos_candidatos
-                    if nombre.startswith('obtener_') and nombre.endswith('s')
-                ]
-                # Ordenar por longitud (más cortos primero = más generales)
-                candidatos_plurales.sort(key=lambda x: len(x[0]))
-                if candidatos_plurales:
-                    metodo_listar = candidatos_plurales[0][1]
-
-            # 3. Si aún no hay, tomar el primero disponible
-            if not metodo_listar and metodos_candidatos:
-                metodo_listar = metodos_candidatos[0][1]
-
-            if not metodo_listar:
-                raise Exception("No se encontró método de listado en el service")
-
-            # Llamar al método con filtro
-            try:
-                datos = metodo_listar(filtro_texto=filtro_texto, limit=1000)
-            except TypeError:
-                # Si el método no acepta estos parámetros, intentar sin ellos
-                datos = metodo_listar()
+            if self.tablas_vigiladas:
+                self._generacion = self._generacion_actual()
+
+            with telemetria.medir(self, telemetria.FASE_CONSULTA):
+                datos = self.obtener_datos()
 
             # Validar que datos sea una lista (no un diccionario u otro tipo)
             if not isinstance(datos, list):
                 raise Exception(f"El método de listado retornó {type(datos).__name__} en lugar de lista")
 
-            # Cargar datos en tabla
-            self.cargar_datos_en_tabla(datos)
+            with telemetria.medir(self, telemetria.FASE_RENDER):
+                self._mostrar_datos(datos)
 
         except Exception as e:
             QMessageBox.critical(self, "❌ Error", f"Error al cargar datos:\n{e}")
 
+    def obtener_datos(self):
+        """
+        Obtiene del service la lista completa de items.
+        Las clases hijas pueden sobrescribir este método si su service lo necesita.
+
+        Returns:
+            list: Lista de diccionarios
+        """
+        metodo_listar = getattr(self.get_service(), self._metodo_listar())
+        try:
+            return metodo_listar(filtro_texto=None, limit=LIMITE_CARGA)
+        except TypeError:
+            # Si el método no acepta estos parámetros, intentar sin ellos
+            return metodo_listar()
+
+    def _metodo_listar(self):
+        """
+        Nombre del método de listado del service, resuelto una vez por clase.
+
+        Los services pueden tener diferentes métodos:
+        - obtener_familias(), obtener_proveedores(), etc. (plurales, sin parámetros obligatorios)
+        - obtener_familia(id), obtener_proveedor(id), etc. (singulares, con parámetro)
+        Buscamos métodos que empiecen con 'obtener_' o 'listar_' y que NO requieran parámetros,
+        excluyendo los de estadísticas, que no retornan listas de items.
+        """
+        clave = (type(self), 'listar')
+        if clave in _METODOS:
+            return _METODOS[clave]
+
+        service = self.get_service()
+        candidatos = []
+        for attr_name in dir(service):
+            if not (attr_name.startswith('obtener_') or attr_name.startswith('listar_')):
+                continue
+            if 'estadistica' in attr_name:
+                continue
+            attr = getattr(service, attr_name)
+            if callable(attr) and not _parametros_obligatorios(attr):
+                candidatos.append(attr_name)
+
+        # 1. Priorizar listar_
+        # 2. Si no hay, obtener_ en plural, los más cortos primero (más generales:
+        #    obtener_operarios sobre obtener_ayudantes_activos)
+        # 3. Si aún no hay, el primero disponible
+        listar = [n for n in candidatos if n.startswith('listar_')]
+        plurales = sorted(
+            (n for n in candidatos if n.startswith('obtener_') and n.endswith('s')),
+            key=len
+        )
+        elegidos = listar or plurales or candidatos
+        if not elegidos:
+            raise Exception("No se encontró método de listado en el service")
+
+        _METODOS[clave] = elegidos[0]
+        return elegidos[0]
+
+    def texto_busqueda(self, item_data):
+        """
+        Texto en el que busca el buscador para un item.
+        Por defecto, sus campos de texto; las clases hijas pueden cambiarlo.
+
+        Args:
+            item_data (dict): Item tal como lo devuelve el service
+
+        Returns:
+            str: Clave normalizada (ver src.utils.texto_busqueda)
+        """
+        return clave_busqueda(*(v for v in item_data.values() if isinstance(v, str)))
+
+    def filtrar_fila(self, item_data):
+        """
+        Filtros adicionales al texto (combos de la ventana).
+        Por defecto no filtra nada. Las clases hijas que lo sobrescriban
+        deben llamar a aplicar_filtro(reiniciar=True) cuando cambien sus combos.
+
+        Args:
+            item_data (dict): Item tal como lo devuelve el service
+
+        Returns:
+            bool: True si el item debe mostrarse
+        """
+        return True
+
+    def _mostrar_datos(self, datos):
+        """Rellena la tabla con todos los items y precalcula sus claves de búsqueda."""
+        ordenable = self.tabla.isSortingEnabled()
+        self.tabla.setSortingEnabled(False)
+        self.tabla.setUpdatesEnabled(False)
+        try:
+            # Vaciar primero: las filas nuevas no heredan filas ocultas
+            self.tabla.setRowCount(0)
+            self.cargar_datos_en_tabla(datos)
+            # Índice del item en cada fila, para seguirlo si se ordena la tabla
+            for i in range(len(datos)):
+                self.tabla.item(i, 0).setData(_ROL_INDICE, i)
+        finally:
+            self.tabla.setSortingEnabled(ordenable)
+            self.tabla.setUpdatesEnabled(True)
+
+        self._datos = datos
+        self._claves = [self.texto_busqueda(item) for item in datos]
+        self._visibles = set(range(len(datos)))
+        self._filas = None
+        self._filtro_aplicado = ""
+        self.aplicar_filtro(reiniciar=True)
+
+    def aplicar_filtro(self, reiniciar=False):
+        """
+        Muestra solo las filas que contienen el texto del buscador.
+
+        Si el texto nuevo contiene al anterior (se ha seguido escribiendo),
+        solo se revisan las filas visibles. Únicamente se tocan las filas
+        que cambian de estado.
+
+        Args:
+            reiniciar (bool): Revisar todas las filas (han cambiado los datos o los combos)
+        """
+        texto = normalizar(self.txt_buscar.text().strip())
+        if reiniciar or self._filtro_aplicado not in texto:
+            candidatos = range(len(self._datos))
+        else:
+            candidatos = self._visibles
+
+        claves = self._claves
+        if type(self).filtrar_fila is VentanaMaestroBase.filtrar_fila:
+            visibles = {i for i in candidatos if texto in claves[i]}
+        else:
+            datos = self._datos
+            visibles = {i for i in candidatos if texto in claves[i] and self.filtrar_fila(datos[i])}
+
+        filas = self._filas_por_indice()
+        anteriores = self._visibles
+        self.tabla.setUpdatesEnabled(False)
+        try:
+            for i in anteriores - visibles:
+                self.tabla.setRowHidden(filas[i], True)
+            for i in visibles - anteriores:
+                self.tabla.setRowHidden(filas[i], False)
+        finally:
+            self.tabla.setUpdatesEnabled(True)
+
+        self._visibles = visibles
+        self._filtro_aplicado = texto
+
+        # No dejar seleccionada una fila oculta
+        fila_actual = self.tabla.currentRow()
+        if fila_actual >= 0 and self.tabla.isRowHidden(fila_actual):
+            self.tabla.clearSelection()
+            self.tabla.setCurrentCell(-1, -1)
+
+    def _filas_por_indice(self):
+        """Fila de la tabla de cada item (cambia si el usuario ordena por una columna)."""
+        if self._filas is None:
+            filas = [0] * len(self._datos)
+            for fila in range(self.tabla.rowCount()):
+                filas[self.tabla.item(fila, 0).data(_ROL_INDICE)] = fila
+            self._filas = filas
+        return self._filas
+
+    def _orden_cambiado(self, *args):
+        self._filas = None
+
+    def _generacion_actual(self):
+        return sum(cache_maestros.generacion(tabla) for tabla in self.tablas_vigiladas)
+
+    def _comprobar_cambios(self):
+        """Recarga si otro puesto (o esta misma sesión) ha cambiado las tablas vigiladas."""
+        if not self.isVisible():
+            return
+        try:
+            if self._generacion_actual() != self._generacion:
+                self.cargar_datos()
+        except Exception as e:
+            logger.warning(f"No se pudo comprobar cambios en {self.titulo_texto}: {e}")
+
     def cargar_datos_en_tabla(self, datos):
         """
         Carga los datos en la tabla.
@@ -348,9 +514,8 @@ class VentanaMaestroBase(QWidget, metaclass=QABCMeta):
                 self.tabla.setItem(i, j, QTableWidgetItem(valor_str))
 
     def buscar(self):
-        """Filtra la tabla según el texto de búsqueda"""
-        filtro = self.txt_buscar.text().strip()
-        self.cargar_datos(filtro)
+        """Filtra la tabla según el texto de búsqueda (en memoria)"""
+        self.aplicar_filtro()
 
     def seleccion_cambiada(self):
         """Activa/desactiva botones según la selección"""
@@ -415,32 +580,12 @@ class VentanaMaestroBase(QWidget, metaclass=QABCMeta):
         service = self.get_service()
         usuario = session_manager.get_usuario_actual() or "admin"
 
-        # Buscar método eliminar
-        metodo_eliminar = None
-        for attr_name in dir(service):
-            if attr_name.startswith('eliminar_'):
-                attr = getattr(service, attr_name)
-                if callable(attr):
-                    metodo_eliminar = attr
-                    break
-
-        if not metodo_eliminar:
+        metodo = self._metodo_eliminar()
+        if not metodo:
             QMessageBox.critical(self, "❌ Error", "No se encontró método de eliminación en el service")
             return
-
-        # Determinar el nombre del parámetro ID
-        # Puede ser: familia_id, proveedor_id, operario_id, etc.
-        import inspect
-        sig = inspect.signature(metodo_eliminar)
-        param_id = None
-        for param_name in sig.parameters:
-            if param_name.endswith('_id'):
-                param_id = param_name
-                break
-
-        if not param_id:
-            # Intentar con 'id' genérico
-            param_id = 'id'
+        nombre_metodo, param_id = metodo
+        metodo_eliminar = getattr(service, nombre_metodo)
 
         # Ejecutar eliminación
         try:
@@ -456,3 +601,26 @@ class VentanaMaestroBase(QWidget, metaclass=QABCMeta):
 
         except Exception as e:
             QMessageBox.critical(self, "❌ Error", f"Error al eliminar:\n{e}")
+
+    def _metodo_eliminar(self):
+        """
+        (nombre del método eliminar_ del service, nombre de su parámetro ID),
+        resuelto una vez por clase. None si el service no tiene método de eliminación.
+        """
+        clave = (type(self), 'eliminar')
+        if clave in _METODOS:
+            return _METODOS[clave]
+
+        service = self.get_service()
+        resultado = None
+        for attr_name in dir(service):
+            if attr_name.startswith('eliminar_') and callable(getattr(service, attr_name)):
+                # El parámetro ID puede ser: familia_id, proveedor_id, operario_id, etc.
+                # Si no hay ninguno, intentar con 'id' genérico
+                parametros = inspect.signature(getattr(service, attr_name)).parameters
+                param_id = next((p for p in parametros if p.endswith('_id')), 'id')
+                resultado = (attr_name, param_id)
+                break
+
+        _METODOS[clave] = resultado
+        return resultado
@@ -57,6 +57,7 @@ from src.ui.widgets_base import TituloVentana, DescripcionVentana
 from src.ui.widgets_personalizados import SpinBoxClimatot, crear_boton_quitar_centrado
 from src.dialogs.buscador_articulos import BuscadorArticulos
 from src.core.session_manager import session_manager
+from src.core import telemetria
 from src.utils import validaciones
 
 
@@ -427,16 +428,17 @@ class VentanaOperativaBase(QWidget, metaclass=QABCMeta):
 
     def actualizar_tabla_articulos(self):
         """Actualiza la tabla de artículos temporales"""
-        self.tabla_articulos.setRowCount(len(self.articulos_temp))
+        with telemetria.medir(self, telemetria.FASE_RENDER):
+            self.tabla_articulos.setRowCount(len(self.articulos_temp))
 
-        for i, art in enumerate(self.articulos_temp):
-            # Las clases hijas deben implementar cómo llenar cada fila
-            self.llenar_fila_articulo(i, art)
+            for i, art in enumerate(self.articulos_temp):
+                # Las clases hijas deben implementar cómo llenar cada fila
+                self.llenar_fila_articulo(i, art)
 
-            # Botón quitar (siempre en la última columna)
-            btn_quitar = crear_boton_quitar_centrado(lambda idx=i: self.quitar_articulo(idx))
-            ultima_columna = self.tabla_articulos.columnCount() - 1
-            self.tabla_articulos.setCellWidget(i, ultima_columna, btn_quitar)
+                # Botón quitar (siempre en la última columna)
+                btn_quitar = crear_boton_quitar_centrado(lambda idx=i: self.quitar_articulo(idx))
+                ultima_columna = self.tabla_articulos.columnCount() - 1
+                self.tabla_articulos.setCellWidget(i, ultima_columna, btn_quitar)
 
         self.actualizar_resumen()
 
@@ -507,7 +509,8 @@ class VentanaOperativaBase(QWidget, metaclass=QABCMeta):
 
         # Ejecutar guardado
         try:
-            exito, mensaje = self.ejecutar_guardado()
+            with telemetria.medir(self, telemetria.FASE_GUARDADO):
+                exito, mensaje = self.ejecutar_guardado()
 
             if exito:
                 QMessageBox.information(self, "✅ Éxito", mensaje)
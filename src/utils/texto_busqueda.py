@@ -0,0 +1,29 @@
+"""
+Normalización de texto para búsquedas en memoria.
+
+Las ventanas que filtran sin ir a la BD precalculan una clave por fila con
+clave_busqueda() y comparan contra normalizar(texto_del_buscador) con un
+simple `in`, sin distinguir mayúsculas ni acentos.
+"""
+import unicodedata
+from functools import lru_cache
+from typing import Any
+
+
+@lru_cache(maxsize=4096)
+def normalizar(texto: str) -> str:
+    """Pasa a minúsculas y quita acentos y diéresis ('Ñandú' -> 'nandu')."""
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def clave_busqueda(*valores: Any) -> str:
+    """
+    Clave de búsqueda de una fila a partir de sus valores.
+
+    Los valores se separan con un carácter que no se puede teclear, para que
+    una búsqueda no encuentre coincidencias a caballo entre dos campos.
+    """
+    return '\x1f'.join(normalizar(str(v)) for v in valores if v is not None)
@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 
 from src.core.logger import logger
 from src.services import furgonetas_service, operarios_service
+from src.core import telemetria
 from src.ui.estilos import ESTILO_VENTANA
 from src.ui.widgets_base import (
     TituloVentana, DescripcionVentana, PanelFiltros, TablaEstandar,
@@ -203,31 +204,32 @@ class VentanaAsignaciones(QWidget):
             logger.exception(f"Error al cargar combos: {e}")
             QMessageBox.critical(self, "❌ Error", f"Error al cargar filtros:\n{e}")
 
+    def _obtener_filtros(self) -> dict:
+        """Construye los filtros de búsqueda a partir de los controles"""
+        # Determinar filtro de turno
+        turno_filtro = None
+        if self.radio_manana.isChecked():
+            turno_filtro = 'manana'
+        elif self.radio_tarde.isChecked():
+            turno_filtro = 'tarde'
+        elif self.radio_completo.isChecked():
+            turno_filtro = 'completo'
+
+        return {
+            'fecha_desde': self.date_desde.date().toString("yyyy-MM-dd"),
+            'fecha_hasta': self.date_hasta.date().toString("yyyy-MM-dd"),
+            'operario_id': self.cmb_operario.currentData(),
+            'furgoneta_id': self.cmb_furgoneta.currentData(),
+            'turno': turno_filtro,
+        }
+
     def buscar_asignaciones(self):
         """Busca asignaciones según los filtros"""
         try:
-            fecha_desde = self.date_desde.date().toString("yyyy-MM-dd")
-            fecha_hasta = self.date_hasta.date().toString("yyyy-MM-dd")
-            operario_id = self.cmb_operario.currentData()
-            furgoneta_id = self.cmb_furgoneta.currentData()
-
-            # Determinar filtro de turno
-            turno_filtro = None
-            if self.radio_manana.isChecked():
-                turno_filtro = 'manana'
-            elif self.radio_tarde.isChecked():
-                turno_filtro = 'tarde'
-            elif self.radio_completo.isChecked():
-                turno_filtro = 'completo'
-
+            crono = telemetria.Cronometro(self)
             # Usar furgonetas_service en lugar de SQL directo
-            resultados = furgonetas_service.obtener_asignaciones_filtradas(
-                fecha_desde=fecha_desde,
-                fecha_hasta=fecha_hasta,
-                operario_id=operario_id,
-                furgoneta_id=furgoneta_id,
-                turno=turno_filtro
-            )
+            resultados = furgonetas_service.obtener_asignaciones_filtradas(**self._obtener_filtros())
+            crono.marcar(telemetria.FASE_CONSULTA)
 
             # Llenar tabla
             self.tabla.setRowCount(len(resultados))
@@ -265,6 +267,7 @@ class VentanaAsignaciones(QWidget):
                 else:
                     dias_texto = f"Hace {dias_transcurridos} días"
                 self.tabla.setItem(i, 5, QTableWidgetItem(dias_texto))
+            crono.marcar(telemetria.FASE_RENDER)
 
             # Estadísticas
             total = len(resultados)
@@ -299,51 +302,15 @@ class VentanaAsignaciones(QWidget):
             QMessageBox.critical(self, "❌ Error", f"Error al buscar:\n{e}")
 
     def exportar_csv(self):
-        """Exporta los resultados a CSV"""
+        """Exporta a CSV todas las asignaciones que cumplen los filtros (en segundo plano)"""
         if self.tabla.rowCount() == 0:
             QMessageBox.warning(self, "⚠️ Aviso", "No hay resultados para exportar")
             return
 
-        try:
-            from PySide6.QtWidgets import QFileDialog
-            import csv
-
-            fecha_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-            nombre_sugerido = f"asignaciones_furgonetas_{fecha_str}.csv"
-
-            ruta, _ = QFileDialog.getSaveFileName(
-                self,
-                "Guardar exportación",
-                nombre_sugerido,
-                "CSV Files (*.csv);;All Files (*)"
-            )
-
-            if not ruta:
-                return
-
-            with open(ruta, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f, delimiter=';')
-
-                # Encabezados
-                writer.writerow(['Fecha', 'Turno', 'Operario', 'Rol', 'Furgoneta', 'Días'])
-
-                # Datos
-                for i in range(self.tabla.rowCount()):
-                    row_data = []
-                    for j in range(6):
-                        item = self.tabla.item(i, j)
-                        row_data.append(item.text() if item else '')
-                    writer.writerow(row_data)
-
-            QMessageBox.information(
-                self,
-                "✅ Éxito",
-                f"Datos exportados correctamente a:\n\n{ruta}"
-            )
-
-        except Exception as e:
-            logger.exception(f"Error al exportar: {e}")
-            QMessageBox.critical(self, "❌ Error", f"Error al exportar:\n{e}")
+        from src.ui.exportacion_worker import exportar_en_segundo_plano
+        exportar_en_segundo_plano(
+            self, 'asignaciones', filtros=self._obtener_filtros(), formato='csv'
+        )
 
     def limpiar_filtros(self):
         """Limpia todos los filtros"""
@@ -11,7 +11,8 @@ from PySide6.QtGui import QFont
 from datetime import date, datetime
 from typing import List, Dict, Any
 
-from src.services import consumos_service
+from src.services import consumos_service, consumos_cubo_service
+from src.core import telemetria
 from src.ui.estilos import (
     ESTILO_VENTANA,
     ESTILO_TITULO_VENTANA,
@@ -28,6 +29,11 @@ class VentanaConsumos(QWidget):
     - Por Furgoneta
     - Por Período
     - Por Artículo
+
+    Salvo el de OT, los tabs se calculan con el cubo de consumos
+    (consumos_cubo_service): cambiar de operario, furgoneta o artículo dentro
+    del mismo período no vuelve a consultar la BD. Doble clic en una fila de
+    los resúmenes o en una celda de la tabla cruzada baja un nivel (drill-down).
     """
     
     def __init__(self, parent=None):
@@ -35,6 +41,12 @@ class VentanaConsumos(QWidget):
         self.setWindowTitle("📊 Análisis de Consumos")
         self.resize(1100, 700)
         self.setStyleSheet(ESTILO_VENTANA)
+
+        # Filtros de la última consulta de cada tab, para exportarla completa
+        self._filtros_exportacion: Dict[str, Dict[str, Any]] = {}
+        # Última consulta del tab de operario y de la tabla cruzada, para el drill-down
+        self._desglose_operario = None
+        self._cruce_actual = None
         
         # Layout principal
         layout = QVBoxLayout(self)
@@ -138,7 +150,9 @@ class VentanaConsumos(QWidget):
             return
         
         try:
+            crono = telemetria.Cronometro("VentanaConsumos.ot")
             datos = consumos_service.obtener_consumos_ot(ot)
+            crono.marcar(telemetria.FASE_CONSULTA)
             
             if not datos['detalle']:
                 QMessageBox.information(self, "Sin resultados", 
@@ -157,6 +171,7 @@ class VentanaConsumos(QWidget):
 <b>Última imputación:</b> {resumen.get('fecha_ultima', 'N/A')}
             """
             self.ot_resumen.setText(texto_resumen)
+            self._filtros_exportacion['consumos_ot'] = {'ot': ot}
             
             # Actualizar tabla
             self.tabla_ot.setRowCount(0)
@@ -177,7 +192,8 @@ class VentanaConsumos(QWidget):
                 ))
                 self.tabla_ot.setItem(r, 5, QTableWidgetItem(row.get('fecha', '')))
                 self.tabla_ot.setItem(r, 6, QTableWidgetItem(row.get('operario', '')))
-            
+            crono.marcar(telemetria.FASE_RENDER)
+
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al consultar OT:\n{e}")
     
@@ -297,15 +313,31 @@ class VentanaConsumos(QWidget):
                 f"Error al exportar:\n{e}"
             )
 
+    def _exportar_consulta_a_csv(self, nombre: str, titulo: str, sufijo: str = ""):
+        """
+        Exporta a CSV la última consulta del tab, ejecutándola completa en
+        el servidor y en segundo plano (no recorre la tabla en pantalla).
+        """
+        filtros = self._filtros_exportacion.get(nombre)
+        if not filtros:
+            QMessageBox.warning(
+                self,
+                "⚠️ Sin datos",
+                "No hay datos para exportar.\n\nPrimero realice una consulta."
+            )
+            return
+
+        from src.ui.exportacion_worker import exportar_en_segundo_plano
+        exportar_en_segundo_plano(
+            self, nombre, filtros=filtros, formato='csv', titulo=titulo,
+            sufijo=sufijo.replace(' ', '_')
+        )
+
     def _exportar_ot(self):
         """Exporta el detalle de OT a CSV"""
-        ot = self.ot_input.text().strip()
+        ot = self._filtros_exportacion.get('consumos_ot', {}).get('ot', '')
         titulo = f"CONSUMOS DE OT: {ot}" if ot else "CONSUMOS DE OT"
-        self._exportar_tabla_a_csv(
-            self.tabla_ot,
-            f"consumos_ot_{ot}" if ot else "consumos_ot",
-            titulo
-        )
+        self._exportar_consulta_a_csv('consumos_ot', titulo, ot)
 
     def _imprimir_ot(self):
         """Imprime el detalle de OT"""
@@ -389,6 +421,8 @@ class VentanaConsumos(QWidget):
         ])
         self.tabla_operario_top.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.tabla_operario_top.setAlternatingRowColors(True)
+        self.tabla_operario_top.setToolTip("Doble clic: OTs en las que se usó el artículo")
+        self.tabla_operario_top.cellDoubleClicked.connect(self._desglosar_operario)
         v_right.addWidget(self.tabla_operario_top)
         h_layout.addLayout(v_right, 1)
         
@@ -447,62 +481,77 @@ class VentanaConsumos(QWidget):
         try:
             fecha_desde = self.operario_fecha_desde.date().toPython()
             fecha_hasta = self.operario_fecha_hasta.date().toPython()
+            filtros = {'operario': operario_id}
             
-            datos = consumos_service.obtener_consumos_operario(operario_id, fecha_desde, fecha_hasta)
+            crono = telemetria.Cronometro("VentanaConsumos.operario")
+            detalle = consumos_cubo_service.consultar(
+                ['dia', 'ot', 'articulo'], filtros, fecha_desde, fecha_hasta, ordenar_por='dia'
+            )
+            top_articulos = consumos_cubo_service.consultar(
+                ['articulo'], filtros, fecha_desde, fecha_hasta, ordenar_por='cantidad', limit=10
+            )
+            crono.marcar(telemetria.FASE_CONSULTA)
             
-            if not datos['detalle']:
+            if not detalle:
                 QMessageBox.information(self, "Sin resultados",
                     "No se encontraron imputaciones para este operario en el período seleccionado")
                 return
             
             # Actualizar resumen
-            resumen = datos['resumen']
+            totales = self._totales(detalle)
             texto_resumen = f"""
-<b>Operario: {resumen.get('operario_nombre', 'N/A')}</b><br>
+<b>Operario: {self.combo_operario.currentText()}</b><br>
 <b>Período:</b> {fecha_desde.strftime('%d/%m/%Y')} - {fecha_hasta.strftime('%d/%m/%Y')}<br>
 <br>
-<b>Total imputaciones:</b> {resumen.get('total_imputaciones', 0)}<br>
-<b>OTs trabajadas:</b> {resumen.get('total_ots', 0)}<br>
-<b>Coste total material:</b> <span style='font-size:16px; color:#dc2626;'><b>{consumos_service.formatear_coste(resumen.get('coste_total', 0))}</b></span>
+<b>Total imputaciones:</b> {totales['imputaciones']}<br>
+<b>OTs trabajadas:</b> {totales['ots']}<br>
+<b>Coste total material:</b> <span style='font-size:16px; color:#dc2626;'><b>{consumos_service.formatear_coste(totales['coste'])}</b></span>
             """
             self.operario_resumen.setText(texto_resumen)
+            self._filtros_exportacion['consumos_operario'] = {
+                'operario_id': operario_id,
+                'fecha_desde': fecha_desde.isoformat(),
+                'fecha_hasta': fecha_hasta.isoformat(),
+            }
+            self._desglose_operario = (filtros, fecha_desde, fecha_hasta)
             
-            # Actualizar tabla de detalle
+            # Actualizar tabla de detalle (un renglón por día, OT y artículo)
             self.tabla_operario_detalle.setRowCount(0)
-            for row in datos['detalle']:
+            for row in detalle:
                 r = self.tabla_operario_detalle.rowCount()
                 self.tabla_operario_detalle.insertRow(r)
                 
-                self.tabla_operario_detalle.setItem(r, 0, QTableWidgetItem(row.get('fecha', '')))
-                self.tabla_operario_detalle.setItem(r, 1, QTableWidgetItem(row.get('ot', '')))
-                self.tabla_operario_detalle.setItem(r, 2, QTableWidgetItem(row.get('articulo', '')))
+                self.tabla_operario_detalle.setItem(r, 0, QTableWidgetItem(row['dia']))
+                self.tabla_operario_detalle.setItem(r, 1, QTableWidgetItem(row['ot']))
+                self.tabla_operario_detalle.setItem(r, 2, QTableWidgetItem(row['articulo']))
                 self.tabla_operario_detalle.setItem(r, 3, QTableWidgetItem(
-                    consumos_service.formatear_cantidad(row.get('cantidad', 0), row.get('unidad', ''))
+                    consumos_service.formatear_cantidad(row['cantidad'], row['unidad'])
                 ))
                 self.tabla_operario_detalle.setItem(r, 4, QTableWidgetItem(
-                    consumos_service.formatear_coste(row.get('coste_unit', 0))
+                    consumos_service.formatear_coste(self._coste_unitario(row))
                 ))
                 self.tabla_operario_detalle.setItem(r, 5, QTableWidgetItem(
-                    consumos_service.formatear_coste(row.get('coste_total', 0))
+                    consumos_service.formatear_coste(row['coste'])
                 ))
             
             # Actualizar top artículos
-            self.tabla_operario_top.setRowCount(0)
-            for row in datos['top_articulos']:
-                r = self.tabla_operario_top.rowCount()
-                self.tabla_operario_top.insertRow(r)
-                
-                self.tabla_operario_top.setItem(r, 0, QTableWidgetItem(row.get('articulo', '')))
-                self.tabla_operario_top.setItem(r, 1, QTableWidgetItem(
-                    consumos_service.formatear_cantidad(row.get('cantidad_total', 0), row.get('unidad', ''))
-                ))
-                self.tabla_operario_top.setItem(r, 2, QTableWidgetItem(str(row.get('veces_usado', 0))))
-                self.tabla_operario_top.setItem(r, 3, QTableWidgetItem(
-                    consumos_service.formatear_coste(row.get('coste_total', 0))
-                ))
-            
+            self._pintar_top_articulos(self.tabla_operario_top, top_articulos)
+            crono.marcar(telemetria.FASE_RENDER)
+
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al consultar operario:\n{e}")
+
+    def _desglosar_operario(self, fila: int, _columna: int):
+        """Doble clic en el top de artículos: OTs del operario en las que se usó"""
+        if not self._desglose_operario:
+            return
+        filtros, fecha_desde, fecha_hasta = self._desglose_operario
+        item = self.tabla_operario_top.item(fila, 0)
+        self._abrir_desglose(
+            f"{self.combo_operario.currentText()} › {item.text()}",
+            ['articulo'], {'articulo': item.data(Qt.UserRole)}, filtros, fecha_desde, fecha_hasta,
+            nueva_dimension='ot'
+        )
     
     # ========================================
     # TAB 3: CONSUMOS POR FURGONETA
@@ -595,42 +644,53 @@ class VentanaConsumos(QWidget):
             fecha_desde = self.furgoneta_fecha_desde.date().toPython()
             fecha_hasta = self.furgoneta_fecha_hasta.date().toPython()
             
-            datos = consumos_service.obtener_consumos_furgoneta(furgoneta_id, fecha_desde, fecha_hasta)
+            crono = telemetria.Cronometro("VentanaConsumos.furgoneta")
+            detalle = consumos_cubo_service.consultar(
+                ['dia', 'ot', 'articulo', 'operario'], {'furgoneta': furgoneta_id},
+                fecha_desde, fecha_hasta, ordenar_por='dia'
+            )
+            crono.marcar(telemetria.FASE_CONSULTA)
             
-            if not datos['detalle']:
+            if not detalle:
                 QMessageBox.information(self, "Sin resultados",
                     "No se encontraron imputaciones desde esta furgoneta en el período")
                 return
             
             # Actualizar resumen
-            resumen = datos['resumen']
+            totales = self._totales(detalle)
             texto_resumen = f"""
-<b>Furgoneta: {resumen.get('furgoneta_nombre', 'N/A')}</b><br>
+<b>Furgoneta: {self.combo_furgoneta.currentText()}</b><br>
 <b>Período:</b> {fecha_desde.strftime('%d/%m/%Y')} - {fecha_hasta.strftime('%d/%m/%Y')}<br>
 <br>
-<b>Total imputaciones:</b> {resumen.get('total_imputaciones', 0)}<br>
-<b>Coste total consumido:</b> <span style='font-size:16px; color:#dc2626;'><b>{consumos_service.formatear_coste(resumen.get('coste_total', 0))}</b></span>
+<b>Total imputaciones:</b> {totales['imputaciones']}<br>
+<b>Coste total consumido:</b> <span style='font-size:16px; color:#dc2626;'><b>{consumos_service.formatear_coste(totales['coste'])}</b></span>
             """
             self.furgoneta_resumen.setText(texto_resumen)
+            self._filtros_exportacion['consumos_furgoneta'] = {
+                'furgoneta_id': furgoneta_id,
+                'fecha_desde': fecha_desde.isoformat(),
+                'fecha_hasta': fecha_hasta.isoformat(),
+            }
             
             # Actualizar tabla
             self.tabla_furgoneta.setRowCount(0)
-            for row in datos['detalle']:
+            for row in detalle:
                 r = self.tabla_furgoneta.rowCount()
                 self.tabla_furgoneta.insertRow(r)
                 
-                self.tabla_furgoneta.setItem(r, 0, QTableWidgetItem(row.get('fecha', '')))
-                self.tabla_furgoneta.setItem(r, 1, QTableWidgetItem(row.get('ot', '')))
-                self.tabla_furgoneta.setItem(r, 2, QTableWidgetItem(row.get('articulo', '')))
+                self.tabla_furgoneta.setItem(r, 0, QTableWidgetItem(row['dia']))
+                self.tabla_furgoneta.setItem(r, 1, QTableWidgetItem(row['ot']))
+                self.tabla_furgoneta.setItem(r, 2, QTableWidgetItem(row['articulo']))
                 self.tabla_furgoneta.setItem(r, 3, QTableWidgetItem(
-                    consumos_service.formatear_cantidad(row.get('cantidad', 0), row.get('unidad', ''))
+                    consumos_service.formatear_cantidad(row['cantidad'], row['unidad'])
                 ))
-                self.tabla_furgoneta.setItem(r, 4, QTableWidgetItem(row.get('operario', '')))
+                self.tabla_furgoneta.setItem(r, 4, QTableWidgetItem(row['operario']))
                 self.tabla_furgoneta.setItem(r, 5, QTableWidgetItem(
-                    consumos_service.formatear_coste(row.get('coste_total', 0))
+                    consumos_service.formatear_coste(row['coste'])
                 ))
-                self.tabla_furgoneta.setItem(r, 6, QTableWidgetItem(row.get('unidad', '')))
-            
+                self.tabla_furgoneta.setItem(r, 6, QTableWidgetItem(row['unidad']))
+            crono.marcar(telemetria.FASE_RENDER)
+
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al consultar furgoneta:\n{e}")
     
@@ -695,6 +755,8 @@ class VentanaConsumos(QWidget):
         ])
         self.tabla_periodo_articulos.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.tabla_periodo_articulos.setAlternatingRowColors(True)
+        self.tabla_periodo_articulos.setToolTip("Doble clic: operarios que lo consumieron")
+        self.tabla_periodo_articulos.cellDoubleClicked.connect(self._desglosar_periodo_articulo)
         v_left.addWidget(self.tabla_periodo_articulos)
         h_layout.addLayout(v_left)
         
@@ -707,11 +769,46 @@ class VentanaConsumos(QWidget):
         ])
         self.tabla_periodo_operarios.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.tabla_periodo_operarios.setAlternatingRowColors(True)
+        self.tabla_periodo_operarios.setToolTip("Doble clic: OTs del operario")
+        self.tabla_periodo_operarios.cellDoubleClicked.connect(self._desglosar_periodo_operario)
         v_right.addWidget(self.tabla_periodo_operarios)
         h_layout.addLayout(v_right)
         
         layout.addLayout(h_layout)
 
+        # Tabla cruzada sobre el cubo (mismo período)
+        panel_cruce = QGroupBox("Tabla cruzada")
+        cruce_layout = QHBoxLayout()
+        cruce_layout.addWidget(QLabel("Filas:"))
+        self.combo_cruce_filas = QComboBox()
+        for texto, dim in (("Familia", 'familia'), ("Operario", 'operario'),
+                           ("Furgoneta", 'furgoneta'), ("OT", 'ot'), ("Artículo", 'articulo')):
+            self.combo_cruce_filas.addItem(texto, dim)
+        cruce_layout.addWidget(self.combo_cruce_filas)
+        cruce_layout.addWidget(QLabel("Columnas:"))
+        self.combo_cruce_columnas = QComboBox()
+        for texto, dim in (("Mes", 'mes'), ("Semana", 'semana'), ("Día", 'dia'),
+                           ("Furgoneta", 'furgoneta'), ("Familia", 'familia')):
+            self.combo_cruce_columnas.addItem(texto, dim)
+        cruce_layout.addWidget(self.combo_cruce_columnas)
+        cruce_layout.addWidget(QLabel("Medida:"))
+        self.combo_cruce_medida = QComboBox()
+        for texto, medida in (("Coste", 'coste'), ("Cantidad", 'cantidad'), ("Imputaciones", 'imputaciones')):
+            self.combo_cruce_medida.addItem(texto, medida)
+        cruce_layout.addWidget(self.combo_cruce_medida)
+        btn_cruzar = QPushButton("🔀 Cruzar")
+        btn_cruzar.clicked.connect(self._cruzar_periodo)
+        cruce_layout.addWidget(btn_cruzar)
+        cruce_layout.addStretch()
+        panel_cruce.setLayout(cruce_layout)
+        layout.addWidget(panel_cruce)
+
+        self.tabla_cruce = QTableWidget(0, 0)
+        self.tabla_cruce.setAlternatingRowColors(True)
+        self.tabla_cruce.setToolTip("Doble clic en una celda: bajar un nivel")
+        self.tabla_cruce.cellDoubleClicked.connect(self._desglosar_cruce)
+        layout.addWidget(self.tabla_cruce)
+
         # Botones
         botones = QHBoxLayout()
         btn_exportar = QPushButton("📄 Exportar a Excel")
@@ -734,16 +831,30 @@ class VentanaConsumos(QWidget):
         self.periodo_fecha_desde.setDate(QDate(inicio.year, inicio.month, inicio.day))
         self.periodo_fecha_hasta.setDate(QDate(fin.year, fin.month, fin.day))
     
+    def _rango_periodo(self):
+        """Fechas (desde, hasta) seleccionadas en el tab de período"""
+        return (
+            self.periodo_fecha_desde.date().toPython(),
+            self.periodo_fecha_hasta.date().toPython(),
+        )
+
     def _consultar_periodo(self):
         """Consulta el análisis de un período"""
         try:
-            fecha_desde = self.periodo_fecha_desde.date().toPython()
-            fecha_hasta = self.periodo_fecha_hasta.date().toPython()
+            fecha_desde, fecha_hasta = self._rango_periodo()
             
-            datos = consumos_service.obtener_analisis_periodo(fecha_desde, fecha_hasta)
+            crono = telemetria.Cronometro("VentanaConsumos.periodo")
+            resumen = consumos_service.obtener_resumen_periodo(fecha_desde, fecha_hasta)
+            articulos_top = consumos_cubo_service.consultar(
+                ['articulo'], None, fecha_desde, fecha_hasta, ordenar_por='cantidad', limit=10
+            )
+            operarios = consumos_cubo_service.consultar(
+                ['operario'], None, fecha_desde, fecha_hasta, ordenar_por='imputaciones'
+            )
+            operarios_top = [op for op in operarios if op['operario_id'] != -1][:10]
+            crono.marcar(telemetria.FASE_CONSULTA)
             
             # Actualizar resumen
-            resumen = datos['resumen']
             texto_resumen = f"""
 <b>RESUMEN DEL PERÍODO: {fecha_desde.strftime('%d/%m/%Y')} - {fecha_hasta.strftime('%d/%m/%Y')}</b><br>
 <br>
@@ -759,34 +870,89 @@ class VentanaConsumos(QWidget):
             self.periodo_resumen.setText(texto_resumen)
             
             # Actualizar top artículos
-            self.tabla_periodo_articulos.setRowCount(0)
-            for row in datos['articulos_top']:
-                r = self.tabla_periodo_articulos.rowCount()
-                self.tabla_periodo_articulos.insertRow(r)
-                
-                self.tabla_periodo_articulos.setItem(r, 0, QTableWidgetItem(row.get('articulo', '')))
-                self.tabla_periodo_articulos.setItem(r, 1, QTableWidgetItem(
-                    consumos_service.formatear_cantidad(row.get('cantidad_total', 0), row.get('unidad', ''))
-                ))
-                self.tabla_periodo_articulos.setItem(r, 2, QTableWidgetItem(str(row.get('veces_usado', 0))))
-                self.tabla_periodo_articulos.setItem(r, 3, QTableWidgetItem(
-                    consumos_service.formatear_coste(row.get('coste_total', 0))
-                ))
+            self._pintar_top_articulos(self.tabla_periodo_articulos, articulos_top)
             
             # Actualizar top operarios
             self.tabla_periodo_operarios.setRowCount(0)
-            for row in datos['operarios_top']:
+            for row in operarios_top:
                 r = self.tabla_periodo_operarios.rowCount()
                 self.tabla_periodo_operarios.insertRow(r)
                 
-                self.tabla_periodo_operarios.setItem(r, 0, QTableWidgetItem(row.get('operario', '')))
-                self.tabla_periodo_operarios.setItem(r, 1, QTableWidgetItem(str(row.get('total_imputaciones', 0))))
+                item = QTableWidgetItem(row['operario'])
+                item.setData(Qt.UserRole, row['operario_id'])
+                self.tabla_periodo_operarios.setItem(r, 0, item)
+                self.tabla_periodo_operarios.setItem(r, 1, QTableWidgetItem(str(row['imputaciones'])))
                 self.tabla_periodo_operarios.setItem(r, 2, QTableWidgetItem(
-                    consumos_service.formatear_coste(row.get('coste_total', 0))
+                    consumos_service.formatear_coste(row['coste'])
                 ))
-            
+
+            # La tabla cruzada sale del mismo rollup: ya está en caché
+            self._cruzar_periodo()
+            crono.marcar(telemetria.FASE_RENDER)
+
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al consultar período:\n{e}")
+
+    def _cruzar_periodo(self):
+        """Pinta la tabla cruzada del período con las dimensiones elegidas"""
+        filas_dim = self.combo_cruce_filas.currentData()
+        columnas_dim = self.combo_cruce_columnas.currentData()
+        medida = self.combo_cruce_medida.currentData()
+        if filas_dim == columnas_dim:
+            QMessageBox.warning(self, "Aviso", "Elija dimensiones distintas para filas y columnas")
+            return
+
+        try:
+            fecha_desde, fecha_hasta = self._rango_periodo()
+            cruce = consumos_cubo_service.pivotar(
+                filas_dim, columnas_dim, medida,
+                fecha_desde=fecha_desde, fecha_hasta=fecha_hasta
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al calcular la tabla cruzada:\n{e}")
+            return
+
+        self._cruce_actual = (filas_dim, columnas_dim, medida, fecha_desde, fecha_hasta)
+        self.tabla_cruce.clear()
+        self.tabla_cruce.setRowCount(len(cruce['filas']))
+        self.tabla_cruce.setColumnCount(len(cruce['columnas']))
+        self.tabla_cruce.setHorizontalHeaderLabels(cruce['columnas'])
+        self.tabla_cruce.setVerticalHeaderLabels(cruce['filas'])
+        for r, valores in enumerate(cruce['valores']):
+            for c, valor in enumerate(valores):
+                self.tabla_cruce.setItem(r, c, QTableWidgetItem(self._formatear_medida(medida, valor)))
+
+    def _desglosar_cruce(self, fila: int, columna: int):
+        """Doble clic en una celda de la tabla cruzada: baja un nivel en las columnas"""
+        if not self._cruce_actual:
+            return
+        filas_dim, columnas_dim, _medida, fecha_desde, fecha_hasta = self._cruce_actual
+        seleccion = {
+            filas_dim: self.tabla_cruce.verticalHeaderItem(fila).text(),
+            columnas_dim: self.tabla_cruce.horizontalHeaderItem(columna).text(),
+        }
+        self._abrir_desglose(
+            " › ".join(seleccion.values()),
+            [filas_dim, columnas_dim], seleccion, None, fecha_desde, fecha_hasta
+        )
+
+    def _desglosar_periodo_articulo(self, fila: int, _columna: int):
+        """Doble clic en el top de artículos del período: operarios que lo consumieron"""
+        fecha_desde, fecha_hasta = self._rango_periodo()
+        item = self.tabla_periodo_articulos.item(fila, 0)
+        self._abrir_desglose(
+            item.text(), ['articulo'], {'articulo': item.data(Qt.UserRole)}, None,
+            fecha_desde, fecha_hasta, nueva_dimension='operario'
+        )
+
+    def _desglosar_periodo_operario(self, fila: int, _columna: int):
+        """Doble clic en el top de operarios del período: sus OTs"""
+        fecha_desde, fecha_hasta = self._rango_periodo()
+        item = self.tabla_periodo_operarios.item(fila, 0)
+        self._abrir_desglose(
+            item.text(), ['operario'], {'operario': item.data(Qt.UserRole)}, None,
+            fecha_desde, fecha_hasta
+        )
     
     # ========================================
     # TAB 5: CONSUMOS POR ARTÍCULO
@@ -937,48 +1103,186 @@ class VentanaConsumos(QWidget):
         try:
             fecha_desde = self.articulo_fecha_desde.date().toPython()
             fecha_hasta = self.articulo_fecha_hasta.date().toPython()
+            filtros = {'articulo': self.articulo_seleccionado_id}
             
-            datos = consumos_service.obtener_consumos_articulo(
-                self.articulo_seleccionado_id, fecha_desde, fecha_hasta
+            crono = telemetria.Cronometro("VentanaConsumos.articulo")
+            resumen = consumos_cubo_service.consultar(['articulo'], filtros, fecha_desde, fecha_hasta)
+            detalle = consumos_cubo_service.consultar(
+                ['dia', 'ot', 'operario'], filtros, fecha_desde, fecha_hasta, ordenar_por='dia'
             )
+            crono.marcar(telemetria.FASE_CONSULTA)
             
-            if not datos['detalle']:
+            if not resumen:
                 QMessageBox.information(self, "Sin resultados",
                     "No se encontraron consumos de este artículo en el período")
                 return
             
             # Actualizar resumen
-            resumen = datos['resumen']
+            resumen = resumen[0]
+            unidad = resumen['unidad']
             texto_resumen = f"""
-<b>Artículo: {resumen.get('articulo_nombre', 'N/A')}</b><br>
+<b>Artículo: {resumen['articulo']}</b><br>
 <b>Período:</b> {fecha_desde.strftime('%d/%m/%Y')} - {fecha_hasta.strftime('%d/%m/%Y')}<br>
 <br>
-<b>Total consumido:</b> {consumos_service.formatear_cantidad(resumen.get('cantidad_total', 0), resumen.get('unidad', ''))}<br>
-<b>Número de imputaciones:</b> {resumen.get('veces_usado', 0)}<br>
-<b>Coste total:</b> <span style='font-size:16px; color:#dc2626;'><b>{consumos_service.formatear_coste(resumen.get('coste_total', 0))}</b></span>
+<b>Total consumido:</b> {consumos_service.formatear_cantidad(resumen['cantidad'], unidad)}<br>
+<b>Número de imputaciones:</b> {resumen['imputaciones']}<br>
+<b>Coste total:</b> <span style='font-size:16px; color:#dc2626;'><b>{consumos_service.formatear_coste(resumen['coste'])}</b></span>
             """
             self.articulo_resumen.setText(texto_resumen)
+            self._filtros_exportacion['consumos_articulo'] = {
+                'articulo_id': self.articulo_seleccionado_id,
+                'fecha_desde': fecha_desde.isoformat(),
+                'fecha_hasta': fecha_hasta.isoformat(),
+            }
             
             # Actualizar tabla
             self.tabla_articulo.setRowCount(0)
-            for row in datos['detalle']:
+            for row in detalle:
                 r = self.tabla_articulo.rowCount()
                 self.tabla_articulo.insertRow(r)
                 
-                self.tabla_articulo.setItem(r, 0, QTableWidgetItem(row.get('fecha', '')))
-                self.tabla_articulo.setItem(r, 1, QTableWidgetItem(row.get('ot', '')))
-                self.tabla_articulo.setItem(r, 2, QTableWidgetItem(row.get('operario', '')))
+                self.tabla_articulo.setItem(r, 0, QTableWidgetItem(row['dia']))
+                self.tabla_articulo.setItem(r, 1, QTableWidgetItem(row['ot']))
+                self.tabla_articulo.setItem(r, 2, QTableWidgetItem(row['operario']))
                 self.tabla_articulo.setItem(r, 3, QTableWidgetItem(
-                    consumos_service.formatear_cantidad(row.get('cantidad', 0), row.get('unidad', ''))
+                    consumos_service.formatear_cantidad(row['cantidad'], unidad)
                 ))
                 self.tabla_articulo.setItem(r, 4, QTableWidgetItem(
-                    consumos_service.formatear_coste(row.get('coste_total', 0))
+                    consumos_service.formatear_coste(row['coste'])
                 ))
-                self.tabla_articulo.setItem(r, 5, QTableWidgetItem(row.get('unidad', '')))
+                self.tabla_articulo.setItem(r, 5, QTableWidgetItem(unidad))
+            crono.marcar(telemetria.FASE_RENDER)
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al consultar artículo:\n{e}")
 
+    # ========================================
+    # CUBO: AUXILIARES Y DRILL-DOWN
+    # ========================================
+
+    @staticmethod
+    def _totales(filas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Suma las medidas de un corte del cubo y cuenta sus OTs distintas"""
+        return {
+            'imputaciones': sum(int(f['imputaciones']) for f in filas),
+            'coste': sum(f['coste'] for f in filas),
+            'ots': len({f['ot'] for f in filas if f['ot'] != 'SIN OT'}),
+        }
+
+    @staticmethod
+    def _coste_unitario(fila: Dict[str, Any]) -> float:
+        """Coste medio por unidad de una fila del cubo"""
+        return fila['coste'] / fila['cantidad'] if fila['cantidad'] else 0.0
+
+    @staticmethod
+    def _formatear_medida(medida: str, valor) -> str:
+        if medida == 'coste':
+            return consumos_service.formatear_coste(valor)
+        if medida == 'imputaciones':
+            return str(int(valor))
+        return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+    def _pintar_top_articulos(self, tabla: QTableWidget, filas: List[Dict[str, Any]]):
+        """Pinta un top de artículos del cubo (el id va en la primera columna, para el drill-down)"""
+        tabla.setRowCount(0)
+        for row in filas:
+            r = tabla.rowCount()
+            tabla.insertRow(r)
+
+            item = QTableWidgetItem(row['articulo'])
+            item.setData(Qt.UserRole, row['articulo_id'])
+            tabla.setItem(r, 0, item)
+            tabla.setItem(r, 1, QTableWidgetItem(
+                consumos_service.formatear_cantidad(row['cantidad'], row['unidad'])
+            ))
+            tabla.setItem(r, 2, QTableWidgetItem(str(row['imputaciones'])))
+            tabla.setItem(r, 3, QTableWidgetItem(
+                consumos_service.formatear_coste(row['coste'])
+            ))
+
+    def _abrir_desglose(self, descripcion: str, dimensiones: List[str], seleccion: Dict[str, Any],
+                        filtros, fecha_desde, fecha_hasta, nueva_dimension: str = None):
+        """
+        Abre un diálogo con el drill-down de una fila o celda del cubo.
+
+        descripcion es el texto de lo pulsado; el diálogo lo muestra como
+        primer paso de la ruta de selección.
+
+        Doble clic en una fila del diálogo baja otro nivel (JERARQUIAS del
+        cubo) mientras la dimensión tenga nivel inferior.
+        """
+        from PySide6.QtWidgets import QDialog
+
+        try:
+            dimensiones, filtros, filas = consumos_cubo_service.drill_down(
+                dimensiones, seleccion, filtros, nueva_dimension,
+                fecha_desde=fecha_desde, fecha_hasta=fecha_hasta
+            )
+        except ValueError as e:
+            QMessageBox.information(self, "Drill-down", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error al desglosar:\n{e}")
+            return
+
+        dialogo = QDialog(self)
+        dialogo.resize(700, 450)
+        layout = QVBoxLayout(dialogo)
+        etiqueta = QLabel()
+        etiqueta.setWordWrap(True)
+        layout.addWidget(etiqueta)
+        tabla = QTableWidget(0, 0)
+        tabla.setAlternatingRowColors(True)
+        layout.addWidget(tabla)
+        btn_cerrar = QPushButton("Cerrar")
+        btn_cerrar.clicked.connect(dialogo.close)
+        layout.addWidget(btn_cerrar)
+
+        estado = {'dimensiones': dimensiones, 'filtros': filtros, 'filas': filas, 'ruta': [descripcion]}
+
+        def pintar():
+            dims = estado['dimensiones']
+            etiquetas = [consumos_cubo_service.DIMENSIONES[d][1] for d in dims]
+            dialogo.setWindowTitle(f"Desglose por {' / '.join(dims)}")
+            etiqueta.setText(f"<b>Selección:</b> {' › '.join(estado['ruta'])}")
+            tabla.clear()
+            tabla.setColumnCount(len(etiquetas) + 3)
+            tabla.setHorizontalHeaderLabels([e.capitalize() for e in etiquetas] + ["Cantidad", "Imputaciones", "Coste"])
+            tabla.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+            tabla.setRowCount(len(estado['filas']))
+            for r, fila in enumerate(estado['filas']):
+                for c, col in enumerate(etiquetas):
+                    tabla.setItem(r, c, QTableWidgetItem(str(fila[col])))
+                base = len(etiquetas)
+                tabla.setItem(r, base, QTableWidgetItem(self._formatear_medida('cantidad', fila['cantidad'])))
+                tabla.setItem(r, base + 1, QTableWidgetItem(str(int(fila['imputaciones']))))
+                tabla.setItem(r, base + 2, QTableWidgetItem(consumos_service.formatear_coste(fila['coste'])))
+
+        def bajar(fila: int, _columna: int):
+            dims = estado['dimensiones']
+            ultima = dims[-1]
+            clave, col_etiqueta = consumos_cubo_service.DIMENSIONES[ultima]
+            seleccion = {ultima: estado['filas'][fila][clave]}
+            etiqueta_fila = estado['filas'][fila][col_etiqueta]
+            try:
+                nuevas = consumos_cubo_service.drill_down(
+                    dims, seleccion, estado['filtros'],
+                    fecha_desde=fecha_desde, fecha_hasta=fecha_hasta
+                )
+            except ValueError as e:
+                QMessageBox.information(dialogo, "Drill-down", str(e))
+                return
+            except Exception as e:
+                QMessageBox.critical(dialogo, "Error", f"Error al desglosar:\n{e}")
+                return
+            estado['dimensiones'], estado['filtros'], estado['filas'] = nuevas
+            estado['ruta'].append(str(etiqueta_fila))
+            pintar()
+
+        tabla.cellDoubleClicked.connect(bajar)
+        pintar()
+        dialogo.exec()
+
     # ========================================
     # FUNCIONES DE EXPORTACIÓN
     # ========================================
@@ -987,21 +1291,13 @@ class VentanaConsumos(QWidget):
         """Exporta el detalle de consumos por operario a CSV"""
         operario = self.combo_operario.currentText()
         titulo = f"CONSUMOS POR OPERARIO: {operario}" if operario and operario != "Seleccione un operario..." else "CONSUMOS POR OPERARIO"
-        self._exportar_tabla_a_csv(
-            self.tabla_operario_detalle,
-            f"consumos_operario_{operario.replace(' ', '_')}" if operario else "consumos_operario",
-            titulo
-        )
+        self._exportar_consulta_a_csv('consumos_operario', titulo, operario)
 
     def _exportar_furgoneta(self):
         """Exporta el detalle de consumos por furgoneta a CSV"""
         furgoneta = self.combo_furgoneta.currentText()
         titulo = f"CONSUMOS POR FURGONETA: {furgoneta}" if furgoneta and furgoneta != "Seleccione una furgoneta..." else "CONSUMOS POR FURGONETA"
-        self._exportar_tabla_a_csv(
-            self.tabla_furgoneta,
-            f"consumos_furgoneta_{furgoneta.replace(' ', '_')}" if furgoneta else "consumos_furgoneta",
-            titulo
-        )
+        self._exportar_consulta_a_csv('consumos_furgoneta', titulo, furgoneta)
 
     def _exportar_periodo(self):
         """Exporta el análisis de consumos por período a CSV"""
@@ -1018,8 +1314,4 @@ class VentanaConsumos(QWidget):
         """Exporta el detalle de consumos por artículo a CSV"""
         articulo = self.articulo_buscar.text().strip()
         titulo = f"CONSUMOS POR ARTÍCULO: {articulo}" if articulo else "CONSUMOS POR ARTÍCULO"
-        self._exportar_tabla_a_csv(
-            self.tabla_articulo,
-            f"consumos_articulo_{articulo.replace(' ', '_')}" if articulo else "consumos_articulo",
-            titulo
-        )
+        self._exportar_consulta_a_csv('consumos_articulo', titulo, articulo)
@@ -3,20 +3,42 @@ from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
     QTableWidgetItem, QLineEdit, QLabel, QMessageBox, QComboBox,
     QGroupBox, QHeaderView, QFormLayout, QTextEdit, QTabWidget,
-    QScrollArea
+    QScrollArea, QCompleter
 )
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QColor
+from PySide6.QtCore import Qt, QTimer, QModelIndex
+from PySide6.QtGui import QColor, QStandardItemModel, QStandardItem
 from pathlib import Path
 import datetime
 from src.ui.estilos import ESTILO_VENTANA
 from src.services import articulos_service, stock_service, movimientos_service
-from src.repos import articulos_repo, stock_repo, movimientos_repo
+from src.repos import articulos_repo
+from src.core import telemetria
+from src.core.logger import logger
+
+# Sugerencias que se piden a la BD cada vez (más al llegar al final de la lista)
+TAM_PAGINA = 50
+# Espera tras la última tecla antes de buscar
+ESPERA_BUSQUEDA_MS = 250
+
+
+def _texto_articulo(art):
+    """Texto del artículo en el buscador: Nombre [EAN] [REF]"""
+    texto = art['nombre']
+    if art['ean']:
+        texto += f" [EAN: {art['ean']}]"
+    if art['ref_proveedor']:
+        texto += f" [REF: {art['ref_proveedor']}]"
+    return texto
+
 
 class VentanaFichaArticulo(QWidget):
     def __init__(self, parent=None, articulo_id=None):
         super().__init__(parent)
-        self.articulo_id = articulo_id
+        self.articulo_id = None
+        # Datos de la ficha del artículo actual (articulos_service.obtener_ficha)
+        self._ficha = None
+        # Pestañas ya pintadas con esa ficha
+        self._tabs_cargados = set()
         self.setWindowTitle("📦 Ficha de Artículo")
         self.resize(1200, 800)
         self.setStyleSheet(ESTILO_VENTANA)
@@ -30,17 +52,16 @@ class VentanaFichaArticulo(QWidget):
         titulo.setStyleSheet("font-size: 20px; font-weight: bold;")
         
         lbl_buscar = QLabel("🔍 Buscar artículo:")
-        self.cmb_articulo = QComboBox()
-        self.cmb_articulo.setMinimumWidth(400)
-        self.cmb_articulo.setEditable(True)
-        self.cmb_articulo.setPlaceholderText("Escribe para buscar...")
-        self.cmb_articulo.currentIndexChanged.connect(self.cargar_articulo)
-        self.cargar_articulos_combo()
+        self.txt_articulo = QLineEdit()
+        self.txt_articulo.setMinimumWidth(400)
+        self.txt_articulo.setClearButtonEnabled(True)
+        self.txt_articulo.setPlaceholderText("Escribe nombre, EAN o referencia...")
+        self.crear_buscador()
         
         header_layout.addWidget(titulo)
         header_layout.addStretch()
         header_layout.addWidget(lbl_buscar)
-        header_layout.addWidget(self.cmb_articulo)
+        header_layout.addWidget(self.txt_articulo)
         
         layout.addLayout(header_layout)
         
@@ -72,6 +93,16 @@ class VentanaFichaArticulo(QWidget):
         self.crear_tab_entradas()
         self.tabs.addTab(self.tab_entradas, "📦 Últimas Entradas")
 
+        # Cada pestaña se pinta al hacerse visible, no al elegir el artículo
+        self._cargas_tabs = {
+            self.tab_info: ("informacion", self.actualizar_info_general),
+            self.tab_stock: ("stock", self.actualizar_stock_almacenes),
+            self.tab_historial: ("historial", self.actualizar_historial),
+            self.tab_stats: ("estadisticas", self.actualizar_estadisticas),
+            self.tab_entradas: ("entradas", self.actualizar_ultimas_entradas),
+        }
+        self.tabs.currentChanged.connect(self.cargar_tab_visible)
+
         layout.addWidget(self.tabs)
         
         # Botón volver
@@ -81,49 +112,163 @@ class VentanaFichaArticulo(QWidget):
         layout.addWidget(btn_volver)
         
         # Si se pasó un ID, cargarlo
-        if self.articulo_id:
-            self.seleccionar_articulo_por_id(self.articulo_id)
+        if articulo_id:
+            self.seleccionar_articulo_por_id(articulo_id)
     
-    def cargar_articulos_combo(self):
-        """Carga todos los artículos en el combo"""
-        try:
-            articulos = articulos_repo.get_todos(solo_activos=True, limit=10000)
+    # ========================================
+    # BUSCADOR DE ARTÍCULOS
+    # ========================================
+    def crear_buscador(self):
+        """
+        Autocompletado paginado sobre el buscador.
+
+        No se cargan todos los artículos al abrir: al escribir se pide a la BD
+        una página de coincidencias y, al bajar hasta el final de la lista,
+        la siguiente.
+        """
+        self._texto_buscado = ""
+        # Texto del artículo mostrado (volver a pulsar Enter no lo recarga)
+        self._texto_cargado = ""
+        self._hay_mas = False
+
+        self.modelo_sugerencias = QStandardItemModel(self)
+        self.completer = QCompleter(self.modelo_sugerencias, self)
+        # El filtro lo hace la BD: la lista muestra la página tal cual
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setMaxVisibleItems(15)
+        self.completer.setWidget(self.txt_articulo)
+        self.completer.activated[QModelIndex].connect(self.sugerencia_elegida)
+        self.completer.popup().verticalScrollBar().valueChanged.connect(
+            self.sugerencias_desplazadas
+        )
+
+        self.timer_busqueda = QTimer(self)
+        self.timer_busqueda.setSingleShot(True)
+        self.timer_busqueda.timeout.connect(self.buscar_sugerencias)
+        self.txt_articulo.textEdited.connect(lambda: self.timer_busqueda.start(ESPERA_BUSQUEDA_MS))
+        self.txt_articulo.returnPressed.connect(self.buscar_exacto)
+
+    def buscar_sugerencias(self):
+        """Muestra la primera página de artículos que coinciden con el texto"""
+        texto = self.txt_articulo.text().strip()
+        self.modelo_sugerencias.clear()
+        self._texto_buscado = texto
+        self._hay_mas = False
+
+        if len(texto) >= 2:
+            self.cargar_pagina_sugerencias()
+        if self.modelo_sugerencias.rowCount():
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def cargar_pagina_sugerencias(self):
+        """Añade a la lista la siguiente página de la búsqueda actual"""
+        crono = telemetria.Cronometro(self)
+        articulos = articulos_service.buscar_articulos_pagina(
+            self._texto_buscado,
+            limit=TAM_PAGINA,
+            offset=self.modelo_sugerencias.rowCount()
+        )
+        crono.marcar(telemetria.FASE_CONSULTA + ".buscador")
+
+        for art in articulos:
+            item = QStandardItem(_texto_articulo(art))
+            item.setData(art['id'], Qt.UserRole)
+            item.setEditable(False)
+            self.modelo_sugerencias.appendRow(item)
+        crono.marcar(telemetria.FASE_RENDER + ".buscador")
+
+        # Página completa: puede haber más resultados
+        self._hay_mas = len(articulos) == TAM_PAGINA
+
+    def sugerencias_desplazadas(self, valor):
+        """Al llegar al final de la lista se pide la página siguiente"""
+        if self._hay_mas and valor == self.completer.popup().verticalScrollBar().maximum():
+            self.cargar_pagina_sugerencias()
+
+    def sugerencia_elegida(self, index):
+        """Carga el artículo elegido en la lista de sugerencias"""
+        articulo_id = index.data(Qt.UserRole)
+        if not articulo_id:
+            return
+        self._texto_cargado = index.data(Qt.DisplayRole)
+        self.txt_articulo.setText(self._texto_cargado)
+        self.cargar_articulo(articulo_id)
+
+    def buscar_exacto(self):
+        """Enter: carga el artículo con ese EAN o referencia exactos (lector de códigos)"""
+        if self.completer.popup().isVisible():
+            # Enter sobre la lista lo gestiona sugerencia_elegida
+            return
 
-            self.cmb_articulo.addItem("(Seleccione un artículo)", None)
+        texto = self.txt_articulo.text().strip()
+        if not texto or texto == self._texto_cargado:
+            return
 
-            for art in articulos:
-                # Texto: Nombre [EAN] [REF]
-                texto = art['nombre']
-                if art['ean']:
-                    texto += f" [EAN: {art['ean']}]"
-                if art['ref_proveedor']:
-                    texto += f" [REF: {art['ref_proveedor']}]"
+        self.timer_busqueda.stop()
+        try:
+            articulo = articulos_repo.buscar_articulo_exacto(texto)
+        except Exception as e:
+            logger.exception(f"Error al buscar artículo '{texto}': {e}")
+            QMessageBox.critical(self, "❌ Error", f"Error al buscar artículo:\n{e}")
+            return
 
-                self.cmb_articulo.addItem(texto, art['id'])
+        if articulo:
+            self.mostrar_articulo(articulo)
+        else:
+            self.buscar_sugerencias()
 
-        except Exception as e:
-            QMessageBox.critical(self, "❌ Error", f"Error al cargar artículos:\n{e}")
-    
     def seleccionar_articulo_por_id(self, articulo_id):
-        """Selecciona un artículo en el combo por su ID"""
-        for i in range(self.cmb_articulo.count()):
-            if self.cmb_articulo.itemData(i) == articulo_id:
-                self.cmb_articulo.setCurrentIndex(i)
-                break
-    
-    def cargar_articulo(self):
-        """Carga la información del artículo seleccionado"""
-        self.articulo_id = self.cmb_articulo.currentData()
-        
-        if not self.articulo_id:
+        """Muestra el artículo con ese ID (el texto del buscador sale de la ficha)"""
+        self.cargar_articulo(articulo_id)
+        if self._ficha:
+            self._texto_cargado = _texto_articulo(self._ficha['articulo'])
+            self.txt_articulo.setText(self._texto_cargado)
+
+    def mostrar_articulo(self, articulo):
+        """Pone el artículo en el buscador y lo carga"""
+        self._texto_cargado = _texto_articulo(articulo)
+        self.txt_articulo.setText(self._texto_cargado)
+        self.cargar_articulo(articulo['id'])
+
+    # ========================================
+    # CARGA DE PESTAÑAS
+    # ========================================
+    def cargar_articulo(self, articulo_id):
+        """
+        Cambia de artículo: toda la ficha llega en una consulta (o de la caché
+        del servicio); se pinta la pestaña visible y el resto al abrirlas.
+        """
+        self.articulo_id = articulo_id
+        self._tabs_cargados.clear()
+
+        tipo, limite = self.filtros_historial()
+        crono = telemetria.Cronometro(self)
+        self._ficha = articulos_service.obtener_ficha(articulo_id, tipo=tipo, limit_historial=limite)
+        crono.marcar(telemetria.FASE_CONSULTA + ".ficha")
+
+        if self._ficha is None:
+            QMessageBox.warning(self, "⚠️ Aviso", "No se pudo cargar la ficha del artículo")
             return
-        
-        # Actualizar todos los tabs
-        self.actualizar_info_general()
-        self.actualizar_stock_almacenes()
-        self.actualizar_historial()
-        self.actualizar_estadisticas()
-        self.actualizar_ultimas_entradas()
+        self.cargar_tab_visible()
+
+    def cargar_tab_visible(self, _indice=None):
+        """Pinta la pestaña visible si aún no muestra la ficha actual"""
+        tab = self.tabs.currentWidget()
+        if not self._ficha or tab in self._tabs_cargados or tab not in self._cargas_tabs:
+            return
+
+        nombre, actualizar = self._cargas_tabs[tab]
+        crono = telemetria.Cronometro(self)
+        actualizar()
+        crono.marcar(telemetria.FASE_RENDER + "." + nombre)
+        self._tabs_cargados.add(tab)
+
+    def filtro_historial_cambiado(self):
+        """Los filtros del historial forman parte de la ficha: se vuelve a pedir"""
+        if self.articulo_id:
+            self.cargar_articulo(self.articulo_id)
     
     # ========================================
     # TAB 1: INFORMACIÓN GENERAL
@@ -225,13 +370,8 @@ class VentanaFichaArticulo(QWidget):
     def actualizar_info_general(self):
         """Actualiza la información general del artículo"""
         try:
-            # Obtener info del artículo
-            articulo = articulos_repo.get_by_id(self.articulo_id)
-            if not articulo:
-                return
-
-            # Obtener stock total
-            stock_total = stock_repo.get_stock_total_articulo(self.articulo_id)
+            articulo = self._ficha['articulo']
+            stock_total = self._ficha['stock_total']
 
             # Datos básicos
             self.lbl_nombre.setText(f"<b>{articulo['nombre']}</b>")
@@ -304,7 +444,7 @@ class VentanaFichaArticulo(QWidget):
     def actualizar_stock_almacenes(self):
         """Actualiza el stock por almacén"""
         try:
-            almacenes = stock_repo.get_stock_articulo_por_almacen(self.articulo_id)
+            almacenes = self._ficha['stock_almacenes']
 
             self.tabla_stock.setRowCount(len(almacenes))
 
@@ -348,12 +488,12 @@ class VentanaFichaArticulo(QWidget):
         self.cmb_limite = QComboBox()
         self.cmb_limite.addItems(["20", "50", "100", "Todos"])
         self.cmb_limite.setCurrentIndex(1)
-        self.cmb_limite.currentTextChanged.connect(self.actualizar_historial)
+        self.cmb_limite.currentTextChanged.connect(self.filtro_historial_cambiado)
         
         lbl_tipo = QLabel("Tipo:")
         self.cmb_tipo_hist = QComboBox()
         self.cmb_tipo_hist.addItems(["Todos", "ENTRADA", "TRASPASO", "IMPUTACION", "PERDIDA", "DEVOLUCION"])
-        self.cmb_tipo_hist.currentTextChanged.connect(self.actualizar_historial)
+        self.cmb_tipo_hist.currentTextChanged.connect(self.filtro_historial_cambiado)
         
         filtros_layout.addWidget(lbl_limite)
         filtros_layout.addWidget(self.cmb_limite)
@@ -383,24 +523,20 @@ class VentanaFichaArticulo(QWidget):
         
         layout.addWidget(self.tabla_historial)
     
+    def filtros_historial(self):
+        """Tipo (None = todos) y límite elegidos para el historial"""
+        tipo_filtro = None
+        if self.cmb_tipo_hist.currentIndex() > 0:
+            tipo_filtro = self.cmb_tipo_hist.currentText()
+
+        limite_str = self.cmb_limite.currentText()
+        limite = 10000 if limite_str == "Todos" else int(limite_str)
+        return tipo_filtro, limite
+
     def actualizar_historial(self):
         """Actualiza el historial de movimientos"""
         try:
-            # Determinar filtros
-            tipo_filtro = None
-            if self.cmb_tipo_hist.currentIndex() > 0:
-                tipo_filtro = self.cmb_tipo_hist.currentText()
-
-            # Determinar límite
-            limite_str = self.cmb_limite.currentText()
-            limite = 10000 if limite_str == "Todos" else int(limite_str)
-
-            # Obtener movimientos
-            movimientos = movimientos_repo.get_movimientos_articulo(
-                articulo_id=self.articulo_id,
-                tipo=tipo_filtro,
-                limit=limite
-            )
+            movimientos = self._ficha['historial']
 
             self.tabla_historial.setRowCount(len(movimientos))
 
@@ -519,10 +655,8 @@ class VentanaFichaArticulo(QWidget):
     def actualizar_estadisticas(self):
         """Actualiza las estadísticas del artículo"""
         try:
-            stats = movimientos_repo.get_estadisticas_articulo(self.articulo_id)
-
             # Resumen total
-            totales = stats['totales']
+            totales = self._ficha['totales']
             self.lbl_total_entradas.setText(f"<b>{totales.get('entradas') or 0:.2f}</b>")
             self.lbl_total_salidas.setText(f"<b>{totales.get('salidas') or 0:.2f}</b>")
             self.lbl_total_traspasos.setText(f"<b>{totales.get('traspasos') or 0:.2f}</b>")
@@ -530,12 +664,12 @@ class VentanaFichaArticulo(QWidget):
             self.lbl_total_perdidas.setText(f"<b>{totales.get('perdidas') or 0:.2f}</b>")
 
             # Últimos 30 días
-            stats_30d = stats['stats_30d']
+            stats_30d = self._ficha['stats_30d']
             self.lbl_entradas_30d.setText(f"<b>{stats_30d.get('entradas') or 0:.2f}</b>")
             self.lbl_consumo_30d.setText(f"<b>{stats_30d.get('consumo') or 0:.2f}</b>")
 
             # Top OTs
-            top_ots = stats['top_ots']
+            top_ots = self._ficha['top_ots']
             self.tabla_top_ots.setRowCount(len(top_ots))
 
             for i, ot in enumerate(top_ots):
@@ -588,8 +722,7 @@ class VentanaFichaArticulo(QWidget):
     def actualizar_ultimas_entradas(self):
         """Actualiza la tabla de últimas entradas"""
         try:
-            # Obtener últimas entradas del repositorio
-            entradas = articulos_repo.get_ultimas_entradas(self.articulo_id, limit=50)
+            entradas = self._ficha['ultimas_entradas']
 
             # Limpiar tabla
             self.tabla_entradas.setRowCount(0)
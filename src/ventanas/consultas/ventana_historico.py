@@ -13,6 +13,10 @@ from src.ui.widgets_base import (
 )
 from src.ui.combo_loaders import ComboLoader
 from src.services import almacenes_service, movimientos_service
+from src.core import telemetria
+
+# Directorio base del proyecto
+BASE = Path(__file__).parent.parent.parent
 
 class VentanaHistorico(QWidget):
     def __init__(self, parent=None):
@@ -191,44 +195,50 @@ class VentanaHistorico(QWidget):
         self.txt_responsable.clear()
         self.buscar()
     
-    def buscar(self):
-        """Busca movimientos según filtros"""
-        try:
-            # Preparar filtros
-            filtros = {}
+    def _obtener_filtros(self) -> dict:
+        """Construye los filtros de búsqueda a partir de los controles"""
+        filtros = {}
 
-            # Filtro de fechas
-            if self.chk_fecha.isChecked():
-                filtros['fecha_desde'] = self.date_desde.date().toString("yyyy-MM-dd")
-                filtros['fecha_hasta'] = self.date_hasta.date().toString("yyyy-MM-dd")
+        # Filtro de fechas
+        if self.chk_fecha.isChecked():
+            filtros['fecha_desde'] = self.date_desde.date().toString("yyyy-MM-dd")
+            filtros['fecha_hasta'] = self.date_hasta.date().toString("yyyy-MM-dd")
 
-            # Filtro de tipo
-            if self.cmb_tipo.currentIndex() > 0:
-                filtros['tipo'] = self.cmb_tipo.currentText()
+        # Filtro de tipo
+        if self.cmb_tipo.currentIndex() > 0:
+            filtros['tipo'] = self.cmb_tipo.currentText()
 
-            # Filtro de almacén (origen o destino)
-            almacen_id = self.cmb_almacen.currentData()
-            if almacen_id:
-                filtros['almacen_id'] = almacen_id
+        # Filtro de almacén (origen o destino)
+        almacen_id = self.cmb_almacen.currentData()
+        if almacen_id:
+            filtros['almacen_id'] = almacen_id
 
-            # Filtro de artículo por texto (nombre, EAN o referencia)
-            texto_articulo = self.txt_articulo.text().strip()
-            if texto_articulo:
-                filtros['articulo_texto'] = texto_articulo
+        # Filtro de artículo por texto (nombre, EAN o referencia)
+        texto_articulo = self.txt_articulo.text().strip()
+        if texto_articulo:
+            filtros['articulo_texto'] = texto_articulo
 
-            # Filtro de OT
-            ot = self.txt_ot.text().strip()
-            if ot:
-                filtros['ot'] = ot
+        # Filtro de OT
+        ot = self.txt_ot.text().strip()
+        if ot:
+            filtros['ot'] = ot
 
-            # Filtro de responsable
-            responsable = self.txt_responsable.text().strip()
-            if responsable:
-                filtros['responsable'] = responsable
+        # Filtro de responsable
+        responsable = self.txt_responsable.text().strip()
+        if responsable:
+            filtros['responsable'] = responsable
 
+        return filtros
+
+    def buscar(self):
+        """Busca movimientos según filtros"""
+        try:
+            filtros = self._obtener_filtros()
+
+            crono = telemetria.Cronometro(self)
             # Usar movimientos_service en lugar de SQL directo
             rows = movimientos_service.obtener_movimientos_filtrados(**filtros)
-
+            crono.marcar(telemetria.FASE_CONSULTA)
 
             # Mostrar en tabla
             self.tabla.setRowCount(len(rows))
@@ -290,7 +300,8 @@ class VentanaHistorico(QWidget):
 
                 # Motivo
                 self.tabla.setItem(i, 10, QTableWidgetItem(row.get('motivo') or "-"))
-            
+            crono.marcar(telemetria.FASE_RENDER)
+
             # Actualizar resumen
             self.lbl_resumen.setText(f"📋 Mostrando {len(rows)} movimiento(s)")
             
@@ -298,53 +309,18 @@ class VentanaHistorico(QWidget):
             QMessageBox.critical(self, "❌ Error", f"Error al buscar movimientos:\n{e}")
     
     def exportar_excel(self):
-        """Exporta los resultados a Excel"""
-        try:
-            import pandas as pd
-            from datetime import datetime
-            
-            # Obtener datos de la tabla
-            datos = []
-            for row in range(self.tabla.rowCount()):
-                fila = []
-                for col in range(1, self.tabla.columnCount()):  # Omitir ID
-                    item = self.tabla.item(row, col)
-                    fila.append(item.text() if item else "")
-                datos.append(fila)
-            
-            if not datos:
-                QMessageBox.warning(self, "⚠️ Aviso", "No hay datos para exportar.")
-                return
-            
-            # Crear DataFrame
-            columnas = ["Fecha", "Tipo", "Origen", "Destino", "Artículo", 
-                       "Cantidad", "Coste", "OT", "Responsable", "Motivo"]
-            df = pd.DataFrame(datos, columns=columnas)
-            
-            # Crear carpeta exports
-            export_dir = BASE / "exports"
-            export_dir.mkdir(exist_ok=True)
-            
-            # Nombre del archivo
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = export_dir / f"movimientos_{timestamp}.xlsx"
-            
-            # Exportar
-            df.to_excel(filename, index=False, sheet_name="Movimientos")
-            
-            QMessageBox.information(
-                self,
-                "✅ Éxito",
-                f"Movimientos exportados correctamente:\n\n{filename}"
-            )
-            
-        except ImportError:
-            QMessageBox.warning(
-                self,
-                "⚠️ Aviso",
-                "No se puede exportar a Excel.\n\n"
-                "Instala las librerías necesarias:\n"
-                "pip install pandas openpyxl"
-            )
-        except Exception as e:
-            QMessageBox.critical(self, "❌ Error", f"Error al exportar:\n{e}")
+        """
+        Exporta a Excel todos los movimientos que cumplen los filtros.
+
+        A diferencia de la tabla (limitada), la exportación recorre la
+        consulta completa en streaming y en segundo plano.
+        """
+        from src.ui.exportacion_worker import exportar_en_segundo_plano
+        from src.services import exportacion_service
+
+        # Crear carpeta exports
+        export_dir = BASE / "exports"
+        export_dir.mkdir(exist_ok=True)
+        ruta = export_dir / exportacion_service.nombre_archivo_sugerido('movimientos')
+
+        exportar_en_segundo_plano(self, 'movimientos', filtros=self._obtener_filtros(), ruta=ruta)
@@ -16,6 +16,7 @@ from datetime import datetime, timedelta
 from src.ui.estilos import ESTILO_VENTANA
 from src.core.logger import logger
 from src.services import informes_furgonetas_service
+from src.core import telemetria
 from src.repos.furgonetas_repo import list_furgonetas
 
 
@@ -160,10 +161,12 @@ class VentanaInformeFurgonetas(QWidget):
         progress.show()
 
         try:
-            exito, mensaje, datos = informes_furgonetas_service.generar_datos_informe(
-                furgoneta_id,
-                fecha_lunes
-            )
+            # El service consulta y agrupa a la vez: todo cuenta como consulta
+            with telemetria.medir(self, telemetria.FASE_CONSULTA):
+                exito, mensaje, datos = informes_furgonetas_service.generar_datos_informe(
+                    furgoneta_id,
+                    fecha_lunes
+                )
 
             progress.close()
 
@@ -172,7 +175,8 @@ class VentanaInformeFurgonetas(QWidget):
                 return
 
             self.datos_informe = datos
-            self.mostrar_datos_en_tabla()
+            with telemetria.medir(self, telemetria.FASE_RENDER):
+                self.mostrar_datos_en_tabla()
             self.btn_exportar_pdf.setEnabled(True)
 
             num_articulos = len(datos['articulos'])
@@ -11,7 +11,7 @@ from PySide6.QtGui import QFont, QColor
 from typing import List, Dict, Any
 
 from src.services import pedido_ideal_service
-from src.repos import pedido_ideal_repo
+from src.core import telemetria
 from src.ui.estilos import (
     ESTILO_VENTANA,
     ESTILO_TITULO_VENTANA,
@@ -267,9 +267,13 @@ class VentanaPedidoIdeal(QWidget):
             self.label_resumen.setText("⏳ Calculando pedido ideal... Analizando consumos históricos...")
             self.label_resumen.repaint()
             
-            # Obtener artículos
+            # Obtener artículos y estadísticas de consumo
+            crono = telemetria.Cronometro(self)
             incluir_sin_alerta = not filtros['solo_bajo_alerta']
-            articulos = pedido_ideal_repo.get_articulos_para_analizar(incluir_sin_alerta)
+            articulos, estadisticas = pedido_ideal_service.obtener_datos_analisis(
+                incluir_sin_alerta, periodo_analisis
+            )
+            crono.marcar(telemetria.FASE_CONSULTA)
             
             if not articulos:
                 QMessageBox.information(self, "Sin datos",
@@ -279,6 +283,7 @@ class VentanaPedidoIdeal(QWidget):
             
             self.label_resumen.setText(f"⏳ Analizando {len(articulos)} artículos...")
             self.label_resumen.repaint()
+            crono = telemetria.Cronometro(self)
             
             # Calcular pedidos
             self.pedidos_calculados = pedido_ideal_service.calcular_pedidos_multiples(
@@ -286,18 +291,21 @@ class VentanaPedidoIdeal(QWidget):
                 dias_cobertura,
                 dias_seguridad,
                 periodo_analisis,
-                filtros
+                filtros,
+                estadisticas=estadisticas
             )
             
             # Agrupar por proveedor
             self.grupos_proveedores = pedido_ideal_service.agrupar_por_proveedor(
                 self.pedidos_calculados
             )
+            crono.marcar(telemetria.FASE_PROCESO)
             
             # Actualizar interfaz
             self._actualizar_resumen()
             self._actualizar_tabla_general()
             self._crear_tabs_proveedores()
+            crono.marcar(telemetria.FASE_RENDER)
             
             QMessageBox.information(self, "✅ Cálculo completado",
                 f"Se ha calculado el pedido ideal para {len(self.pedidos_calculados)} artículos")
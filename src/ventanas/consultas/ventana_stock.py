@@ -13,6 +13,7 @@ from src.ui.widgets_base import (
 )
 from src.ui.combo_loaders import ComboLoader
 from src.services import familias_service, almacenes_service, stock_service
+from src.core import telemetria
 
 # Directorio base del proyecto
 BASE = Path(__file__).parent.parent.parent
@@ -169,19 +170,30 @@ class VentanaStock(QWidget):
         solo_alertas = self.chk_alertas.isChecked()
 
         try:
-            # Usar stock_service en lugar de SQL directo
+            crono = telemetria.Cronometro(self)
+            # Usar stock_service en lugar de SQL directo (resultado por columnas)
             rows = stock_service.obtener_stock_completo(
                 filtro_texto=texto_buscar,
                 familia=familia,
                 almacen=almacen,
                 solo_con_stock=solo_con_stock,
-                solo_alertas=solo_alertas
+                solo_alertas=solo_alertas,
+                columnar=True
             )
+            crono.marcar(telemetria.FASE_CONSULTA)
 
             self.tabla.setRowCount(len(rows))
 
-            total_articulos = 0
+            total_articulos = len(rows)
             alertas = 0
+            if total_articulos:
+                # Estado calculado de una vez sobre las columnas numéricas
+                stocks = rows.columna('stock')
+                minimos = rows.columna('min_alerta')
+                bajo_minimo = stocks < minimos
+                vacio = stocks == 0
+                alertas = int(bajo_minimo.sum())
+            crono.marcar(telemetria.FASE_PROCESO)
 
             for i, row in enumerate(rows):
                 # ID
@@ -195,22 +207,19 @@ class VentanaStock(QWidget):
                 # Almacén
                 self.tabla.setItem(i, 4, QTableWidgetItem(row['almacen'] or "-"))
                 # Stock
-                stock = row['stock']
                 u_medida = row['u_medida'] or "unidad"
-                item_stock = QTableWidgetItem(f"{stock:.2f} {u_medida}")
+                item_stock = QTableWidgetItem(f"{stocks[i]:.2f} {u_medida}")
                 item_stock.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                 self.tabla.setItem(i, 5, item_stock)
                 # Mínimo
-                min_alerta = row['min_alerta']
-                item_min = QTableWidgetItem(f"{min_alerta:.2f}")
+                item_min = QTableWidgetItem(f"{minimos[i]:.2f}")
                 item_min.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                 self.tabla.setItem(i, 6, item_min)
                 # Estado
-                if stock < min_alerta:
+                if bajo_minimo[i]:
                     estado = "⚠️ BAJO"
                     color = QColor("#fee2e2")
-                    alertas += 1
-                elif stock == 0:
+                elif vacio[i]:
                     estado = "❌ VACÍO"
                     color = QColor("#fecaca")
                 else:
@@ -221,8 +230,7 @@ class VentanaStock(QWidget):
                 item_estado.setBackground(color)
                 item_estado.setTextAlignment(Qt.AlignCenter)
                 self.tabla.setItem(i, 7, item_estado)
-
-                total_articulos += 1
+            crono.marcar(telemetria.FASE_RENDER)
 
             # Actualizar resumen
             self.lbl_resumen.setText(
@@ -244,52 +252,26 @@ class VentanaStock(QWidget):
             QMessageBox.critical(self, "❌ Error", f"Error al cargar stock:\n{e}")
     
     def exportar_excel(self):
-        """Exporta el stock actual a Excel"""
-        try:
-            import pandas as pd
-            from datetime import datetime
-            
-            # Obtener datos de la tabla
-            datos = []
-            for row in range(self.tabla.rowCount()):
-                fila = []
-                for col in range(1, self.tabla.columnCount()):  # Omitir ID
-                    item = self.tabla.item(row, col)
-                    fila.append(item.text() if item else "")
-                datos.append(fila)
-            
-            if not datos:
-                QMessageBox.warning(self, "⚠️ Aviso", "No hay datos para exportar.")
-                return
-            
-            # Crear DataFrame
-            columnas = ["Artículo", "EAN", "Familia", "Almacén", "Stock", "Mínimo", "Estado"]
-            df = pd.DataFrame(datos, columns=columnas)
-            
-            # Crear carpeta exports si no existe
-            export_dir = BASE / "exports"
-            export_dir.mkdir(exist_ok=True)
-            
-            # Nombre del archivo con timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = export_dir / f"stock_{timestamp}.xlsx"
-            
-            # Exportar
-            df.to_excel(filename, index=False, sheet_name="Stock")
-            
-            QMessageBox.information(
-                self,
-                "✅ Éxito",
-                f"Stock exportado correctamente:\n\n{filename}"
-            )
-            
-        except ImportError:
-            QMessageBox.warning(
-                self,
-                "⚠️ Aviso",
-                "No se puede exportar a Excel.\n\n"
-                "Instala las librerías necesarias:\n"
-                "pip install pandas openpyxl"
-            )
-        except Exception as e:
-            QMessageBox.critical(self, "❌ Error", f"Error al exportar:\n{e}")
\ No newline at end of file
+        """
+        Exporta a Excel el stock completo con los filtros actuales.
+
+        La consulta se vuelve a ejecutar en el servidor y se escribe en
+        streaming en segundo plano, sin depender de lo cargado en la tabla.
+        """
+        from src.ui.exportacion_worker import exportar_en_segundo_plano
+        from src.services import exportacion_service
+
+        filtros = {
+            'filtro_texto': self.txt_buscar.text().strip() or None,
+            'familia': self.cmb_familia.currentData(),
+            'almacen': self.cmb_almacen.currentData(),
+            'solo_con_stock': self.chk_con_stock.isChecked(),
+            'solo_alertas': self.chk_alertas.isChecked(),
+        }
+
+        # Crear carpeta exports si no existe
+        export_dir = BASE / "exports"
+        export_dir.mkdir(exist_ok=True)
+        ruta = export_dir / exportacion_service.nombre_archivo_sugerido('stock')
+
+        exportar_en_segundo_plano(self, 'stock', filtros=filtros, ruta=ruta)
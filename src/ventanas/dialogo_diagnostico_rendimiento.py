@@ -0,0 +1,142 @@
+"""
+Diálogo de diagnóstico de rendimiento por pantalla (solo administradores)
+"""
+import socket
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTableWidgetItem, QHeaderView, QMessageBox
+)
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QColor
+
+from src.ui.estilos import ESTILO_DIALOGO
+from src.ui.widgets_base import TablaEstandar
+from src.core import telemetria
+from src.core.session_manager import session_manager
+
+
+# p90 a partir del cual la fila se marca como lenta (ms)
+UMBRAL_AVISO_MS = 300
+UMBRAL_LENTO_MS = 1000
+
+
+class DialogoDiagnosticoRendimiento(QDialog):
+    """Muestra los percentiles de tiempo por pantalla y fase de esta sesión"""
+
+    COLUMNAS = ["Pantalla", "Fase", "Muestras", "Media", "p50", "p90", "p99", "Máx"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnóstico de Rendimiento")
+        self.setMinimumSize(820, 520)
+        self.setStyleSheet(ESTILO_DIALOGO)
+
+        self.crear_interfaz()
+        self.actualizar()
+
+    def crear_interfaz(self):
+        """Crea la interfaz del diálogo"""
+        layout = QVBoxLayout(self)
+
+        titulo = QLabel("⏱️ Diagnóstico de Rendimiento")
+        titulo.setStyleSheet("font-size: 16px; font-weight: bold; margin: 10px;")
+        titulo.setAlignment(Qt.AlignCenter)
+        layout.addWidget(titulo)
+
+        descripcion = QLabel(
+            "Tiempos de las pantallas abiertas en esta sesión y en este equipo.\n"
+            "consulta = espera a la base de datos · proceso = cálculos · "
+            "render = pintar la tabla · carga = consulta y render juntos"
+        )
+        descripcion.setStyleSheet("color: #64748b; margin-bottom: 10px;")
+        descripcion.setWordWrap(True)
+        descripcion.setAlignment(Qt.AlignCenter)
+        layout.addWidget(descripcion)
+
+        self.tabla = TablaEstandar()
+        self.tabla.setColumnCount(len(self.COLUMNAS))
+        self.tabla.setHorizontalHeaderLabels(self.COLUMNAS)
+        header = self.tabla.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for col in range(1, len(self.COLUMNAS)):
+            header.setSectionResizeMode(col, QHeaderView.ResizeToContents)
+        layout.addWidget(self.tabla)
+
+        self.lbl_resumen = QLabel()
+        self.lbl_resumen.setStyleSheet("color: #64748b;")
+        layout.addWidget(self.lbl_resumen)
+
+        botones = QHBoxLayout()
+        btn_actualizar = QPushButton("🔄 Actualizar")
+        btn_actualizar.clicked.connect(self.actualizar)
+        botones.addWidget(btn_actualizar)
+
+        btn_reiniciar = QPushButton("🧹 Reiniciar")
+        btn_reiniciar.clicked.connect(self.reiniciar)
+        botones.addWidget(btn_reiniciar)
+
+        btn_subir = QPushButton("☁️ Subir a la BD")
+        btn_subir.setToolTip("Guarda el resumen en la tabla metricas_rendimiento")
+        btn_subir.clicked.connect(self.subir)
+        botones.addWidget(btn_subir)
+
+        botones.addStretch()
+        btn_cerrar = QPushButton("Cerrar")
+        btn_cerrar.clicked.connect(self.accept)
+        botones.addWidget(btn_cerrar)
+        layout.addLayout(botones)
+
+    def actualizar(self):
+        """Recarga la tabla con las estadísticas actuales"""
+        filas = telemetria.estadisticas()
+        self.tabla.setRowCount(len(filas))
+
+        for i, fila in enumerate(filas):
+            self.tabla.setItem(i, 0, QTableWidgetItem(fila['pantalla']))
+            self.tabla.setItem(i, 1, QTableWidgetItem(fila['fase']))
+
+            valores = [
+                str(fila['muestras']),
+                f"{fila['media_ms']:.0f} ms",
+                f"{fila['p50_ms']:.0f} ms",
+                f"{fila['p90_ms']:.0f} ms",
+                f"{fila['p99_ms']:.0f} ms",
+                f"{fila['max_ms']:.0f} ms",
+            ]
+            for j, texto in enumerate(valores, start=2):
+                item = QTableWidgetItem(texto)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.tabla.setItem(i, j, item)
+
+            if fila['p90_ms'] >= UMBRAL_LENTO_MS:
+                color = QColor("#fee2e2")
+            elif fila['p90_ms'] >= UMBRAL_AVISO_MS:
+                color = QColor("#fef3c7")
+            else:
+                continue
+            for j in range(len(self.COLUMNAS)):
+                self.tabla.item(i, j).setBackground(color)
+
+        pantallas = len({f['pantalla'] for f in filas})
+        self.lbl_resumen.setText(
+            f"{pantallas} pantalla(s) medidas · se guardan las últimas "
+            f"{telemetria.MAX_MUESTRAS} muestras por fase"
+        )
+
+    def reiniciar(self):
+        """Borra las muestras acumuladas"""
+        telemetria.reiniciar()
+        self.actualizar()
+
+    def subir(self):
+        """Sube el resumen a metricas_rendimiento"""
+        from src.services import metricas_service
+
+        usuario = session_manager.get_usuario_actual() or "admin"
+        exito, mensaje = metricas_service.subir_metricas(usuario, socket.gethostname())
+        if exito:
+            QMessageBox.information(self, "✅ Métricas", mensaje)
+        else:
+            QMessageBox.warning(self, "⚠️ Métricas", mensaje)
+        self.actualizar()
@@ -7,11 +7,12 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt
 from src.ui.estilos import ESTILO_DIALOGO
-from src.ui.ventana_maestro_base import VentanaMaestroBase
+from src.ui.ventana_maestro_base import VentanaMaestroBase, LIMITE_CARGA
 from src.ui.combo_loaders import ComboLoader
 from src.services import articulos_service
 from src.core.session_manager import session_manager
 from src.repos import articulos_repo
+from src.utils.texto_busqueda import clave_busqueda
 
 # ========================================
 # DIÁLOGO PARA AÑADIR/EDITAR ARTÍCULO
@@ -313,6 +314,8 @@ class DialogoArticulo(QDialog):
 # VENTANA PRINCIPAL DE ARTÍCULOS
 # ========================================
 class VentanaArticulos(VentanaMaestroBase):
+    tablas_vigiladas = ('articulos', 'familias')
+
     def __init__(self, parent=None):
         # Inicializar combos de filtros antes de super()
         self.cmb_familia_filtro = None
@@ -343,13 +346,13 @@ class VentanaArticulos(VentanaMaestroBase):
         self.cargar_familias_filtro()  # Carga familias primero
         self.cmb_familia_filtro.insertItem(0, "Todas", None)  # Inserta "Todas" al principio
         self.cmb_familia_filtro.setCurrentIndex(0)  # Selecciona "Todas" por defecto
-        self.cmb_familia_filtro.currentTextChanged.connect(self.buscar)
+        self.cmb_familia_filtro.currentTextChanged.connect(lambda: self.aplicar_filtro(reiniciar=True))
 
         # Filtro de estado
         lbl_estado = QLabel("Estado:")
         self.cmb_estado = QComboBox()
         self.cmb_estado.addItems(["Todos", "Solo Activos", "Solo Inactivos"])
-        self.cmb_estado.currentTextChanged.connect(self.buscar)
+        self.cmb_estado.currentTextChanged.connect(lambda: self.aplicar_filtro(reiniciar=True))
 
         # Insertar los filtros antes del botón "Nuevo"
         top_layout.insertWidget(2, lbl_familia)
@@ -411,30 +414,29 @@ class VentanaArticulos(VentanaMaestroBase):
             opcion_vacia=False
         )
 
-    def cargar_datos(self, filtro=""):
-        """Sobrescribe para manejar filtros adicionales"""
+    def obtener_datos(self):
+        """Carga todos los artículos; familia y estado se filtran en memoria"""
+        return articulos_service.obtener_articulos(limit=LIMITE_CARGA)
+
+    def texto_busqueda(self, item_data):
+        """Busca por nombre, EAN, referencia o palabras clave"""
+        return clave_busqueda(
+            item_data['nombre'], item_data['ean'],
+            item_data['ref_proveedor'], item_data['palabras_clave']
+        )
+
+    def filtrar_fila(self, item_data):
+        """Aplica los combos de familia y estado"""
         familia_id = self.cmb_familia_filtro.currentData() if self.cmb_familia_filtro else None
-        estado = self.cmb_estado.currentText() if self.cmb_estado else "Todos"
+        if familia_id and item_data['familia_id'] != familia_id:
+            return False
 
-        # Convertir estado a booleano o None
-        solo_activos = None
+        estado = self.cmb_estado.currentText() if self.cmb_estado else "Todos"
         if estado == "Solo Activos":
-            solo_activos = True
-        elif estado == "Solo Inactivos":
-            solo_activos = False
-
-        # Obtener artículos con filtros
-        try:
-            filtro_texto = filtro if filtro else None
-            articulos = articulos_service.obtener_articulos(
-                filtro_texto=filtro_texto,
-                familia_id=familia_id,
-                solo_activos=solo_activos,
-                limit=1000
-            )
-            self.cargar_datos_en_tabla(articulos)
-        except Exception as e:
-            QMessageBox.critical(self, "❌ Error", f"Error al cargar artículos:\n{e}")
+            return item_data['activo'] == 1
+        if estado == "Solo Inactivos":
+            return item_data['activo'] == 0
+        return True
 
     def cargar_datos_en_tabla(self, datos):
         """Carga los artículos en la tabla con formato especial"""
@@ -44,6 +44,8 @@ class DialogoFamilia(DialogoMaestroBase):
 # VENTANA PRINCIPAL DE FAMILIAS
 # ========================================
 class VentanaFamilias(VentanaMaestroBase):
+    tablas_vigiladas = ('familias',)
+
     def __init__(self, parent=None):
         super().__init__(
             titulo="📂 Gestión de Familias de Artículos",
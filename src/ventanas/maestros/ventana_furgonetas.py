@@ -10,6 +10,7 @@ from src.ui.ventana_maestro_base import VentanaMaestroBase
 from src.services.furgonetas_service import boot, furgonetas_service_wrapper
 from src.repos.operarios_repo import get_todos as get_todos_operarios
 from src.utils import validaciones
+from src.utils.texto_busqueda import clave_busqueda
 
 # ========================================
 # DIÁLOGO PARA AÑADIR/EDITAR FURGONETA
@@ -107,6 +108,8 @@ class DialogoFurgoneta(DialogoMaestroBase):
 # VENTANA PRINCIPAL: GESTIÓN DE FURGONETAS
 # ========================================
 class VentanaFurgonetas(VentanaMaestroBase):
+    tablas_vigiladas = ('furgonetas',)
+
     def __init__(self, parent=None):
         # Asegurar esquema de base de datos
         boot()
@@ -154,6 +157,13 @@ class VentanaFurgonetas(VentanaMaestroBase):
         """Retorna la matrícula para mostrar en mensajes"""
         return self.tabla.item(fila, 2).text()  # Columna 2 = Matrícula
 
+    def texto_busqueda(self, item_data):
+        """Busca por número, matrícula, marca y modelo"""
+        return clave_busqueda(
+            item_data.get('numero'), item_data.get('matricula'),
+            item_data.get('marca'), item_data.get('modelo')
+        )
+
     def cargar_datos_en_tabla(self, datos):
         """Carga las furgonetas en la tabla con formato especial"""
         self.tabla.setRowCount(len(datos))
@@ -8,6 +8,7 @@ from src.ui.dialogo_maestro_base import DialogoMaestroBase
 from src.ui.ventana_maestro_base import VentanaMaestroBase
 from src.services import operarios_service
 from src.utils import validaciones
+from src.utils.texto_busqueda import clave_busqueda
 
 # ========================================
 # DIÁLOGO PARA AÑADIR/EDITAR OPERARIO
@@ -81,6 +82,8 @@ class DialogoOperario(DialogoMaestroBase):
 # VENTANA PRINCIPAL DE OPERARIOS
 # ========================================
 class VentanaOperarios(VentanaMaestroBase):
+    tablas_vigiladas = ('operarios',)
+
     def __init__(self, parent=None):
         # Crear ComboBox de filtros antes de llamar a super()
         self.cmb_filtro = None
@@ -118,7 +121,7 @@ class VentanaOperarios(VentanaMaestroBase):
         lbl_filtro = QLabel("Filtrar:")
         self.cmb_filtro = QComboBox()
         self.cmb_filtro.addItems(["Todos", "Solo Oficiales", "Solo Ayudantes", "Solo Activos", "Solo Inactivos"])
-        self.cmb_filtro.currentTextChanged.connect(self.buscar)
+        self.cmb_filtro.currentTextChanged.connect(lambda: self.aplicar_filtro(reiniciar=True))
 
         # Insertar en la posición 2 (después de lbl_buscar y txt_buscar)
         top_layout.insertWidget(2, lbl_filtro)
@@ -144,36 +147,23 @@ class VentanaOperarios(VentanaMaestroBase):
         """Crea el diálogo para crear/editar un operario"""
         return DialogoOperario(self, item_id)
 
-    def cargar_datos(self, filtro=""):
-        """Sobrescribe para manejar filtros adicionales"""
-        filtro_tipo = self.cmb_filtro.currentText() if self.cmb_filtro else "Todos"
+    def texto_busqueda(self, item_data):
+        """Busca solo por nombre"""
+        return clave_busqueda(item_data['nombre'])
 
-        # Preparar filtros
-        filtro_texto_param = filtro if filtro else None
+    def filtrar_fila(self, item_data):
+        """Aplica el combo de filtro (rol o estado)"""
+        filtro_tipo = self.cmb_filtro.currentText() if self.cmb_filtro else "Todos"
 
-        solo_rol = None
         if filtro_tipo == "Solo Oficiales":
-            solo_rol = "oficial"
-        elif filtro_tipo == "Solo Ayudantes":
-            solo_rol = "ayudante"
-
-        solo_activos = None
+            return item_data['rol_operario'] == "oficial"
+        if filtro_tipo == "Solo Ayudantes":
+            return item_data['rol_operario'] == "ayudante"
         if filtro_tipo == "Solo Activos":
-            solo_activos = True
-        elif filtro_tipo == "Solo Inactivos":
-            solo_activos = False
-
-        # Obtener operarios con filtros
-        try:
-            operarios = operarios_service.obtener_operarios(
-                filtro_texto=filtro_texto_param,
-                solo_rol=solo_rol,
-                solo_activos=solo_activos,
-                limit=1000
-            )
-            self.cargar_datos_en_tabla(operarios)
-        except Exception as e:
-            QMessageBox.critical(self, "❌ Error", f"Error al cargar operarios:\n{e}")
+            return item_data['activo'] == 1
+        if filtro_tipo == "Solo Inactivos":
+            return item_data['activo'] == 0
+        return True
 
     def cargar_datos_en_tabla(self, datos):
         """Carga los operarios en la tabla con formato especial"""
@@ -83,6 +83,8 @@ class DialogoProveedor(DialogoMaestroBase):
 # VENTANA PRINCIPAL DE PROVEEDORES
 # ========================================
 class VentanaProveedores(VentanaMaestroBase):
+    tablas_vigiladas = ('proveedores',)
+
     def __init__(self, parent=None):
         super().__init__(
             titulo="🏭 Gestión de Proveedores",
@@ -44,6 +44,8 @@ class DialogoUbicacion(DialogoMaestroBase):
 # VENTANA PRINCIPAL DE UBICACIONES
 # ========================================
 class VentanaUbicaciones(VentanaMaestroBase):
+    tablas_vigiladas = ('ubicaciones',)
+
     def __init__(self, parent=None):
         super().__init__(
             titulo="📍 Gestión de Ubicaciones del Almacén",
@@ -10,6 +10,7 @@ from src.ui.ventana_maestro_base import VentanaMaestroBase
 from src.services import usuarios_service
 from src.core.session_manager import session_manager
 from src.utils import validaciones
+from src.utils.texto_busqueda import clave_busqueda
 
 
 # ========================================
@@ -312,6 +313,10 @@ class VentanaUsuarios(VentanaMaestroBase):
         """Retorna el nombre de usuario para mostrar en mensajes"""
         return self.tabla.item(fila, 0).text()  # Columna 0 = Usuario
 
+    def texto_busqueda(self, item_data):
+        """Busca por usuario y rol"""
+        return clave_busqueda(item_data.get('usuario'), item_data.get('rol'))
+
     def editar_item(self):
         """Sobrescribe para usar columna 3 (usuario) en lugar de columna 0 (ID)"""
         seleccion = self.tabla.currentRow()
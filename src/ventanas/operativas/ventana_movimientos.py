@@ -14,7 +14,7 @@ from src.ui.combo_loaders import ComboLoader
 from src.ui.dialog_manager import DialogManager
 from src.core.logger import logger
 from src.core.error_handler import handle_db_errors, validate_field, show_warning, show_info
-from src.services import movimientos_service, historial_service
+from src.services import movimientos_service
 from src.repos import movimientos_repo, articulos_repo
 from src.services.furgonetas_service import list_furgonetas
 from src.core.session_manager import session_manager
@@ -686,37 +686,26 @@ class VentanaMovimientos(QWidget):
 
         # Preparar lista de artículos para el service
         articulos_para_service = [
-            {'id': art['id'], 'cantidad': art['cantidad']}
+            {'id': art['id'], 'cantidad': art['cantidad'],
+             'nombre': art['nombre'], 'u_medida': art['u_medida']}
             for art in self.articulos_temp
         ]
 
-        # Llamar al service para crear los traspasos
+        # Llamar al service para crear los traspasos; el historial de cada
+        # artículo se guarda en la misma transacción
         exito, mensaje, ids_creados = movimientos_service.crear_traspaso_almacen_furgoneta(
             fecha=fecha,
             operario_id=operario_id,
             articulos=articulos_para_service,
             usuario=session_manager.get_usuario_actual() or "admin",
-            modo=modo
+            modo=modo,
+            usuario_historial=session_manager.get_usuario_actual()
         )
 
         if not exito:
             show_warning("⚠️ Error", mensaje)
             return
 
-        # Guardar en historial (cada artículo individualmente)
-        usuario = session_manager.get_usuario_actual()
-        if usuario:
-            for art in self.articulos_temp:
-                historial_service.guardar_en_historial(
-                    usuario=usuario,
-                    tipo_operacion='movimiento',
-                    articulo_id=art['id'],
-                    articulo_nombre=art['nombre'],
-                    cantidad=art['cantidad'],
-                    u_medida=art['u_medida'],
-                    datos_adicionales={'modo': modo.lower()}
-                )
-
         # Mensaje de éxito
         modo_texto = "entregado a" if modo == "ENTREGAR" else "recibido de"
         show_info(
@@ -5,7 +5,7 @@ Ventana de Login - Autenticación de usuarios
 from datetime import datetime
 from pathlib import Path
 
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QThread, QTimer, Signal
 from PySide6.QtGui import QFont, QPixmap
 from PySide6.QtWidgets import (
     QDialog,
@@ -26,6 +26,26 @@ from src.services import usuarios_service
 from src.ui.estilos import COLOR_AZUL_PRINCIPAL, COLOR_TEXTO_OSCURO, ESTILO_LOGIN
 
 
+class AutenticacionWorker(QThread):
+    """
+    Ejecuta usuarios_service.autenticar_usuario() fuera del hilo de la
+    interfaz: bcrypt tarda cientos de ms a propósito y congelaría el login.
+    """
+
+    terminado = Signal(bool, str, object)  # (exito, mensaje, user_data)
+
+    def __init__(self, usuario: str, password: str, parent=None):
+        super().__init__(parent)
+        self.usuario = usuario
+        self.password = password
+
+    def run(self):
+        exito, mensaje, user_data = usuarios_service.autenticar_usuario(
+            self.usuario, self.password
+        )
+        self.terminado.emit(exito, mensaje, user_data)
+
+
 class VentanaLogin(QDialog):
     """Ventana de inicio de sesión."""
 
@@ -42,6 +62,9 @@ class VentanaLogin(QDialog):
         # Flag para indicar si el usuario quiere salir de la aplicación
         self.quiere_salir = False
 
+        # Autenticación en curso (AutenticacionWorker)
+        self._worker_auth = None
+
         # Layout principal horizontal
         main_layout = QHBoxLayout(self)
         main_layout.setSpacing(0)
@@ -194,10 +217,33 @@ class VentanaLogin(QDialog):
             self.txt_password.setFocus()
             return
 
-        # Autenticar con el servicio
-        exito, mensaje, user_data = usuarios_service.autenticar_usuario(
-            usuario, password
+        # Autenticar en segundo plano; el resultado llega por señal
+        if self._worker_auth is not None:
+            return
+        self._set_verificando(True)
+        self._worker_auth = AutenticacionWorker(usuario, password, self)
+        self._worker_auth.terminado.connect(
+            lambda exito, mensaje, user_data: self._on_autenticacion(
+                exito, mensaje, user_data, password
+            )
         )
+        self._worker_auth.finished.connect(self._worker_auth.deleteLater)
+        self._worker_auth.start()
+
+    def _set_verificando(self, verificando: bool):
+        """Bloquea el formulario mientras se verifica la contraseña."""
+        self.txt_usuario.setEnabled(not verificando)
+        self.txt_password.setEnabled(not verificando)
+        self.btn_login.setEnabled(not verificando)
+        self.btn_login.setText("Verificando..." if verificando else "Iniciar Sesión")
+
+    def _on_autenticacion(self, exito, mensaje, user_data, password):
+        """Procesa el resultado de AutenticacionWorker."""
+        if self._worker_auth is None:
+            # El diálogo se cerró mientras se verificaba: descartar el resultado
+            return
+        self._worker_auth = None
+        self._set_verificando(False)
 
         if not exito:
             QMessageBox.critical(self, "Error de autenticación", mensaje)
@@ -205,6 +251,12 @@ class VentanaLogin(QDialog):
             self.txt_password.setFocus()
             return
 
+        # Migrar el hash (SHA256 o pocas rondas) sin retrasar la entrada
+        if user_data.get("requiere_rehash"):
+            usuarios_service.actualizar_hash_en_segundo_plano(
+                user_data["usuario"], password
+            )
+
         # Login exitoso - guardar en session manager
         session_manager.login(
             user_data["usuario"], user_data["rol"], user_data.get("id")
@@ -218,16 +270,10 @@ class VentanaLogin(QDialog):
             config = obtener_configuracion()
 
             if config.backup_auto_inicio:
-                # Importar y ejecutar backup en segundo plano
-                import sys
-                from pathlib import Path
-
-                ROOT_DIR = Path(__file__).parent.parent.parent
-                sys.path.insert(0, str(ROOT_DIR))
+                # Ejecutar backup en segundo plano
+                from src.services import backup_service
 
-                from scripts.backup_db import crear_backup
-
-                crear_backup(mostrar_log=True, forzar=False)
+                backup_service.crear_backup_en_segundo_plano(forzar=False)
         except Exception as e:
             # No mostrar error al usuario, solo registrar en log
             from src.core.logger import logger
@@ -502,6 +548,22 @@ class VentanaLogin(QDialog):
             # Usuario canceló el cierre - ignorar el evento
             event.ignore()
 
+    def reject(self):
+        """
+        Cierra el diálogo sin autenticar (botón Salir, Escape o cierre de
+        ventana, que Qt también canaliza por aquí).
+
+        Si hay una verificación en curso se espera a que termine antes de
+        cerrar: destruir un QThread en marcha aborta la aplicación. bcrypt
+        tarda como mucho unos cientos de ms.
+        """
+        worker = self._worker_auth
+        if worker is not None:
+            self._worker_auth = None
+            worker.terminado.disconnect()
+            worker.wait()
+        super().reject()
+
     def get_usuario_autenticado(self):
         """Devuelve los datos del usuario autenticado (o None)."""
         return self.usuario_autenticado